@@ -0,0 +1,8 @@
+# Celery es opcional: si no está instalado, los workers locales
+# (comandos de gestión) procesan las colas.
+try:
+    from .celery import app as celery_app
+except ImportError:
+    celery_app = None
+
+__all__ = ('celery_app',)
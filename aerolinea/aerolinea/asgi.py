@@ -3,6 +3,16 @@ ASGI config for aerolinea project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+En producción se sirve con un servidor ASGI, por ejemplo:
+
+    uvicorn aerolinea.asgi:application --workers 4
+
+Bajo ASGI las vistas async (home, lista y búsqueda de vuelos, detalle de
+vuelo, estadísticas) esperan a la base sin ocupar el worker, y el stream
+del mapa de asientos (server-sent events) queda abierto sin bloquear el
+resto del tráfico. Con varios workers, PUBSUB_BROKER debe apuntar a un
+broker compartido (ver aerolinea.pubsub).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
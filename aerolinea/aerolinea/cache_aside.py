@@ -0,0 +1,172 @@
+"""
+Caché de agregados costosos con protección contra estampidas.
+
+Los contadores de vuelos, las estadísticas del panel y los reportes se
+guardaban en caché con un vencimiento fijo: al vencer, todas las
+solicitudes que llegaban en ese momento los recalculaban a la vez, justo
+en los picos. obtener_o_calcular evita las dos causas:
+
+1. Recálculo anticipado probabilístico (XFetch): junto con el valor se
+   guarda cuánto tardó en calcularse y cuándo vence. Cada lectura decide
+   al azar si lo recalcula antes de tiempo, con una probabilidad que crece
+   a medida que se acerca el vencimiento y con lo que cuesta calcularlo
+   (CACHE_RECALCULO_BETA > 1 adelanta más el recálculo). Lo normal es que
+   una sola solicitud lo renueve mientras las demás siguen usando el valor
+   vigente, y que nunca llegue a vencer.
+2. Recálculo único: si el valor no está (venció, se invalidó o es la
+   primera vez), solo la solicitud que toma el bloqueo (cache.add) lo
+   calcula; las demás esperan hasta CACHE_RECALCULO_ESPERA segundos a que
+   aparezca y, si no aparece, lo calculan ellas mismas. esperar/aesperar y
+   vencimiento_bloqueo también los usa la caché de respuestas por vista
+   (aerolinea.cache_vistas).
+
+Los valores se guardan tal cual en sus claves (los datos del recálculo van
+en una clave aparte), así otro código puede seguir ajustándolos con
+cache.incr o descartándolos con cache.delete.
+
+Uso:
+
+    total = obtener_o_calcular('aviones:total', Avion.objects.count, 300)
+
+    # Varios valores que se calculan juntos
+    contadores = obtener_o_calcular_varios(
+        'vuelos:contadores',
+        {'total': 'total_vuelos_count', 'programados': 'vuelos_activos_count'},
+        VueloRepository.contar_total_y_programados,
+        300
+    )
+"""
+
+import asyncio
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+_INTERVALO_ESPERA = 0.05  # segundos entre lecturas mientras otro calcula
+
+
+def _cache():
+    return caches[getattr(settings, 'CACHE_RECALCULO_ALIAS', 'default')]
+
+
+def _recalcular_antes(duracion: float, vence: float) -> bool:
+    """Sorteo del recálculo anticipado (XFetch)."""
+    beta = getattr(settings, 'CACHE_RECALCULO_BETA', 1.0)
+    # 1 - random() está en (0, 1]: el logaritmo es <= 0
+    return time.time() - duracion * beta * math.log(1 - random.random()) >= vence
+
+
+def _calcular_y_guardar(cache, nombre: str, claves: dict, calcular, ttl: int) -> dict:
+    inicio = time.monotonic()
+    valores = calcular()
+    duracion = time.monotonic() - inicio
+
+    datos = {clave: valores[campo] for campo, clave in claves.items()}
+    datos[f'{nombre}:recalculo'] = (duracion, time.time() + ttl)
+    cache.set_many(datos, ttl)
+    return valores
+
+
+def vencimiento_bloqueo() -> int:
+    """Segundos de validez del bloqueo de recálculo (por si quien lo toma muere sin liberarlo)."""
+    return getattr(settings, 'CACHE_RECALCULO_BLOQUEO', 30)
+
+
+def _revisar_espera(encontrados: dict, claves: list, bloqueo: str):
+    """(terminó, valores) según lo leído mientras otra solicitud calcula."""
+    if all(clave in encontrados for clave in claves):
+        return True, {clave: encontrados[clave] for clave in claves}
+    # Sin bloqueo, terminó sin guardarlos (por ejemplo, por un error)
+    return bloqueo not in encontrados, None
+
+
+def esperar(cache, claves: list, bloqueo: str) -> dict | None:
+    """
+    Espera a que la solicitud que tomó el bloqueo (cache.add) guarde las claves.
+
+    Args:
+        cache: Backend de caché donde se guardan
+        claves (list): Claves que guarda quien calcula
+        bloqueo (str): Clave del bloqueo
+
+    Returns:
+        dict: {clave: valor}, o None si el bloqueo se liberó sin guardarlas
+        o pasaron CACHE_RECALCULO_ESPERA segundos
+    """
+    limite = time.monotonic() + getattr(settings, 'CACHE_RECALCULO_ESPERA', 2)
+    while time.monotonic() < limite:
+        time.sleep(_INTERVALO_ESPERA)
+        terminado, valores = _revisar_espera(cache.get_many([*claves, bloqueo]), claves, bloqueo)
+        if terminado:
+            return valores
+    return None
+
+
+async def aesperar(cache, claves: list, bloqueo: str) -> dict | None:
+    """Versión async de esperar."""
+    limite = time.monotonic() + getattr(settings, 'CACHE_RECALCULO_ESPERA', 2)
+    while time.monotonic() < limite:
+        await asyncio.sleep(_INTERVALO_ESPERA)
+        terminado, valores = _revisar_espera(await cache.aget_many([*claves, bloqueo]), claves, bloqueo)
+        if terminado:
+            return valores
+    return None
+
+
+def obtener_o_calcular_varios(nombre: str, claves: dict, calcular, ttl: int) -> dict:
+    """
+    Obtiene de la caché varios valores que se calculan juntos.
+
+    Args:
+        nombre (str): Nombre del grupo de valores (para el bloqueo y los
+            datos del recálculo)
+        claves (dict): {campo: clave de caché} de cada valor
+        calcular: Función sin argumentos que devuelve {campo: valor}
+        ttl (int): Segundos de validez
+
+    Returns:
+        dict: {campo: valor}
+    """
+    cache = _cache()
+    recalculo = f'{nombre}:recalculo'
+    bloqueo = f'{nombre}:bloqueo'
+    bloqueo_ttl = vencimiento_bloqueo()
+
+    encontrados = cache.get_many([*claves.values(), recalculo])
+    if all(clave in encontrados for clave in claves.values()):
+        datos = encontrados.get(recalculo)
+        if datos is not None and _recalcular_antes(*datos) and cache.add(bloqueo, 1, bloqueo_ttl):
+            try:
+                return _calcular_y_guardar(cache, nombre, claves, calcular, ttl)
+            finally:
+                cache.delete(bloqueo)
+        return {campo: encontrados[clave] for campo, clave in claves.items()}
+
+    if cache.add(bloqueo, 1, bloqueo_ttl):
+        try:
+            return _calcular_y_guardar(cache, nombre, claves, calcular, ttl)
+        finally:
+            cache.delete(bloqueo)
+
+    encontrados = esperar(cache, list(claves.values()), bloqueo)
+    if encontrados is None:
+        return _calcular_y_guardar(cache, nombre, claves, calcular, ttl)
+    return {campo: encontrados[clave] for campo, clave in claves.items()}
+
+
+def obtener_o_calcular(clave: str, calcular, ttl: int):
+    """
+    Obtiene un valor de la caché, calculándolo una sola vez cuando falta.
+
+    Args:
+        clave (str): Clave de caché del valor
+        calcular: Función sin argumentos que devuelve el valor
+        ttl (int): Segundos de validez
+
+    Returns:
+        El valor
+    """
+    return obtener_o_calcular_varios(clave, {'valor': clave}, lambda: {'valor': calcular()}, ttl)['valor']
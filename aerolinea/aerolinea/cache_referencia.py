@@ -0,0 +1,180 @@
+"""
+Caché de datos de referencia en dos niveles.
+
+Los aviones, la distribución de asientos de cada avión y los usuarios
+(con su rol) se leían de la base en casi todas las solicitudes, aunque
+cambian muy poco. Este módulo los guarda en dos niveles:
+
+1. Local: un LRU en memoria del proceso, acotado a
+   CACHE_REFERENCIA_MAXIMO_LOCAL entradas y con vencimiento corto
+   (CACHE_REFERENCIA_TTL_LOCAL). No cuesta ni una consulta de red.
+2. Compartido: el backend de caché de Django (CACHE_REFERENCIA_ALIAS, con
+   Redis vía django-redis o la memoria local como respaldo), válido por
+   CACHE_REFERENCIA_TTL.
+
+Las entidades creadas con compartir=False (los usuarios, que llevan el
+hash de la contraseña) solo usan el nivel local: no salen del proceso y se
+vuelven a leer de la base cada CACHE_REFERENCIA_TTL_LOCAL segundos.
+
+Las claves llevan versión: CACHE_REFERENCIA_VERSION (se sube cuando cambia
+un modelo cacheado, para no leer objetos con otra estructura) y una
+generación por entidad, que invalidar_todo() incrementa. Los repositorios
+invalidan cada objeto al guardarlo (signals); los otros procesos lo ven a
+lo sumo CACHE_REFERENCIA_TTL_LOCAL segundos después.
+
+Los valores se guardan serializados: cada lectura devuelve una copia, así
+que modificar el objeto obtenido no altera la caché.
+
+Uso:
+
+    CACHE_AVIONES = CacheReferencia('avion')
+
+    avion = CACHE_AVIONES.obtener(avion_id, lambda: Avion.objects.filter(id=avion_id).first())
+    CACHE_AVIONES.invalidar(avion_id)
+"""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+_AUSENTE = object()
+
+_local = None
+_local_lock = threading.Lock()
+
+
+class CacheLocal:
+    """LRU en memoria del proceso, con tamaño máximo y vencimiento por entrada."""
+
+    def __init__(self, maximo: int):
+        self.maximo = maximo
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave, default=_AUSENTE):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return default
+            valor, vence = entrada
+            if vence <= time.monotonic():
+                del self._datos[clave]
+                return default
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor, ttl: float):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maximo:
+                # Descartar la entrada usada hace más tiempo
+                self._datos.popitem(last=False)
+
+    def delete(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+def cache_local() -> CacheLocal:
+    """Nivel local compartido por todas las entidades (una instancia por proceso)."""
+    global _local
+    if _local is None:
+        with _local_lock:
+            if _local is None:
+                _local = CacheLocal(getattr(settings, 'CACHE_REFERENCIA_MAXIMO_LOCAL', 1000))
+    return _local
+
+
+class CacheReferencia:
+    """Caché en dos niveles de una entidad de referencia."""
+
+    def __init__(self, nombre: str, compartir: bool = True):
+        """
+        Args:
+            nombre: Nombre de la entidad, parte de cada clave
+            compartir: Si es False, los valores solo se guardan en el nivel local
+        """
+        self.nombre = nombre
+        self.compartir = compartir
+
+    @property
+    def compartida(self):
+        return caches[getattr(settings, 'CACHE_REFERENCIA_ALIAS', 'default')]
+
+    def _clave_generacion(self) -> str:
+        return f'ref:{self.nombre}:generacion'
+
+    def _generacion(self) -> int:
+        """Generación vigente de la entidad (leída del nivel compartido cada TTL local)."""
+        clave = self._clave_generacion()
+        local = cache_local()
+        generacion = local.get(clave)
+        if generacion is _AUSENTE:
+            generacion = self.compartida.get(clave)
+            if generacion is None:
+                self.compartida.add(clave, 1, None)
+                generacion = self.compartida.get(clave, 1)
+            local.set(clave, generacion, getattr(settings, 'CACHE_REFERENCIA_TTL_LOCAL', 5))
+        return generacion
+
+    def _clave(self, clave) -> str:
+        version = getattr(settings, 'CACHE_REFERENCIA_VERSION', 1)
+        return f'ref:v{version}:{self.nombre}:g{self._generacion()}:{clave}'
+
+    def obtener(self, clave, cargar):
+        """
+        Obtiene un valor, cargándolo si no está en ninguno de los dos niveles.
+
+        Args:
+            clave: Identificador del valor dentro de la entidad (por ejemplo el ID)
+            cargar: Función sin argumentos que lee el valor de la base.
+                Si devuelve None, no se guarda
+
+        Returns:
+            Una copia del valor, o None
+        """
+        completa = self._clave(clave)
+        local = cache_local()
+        datos = local.get(completa)
+        if datos is _AUSENTE:
+            datos = self.compartida.get(completa) if self.compartir else None
+            if datos is None:
+                valor = cargar()
+                if valor is None:
+                    return None
+                datos = pickle.dumps(valor, pickle.HIGHEST_PROTOCOL)
+                if self.compartir:
+                    self.compartida.set(completa, datos, getattr(settings, 'CACHE_REFERENCIA_TTL', 3600))
+            local.set(completa, datos, getattr(settings, 'CACHE_REFERENCIA_TTL_LOCAL', 5))
+        return pickle.loads(datos)
+
+    def invalidar(self, *claves):
+        """Descarta valores de ambos niveles (en los otros procesos vencen solos)."""
+        completas = [self._clave(clave) for clave in claves]
+        if self.compartir:
+            self.compartida.delete_many(completas)
+        local = cache_local()
+        for completa in completas:
+            local.delete(completa)
+
+    def invalidar_todo(self):
+        """Descarta todos los valores de la entidad pasando a una nueva generación."""
+        clave = self._clave_generacion()
+        try:
+            self.compartida.incr(clave)
+        except ValueError:
+            # Todavía no había generación en el nivel compartido
+            self.compartida.add(clave, 2, None)
+        cache_local().delete(clave)
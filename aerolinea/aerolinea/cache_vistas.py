@@ -0,0 +1,223 @@
+"""
+Caché de respuestas por vista.
+
+La página principal, la lista de vuelos y el listado y el detalle públicos
+de vuelos de la API se calculaban en cada solicitud, aunque cambian poco y son las
+páginas más visitadas. El decorador cachear_respuesta guarda la respuesta
+en la caché de Django (ver CACHES en settings) y la reutiliza mientras no
+cambien:
+
+- la ruta y el query string (normalizado: no importa el orden de los parámetros)
+- el idioma activo (el sitio usa i18n_patterns)
+- el estado de autenticación: anónimo o autenticado, o directamente el
+  usuario si la página muestra datos propios (por_usuario=True; el menú
+  del sitio muestra el nombre y los enlaces de staff)
+- la generación del grupo de la vista, que invalidar_grupo() incrementa
+  (los signals de vuelos lo hacen al guardar un vuelo o un avión)
+
+Solo se cachean las respuestas 200 a GET, de solicitudes sin mensajes
+pendientes (el template los mostraría y consumiría una sola vez) y que no
+fijan cookies. El token CSRF de los formularios de la página se reemplaza,
+en cada respuesta servida desde la caché, por uno válido para quien la
+pide. Las respuestas de la API (Response de DRF) se guardan como datos sin
+renderizar, así la negociación de contenido sigue funcionando.
+
+Protección contra estampidas: cuando falta una entrada, solo una solicitud
+la calcula (toma un bloqueo con cache.add); las demás esperan a que
+aparezca con el mismo mecanismo que los agregados de aerolinea.cache_aside
+(CACHE_RECALCULO_ESPERA y CACHE_RECALCULO_BLOQUEO) y, si no aparece, la
+calculan ellas mismas.
+
+Uso:
+
+    @cachear_respuesta('vuelos', por_usuario=True)
+    async def home(request):
+        ...
+
+    @method_decorator(cachear_respuesta('vuelos'), name='list')
+    class VueloViewSet(viewsets.ModelViewSet):
+        ...
+"""
+
+import hashlib
+import re
+from functools import wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.translation import get_language
+from rest_framework.response import Response
+
+from aerolinea.cache_aside import aesperar, esperar, vencimiento_bloqueo
+
+_PATRON_TOKEN_CSRF = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+def _cache():
+    return caches[getattr(settings, 'CACHE_VISTAS_ALIAS', 'default')]
+
+
+def _clave_generacion(grupo: str) -> str:
+    return f'vista:{grupo}:generacion'
+
+
+def _generacion(grupo: str) -> int:
+    """Generación vigente de un grupo de vistas."""
+    cache = _cache()
+    clave = _clave_generacion(grupo)
+    generacion = cache.get(clave)
+    if generacion is None:
+        cache.add(clave, 1, None)
+        generacion = cache.get(clave, 1)
+    return generacion
+
+
+def invalidar_grupo(grupo: str):
+    """Descarta las respuestas cacheadas de un grupo de vistas pasando a una nueva generación."""
+    cache = _cache()
+    clave = _clave_generacion(grupo)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        # Todavía no había generación
+        cache.add(clave, 2, None)
+
+
+def _estado_autenticacion(request, por_usuario: bool) -> str:
+    usuario = request.user
+    if not usuario.is_authenticated:
+        return 'anonimo'
+    return f'usuario{usuario.pk}' if por_usuario else 'autenticado'
+
+
+def _preparar(request, grupo: str, nombre: str, por_usuario: bool) -> str | None:
+    """
+    Clave de la respuesta en la caché.
+
+    Returns:
+        str: La clave, o None si la solicitud no se debe cachear
+    """
+    if request.method != 'GET':
+        return None
+    if len(get_messages(request)):
+        # El template mostraría los mensajes pendientes una sola vez
+        return None
+
+    parametros = urlencode(sorted(
+        (parametro, valor) for parametro, valores in request.GET.lists() for valor in valores
+    ))
+    huella = hashlib.sha1(f'{request.path}?{parametros}'.encode()).hexdigest()
+    return (
+        f'vista:{grupo}:g{_generacion(grupo)}:{nombre}:{get_language()}:'
+        f'{_estado_autenticacion(request, por_usuario)}:{huella}'
+    )
+
+
+def _empaquetar(response):
+    """Versión guardable de la respuesta, o None si no se debe cachear."""
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return None
+    if isinstance(response, Response):
+        return ('datos', response.status_code, response.data)
+    token = _PATRON_TOKEN_CSRF.search(response.content)
+    return (
+        'html', response.status_code, response.content, response['Content-Type'],
+        token.group(1) if token else None
+    )
+
+
+def _desempaquetar(request, paquete):
+    """Arma la respuesta a partir de lo guardado en la caché."""
+    tipo, status, *resto = paquete
+    if tipo == 'datos':
+        response = Response(resto[0], status=status)
+    else:
+        contenido, content_type, token = resto
+        if token:
+            # El token guardado es el del visitante que generó la página
+            contenido = contenido.replace(token, get_token(request).encode())
+        response = HttpResponse(contenido, status=status, content_type=content_type)
+    response['X-Cache-Vista'] = 'HIT'
+    return response
+
+
+def cachear_respuesta(grupo: str, ttl: int = None, por_usuario: bool = False):
+    """
+    Decorador que cachea la respuesta de una vista (sincrónica o async).
+
+    Args:
+        grupo (str): Grupo de invalidación de la vista (ver invalidar_grupo)
+        ttl (int): Segundos de validez; por defecto CACHE_VISTAS_TTL (0 = sin caché)
+        por_usuario (bool): Si la página cambia según el usuario autenticado
+
+    Returns:
+        El decorador
+    """
+    def decorador(vista):
+        nombre = f'{vista.__module__}.{vista.__qualname__}'
+
+        def validez():
+            return ttl if ttl is not None else getattr(settings, 'CACHE_VISTAS_TTL', 60)
+
+        if iscoroutinefunction(vista):
+            @wraps(vista)
+            async def envoltorio(request, *args, **kwargs):
+                segundos = validez()
+                clave = segundos and await sync_to_async(_preparar)(request, grupo, nombre, por_usuario)
+                if not clave:
+                    return await vista(request, *args, **kwargs)
+
+                cache = _cache()
+                paquete = await cache.aget(clave)
+                if paquete is None:
+                    bloqueo = f'{clave}:bloqueo'
+                    if await cache.aadd(bloqueo, 1, vencimiento_bloqueo()):
+                        try:
+                            response = await vista(request, *args, **kwargs)
+                            paquete = _empaquetar(response)
+                            if paquete is not None:
+                                await cache.aset(clave, paquete, segundos)
+                        finally:
+                            await cache.adelete(bloqueo)
+                        return response
+                    guardada = await aesperar(cache, [clave], bloqueo)
+                    if guardada is None:
+                        # Terminó sin guardarla (por ejemplo, respondió con un error)
+                        return await vista(request, *args, **kwargs)
+                    paquete = guardada[clave]
+                return _desempaquetar(request, paquete)
+        else:
+            @wraps(vista)
+            def envoltorio(request, *args, **kwargs):
+                segundos = validez()
+                clave = segundos and _preparar(request, grupo, nombre, por_usuario)
+                if not clave:
+                    return vista(request, *args, **kwargs)
+
+                cache = _cache()
+                paquete = cache.get(clave)
+                if paquete is None:
+                    bloqueo = f'{clave}:bloqueo'
+                    if cache.add(bloqueo, 1, vencimiento_bloqueo()):
+                        try:
+                            response = vista(request, *args, **kwargs)
+                            paquete = _empaquetar(response)
+                            if paquete is not None:
+                                cache.set(clave, paquete, segundos)
+                        finally:
+                            cache.delete(bloqueo)
+                        return response
+                    guardada = esperar(cache, [clave], bloqueo)
+                    if guardada is None:
+                        return vista(request, *args, **kwargs)
+                    paquete = guardada[clave]
+                return _desempaquetar(request, paquete)
+
+        return envoltorio
+
+    return decorador
@@ -0,0 +1,28 @@
+"""
+Aplicación de Celery del proyecto.
+
+Celery es opcional: se usa solo si está instalado y CORREO_USAR_CELERY
+(u otra tarea asíncrona) está activo. Sin Celery, los workers locales
+(comandos de gestión) cumplen la misma función.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'aerolinea.settings')
+
+app = Celery('aerolinea')
+
+# Lee la configuración desde settings con el prefijo CELERY_
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+# Busca tasks.py en las aplicaciones instaladas
+app.autodiscover_tasks()
+
+
+@app.task(name='aerolinea.tareas.ejecutar_tarea', ignore_result=True)
+def ejecutar_tarea(ruta, *args, **kwargs):
+    """Tarea genérica usada por aerolinea.tareas.encolar."""
+    from aerolinea.tareas import ejecutar_tarea as ejecutar
+    return ejecutar(ruta, *args, **kwargs)
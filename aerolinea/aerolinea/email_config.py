@@ -3,17 +3,20 @@ Configuración de emails para el sistema de aerolínea.
 
 Este módulo configura el sistema de envío de emails con:
 - Templates HTML personalizados
-- Configuración de SMTP
+- Cola de salida asíncrona (app notificaciones)
 - Funciones helper para envío
+
+Ningún método envía por SMTP dentro de la solicitud: los emails se
+renderizan y se encolan, y el worker de la cola los entrega en lotes
+(ver notificaciones.services.notificaciones.CorreoService).
 """
 
 import logging
-from django.core.mail import send_mail, EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
 from django.conf import settings
 from django.utils.translation import gettext as _
 
+from notificaciones.services.notificaciones import CorreoService
+
 
 logger = logging.getLogger(__name__)
 
@@ -27,68 +30,53 @@ class EmailService:
     - Recordatorio de vuelo
     - Cambios de estado
     - Notificaciones administrativas
+    
+    Todos los métodos encolan el email y retornan True si quedó en la cola.
     """
     
     @staticmethod
     def send_reservation_confirmation(reservation, user):
         """
-        Envía email de confirmación de reserva.
+        Encola email de confirmación de reserva.
         
         Args:
             reservation: Objeto Reserva
-            user: Usuario que realizó la reserva
+            user: Usuario (o pasajero) que recibe el email
         """
         try:
             subject = _('Confirmación de Reserva - Vuelo {}').format(
-                reservation.vuelo.codigo_vuelo
+                reservation.vuelo.id
             )
             
-            # Renderizar template HTML
-            html_content = render_to_string('emails/reservation_confirmation.html', {
+            CorreoService.encolar_plantilla(subject, 'emails/reservation_confirmation.html', {
                 'reservation': reservation,
                 'user': user,
                 'vuelo': reservation.vuelo,
                 'pasajero': reservation.pasajero,
                 'asiento': reservation.asiento
-            })
-            
-            # Versión texto plano
-            text_content = strip_tags(html_content)
-            
-            # Crear email
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=text_content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[user.email]
-            )
-            
-            email.attach_alternative(html_content, "text/html")
-            
-            # Enviar email
-            email.send()
+            }, [user.email])
             
             logger.info(
-                f"Email de confirmación enviado a {user.email} "
-                f"para reserva {reservation.codigo_reserva}"
+                f"Email de confirmación encolado para {user.email} "
+                f"(reserva {reservation.codigo_reserva})"
             )
             
             return True
             
         except Exception as e:
             logger.error(
-                f"Error enviando email de confirmación a {user.email}: {str(e)}"
+                f"Error encolando email de confirmación para {user.email}: {str(e)}"
             )
             return False
     
     @staticmethod
     def send_flight_reminder(reservation, user):
         """
-        Envía email de recordatorio de vuelo.
+        Encola email de recordatorio de vuelo.
         
         Args:
             reservation: Objeto Reserva
-            user: Usuario que realizó la reserva
+            user: Usuario (o pasajero) que recibe el email
         """
         try:
             subject = _('Recordatorio de Vuelo - {} → {}').format(
@@ -96,48 +84,33 @@ class EmailService:
                 reservation.vuelo.destino
             )
             
-            # Renderizar template HTML
-            html_content = render_to_string('emails/flight_reminder.html', {
+            CorreoService.encolar_plantilla(subject, 'emails/flight_reminder.html', {
                 'reservation': reservation,
                 'user': user,
                 'vuelo': reservation.vuelo,
                 'pasajero': reservation.pasajero,
                 'asiento': reservation.asiento
-            })
-            
-            # Versión texto plano
-            text_content = strip_tags(html_content)
-            
-            # Crear email
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=text_content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[user.email]
-            )
-            
-            email.attach_alternative(html_content, "text/html")
-            
-            # Enviar email
-            email.send()
+            }, [user.email])
             
             logger.info(
-                f"Email de recordatorio enviado a {user.email} "
-                f"para vuelo {reservation.vuelo.codigo_vuelo}"
+                f"Email de recordatorio encolado para {user.email} "
+                f"(vuelo {reservation.vuelo.id})"
             )
             
             return True
             
         except Exception as e:
             logger.error(
-                f"Error enviando email de recordatorio a {user.email}: {str(e)}"
+                f"Error encolando email de recordatorio para {user.email}: {str(e)}"
             )
             return False
     
     @staticmethod
     def send_flight_status_change(vuelo, old_status, new_status, users):
         """
-        Envía email de cambio de estado de vuelo.
+        Encola email de cambio de estado de vuelo.
+        
+        El template se renderiza una sola vez para todos los destinatarios.
         
         Args:
             vuelo: Objeto Vuelo
@@ -146,53 +119,30 @@ class EmailService:
             users: Lista de usuarios a notificar
         """
         try:
-            subject = _('Cambio de Estado - Vuelo {}').format(vuelo.codigo_vuelo)
+            subject = _('Cambio de Estado - Vuelo {}').format(vuelo.id)
             
-            # Renderizar template HTML
-            html_content = render_to_string('emails/flight_status_change.html', {
+            encolados = CorreoService.encolar_plantilla(subject, 'emails/flight_status_change.html', {
                 'vuelo': vuelo,
                 'old_status': old_status,
                 'new_status': new_status
-            })
-            
-            # Versión texto plano
-            text_content = strip_tags(html_content)
+            }, [user.email for user in users])
             
-            # Enviar a todos los usuarios
-            for user in users:
-                try:
-                    email = EmailMultiAlternatives(
-                        subject=subject,
-                        body=text_content,
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        to=[user.email]
-                    )
-                    
-                    email.attach_alternative(html_content, "text/html")
-                    email.send()
-                    
-                    logger.info(
-                        f"Email de cambio de estado enviado a {user.email} "
-                        f"para vuelo {vuelo.codigo_vuelo}"
-                    )
-                    
-                except Exception as e:
-                    logger.error(
-                        f"Error enviando email a {user.email}: {str(e)}"
-                    )
+            logger.info(
+                f"{encolados} emails de cambio de estado encolados para vuelo {vuelo.id}"
+            )
             
             return True
             
         except Exception as e:
             logger.error(
-                f"Error enviando emails de cambio de estado: {str(e)}"
+                f"Error encolando emails de cambio de estado: {str(e)}"
             )
             return False
     
     @staticmethod
     def send_welcome_email(user):
         """
-        Envía email de bienvenida a nuevos usuarios.
+        Encola email de bienvenida a nuevos usuarios.
         
         Args:
             user: Usuario recién registrado
@@ -200,40 +150,23 @@ class EmailService:
         try:
             subject = _('¡Bienvenido a {}!').format(settings.SITE_NAME)
             
-            # Renderizar template HTML
-            html_content = render_to_string('emails/welcome.html', {
+            CorreoService.encolar_plantilla(subject, 'emails/welcome.html', {
                 'user': user,
                 'site_name': settings.SITE_NAME
-            })
+            }, [user.email])
             
-            # Versión texto plano
-            text_content = strip_tags(html_content)
-            
-            # Crear email
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=text_content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[user.email]
-            )
-            
-            email.attach_alternative(html_content, "text/html")
-            
-            # Enviar email
-            email.send()
-            
-            logger.info(f"Email de bienvenida enviado a {user.email}")
+            logger.info(f"Email de bienvenida encolado para {user.email}")
             
             return True
             
         except Exception as e:
-            logger.error(f"Error enviando email de bienvenida a {user.email}: {str(e)}")
+            logger.error(f"Error encolando email de bienvenida para {user.email}: {str(e)}")
             return False
     
     @staticmethod
     def send_password_reset(user, reset_url):
         """
-        Envía email de restablecimiento de contraseña.
+        Encola email de restablecimiento de contraseña.
         
         Args:
             user: Usuario que solicitó el restablecimiento
@@ -242,41 +175,24 @@ class EmailService:
         try:
             subject = _('Restablecimiento de Contraseña')
             
-            # Renderizar template HTML
-            html_content = render_to_string('emails/password_reset.html', {
+            CorreoService.encolar_plantilla(subject, 'emails/password_reset.html', {
                 'user': user,
                 'reset_url': reset_url,
                 'site_name': settings.SITE_NAME
-            })
+            }, [user.email])
             
-            # Versión texto plano
-            text_content = strip_tags(html_content)
-            
-            # Crear email
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=text_content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[user.email]
-            )
-            
-            email.attach_alternative(html_content, "text/html")
-            
-            # Enviar email
-            email.send()
-            
-            logger.info(f"Email de restablecimiento enviado a {user.email}")
+            logger.info(f"Email de restablecimiento encolado para {user.email}")
             
             return True
             
         except Exception as e:
-            logger.error(f"Error enviando email de restablecimiento a {user.email}: {str(e)}")
+            logger.error(f"Error encolando email de restablecimiento para {user.email}: {str(e)}")
             return False
     
     @staticmethod
     def send_admin_notification(subject, message, admin_emails):
         """
-        Envía notificación administrativa.
+        Encola notificación administrativa.
         
         Args:
             subject: Asunto del email
@@ -284,38 +200,18 @@ class EmailService:
             admin_emails: Lista de emails de administradores
         """
         try:
-            # Renderizar template HTML
-            html_content = render_to_string('emails/admin_notification.html', {
+            encolados = CorreoService.encolar_plantilla(subject, 'emails/admin_notification.html', {
                 'subject': subject,
                 'message': message,
                 'site_name': settings.SITE_NAME
-            })
-            
-            # Versión texto plano
-            text_content = strip_tags(html_content)
+            }, admin_emails)
             
-            # Enviar a todos los administradores
-            for admin_email in admin_emails:
-                try:
-                    email = EmailMultiAlternatives(
-                        subject=subject,
-                        body=text_content,
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        to=[admin_email]
-                    )
-                    
-                    email.attach_alternative(html_content, "text/html")
-                    email.send()
-                    
-                    logger.info(f"Notificación administrativa enviada a {admin_email}")
-                    
-                except Exception as e:
-                    logger.error(f"Error enviando notificación a {admin_email}: {str(e)}")
+            logger.info(f"{encolados} notificaciones administrativas encoladas")
             
             return True
             
         except Exception as e:
-            logger.error(f"Error enviando notificaciones administrativas: {str(e)}")
+            logger.error(f"Error encolando notificaciones administrativas: {str(e)}")
             return False
 
 
@@ -330,22 +226,16 @@ def send_simple_email(subject, message, recipient_list, html_message=None):
         html_message: Mensaje HTML (opcional)
     
     Returns:
-        bool: True si se envió correctamente, False en caso contrario
+        bool: True si se encoló correctamente, False en caso contrario
     """
     try:
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=recipient_list,
-            html_message=html_message
-        )
+        CorreoService.encolar(subject, recipient_list, message, html_message or '')
         
-        logger.info(f"Email simple enviado a {recipient_list}")
+        logger.info(f"Email simple encolado para {recipient_list}")
         return True
         
     except Exception as e:
-        logger.error(f"Error enviando email simple: {str(e)}")
+        logger.error(f"Error encolando email simple: {str(e)}")
         return False
 
 
@@ -353,6 +243,9 @@ def send_bulk_email(subject, message, recipient_list, html_message=None):
     """
     Función helper para envío masivo de emails.
     
+    Encola un email por destinatario con una sola inserción; el worker
+    los envía en lotes reutilizando la conexión SMTP.
+    
     Args:
         subject: Asunto del email
         message: Mensaje del email
@@ -360,25 +253,13 @@ def send_bulk_email(subject, message, recipient_list, html_message=None):
         html_message: Mensaje HTML (opcional)
     
     Returns:
-        int: Número de emails enviados exitosamente
+        int: Número de emails encolados
     """
-    success_count = 0
-    
-    for recipient in recipient_list:
-        try:
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[recipient],
-                html_message=html_message
-            )
-            
-            success_count += 1
-            logger.info(f"Email masivo enviado a {recipient}")
-            
-        except Exception as e:
-            logger.error(f"Error enviando email masivo a {recipient}: {str(e)}")
+    try:
+        encolados = CorreoService.encolar(subject, recipient_list, message, html_message or '')
+    except Exception as e:
+        logger.error(f"Error encolando envío masivo: {str(e)}")
+        return 0
     
-    logger.info(f"Envio masivo completado: {success_count}/{len(recipient_list)} emails enviados")
-    return success_count 
\ No newline at end of file
+    logger.info(f"Envío masivo encolado: {encolados}/{len(recipient_list)} emails")
+    return encolados
\ No newline at end of file
@@ -0,0 +1,306 @@
+"""
+Soporte de idempotencia para endpoints de reservas.
+
+Los clientes móviles reintentan las solicitudes lentas, y cada reintento
+de crear/confirmar/cancelar volvía a ejecutar la transacción completa.
+Este módulo permite que el cliente envíe una cabecera ``Idempotency-Key``:
+la primera solicitud con esa clave se ejecuta normalmente y su respuesta
+queda guardada; las repeticiones reciben la respuesta original sin volver
+a tocar la base de datos.
+
+Componentes:
+- AlmacenIdempotencia: almacén compacto de respuestas con expiración (TTL)
+- idempotente: decorador para acciones de ViewSets de DRF
+- idempotente_vista: decorador para vistas de Django basadas en funciones
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+
+CABECERA_IDEMPOTENCIA = 'Idempotency-Key'
+CAMPO_IDEMPOTENCIA = 'idempotency_key'
+CABECERA_REPETIDA = 'Idempotent-Replayed'
+
+# Respuesta guardada para una clave
+RespuestaGuardada = namedtuple(
+    'RespuestaGuardada', ['huella', 'status', 'datos', 'cabeceras']
+)
+
+
+class AlmacenIdempotencia:
+    """
+    Almacén de respuestas por clave de idempotencia.
+
+    Guarda en memoria del proceso un diccionario ordenado por inserción
+    cuyas claves son digests SHA-1 (20 bytes). Como todas las entradas
+    tienen el mismo TTL, las más antiguas están al principio y la
+    expiración se resuelve quitando elementos del frente.
+
+    Además replica las respuestas y la marca de solicitud en curso en el
+    caché de Django (IDEMPOTENCIA_USAR_CACHE, activado por defecto), para
+    que un reintento que llega a otro worker también se deduplique. La
+    garantía entre workers depende de que ese caché sea compartido
+    (CACHE_BACKEND='redis'); con el backend en memoria vale por proceso.
+    """
+
+    def __init__(self, ttl: int = None, max_claves: int = None, usar_cache: bool = None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'IDEMPOTENCIA_TTL', 86400)
+        self.max_claves = max_claves if max_claves is not None else getattr(
+            settings, 'IDEMPOTENCIA_MAX_CLAVES', 10000
+        )
+        self.usar_cache = usar_cache if usar_cache is not None else getattr(
+            settings, 'IDEMPOTENCIA_USAR_CACHE', True
+        )
+        self._datos = OrderedDict()
+        self._en_curso = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def generar_clave(*partes) -> bytes:
+        """Genera la clave interna a partir del alcance y la clave del cliente."""
+        return hashlib.sha1('\x1f'.join(str(p) for p in partes).encode()).digest()
+
+    @staticmethod
+    def _clave_cache(clave: bytes, sufijo: str = '') -> str:
+        return f"idempotencia:{clave.hex()}{sufijo}"
+
+    def _purgar(self, ahora: float):
+        """Elimina entradas vencidas y respeta el tamaño máximo."""
+        datos = self._datos
+        while datos:
+            primera = next(iter(datos))
+            if datos[primera][0] > ahora and len(datos) <= self.max_claves:
+                break
+            datos.popitem(last=False)
+
+    def obtener(self, clave: bytes) -> RespuestaGuardada | None:
+        """Retorna la respuesta guardada para la clave, si existe."""
+        ahora = time.monotonic()
+        with self._lock:
+            self._purgar(ahora)
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                return entrada[1]
+        if self.usar_cache:
+            guardada = cache.get(self._clave_cache(clave))
+            if guardada is not None:
+                return RespuestaGuardada(*guardada)
+        return None
+
+    def iniciar(self, clave: bytes) -> bool:
+        """
+        Marca la clave como en curso.
+
+        Returns:
+            bool: False si otra solicitud con la misma clave ya está en curso
+        """
+        with self._lock:
+            if clave in self._en_curso:
+                return False
+            self._en_curso[clave] = threading.Event()
+        if self.usar_cache and not cache.add(self._clave_cache(clave, ':en_curso'), 1, 60):
+            with self._lock:
+                self._en_curso.pop(clave).set()
+            return False
+        return True
+
+    def esperar(self, clave: bytes, timeout: float) -> RespuestaGuardada | None:
+        """Espera a que termine la solicitud en curso y retorna su respuesta."""
+        limite = time.monotonic() + timeout
+        with self._lock:
+            evento = self._en_curso.get(clave)
+        if evento is not None:
+            evento.wait(timeout)
+        else:
+            # La solicitud original está en otro proceso: consultar el caché
+            while time.monotonic() < limite:
+                if self.obtener(clave) is not None:
+                    break
+                time.sleep(0.05)
+        return self.obtener(clave)
+
+    def guardar(self, clave: bytes, respuesta: RespuestaGuardada):
+        """Guarda la respuesta y libera la clave."""
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl, respuesta)
+            self._datos.move_to_end(clave)
+            self._purgar(time.monotonic())
+        if self.usar_cache:
+            cache.set(self._clave_cache(clave), tuple(respuesta), self.ttl)
+        self.liberar(clave)
+
+    def liberar(self, clave: bytes):
+        """Libera la marca de solicitud en curso."""
+        with self._lock:
+            evento = self._en_curso.pop(clave, None)
+        if evento is not None:
+            evento.set()
+            if self.usar_cache:
+                cache.delete(self._clave_cache(clave, ':en_curso'))
+
+    def limpiar(self):
+        """Vacía el almacén, incluidas las respuestas que replicó en el caché (usado en tests)."""
+        with self._lock:
+            claves = list(self._datos)
+            self._datos.clear()
+            self._en_curso.clear()
+        if self.usar_cache and claves:
+            cache.delete_many([self._clave_cache(clave) for clave in claves])
+
+
+# Almacén compartido por todas las vistas del proceso
+almacen = AlmacenIdempotencia()
+
+
+def _huella(*partes) -> str:
+    """Huella del contenido de la solicitud, para detectar claves reutilizadas."""
+    contenido = json.dumps(partes, sort_keys=True, default=str)
+    return hashlib.sha1(contenido.encode()).hexdigest()
+
+
+def _alcance(request) -> str:
+    """Alcance de la clave: usuario autenticado o sesión anónima."""
+    usuario = getattr(request, 'user', None)
+    if usuario is not None and usuario.is_authenticated:
+        return f"u{usuario.pk}"
+    sesion = getattr(request, 'session', None)
+    return f"s{sesion.session_key}" if sesion is not None and sesion.session_key else 'anonimo'
+
+
+def _procesar(clave, huella, ejecutar, reproducir, rechazar):
+    """Flujo común: reproducir, esperar o ejecutar y guardar."""
+    guardada = almacen.obtener(clave)
+    if guardada is None:
+        if almacen.iniciar(clave):
+            # Otra solicitud con la misma clave pudo terminar entre la
+            # lectura y la marca: volver a leer antes de ejecutar
+            guardada = almacen.obtener(clave)
+            if guardada is not None:
+                almacen.liberar(clave)
+        else:
+            espera = getattr(settings, 'IDEMPOTENCIA_ESPERA', 10)
+            guardada = almacen.esperar(clave, espera)
+            if guardada is None:
+                return rechazar(409, 'Hay una solicitud en curso con la misma clave de idempotencia')
+
+    if guardada is not None:
+        if guardada.huella != huella:
+            return rechazar(422, 'La clave de idempotencia ya se usó con otros datos')
+        return reproducir(guardada)
+
+    try:
+        respuesta, guardada = ejecutar()
+    except BaseException:
+        almacen.liberar(clave)
+        raise
+
+    # Los errores del servidor no se guardan: el reintento debe ejecutarse
+    if guardada.status < 500:
+        almacen.guardar(clave, guardada)
+    else:
+        almacen.liberar(clave)
+    return respuesta
+
+
+def idempotente(accion):
+    """
+    Decorador para acciones de ViewSets de DRF.
+
+    Si la solicitud trae la cabecera Idempotency-Key, la respuesta se
+    guarda y las repeticiones con la misma clave la reciben sin volver a
+    ejecutar la acción.
+    """
+    from rest_framework.response import Response
+
+    @wraps(accion)
+    def envoltura(self, request, *args, **kwargs):
+        clave_cliente = request.headers.get(CABECERA_IDEMPOTENCIA)
+        if not clave_cliente:
+            return accion(self, request, *args, **kwargs)
+
+        clave = almacen.generar_clave(_alcance(request), request.method, request.path, clave_cliente)
+        huella = _huella(request.data, request.query_params)
+
+        def ejecutar():
+            respuesta = accion(self, request, *args, **kwargs)
+            cabeceras = {}
+            if respuesta.has_header('Location'):
+                cabeceras['Location'] = respuesta['Location']
+            return respuesta, RespuestaGuardada(
+                huella, respuesta.status_code, getattr(respuesta, 'data', None), cabeceras
+            )
+
+        def reproducir(guardada):
+            cabeceras = dict(guardada.cabeceras)
+            cabeceras[CABECERA_REPETIDA] = 'true'
+            return Response(guardada.datos, status=guardada.status, headers=cabeceras)
+
+        def rechazar(status, mensaje):
+            return Response({'error': mensaje}, status=status)
+
+        return _procesar(clave, huella, ejecutar, reproducir, rechazar)
+
+    return envoltura
+
+
+def idempotente_vista(vista):
+    """
+    Decorador para vistas de Django basadas en funciones.
+
+    Acepta la clave en la cabecera Idempotency-Key o en el campo oculto
+    ``idempotency_key`` del formulario. Solo aplica a solicitudes POST.
+    """
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if request.method != 'POST':
+            return vista(request, *args, **kwargs)
+
+        clave_cliente = (
+            request.headers.get(CABECERA_IDEMPOTENCIA)
+            or request.POST.get(CAMPO_IDEMPOTENCIA)
+        )
+        if not clave_cliente:
+            return vista(request, *args, **kwargs)
+
+        clave = almacen.generar_clave(_alcance(request), request.method, request.path, clave_cliente)
+        datos = {
+            campo: request.POST.getlist(campo)
+            for campo in request.POST
+            if campo not in ('csrfmiddlewaretoken', CAMPO_IDEMPOTENCIA)
+        }
+        huella = _huella(datos, request.GET.urlencode())
+
+        def ejecutar():
+            respuesta = vista(request, *args, **kwargs)
+            cabeceras = {}
+            if respuesta.has_header('Location'):
+                cabeceras['Location'] = respuesta['Location']
+            contenido = b'' if respuesta.streaming else respuesta.content
+            return respuesta, RespuestaGuardada(
+                huella, respuesta.status_code,
+                (contenido, respuesta.get('Content-Type')), cabeceras
+            )
+
+        def reproducir(guardada):
+            contenido, content_type = guardada.datos
+            respuesta = HttpResponse(contenido, status=guardada.status, content_type=content_type)
+            for nombre, valor in guardada.cabeceras.items():
+                respuesta[nombre] = valor
+            respuesta[CABECERA_REPETIDA] = 'true'
+            return respuesta
+
+        def rechazar(status, mensaje):
+            return JsonResponse({'error': mensaje}, status=status)
+
+        return _procesar(clave, huella, ejecutar, reproducir, rechazar)
+
+    return envoltura
@@ -3,11 +3,137 @@ Configuración de logging para el sistema de aerolínea.
 
 Este módulo configura el sistema de logging para diferentes entornos
 y tipos de mensajes (debug, info, warning, error).
+
+La escritura a consola y archivos no se hace en el hilo de la solicitud:
+los loggers solo ponen el registro en una cola en memoria (ColaHandler) y
+un hilo de fondo (ListenerRuteado) lo formatea y lo entrega a los
+handlers reales. Así el I/O de logging y las rotaciones de archivos no
+suman latencia a las solicitudes.
 """
 
+import atexit
+import copy
+import json
 import os
 import logging
-from logging.handlers import RotatingFileHandler
+import logging.config
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+
+# Atributos estándar de LogRecord que no se copian al JSON
+_ATRIBUTOS_RECORD = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'destinos'}
+
+
+class FormatoJSON(logging.Formatter):
+    """
+    Formatter que emite un objeto JSON por línea.
+
+    Incluye los campos pasados en ``extra`` y el diccionario ``datos``.
+    Los valores de ``datos`` que son funciones se evalúan recién al
+    formatear (en el hilo del listener), así que solo se calculan si el
+    registro realmente se escribe.
+    """
+
+    def format(self, record):
+        salida = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+        }
+        for clave, valor in record.__dict__.items():
+            if clave not in _ATRIBUTOS_RECORD and clave != 'datos':
+                salida[clave] = valor
+        datos = getattr(record, 'datos', None)
+        if datos:
+            for clave, valor in datos.items():
+                salida[clave] = valor() if callable(valor) else valor
+        if record.exc_info:
+            salida['excepcion'] = self.formatException(record.exc_info)
+        return json.dumps(salida, ensure_ascii=False, default=str)
+
+
+class ColaHandler(QueueHandler):
+    """
+    QueueHandler que delega el formateo al hilo del listener.
+
+    Cada ColaHandler recuerda los handlers reales de su logger
+    (``destinos``); el registro viaja por la cola junto con esa lista.
+    """
+
+    def __init__(self, cola, destinos):
+        super().__init__(cola)
+        self.destinos = tuple(destinos)
+
+    def prepare(self, record):
+        # Copia liviana: el mensaje se resuelve ahora (los argumentos
+        # pueden cambiar después), el formateo queda para el listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        record.destinos = self.destinos
+        return record
+
+
+class ListenerRuteado(QueueListener):
+    """QueueListener que entrega cada registro a los handlers de su logger."""
+
+    def handle(self, record):
+        for handler in record.destinos:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+_listener = None
+
+
+def activar_cola(nombres_loggers=None):
+    """
+    Mueve los handlers de los loggers indicados detrás de una cola.
+
+    Args:
+        nombres_loggers: Nombres de loggers a procesar ('' es el raíz).
+            Por defecto, el raíz y todos los loggers ya configurados.
+
+    Returns:
+        ListenerRuteado: Listener en ejecución
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    if nombres_loggers is None:
+        nombres_loggers = [''] + list(logging.root.manager.loggerDict)
+
+    cola = queue.SimpleQueue()
+    for nombre in nombres_loggers:
+        logger = logging.getLogger(nombre)
+        if not isinstance(logger, logging.Logger):
+            continue
+        destinos = [h for h in logger.handlers if not isinstance(h, QueueHandler)]
+        if not destinos:
+            continue
+        for handler in destinos:
+            logger.removeHandler(handler)
+        logger.addHandler(ColaHandler(cola, destinos))
+
+    _listener = ListenerRuteado(cola)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+def configurar_logging(config):
+    """
+    Punto de entrada para LOGGING_CONFIG en settings.
+
+    Aplica el diccionario LOGGING como lo haría Django y luego pone los
+    handlers configurados detrás de la cola.
+    """
+    logging.config.dictConfig(config)
+    activar_cola([''] + list(config.get('loggers', {})))
 
 
 def configure_logging():
@@ -16,8 +142,10 @@ def configure_logging():
     
     Configura diferentes handlers para diferentes tipos de mensajes:
     - Console: Para desarrollo
-    - File: Para producción y debugging
-    - Email: Para errores críticos (opcional)
+    - File: Para producción y debugging (rotación diaria)
+    - Requests: Una línea JSON por solicitud
+    
+    Todos los handlers quedan detrás de la cola de logging.
     """
     
     # Crear directorio de logs si no existe
@@ -34,28 +162,28 @@ def configure_logging():
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
     
-    # Handler para archivo general
-    general_handler = RotatingFileHandler(
+    # Handler para archivo general (rotación diaria)
+    general_handler = TimedRotatingFileHandler(
         os.path.join(log_dir, 'aerolinea.log'),
-        maxBytes=1024*1024,  # 1MB
-        backupCount=5
+        when='midnight',
+        backupCount=14
     )
     general_handler.setLevel(logging.INFO)
     general_handler.setFormatter(formatter)
     
     # Handler para errores
-    error_handler = RotatingFileHandler(
+    error_handler = TimedRotatingFileHandler(
         os.path.join(log_dir, 'errors.log'),
-        maxBytes=1024*1024,  # 1MB
-        backupCount=5
+        when='midnight',
+        backupCount=30
     )
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(formatter)
     
     # Handler para debugging
-    debug_handler = RotatingFileHandler(
+    debug_handler = TimedRotatingFileHandler(
         os.path.join(log_dir, 'debug.log'),
-        maxBytes=1024*1024,  # 1MB
+        when='midnight',
         backupCount=3
     )
     debug_handler.setLevel(logging.DEBUG)
@@ -68,8 +196,22 @@ def configure_logging():
     root_logger.addHandler(general_handler)
     root_logger.addHandler(error_handler)
     
+    # Handler para el log estructurado de solicitudes (una línea JSON por request)
+    requests_handler = TimedRotatingFileHandler(
+        os.path.join(log_dir, 'requests.log'),
+        when='midnight',
+        backupCount=14
+    )
+    requests_handler.setLevel(logging.INFO)
+    requests_handler.setFormatter(FormatoJSON())
+    
     # Configurar loggers específicos
     loggers = {
+        'aerolinea.solicitudes': {
+            'handlers': ['requests'],
+            'level': 'INFO',
+            'propagate': False,
+        },
         'django': {
             'handlers': ['console', 'general', 'error'],
             'level': 'INFO',
@@ -121,8 +263,13 @@ def configure_logging():
                 logger.addHandler(error_handler)
             elif handler_name == 'debug':
                 logger.addHandler(debug_handler)
+            elif handler_name == 'requests':
+                logger.addHandler(requests_handler)
         
         logger.propagate = logger_config['propagate']
+    
+    # Escritura de archivos fuera del hilo de la solicitud
+    activar_cola([''] + list(loggers))
 
 
 def log_user_action(user, action, details=None, level='info'):
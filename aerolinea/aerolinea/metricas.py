@@ -0,0 +1,350 @@
+"""
+Métricas de la aplicación en formato Prometheus.
+
+Expone contadores e histogramas de latencia para los caminos críticos:
+- Creación, confirmación y cancelación de reservas (servicio y vistas)
+- Búsqueda de vuelos disponibles
+- Construcción de mapas de asientos
+- Barridos de reservas expiradas
+- Envío de emails de la cola
+
+Si prometheus-client está instalado se usa su registro. Con varios
+workers de gunicorn hay que definir la variable de entorno
+PROMETHEUS_MULTIPROC_DIR (un directorio vacío al iniciar): cada proceso
+escribe sus valores ahí y el endpoint /metrics los agrega. gunicorn.conf.py
+limpia los archivos de los workers que terminan.
+
+Sin prometheus-client se usa un registro en memoria con la misma interfaz
+(labels, inc, observe), válido para un solo proceso.
+"""
+
+import hmac
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ContextDecorator
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse, HttpResponseForbidden
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:  # pragma: no cover - dependencia opcional
+    prometheus_client = None
+
+
+# Buckets de latencia (segundos)
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+# --- Registro en memoria (sin prometheus-client) -----------------------------
+
+def _formatear_etiquetas(nombres, valores, extra=()):
+    pares = list(zip(nombres, valores)) + list(extra)
+    if not pares:
+        return ''
+    contenido = ','.join(
+        '{}="{}"'.format(nombre, str(valor).replace('\\', r'\\').replace('"', r'\"'))
+        for nombre, valor in pares
+    )
+    return '{' + contenido + '}'
+
+
+def _formatear_numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor))
+
+
+class _MetricaLocal:
+    """Métrica con etiquetas del registro en memoria."""
+
+    tipo = None
+
+    def __init__(self, nombre, descripcion, etiquetas=()):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.etiquetas = tuple(etiquetas)
+        self._hijos = {}
+        self._lock = threading.Lock()
+        if not self.etiquetas:
+            self._hijos[()] = self._nuevo_hijo()
+
+    def labels(self, *valores, **por_nombre):
+        if por_nombre:
+            valores = tuple(por_nombre[nombre] for nombre in self.etiquetas)
+        if len(valores) != len(self.etiquetas):
+            raise ValueError(f'{self.nombre}: se esperaban las etiquetas {self.etiquetas}')
+        clave = tuple(str(valor) for valor in valores)
+        with self._lock:
+            hijo = self._hijos.get(clave)
+            if hijo is None:
+                hijo = self._hijos[clave] = self._nuevo_hijo()
+        return hijo
+
+    def _hijo_sin_etiquetas(self):
+        if self.etiquetas:
+            raise ValueError(f'{self.nombre}: faltan las etiquetas {self.etiquetas}')
+        return self._hijos[()]
+
+    def exponer(self):
+        lineas = [f'# HELP {self.nombre} {self.descripcion}', f'# TYPE {self.nombre} {self.tipo}']
+        with self._lock:
+            hijos = sorted(self._hijos.items())
+        for valores, hijo in hijos:
+            lineas.extend(hijo.exponer(self.nombre, self.etiquetas, valores))
+        return lineas
+
+
+class _ValorContador:
+    def __init__(self):
+        self.valor = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, cantidad=1):
+        if cantidad < 0:
+            raise ValueError('Los contadores solo pueden incrementarse')
+        with self._lock:
+            self.valor += cantidad
+
+    def exponer(self, nombre, etiquetas, valores):
+        return [f'{nombre}_total{_formatear_etiquetas(etiquetas, valores)} {_formatear_numero(self.valor)}']
+
+
+class _ContadorLocal(_MetricaLocal):
+    tipo = 'counter'
+
+    def __init__(self, nombre, descripcion, etiquetas=()):
+        # Igual que prometheus-client: el sufijo _total se agrega al exponer
+        if nombre.endswith('_total'):
+            nombre = nombre[:-len('_total')]
+        super().__init__(nombre, descripcion, etiquetas)
+
+    def _nuevo_hijo(self):
+        return _ValorContador()
+
+    def inc(self, cantidad=1):
+        self._hijo_sin_etiquetas().inc(cantidad)
+
+
+class _ValorHistograma:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.conteos = [0] * len(buckets)
+        self.suma = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, valor):
+        with self._lock:
+            self.suma += valor
+            indice = bisect_left(self.buckets, valor)
+            if indice < len(self.conteos):
+                self.conteos[indice] += 1
+
+    def exponer(self, nombre, etiquetas, valores):
+        lineas = []
+        acumulado = 0
+        for limite, conteo in zip(self.buckets, self.conteos):
+            acumulado += conteo
+            extra = [('le', _formatear_numero(limite))]
+            lineas.append(f'{nombre}_bucket{_formatear_etiquetas(etiquetas, valores, extra)} {acumulado}')
+        sufijo = _formatear_etiquetas(etiquetas, valores)
+        lineas.append(f'{nombre}_count{sufijo} {acumulado}')
+        lineas.append(f'{nombre}_sum{sufijo} {_formatear_numero(self.suma)}')
+        return lineas
+
+
+class _HistogramaLocal(_MetricaLocal):
+    tipo = 'histogram'
+
+    def __init__(self, nombre, descripcion, etiquetas=(), buckets=BUCKETS_LATENCIA):
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        super().__init__(nombre, descripcion, etiquetas)
+
+    def _nuevo_hijo(self):
+        return _ValorHistograma(self.buckets)
+
+    def observe(self, valor):
+        self._hijo_sin_etiquetas().observe(valor)
+
+
+class RegistroLocal:
+    """Registro de métricas en memoria del proceso actual."""
+
+    def __init__(self):
+        self._metricas = []
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def generar(self) -> bytes:
+        lineas = []
+        for metrica in self._metricas:
+            lineas.extend(metrica.exponer())
+        return ('\n'.join(lineas) + '\n').encode('utf-8')
+
+
+registro_local = RegistroLocal()
+
+
+def contador(nombre, descripcion, etiquetas=()):
+    """Crea un contador (prometheus-client o registro en memoria)."""
+    if prometheus_client is not None:
+        return prometheus_client.Counter(nombre, descripcion, etiquetas)
+    return registro_local.registrar(_ContadorLocal(nombre, descripcion, etiquetas))
+
+
+def histograma(nombre, descripcion, etiquetas=(), buckets=BUCKETS_LATENCIA):
+    """Crea un histograma (prometheus-client o registro en memoria)."""
+    if prometheus_client is not None:
+        return prometheus_client.Histogram(nombre, descripcion, etiquetas, buckets=buckets)
+    return registro_local.registrar(_HistogramaLocal(nombre, descripcion, etiquetas, buckets))
+
+
+# --- Métricas de la aplicación -----------------------------------------------
+
+RESERVAS_OPERACIONES = contador(
+    'aerolinea_reservas_operaciones_total',
+    'Operaciones sobre reservas por resultado (ok, rechazada, error)',
+    ['operacion', 'origen', 'resultado'],
+)
+RESERVAS_DURACION = histograma(
+    'aerolinea_reservas_duracion_segundos',
+    'Duración de las operaciones sobre reservas',
+    ['operacion', 'origen'],
+)
+BUSQUEDA_VUELOS_DURACION = histograma(
+    'aerolinea_busqueda_vuelos_duracion_segundos',
+    'Duración de la búsqueda de vuelos disponibles',
+)
+BUSQUEDA_VUELOS_RESULTADOS = histograma(
+    'aerolinea_busqueda_vuelos_resultados',
+    'Cantidad de vuelos devueltos por búsqueda',
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500),
+)
+MAPA_ASIENTOS_DURACION = histograma(
+    'aerolinea_mapa_asientos_duracion_segundos',
+    'Duración de la construcción del mapa de asientos de un vuelo',
+    ['origen'],
+)
+BARRIDO_EXPIRADAS_DURACION = histograma(
+    'aerolinea_barrido_expiradas_duracion_segundos',
+    'Duración de los barridos de reservas expiradas',
+    ['origen'],
+)
+RESERVAS_EXPIRADAS = contador(
+    'aerolinea_reservas_expiradas_total',
+    'Reservas procesadas por los barridos de expiración',
+    ['origen'],
+)
+EMAILS_PROCESADOS = contador(
+    'aerolinea_emails_procesados_total',
+    'Emails de la cola procesados por resultado (enviado, reintento, fallido)',
+    ['resultado'],
+)
+ENVIO_EMAILS_DURACION = histograma(
+    'aerolinea_envio_emails_lote_duracion_segundos',
+    'Duración del envío de un lote de emails',
+)
+
+
+class medir(ContextDecorator):
+    """
+    Mide la duración de un bloque o función y cuenta su resultado.
+
+    Se usa como decorador o como context manager:
+
+        @medir(RESERVAS_DURACION, RESERVAS_OPERACIONES, operacion='crear', origen='servicio')
+        def crear_reserva(...): ...
+
+    El contador (opcional) recibe además la etiqueta 'resultado': 'ok',
+    'rechazada' (ValidationError) o 'error' (cualquier otra excepción).
+
+    Args:
+        histograma: Histograma de duración
+        contador: Contador de operaciones por resultado (opcional)
+        **etiquetas: Etiquetas comunes a ambas métricas
+    """
+
+    def __init__(self, histograma, contador=None, **etiquetas):
+        self.histograma = histograma.labels(**etiquetas) if etiquetas else histograma
+        self.contador = contador
+        self.etiquetas = etiquetas
+        self._inicios = threading.local()
+
+    def __enter__(self):
+        # Pila por hilo: el mismo decorador puede ejecutarse anidado o en paralelo
+        pila = getattr(self._inicios, 'pila', None)
+        if pila is None:
+            pila = self._inicios.pila = []
+        pila.append(time.perf_counter())
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        inicio = self._inicios.pila.pop()
+        self.histograma.observe(time.perf_counter() - inicio)
+        if self.contador is not None:
+            if tipo is None:
+                resultado = 'ok'
+            elif issubclass(tipo, ValidationError):
+                resultado = 'rechazada'
+            else:
+                resultado = 'error'
+            self.contador.labels(resultado=resultado, **self.etiquetas).inc()
+        return False
+
+
+# --- Exposición --------------------------------------------------------------
+
+def generar_metricas() -> tuple[bytes, str]:
+    """
+    Genera el texto de exposición de todas las métricas.
+
+    Returns:
+        tuple: (contenido, content type)
+    """
+    if prometheus_client is None:
+        return registro_local.generar(), CONTENT_TYPE
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        # Modo multiproceso: se agregan los archivos de todos los workers
+        registro = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registro), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def proceso_terminado(pid: int):
+    """Limpia los valores de un worker terminado (hook child_exit de gunicorn)."""
+    if prometheus_client is not None and os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
+
+
+def puede_ver_metricas(request) -> bool:
+    """
+    Controla el acceso al endpoint de métricas.
+
+    Con METRICAS_TOKEN definido se exige 'Authorization: Bearer <token>';
+    si no, solo se aceptan las IPs de METRICAS_IPS_PERMITIDAS.
+    """
+    token = getattr(settings, 'METRICAS_TOKEN', '')
+    if token:
+        # Comparación en tiempo constante para no filtrar el token por latencia
+        recibido = request.META.get('HTTP_AUTHORIZATION', '')
+        return hmac.compare_digest(recibido.encode(), f'Bearer {token}'.encode())
+    ips = getattr(settings, 'METRICAS_IPS_PERMITIDAS', ['127.0.0.1', '::1'])
+    return request.META.get('REMOTE_ADDR') in ips
+
+
+def vista_metricas(request):
+    """Endpoint de scraping de Prometheus."""
+    if not puede_ver_metricas(request):
+        return HttpResponseForbidden()
+    contenido, content_type = generar_metricas()
+    return HttpResponse(contenido, content_type=content_type)
@@ -3,14 +3,28 @@ Middleware personalizado para el sistema de aerolínea.
 
 Este módulo contiene middleware para:
 - Logging de requests
+- Métricas de rendimiento (Server-Timing, detección de N+1)
+- Perfilado bajo demanda (cProfile)
 - Manejo de errores
 - Validaciones de seguridad
 """
 
+import cProfile
 import logging
+import random
+import re
+import threading
 import time
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject, empty
 from django.http import JsonResponse
+from django.core.exceptions import RequestDataTooBig
+from django.http.multipartparser import MultiPartParserError
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 
@@ -19,57 +33,265 @@ class RequestLoggingMiddleware(MiddlewareMixin):
     """
     Middleware para loggear información de requests.
     
-    Registra información sobre requests, incluyendo:
+    Emite un único registro estructurado (JSON) por request en el logger
+    'aerolinea.solicitudes', con:
     - Método HTTP
-    - URL
+    - URL y vista resuelta
     - Usuario
     - Tiempo de respuesta
     - Código de estado
+    
+    Las respuestas exitosas de rutas de alto volumen se muestrean
+    (LOG_SOLICITUDES_MUESTREO); los errores y las solicitudes lentas se
+    registran siempre.
     """
     
+    logger = logging.getLogger('aerolinea.solicitudes')
+    
     def process_request(self, request):
-        """Registra información del request al inicio."""
-        request.start_time = time.time()
-        
-        # Loggear información básica del request
-        logger = logging.getLogger('django.request')
-        
-        user_info = 'Anónimo'
-        if request.user.is_authenticated:
-            user_info = f"{request.user.username} ({request.user.email})"
-        
-        logger.info(
-            f"Request iniciado - Método: {request.method} - URL: {request.path} - "
-            f"Usuario: {user_info} - IP: {self.get_client_ip(request)}"
-        )
+        """Registra el inicio del request."""
+        request.start_time = time.perf_counter()
     
     def process_response(self, request, response):
         """Registra información del response al final."""
-        if hasattr(request, 'start_time'):
-            duration = time.time() - request.start_time
-            
-            logger = logging.getLogger('django.request')
-            
-            user_info = 'Anónimo'
-            if request.user.is_authenticated:
-                user_info = f"{request.user.username} ({request.user.email})"
-            
-            logger.info(
-                f"Request completado - Método: {request.method} - URL: {request.path} - "
-                f"Usuario: {user_info} - Status: {response.status_code} - "
-                f"Duración: {duration:.3f}s"
-            )
+        if not hasattr(request, 'start_time') or not self.logger.isEnabledFor(logging.INFO):
+            return response
+        
+        duration_ms = (time.perf_counter() - request.start_time) * 1000
+        if not self.debe_registrar(request.path, response.status_code, duration_ms):
+            return response
+        
+        # Campos baratos ahora; el resto se calcula al formatear, en el
+        # hilo del listener de logging
+        meta = request.META
+        datos = {
+            'metodo': request.method,
+            'ruta': request.path,
+            'status': response.status_code,
+            'duracion_ms': round(duration_ms, 2),
+            'usuario_id': self.get_user_id(request),
+            'ip': lambda: self.get_client_ip_from_meta(meta),
+            'vista': lambda: getattr(request.resolver_match, 'view_name', None),
+            'user_agent': lambda: meta.get('HTTP_USER_AGENT', ''),
+        }
+        level = logging.ERROR if response.status_code >= 500 else (
+            logging.WARNING if response.status_code >= 400 else logging.INFO
+        )
+        self.logger.log(level, 'solicitud', extra={'datos': datos})
         
         return response
     
+    @staticmethod
+    def debe_registrar(path, status_code, duration_ms):
+        """Decide si la solicitud se registra (muestreo de respuestas exitosas)."""
+        if status_code >= 400:
+            return True
+        if duration_ms >= getattr(settings, 'LOG_SOLICITUDES_LENTA_MS', 1000):
+            return True
+        if path.startswith(tuple(getattr(settings, 'LOG_SOLICITUDES_RUTAS_EXCLUIDAS', ()))):
+            return False
+        muestreo = getattr(settings, 'LOG_SOLICITUDES_MUESTREO', 1.0)
+        return muestreo >= 1 or random.random() < muestreo
+    
+    @staticmethod
+    def get_user_id(request):
+        """
+        ID del usuario, solo si ya fue cargado por la vista.
+        
+        request.user es un objeto lazy: consultarlo acá agregaría una
+        consulta a la base de datos solo para loggear.
+        """
+        user = request.__dict__.get('user')
+        if user is None:
+            return None
+        if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+            return None
+        return user.pk if user.is_authenticated else None
+    
+    @staticmethod
+    def get_client_ip_from_meta(meta):
+        """Obtiene la IP real del cliente a partir de request.META."""
+        x_forwarded_for = meta.get('HTTP_X_FORWARDED_FOR')
+        if x_forwarded_for:
+            return x_forwarded_for.split(',')[0]
+        return meta.get('REMOTE_ADDR')
+    
     def get_client_ip(self, request):
         """Obtiene la IP real del cliente."""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        return self.get_client_ip_from_meta(request.META)
+
+
+class PerformanceMiddleware:
+    """
+    Middleware para medir el rendimiento de cada request.
+    
+    Mide consultas SQL, tiempo en la base de datos, aciertos y fallos de
+    caché y tiempo de templates (ver aerolinea.rendimiento). Con los datos:
+    - Agrega la cabecera Server-Timing (RENDIMIENTO_SERVER_TIMING)
+    - Avisa cuando una misma consulta se repite RENDIMIENTO_UMBRAL_REPETIDAS
+      veces o más (patrón N+1)
+    - Acumula histogramas por vista, visibles en /admin/rendimiento/
+    
+    Se desactiva con RENDIMIENTO_ACTIVO = False.
+    
+    Bajo ASGI las consultas de las vistas async corren en el hilo que Django
+    asigna a la solicitud (sync_to_async), así que el wrapper de consultas
+    se instala y se quita en ese hilo.
+    """
+    
+    sync_capable = True
+    async_capable = True
+    
+    logger = logging.getLogger('aerolinea.rendimiento')
+    
+    def __init__(self, get_response):
+        if not getattr(settings, 'RENDIMIENTO_ACTIVO', True):
+            raise MiddlewareNotUsed
+        from aerolinea import rendimiento
+        rendimiento.instrumentar()
+        self.rendimiento = rendimiento
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        rendimiento = self.rendimiento
+        medicion, token = rendimiento.iniciar_medicion()
+        try:
+            with self.medir_consultas():
+                response = self.get_response(request)
+        finally:
+            rendimiento.finalizar_medicion(token)
+        
+        return self.procesar_medicion(request, response, medicion)
+    
+    async def __acall__(self, request):
+        rendimiento = self.rendimiento
+        medicion, token = rendimiento.iniciar_medicion()
+        stack = await sync_to_async(self.medir_consultas)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            rendimiento.finalizar_medicion(token)
+        
+        return self.procesar_medicion(request, response, medicion)
+    
+    def medir_consultas(self) -> ExitStack:
+        """Instala el wrapper de consultas en las conexiones del hilo actual."""
+        stack = ExitStack()
+        for conexion in connections.all():
+            stack.enter_context(conexion.execute_wrapper(self.rendimiento.medir_consulta))
+        return stack
+    
+    def procesar_medicion(self, request, response, medicion):
+        """Registra la medición y agrega las cabeceras a la respuesta."""
+        rendimiento = self.rendimiento
+        total_ms = (time.perf_counter() - medicion.inicio) * 1000
+        umbral = getattr(settings, 'RENDIMIENTO_UMBRAL_REPETIDAS', 5)
+        repetidas = medicion.consultas_repetidas(umbral)
+        if repetidas:
+            firma, veces = max(repetidas.items(), key=lambda item: item[1])
+            self.logger.warning(
+                'Consulta repetida %s veces en %s (posible N+1): %s',
+                veces, request.path, firma[:300]
+            )
+        
+        if getattr(settings, 'RENDIMIENTO_SERVER_TIMING', False):
+            response['Server-Timing'] = medicion.server_timing(total_ms)
+            if repetidas:
+                response['X-Consultas-Repetidas'] = str(sum(repetidas.values()))
+        
+        vista = getattr(request.resolver_match, 'view_name', None)
+        if vista:
+            rendimiento.registro.registrar(vista, medicion, total_ms, bool(repetidas))
+        
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Middleware para perfilar requests con cProfile bajo demanda.
+    
+    La decisión de perfilar y el guardado de los perfiles están en
+    monitoreo.services.monitoreo.PerfiladoService; los perfiles se
+    consultan desde el admin. Va después de AuthenticationMiddleware para
+    poder verificar si el usuario es staff.
+    
+    Se perfila una solicitud a la vez por proceso: si otra ya se está
+    perfilando, la nueva se atiende sin perfilar.
+    
+    Bajo ASGI el perfil se toma en el hilo del event loop: incluye las
+    corrutinas de otras solicitudes que avancen mientras tanto, y el
+    tiempo de las consultas (que corren en otro hilo) aparece como espera.
+    """
+    
+    sync_capable = True
+    async_capable = True
+    
+    _lock = threading.Lock()
+    
+    def __init__(self, get_response):
+        from monitoreo.services.monitoreo import PerfiladoService
+        self.servicio = PerfiladoService
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        motivo = self.servicio.motivo_perfilado(request)
+        if motivo is None or not self._lock.acquire(blocking=False):
+            return self.get_response(request)
+        
+        try:
+            perfil = cProfile.Profile()
+            inicio = time.perf_counter()
+            perfil.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                perfil.disable()
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+        finally:
+            self._lock.release()
+        
+        return self.guardar_perfil(request, response, motivo, perfil, duracion_ms)
+    
+    async def __acall__(self, request):
+        # Decidir puede cargar request.user (consulta a la base)
+        motivo = await sync_to_async(self.servicio.motivo_perfilado)(request)
+        if motivo is None or not self._lock.acquire(blocking=False):
+            return await self.get_response(request)
+        
+        try:
+            perfil = cProfile.Profile()
+            inicio = time.perf_counter()
+            perfil.enable()
+            try:
+                response = await self.get_response(request)
+            finally:
+                perfil.disable()
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+        finally:
+            self._lock.release()
+        
+        return await sync_to_async(self.guardar_perfil)(request, response, motivo, perfil, duracion_ms)
+    
+    def guardar_perfil(self, request, response, motivo, perfil, duracion_ms):
+        """Guarda el perfil de la solicitud y marca la respuesta."""
+        from aerolinea.rendimiento import medicion_actual
+        medicion = medicion_actual()
+        guardado = self.servicio.registrar(
+            request, response, duracion_ms, motivo, perfil,
+            consultas=medicion.consultas if medicion else None
+        )
+        if motivo == 'cabecera':
+            response['X-Perfilado'] = 'guardado' if guardado else 'descartado'
+        return response
 
 
 class ErrorHandlingMiddleware(MiddlewareMixin):
@@ -129,15 +351,45 @@ class SecurityMiddleware(MiddlewareMixin):
     - Headers de seguridad
     - Validación de contenido
     - Protección contra ataques básicos
+    
+    Los patrones sospechosos (SEGURIDAD_PATRONES_SOSPECHOSOS) se compilan
+    en una sola expresión regular y se buscan una vez sobre la ruta, una
+    vez sobre los valores de request.GET y una vez sobre los campos de los
+    formularios urlencoded. Los formularios multipart solo se leen en las
+    rutas de SEGURIDAD_RUTAS_MULTIPART (el contenido de los archivos no se
+    escanea), para no procesar cada subida antes de la vista. Los cuerpos
+    cuyo CONTENT_LENGTH supera SEGURIDAD_MAX_CUERPO_ESCANEO no se leen (se
+    registra en DEBUG). Los cuerpos JSON u otros tipos tampoco se leen. Las
+    rutas de SEGURIDAD_RUTAS_EXCLUIDAS no se escanean.
     """
     
+    TIPO_URLENCODED = 'application/x-www-form-urlencoded'
+    TIPO_MULTIPART = 'multipart/form-data'
+    
+    PATRONES_SOSPECHOSOS = [
+        'script',
+        'javascript:',
+        'data:text/html',
+        'vbscript:',
+        'onload=',
+        'onerror=',
+    ]
+    
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        patrones = getattr(settings, 'SEGURIDAD_PATRONES_SOSPECHOSOS', self.PATRONES_SOSPECHOSOS)
+        self.patron = re.compile('|'.join(map(re.escape, patrones)), re.IGNORECASE)
+        self.rutas_excluidas = tuple(getattr(settings, 'SEGURIDAD_RUTAS_EXCLUIDAS', ()))
+        self.rutas_multipart = tuple(getattr(settings, 'SEGURIDAD_RUTAS_MULTIPART', ()))
+        self.max_cuerpo = getattr(settings, 'SEGURIDAD_MAX_CUERPO_ESCANEO', 64 * 1024)
+    
     def process_request(self, request):
         """Aplica validaciones de seguridad al request."""
-        # Loggear requests sospechosos
-        logger = logging.getLogger('django.security')
-        
         # Verificar headers de seguridad
         if self.is_suspicious_request(request):
+            # Loggear requests sospechosos
+            logger = logging.getLogger('django.security')
+            
             user_info = 'Anónimo'
             if request.user.is_authenticated:
                 user_info = f"{request.user.username} ({request.user.email})"
@@ -161,38 +413,51 @@ class SecurityMiddleware(MiddlewareMixin):
     
     def is_suspicious_request(self, request):
         """Detecta requests potencialmente sospechosos."""
-        suspicious_patterns = [
-            'script',
-            'javascript:',
-            'data:text/html',
-            'vbscript:',
-            'onload=',
-            'onerror=',
-        ]
+        if self.rutas_excluidas and request.path.startswith(self.rutas_excluidas):
+            return False
         
         # Verificar en URL
-        url_lower = request.path.lower()
-        for pattern in suspicious_patterns:
-            if pattern in url_lower:
-                return True
+        if self.patron.search(request.path):
+            return True
         
-        # Verificar en parámetros GET
-        for key, value in request.GET.items():
-            if any(pattern in str(value).lower() for pattern in suspicious_patterns):
-                return True
+        # Verificar en parámetros GET (solo los valores)
+        if request.GET and self.patron.search(self.unir_valores(request.GET)):
+            return True
         
-        # Verificar en parámetros POST
-        for key, value in request.POST.items():
-            if any(pattern in str(value).lower() for pattern in suspicious_patterns):
-                return True
+        # Verificar en parámetros POST (formularios urlencoded y, si la ruta lo pide, multipart)
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return False
+        if request.content_type == self.TIPO_MULTIPART:
+            if not (self.rutas_multipart and request.path.startswith(self.rutas_multipart)):
+                return False
+        elif request.content_type != self.TIPO_URLENCODED:
+            return False
         
-        return False
+        logger = logging.getLogger('django.security')
+        try:
+            largo = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            largo = 0
+        if largo > self.max_cuerpo:
+            # El cuerpo no se lee antes de la vista: se omite el escaneo
+            logger.debug("Cuerpo de %s bytes sin escanear: %s", largo, request.path)
+            return False
+        try:
+            datos = request.POST
+        except RequestDataTooBig:
+            logger.debug("Cuerpo mayor que DATA_UPLOAD_MAX sin escanear: %s", request.path)
+            return False
+        except MultiPartParserError:
+            # Formulario mal formado
+            return True
+        texto = self.unir_valores(datos)
+        return bool(texto) and self.patron.search(texto) is not None
+    
+    @staticmethod
+    def unir_valores(datos):
+        """Valores de un QueryDict en un solo texto, para buscar los patrones una vez."""
+        return '\n'.join(valor for _, valores in datos.lists() for valor in valores)
     
     def get_client_ip(self, request):
         """Obtiene la IP real del cliente."""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip 
\ No newline at end of file
+        return RequestLoggingMiddleware.get_client_ip_from_meta(request.META)
@@ -0,0 +1,144 @@
+"""
+Publicación y suscripción de mensajes por canal.
+
+Conecta el código que produce cambios (suscriptores del bus de eventos,
+que corren en hilos sincrónicos después del commit) con las conexiones
+abiertas que los transmiten a los navegadores (vistas ASGI con
+server-sent events, que esperan en el event loop).
+
+El broker se elige con el setting PUBSUB_BROKER (ruta a la clase):
+- 'aerolinea.pubsub.BrokerLocal' (default): en memoria del proceso. Solo
+  ven los mensajes las conexiones atendidas por el mismo proceso, así que
+  sirve para desarrollo o para un único worker ASGI. Con varios workers se
+  reemplaza por una clase con la misma interfaz sobre un broker externo
+  (por ejemplo Redis pub/sub).
+
+Cada suscripción tiene una cola acotada (PUBSUB_COLA_MAXIMA). Si un
+cliente lento la llena, los mensajes siguientes se descartan y la
+suscripción queda marcada como desbordada para que el consumidor se
+resincronice.
+
+Uso:
+
+    broker = obtener_broker()
+    broker.publicar('asientos:vuelo:1', {'ocupados': [10, 11]})
+
+    async with broker.suscribir('asientos:vuelo:1') as suscripcion:
+        mensaje = await suscripcion.recibir(timeout=15)
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class Suscripcion:
+    """Suscripción de un consumidor asíncrono a un canal."""
+
+    def __init__(self, broker, canal: str, maximo: int):
+        self.broker = broker
+        self.canal = canal
+        self.desbordada = False
+        self._loop = asyncio.get_running_loop()
+        self._cola = asyncio.Queue(maxsize=maximo)
+
+    def _entregar(self, mensaje):
+        """Encola un mensaje (corre en el event loop del consumidor)."""
+        try:
+            self._cola.put_nowait(mensaje)
+        except asyncio.QueueFull:
+            self.desbordada = True
+
+    def entregar(self, mensaje):
+        """Entrega un mensaje desde cualquier hilo."""
+        self._loop.call_soon_threadsafe(self._entregar, mensaje)
+
+    async def recibir(self, timeout: float = None):
+        """
+        Espera el próximo mensaje del canal.
+
+        Args:
+            timeout (float): Segundos máximos de espera
+
+        Returns:
+            El mensaje, o None si se cumplió el timeout
+        """
+        try:
+            return await asyncio.wait_for(self._cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def vaciar(self):
+        """Descarta los mensajes pendientes y limpia la marca de desborde."""
+        while not self._cola.empty():
+            self._cola.get_nowait()
+        self.desbordada = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.broker.cancelar(self)
+
+
+class BrokerLocal:
+    """Broker en memoria del proceso."""
+
+    def __init__(self):
+        self._suscripciones = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publicar(self, canal: str, mensaje) -> int:
+        """
+        Publica un mensaje en un canal. Se puede llamar desde cualquier hilo.
+
+        Returns:
+            int: Cantidad de suscripciones que lo recibieron
+        """
+        with self._lock:
+            suscripciones = list(self._suscripciones.get(canal, ()))
+        for suscripcion in suscripciones:
+            try:
+                suscripcion.entregar(mensaje)
+            except RuntimeError:
+                # El event loop del consumidor ya se cerró
+                self.cancelar(suscripcion)
+        return len(suscripciones)
+
+    def suscribir(self, canal: str) -> Suscripcion:
+        """Crea una suscripción al canal (usar con 'async with' dentro del event loop)."""
+        suscripcion = Suscripcion(self, canal, getattr(settings, 'PUBSUB_COLA_MAXIMA', 100))
+        with self._lock:
+            self._suscripciones[canal].add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion):
+        """Quita una suscripción de su canal."""
+        with self._lock:
+            suscripciones = self._suscripciones.get(suscripcion.canal)
+            if suscripciones is not None:
+                suscripciones.discard(suscripcion)
+                if not suscripciones:
+                    del self._suscripciones[suscripcion.canal]
+
+    def suscriptores(self, canal: str) -> int:
+        """Cantidad de suscripciones activas de un canal."""
+        with self._lock:
+            return len(self._suscripciones.get(canal, ()))
+
+
+def obtener_broker():
+    """Broker configurado en PUBSUB_BROKER (una instancia por proceso)."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                clase = import_string(getattr(settings, 'PUBSUB_BROKER', 'aerolinea.pubsub.BrokerLocal'))
+                _broker = clase()
+    return _broker
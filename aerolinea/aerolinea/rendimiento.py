@@ -0,0 +1,281 @@
+"""
+Instrumentación de rendimiento por solicitud.
+
+Para cada solicitud se mide:
+- Cantidad de consultas SQL y tiempo total en la base de datos
+- Consultas repetidas con la misma forma (firma), típicas del problema N+1
+- Aciertos y fallos de caché
+- Tiempo de renderizado de templates
+
+Los valores se devuelven en la cabecera ``Server-Timing`` (visible en las
+herramientas de desarrollo del navegador) y se acumulan en histogramas
+por vista, consultables por el staff en ``/admin/rendimiento/``.
+
+El middleware está en aerolinea.middleware.PerformanceMiddleware.
+"""
+
+import contextvars
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+
+# Límites superiores (ms) de los buckets de los histogramas
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+# Literales que se reemplazan para obtener la "forma" de una consulta
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LISTAS_IN = re.compile(r"IN \((?:\?, )*\?\)")
+
+_medicion_actual = contextvars.ContextVar('medicion_rendimiento', default=None)
+
+
+def firma_sql(sql: str) -> str:
+    """Normaliza una consulta reemplazando literales por '?'."""
+    firma = _LITERALES.sub('?', sql)
+    return _LISTAS_IN.sub('IN (...)', firma)
+
+
+class MedicionSolicitud:
+    """Métricas acumuladas durante una solicitud."""
+
+    __slots__ = (
+        'inicio', 'consultas', 'sql_ms', 'firmas',
+        'cache_aciertos', 'cache_fallos', 'template_ms', '_profundidad_template',
+    )
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.sql_ms = 0.0
+        self.firmas = Counter()
+        self.cache_aciertos = 0
+        self.cache_fallos = 0
+        self.template_ms = 0.0
+        self._profundidad_template = 0
+
+    def consultas_repetidas(self, umbral: int) -> dict:
+        """Firmas ejecutadas al menos ``umbral`` veces."""
+        return {firma: n for firma, n in self.firmas.items() if n >= umbral}
+
+    def server_timing(self, total_ms: float) -> str:
+        """Valor de la cabecera Server-Timing."""
+        return ', '.join([
+            f'db;dur={self.sql_ms:.1f};desc="{self.consultas} consultas"',
+            f'cache;desc="aciertos={self.cache_aciertos} fallos={self.cache_fallos}"',
+            f'tpl;dur={self.template_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+
+def medicion_actual() -> MedicionSolicitud | None:
+    """Medición de la solicitud en curso (None fuera de una solicitud)."""
+    return _medicion_actual.get()
+
+
+def iniciar_medicion() -> tuple[MedicionSolicitud, contextvars.Token]:
+    medicion = MedicionSolicitud()
+    return medicion, _medicion_actual.set(medicion)
+
+
+def finalizar_medicion(token: contextvars.Token):
+    _medicion_actual.reset(token)
+
+
+def medir_consulta(execute, sql, params, many, context):
+    """execute_wrapper de Django que cuenta y cronometra las consultas."""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.sql_ms += (time.perf_counter() - inicio) * 1000
+        medicion.consultas += 1
+        medicion.firmas[firma_sql(sql)] += 1
+
+
+# --- Caché y templates -------------------------------------------------------
+
+_instrumentado = False
+_instrumentado_lock = threading.Lock()
+_NO_ENCONTRADO = object()
+
+
+def _envolver_cache_get(clase):
+    """Envuelve get() de un backend de caché para contar aciertos y fallos."""
+    original = clase.get
+    if getattr(original, '_rendimiento', False):
+        return
+
+    def get(self, key, default=None, version=None):
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            return original(self, key, default, version)
+        valor = original(self, key, _NO_ENCONTRADO, version)
+        if valor is _NO_ENCONTRADO:
+            medicion.cache_fallos += 1
+            return default
+        medicion.cache_aciertos += 1
+        return valor
+
+    get._rendimiento = True
+    clase.get = get
+
+
+def _envolver_template_render(clase):
+    """Envuelve render() de los templates para medir el tiempo total."""
+    original = clase.render
+    if getattr(original, '_rendimiento', False):
+        return
+
+    def render(self, *args, **kwargs):
+        medicion = _medicion_actual.get()
+        if medicion is None:
+            return original(self, *args, **kwargs)
+        # Solo se mide el template exterior: los includes quedan dentro
+        medicion._profundidad_template += 1
+        inicio = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            medicion._profundidad_template -= 1
+            if medicion._profundidad_template == 0:
+                medicion.template_ms += (time.perf_counter() - inicio) * 1000
+
+    render._rendimiento = True
+    clase.render = render
+
+
+def instrumentar():
+    """Instala los wrappers de caché y templates (una sola vez por proceso)."""
+    global _instrumentado
+    if _instrumentado:
+        return
+    with _instrumentado_lock:
+        if _instrumentado:
+            return
+        from django.core.cache import caches
+        from django.template.backends.django import Template as TemplateDjango
+
+        for alias in settings.CACHES:
+            _envolver_cache_get(type(caches[alias]))
+        _envolver_template_render(TemplateDjango)
+        _instrumentado = True
+
+
+# --- Histogramas por vista ---------------------------------------------------
+
+class HistogramaVista:
+    """Histograma de duración y acumulados de una vista."""
+
+    __slots__ = ('conteos', 'solicitudes', 'total_ms', 'consultas', 'sql_ms',
+                 'template_ms', 'cache_aciertos', 'cache_fallos', 'con_repetidas')
+
+    def __init__(self):
+        self.conteos = [0] * len(BUCKETS_MS)
+        self.solicitudes = 0
+        self.total_ms = 0.0
+        self.consultas = 0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.cache_aciertos = 0
+        self.cache_fallos = 0
+        self.con_repetidas = 0
+
+    def registrar(self, medicion: MedicionSolicitud, total_ms: float, repetidas: bool):
+        self.conteos[bisect_left(BUCKETS_MS, total_ms)] += 1
+        self.solicitudes += 1
+        self.total_ms += total_ms
+        self.consultas += medicion.consultas
+        self.sql_ms += medicion.sql_ms
+        self.template_ms += medicion.template_ms
+        self.cache_aciertos += medicion.cache_aciertos
+        self.cache_fallos += medicion.cache_fallos
+        self.con_repetidas += repetidas
+
+    def percentil(self, p: float) -> float:
+        """Percentil aproximado (límite superior del bucket)."""
+        objetivo = self.solicitudes * p
+        acumulado = 0
+        for limite, conteo in zip(BUCKETS_MS, self.conteos):
+            acumulado += conteo
+            if acumulado >= objetivo:
+                return limite
+        return BUCKETS_MS[-1]
+
+    def resumen(self) -> dict:
+        n = self.solicitudes or 1
+        return {
+            'solicitudes': self.solicitudes,
+            'promedio_ms': round(self.total_ms / n, 2),
+            'p50_ms': self.percentil(0.5),
+            'p95_ms': self.percentil(0.95),
+            'p99_ms': self.percentil(0.99),
+            'consultas_promedio': round(self.consultas / n, 2),
+            'sql_ms_promedio': round(self.sql_ms / n, 2),
+            'template_ms_promedio': round(self.template_ms / n, 2),
+            'cache_aciertos': self.cache_aciertos,
+            'cache_fallos': self.cache_fallos,
+            'solicitudes_con_consultas_repetidas': self.con_repetidas,
+            'histograma': {
+                ('+inf' if limite == float('inf') else f'<={limite}'): conteo
+                for limite, conteo in zip(BUCKETS_MS, self.conteos)
+            },
+        }
+
+
+class RegistroRendimiento:
+    """Histogramas por vista del proceso actual."""
+
+    def __init__(self):
+        self._vistas = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, vista: str, medicion: MedicionSolicitud, total_ms: float, repetidas: bool):
+        with self._lock:
+            histograma = self._vistas.get(vista)
+            if histograma is None:
+                histograma = self._vistas[vista] = HistogramaVista()
+            histograma.registrar(medicion, total_ms, repetidas)
+
+    def resumen(self) -> dict:
+        with self._lock:
+            return {vista: h.resumen() for vista, h in sorted(self._vistas.items())}
+
+    def reiniciar(self):
+        with self._lock:
+            self._vistas.clear()
+
+
+registro = RegistroRendimiento()
+
+
+@staff_member_required
+@require_http_methods(['GET', 'POST'])
+def estadisticas_rendimiento(request):
+    """
+    Histogramas de rendimiento por vista (solo staff).
+
+    GET retorna el resumen; POST lo reinicia. Los datos son del proceso
+    que atiende la solicitud.
+    """
+    if request.method == 'POST':
+        registro.reiniciar()
+        return JsonResponse({'success': True})
+
+    orden = request.GET.get('orden', 'p95_ms')
+    vistas = registro.resumen()
+    ranking = sorted(vistas, key=lambda v: vistas[v].get(orden, 0), reverse=True)
+    return JsonResponse({
+        'buckets_ms': [str(b) for b in BUCKETS_MS],
+        'ranking': ranking,
+        'vistas': vistas,
+    })
@@ -14,6 +14,7 @@ from pathlib import Path
 import sentry_sdk
 from dotenv import load_dotenv
 from decouple import config, Csv
+from django.core.exceptions import ImproperlyConfigured
 import os
 
 load_dotenv()
@@ -59,19 +60,26 @@ INSTALLED_APPS = [
     'pasajeros',   # Gestión de pasajeros
     'reservas',    # Sistema de reservas
     'api',         # API REST
+    'notificaciones',  # Cola de emails (outbox)
+    'monitoreo',   # Perfiles de solicitudes lentas
+    'eventos',     # Bus de eventos de dominio (outbox)
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir el tiempo total de la solicitud
+    'aerolinea.middleware.RequestLoggingMiddleware',
+    'aerolinea.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',  # Middleware para internacionalización
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Después de la autenticación: el perfilado por cabecera es solo para staff
+    'aerolinea.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     # Middleware personalizado (comentado temporalmente para debug)
-    # 'aerolinea.middleware.RequestLoggingMiddleware',
     # 'aerolinea.middleware.ErrorHandlingMiddleware',
     # 'aerolinea.middleware.SecurityMiddleware',
 ]
@@ -98,6 +106,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'aerolinea.wsgi.application'
 
+# Servidor ASGI (uvicorn aerolinea.asgi:application): necesario para el
+# mapa de asientos en vivo; las vistas de consulta más usadas son async
+ASGI_APPLICATION = 'aerolinea.asgi.application'
+
 
 # Database (Base de datos)
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -205,6 +217,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # en lugar del modelo User por defecto
 AUTH_USER_MODEL = 'usuarios.Usuario'
 
+# El usuario de la sesión (y su rol) se lee de la caché de datos de referencia
+AUTHENTICATION_BACKENDS = ['usuarios.backends.ModelBackendConCache']
+
 
 from sentry_sdk.integrations.django import DjangoIntegration
 from sentry_sdk.integrations.logging import ignore_logger
@@ -227,21 +242,101 @@ sentry_sdk.init(
 )
 
 
+# Los handlers configurados acá quedan detrás de una cola en memoria
+# (ver aerolinea.logging_config): la escritura ocurre en un hilo de fondo.
+LOGGING_CONFIG = 'aerolinea.logging_config.configurar_logging'
+
+# Directorio para los archivos de log (vacío = solo consola)
+LOG_DIR = config('LOG_DIR', default='')
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'aerolinea.logging_config.FormatoJSON',
+        },
+    },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
         },
+        'solicitudes': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'json',
+        },
     },
 
     'root': {
         'level': 'INFO',
         'handlers': ['console'],
     },
+
+    'loggers': {
+        # Un registro JSON por solicitud (RequestLoggingMiddleware)
+        'aerolinea.solicitudes': {
+            'level': 'INFO',
+            'handlers': ['solicitudes'],
+            'propagate': False,
+        },
+    },
 }
 
+if LOG_DIR:
+    os.makedirs(LOG_DIR, exist_ok=True)
+    # Rotación diaria: archivos más grandes y menos rotaciones que por tamaño
+    LOGGING['handlers']['solicitudes'] = {
+        'class': 'logging.handlers.TimedRotatingFileHandler',
+        'filename': os.path.join(LOG_DIR, 'requests.log'),
+        'when': 'midnight',
+        'backupCount': 14,
+        'formatter': 'json',
+    }
+    LOGGING['handlers']['archivo'] = {
+        'class': 'logging.handlers.TimedRotatingFileHandler',
+        'filename': os.path.join(LOG_DIR, 'aerolinea.log'),
+        'when': 'midnight',
+        'backupCount': 14,
+    }
+    LOGGING['root']['handlers'].append('archivo')
+
+# Muestreo del log de solicitudes: fracción de respuestas exitosas que se
+# registran. Los errores y las solicitudes lentas se registran siempre.
+LOG_SOLICITUDES_MUESTREO = config('LOG_SOLICITUDES_MUESTREO', default=1.0, cast=float)
+LOG_SOLICITUDES_LENTA_MS = config('LOG_SOLICITUDES_LENTA_MS', default=1000, cast=int)
+LOG_SOLICITUDES_RUTAS_EXCLUIDAS = ['/static/', '/media/', '/favicon.ico']
+
+# Métricas de rendimiento por solicitud (aerolinea.rendimiento)
+RENDIMIENTO_ACTIVO = config('RENDIMIENTO_ACTIVO', default=True, cast=bool)
+# La cabecera Server-Timing expone tiempos internos: solo en desarrollo por defecto
+RENDIMIENTO_SERVER_TIMING = config('RENDIMIENTO_SERVER_TIMING', default=DEBUG, cast=bool)
+# Repeticiones de una misma consulta a partir de las cuales se avisa de un N+1
+RENDIMIENTO_UMBRAL_REPETIDAS = config('RENDIMIENTO_UMBRAL_REPETIDAS', default=5, cast=int)
+
+# Escaneo de requests sospechosos (aerolinea.middleware.SecurityMiddleware)
+SEGURIDAD_RUTAS_EXCLUIDAS = ['/static/', '/media/', '/favicon.ico']
+# Rutas cuyos formularios multipart se escanean (los demás no se leen antes de la vista)
+SEGURIDAD_RUTAS_MULTIPART = []
+# Los cuerpos con un CONTENT_LENGTH mayor que esto (bytes) no se leen ni se escanean
+SEGURIDAD_MAX_CUERPO_ESCANEO = config('SEGURIDAD_MAX_CUERPO_ESCANEO', default=64 * 1024, cast=int)
+
+# Perfilado de solicitudes con cProfile (monitoreo). Staff puede pedirlo con
+# la cabecera 'X-Perfilar: 1'; con PERFILADO_ACTIVO se muestrea además una
+# fracción de las solicitudes y se guardan las que superan el umbral.
+PERFILADO_ACTIVO = config('PERFILADO_ACTIVO', default=False, cast=bool)
+PERFILADO_MUESTREO = config('PERFILADO_MUESTREO', default=0.01, cast=float)
+PERFILADO_UMBRAL_MS = config('PERFILADO_UMBRAL_MS', default=500, cast=int)
+PERFILADO_TOP_FUNCIONES = config('PERFILADO_TOP_FUNCIONES', default=25, cast=int)
+PERFILADO_MAX_REGISTROS = config('PERFILADO_MAX_REGISTROS', default=200, cast=int)
+# Valor de X-Perfilar que habilita el perfilado sin sesión (clientes de la API)
+PERFILADO_TOKEN = config('PERFILADO_TOKEN', default='')
+
+# Endpoint /metrics de Prometheus (aerolinea.metricas). Con token se exige
+# 'Authorization: Bearer <token>'; sin token solo se aceptan estas IPs.
+# Con varios workers definir PROMETHEUS_MULTIPROC_DIR en el entorno.
+METRICAS_TOKEN = config('METRICAS_TOKEN', default='')
+METRICAS_IPS_PERMITIDAS = config('METRICAS_IPS_PERMITIDAS', default='127.0.0.1,::1', cast=Csv())
+
 # Configuración de Django REST Framework
 REST_FRAMEWORK = {
     # Autenticación por defecto
@@ -273,6 +368,11 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.MultiPartParser',
     ],
     
+    # Límites de frecuencia por alcance (ver api.throttles)
+    'DEFAULT_THROTTLE_RATES': {
+        'cotizacion': config('COTIZACION_LIMITE', default='30/min'),
+    },
+    
     # Manejo de excepciones
     'EXCEPTION_HANDLER': 'api.exceptions.custom_exception_handler',
     
@@ -321,4 +421,178 @@ SWAGGER_SETTINGS = {
     'USE_SESSION_AUTH': True,
     'LOGIN_URL': '/admin/login/',
     'LOGOUT_URL': '/admin/logout/',
-}
\ No newline at end of file
+}
+
+# Configuración de email
+# https://docs.djangoproject.com/en/5.2/topics/email/
+SITE_NAME = config('SITE_NAME', default='Aerolínea')
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=10, cast=int)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='no-reply@aerolinea.com')
+
+# Cola de emails (app notificaciones)
+# Los emails se encolan en la base de datos y se envían en lotes desde
+# el comando procesar_correos o desde Celery.
+CORREO_TAMANO_LOTE = config('CORREO_TAMANO_LOTE', default=50, cast=int)
+CORREO_MAX_INTENTOS = config('CORREO_MAX_INTENTOS', default=5, cast=int)
+CORREO_REINTENTO_BASE = 60        # segundos antes del primer reintento
+CORREO_REINTENTO_MAXIMO = 3600    # tope del backoff exponencial
+CORREO_BLOQUEO_SEGUNDOS = 300     # tiempo que un lote queda reservado por un worker
+CORREO_USAR_CELERY = config('CORREO_USAR_CELERY', default=False, cast=bool)
+CORREO_MAX_POR_SEGUNDO = config('CORREO_MAX_POR_SEGUNDO', default=0, cast=float)  # 0 = sin límite
+
+# Avisos masivos (fan-out) por cambios de vuelo
+NOTIFICACIONES_TAMANO_BLOQUE = 500   # emails insertados por bloque
+NOTIFICACIONES_PAUSA_BLOQUE = 0.05   # segundos entre bloques
+
+# Cancelación en cascada de vuelos (reservas.services.cancelaciones)
+CANCELACION_TAMANO_LOTE = config('CANCELACION_TAMANO_LOTE', default=200, cast=int)
+CANCELACION_PAUSA_LOTE = 0          # segundos entre lotes
+CANCELACION_PORCENTAJE_REEMBOLSO = config('CANCELACION_PORCENTAJE_REEMBOLSO', default=100, cast=int)
+# Reintentos cuando las reservas restantes están bloqueadas por otra transacción
+CANCELACION_REINTENTOS_BLOQUEO = 5
+CANCELACION_ESPERA_BLOQUEO = 1      # segundos entre reintentos
+# Las cancelaciones activas sin avance durante este tiempo se vuelven a encolar
+CANCELACION_MINUTOS_INACTIVA = 10
+
+# Rotación de aviones (vuelos.services.rotacion): tiempo mínimo en tierra
+# entre la llegada de un vuelo y la salida del siguiente del mismo avión
+VUELOS_ROTACION_MINUTOS = config('VUELOS_ROTACION_MINUTOS', default=45, cast=int)
+
+# Generación de vuelos por temporada (comando generar_programacion)
+PROGRAMACION_TAMANO_LOTE = 1000    # vuelos por INSERT
+
+# Cotización en bloque (POST /api/vuelos/cotizar/)
+COTIZACION_MAX_SOLICITUDES = config('COTIZACION_MAX_SOLICITUDES', default=500, cast=int)
+COTIZACION_MAX_PASAJEROS = 9       # pasajeros por solicitud
+
+# Disponibilidad de asientos por vuelo en caché (vuelos.services.disponibilidad).
+# Se descarta al cambiar las reservas del vuelo; el TTL acota lo que puede
+# quedar desactualizado el precio entre recálculos de la tabla de tarifas.
+DISPONIBILIDAD_TTL = config('DISPONIBILIDAD_TTL', default=300, cast=int)
+
+# Caché (django.core.cache). CACHE_BACKEND elige el backend:
+# - 'locmem' (default): memoria de cada proceso, no se comparte entre
+#   workers; sirve para desarrollo o un único proceso
+# - 'redis': django-redis en CACHE_URL (compartida por todos los workers)
+# - 'memcached': pymemcache en CACHE_URL ('host:puerto')
+# - 'archivo': directorio CACHE_URL
+# - 'dummy': sin caché
+# Las claves llevan el prefijo CACHE_PREFIJO (para compartir el servidor
+# con otros sitios) y la versión CACHE_VERSION: subirla descarta todo lo
+# cacheado, por ejemplo al desplegar un cambio de formato.
+_BACKENDS_CACHE = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'redis': 'django_redis.cache.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'archivo': 'django.core.cache.backends.filebased.FileBasedCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+}
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+if CACHE_BACKEND not in _BACKENDS_CACHE:
+    raise ImproperlyConfigured(
+        f"CACHE_BACKEND inválido: '{CACHE_BACKEND}' (opciones: {', '.join(_BACKENDS_CACHE)})"
+    )
+CACHES = {
+    'default': {
+        'BACKEND': _BACKENDS_CACHE[CACHE_BACKEND],
+        'LOCATION': config('CACHE_URL', default='redis://localhost:6379/1' if CACHE_BACKEND == 'redis' else ''),
+        'TIMEOUT': config('CACHE_TTL', default=300, cast=int),
+        'KEY_PREFIX': config('CACHE_PREFIJO', default='aerolinea'),
+        'VERSION': config('CACHE_VERSION', default=1, cast=int),
+    }
+}
+if CACHE_BACKEND == 'redis':
+    # Si Redis no responde, las lecturas fallan como ausencias en lugar de romper la solicitud
+    CACHES['default']['OPTIONS'] = {'IGNORE_EXCEPTIONS': True}
+
+# Caché de respuestas por vista (aerolinea.cache_vistas): página principal,
+# lista de vuelos y listado de vuelos de la API. Se invalida al guardar un
+# vuelo o un avión; el TTL acota lo que pueden quedar desactualizados los
+# precios, que cambian con las reservas.
+CACHE_VISTAS_ALIAS = 'default'
+CACHE_VISTAS_TTL = config('CACHE_VISTAS_TTL', default=60, cast=int)  # 0 = sin caché
+
+# Agregados costosos en caché (aerolinea.cache_aside): contadores de vuelos,
+# estadísticas del panel y reportes. Se recalculan antes de vencer, en una
+# sola solicitud; BETA > 1 adelanta el recálculo. ESPERA y BLOQUEO también
+# rigen el recálculo único de las respuestas por vista.
+CACHE_RECALCULO_ALIAS = 'default'
+CACHE_RECALCULO_BETA = 1.0
+CACHE_RECALCULO_ESPERA = 2         # segundos que se espera a que otro worker lo calcule
+CACHE_RECALCULO_BLOQUEO = 30       # vencimiento del bloqueo de recálculo
+ESTADISTICAS_TTL = config('ESTADISTICAS_TTL', default=300, cast=int)
+
+# Caché de datos de referencia en dos niveles (aerolinea.cache_referencia):
+# aviones, asientos por avión y usuarios de sesión. El nivel local es por
+# proceso; el TTL local es lo máximo que otro proceso tarda en ver un cambio.
+CACHE_REFERENCIA_ALIAS = 'default'
+CACHE_REFERENCIA_TTL = config('CACHE_REFERENCIA_TTL', default=3600, cast=int)
+CACHE_REFERENCIA_TTL_LOCAL = 5         # segundos
+CACHE_REFERENCIA_MAXIMO_LOCAL = 1000   # entradas por proceso (LRU)
+CACHE_REFERENCIA_VERSION = 1           # subir al cambiar un modelo cacheado
+
+# Mapa de asientos en vivo (vuelos.services.mapa_en_vivo, requiere ASGI).
+# El broker local solo reparte mensajes dentro del proceso: con varios
+# workers ASGI se configura una clase sobre un broker externo.
+PUBSUB_BROKER = config('PUBSUB_BROKER', default='aerolinea.pubsub.BrokerLocal')
+PUBSUB_COLA_MAXIMA = 100           # mensajes pendientes por conexión
+SSE_LATIDO_SEGUNDOS = 15           # comentario para mantener viva la conexión
+SSE_DURACION_MAXIMA = 300          # segundos antes de cerrar (el navegador reconecta)
+SSE_REINTENTO_MS = 3000            # espera del navegador antes de reconectar
+
+# Reubicación de pasajeros desplazados (comando reubicar_pasajeros)
+REUBICACION_VENTANA_HORAS = config('REUBICACION_VENTANA_HORAS', default=48, cast=int)
+REUBICACION_TAMANO_LOTE = 100      # reservas creadas por transacción
+
+# Recordatorios de vuelo (comando enviar_recordatorios)
+RECORDATORIOS_VENTANA_HORAS = config('RECORDATORIOS_VENTANA_HORAS', default=24, cast=int)
+RECORDATORIOS_TAMANO_LOTE = 1000
+
+# Eventos de dominio (app eventos)
+# Los eventos con suscriptores en cola se guardan en el outbox y se
+# entregan después del commit; el comando procesar_eventos (o Celery)
+# recupera los que quedaron pendientes.
+EVENTOS_TAMANO_LOTE = config('EVENTOS_TAMANO_LOTE', default=500, cast=int)
+EVENTOS_MAX_INTENTOS = config('EVENTOS_MAX_INTENTOS', default=5, cast=int)
+EVENTOS_REINTENTO_BASE = 30        # segundos antes del primer reintento
+EVENTOS_REINTENTO_MAXIMO = 3600    # tope del backoff exponencial
+EVENTOS_BLOQUEO_SEGUNDOS = 300     # tiempo que un lote queda reservado por un worker
+
+# Tareas en segundo plano (aerolinea.tareas): 'hilos', 'celery' o 'sincrono'
+TAREAS_MODO = config('TAREAS_MODO', default='hilos')
+TAREAS_HILOS = config('TAREAS_HILOS', default=4, cast=int)
+
+# Configuración de Celery (opcional)
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default='redis://localhost:6379/0')
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_BEAT_SCHEDULE = {
+    # Respaldo periódico por si alguna notificación al worker se pierde
+    'enviar-correos-pendientes': {
+        'task': 'notificaciones.tasks.enviar_correos_pendientes',
+        'schedule': 30.0,
+    },
+    'enviar-recordatorios-vuelo': {
+        'task': 'notificaciones.tasks.enviar_recordatorios_vuelo',
+        'schedule': 3600.0,
+    },
+    'procesar-eventos-pendientes': {
+        'task': 'eventos.tasks.procesar_eventos_pendientes',
+        'schedule': 30.0,
+    },
+    # Cancelaciones en cascada interrumpidas (por ejemplo, por un reinicio)
+    'reanudar-cancelaciones-inactivas': {
+        'task': 'reservas.tasks.reanudar_cancelaciones_inactivas',
+        'schedule': 300.0,
+    },
+    # El factor de anticipación de las tarifas cambia con el tiempo
+    'recalcular-tarifas-proximas': {
+        'task': 'vuelos.tasks.recalcular_tarifas_proximas',
+        'schedule': 3600.0,
+    },
+}
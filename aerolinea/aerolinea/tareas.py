@@ -0,0 +1,122 @@
+"""
+Ejecución de tareas en segundo plano.
+
+Permite sacar del ciclo de la solicitud trabajos largos (fan-out de
+notificaciones, cascadas de cancelación, etc.) sin depender de Celery.
+
+Modos (setting TAREAS_MODO):
+- 'hilos': pool de hilos del proceso (default, no requiere infraestructura)
+- 'celery': envía la tarea al worker de Celery
+- 'sincrono': ejecuta en el momento (útil en tests y scripts)
+
+Las tareas se identifican por una ruta ``'modulo:atributo'``, por ejemplo
+``'notificaciones.services.notificaciones:NotificacionVueloService.notificar_cambio'``,
+para que el mismo código funcione en los tres modos.
+"""
+
+import importlib
+import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def resolver(ruta: str):
+    """Importa el objeto indicado por una ruta 'modulo:atributo.atributo'."""
+    modulo, _, atributos = ruta.partition(':')
+    objeto = importlib.import_module(modulo)
+    for atributo in atributos.split('.'):
+        objeto = getattr(objeto, atributo)
+    return objeto
+
+
+def ejecutar_tarea(ruta: str, *args, **kwargs):
+    """Ejecuta una tarea en el proceso actual, registrando errores."""
+    close_old_connections()
+    try:
+        return resolver(ruta)(*args, **kwargs)
+    except Exception:
+        logger.exception(f"Error ejecutando la tarea {ruta}")
+        raise
+    finally:
+        close_old_connections()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'TAREAS_HILOS', 4),
+                    thread_name_prefix='tareas',
+                )
+    return _executor
+
+
+def encolar(ruta: str, *args, **kwargs):
+    """
+    Programa una tarea en segundo plano.
+
+    Los argumentos deben ser serializables (ids, strings, números) para
+    que la tarea pueda viajar a Celery.
+
+    Args:
+        ruta (str): Ruta 'modulo:atributo' de la función a ejecutar
+        *args, **kwargs: Argumentos de la función
+    """
+    modo = getattr(settings, 'TAREAS_MODO', 'hilos')
+
+    if modo == 'sincrono':
+        return ejecutar_tarea(ruta, *args, **kwargs)
+
+    if modo == 'celery':
+        from aerolinea import celery_app
+        if celery_app is not None:
+            return celery_app.send_task(
+                'aerolinea.tareas.ejecutar_tarea', args=(ruta,) + args, kwargs=kwargs
+            )
+        logger.warning("TAREAS_MODO='celery' pero Celery no está instalado; se usan hilos")
+
+    return _pool().submit(ejecutar_tarea, ruta, *args, **kwargs)
+
+
+def reprogramar(registro, error: Exception, max_intentos: int, base: int, maximo: int) -> bool:
+    """
+    Registra un intento fallido de una cola persistente (emails, outbox).
+
+    Aplica backoff exponencial con jitter (±20%) o, si se agotaron los
+    intentos, marca el registro como fallido. ``registro`` debe tener los
+    campos intentos, ultimo_error, estado y proximo_intento.
+
+    Args:
+        registro: Fila de la cola a reprogramar (no se guarda)
+        error (Exception): Error del último intento
+        max_intentos (int): Intentos antes de marcarlo como fallido
+        base (int): Segundos de espera antes del primer reintento
+        maximo (int): Tope de la espera en segundos
+
+    Returns:
+        bool: True si se reprogramó, False si quedó 'fallido'
+    """
+    registro.intentos += 1
+    registro.ultimo_error = str(error)[:1000]
+    if registro.intentos >= max_intentos:
+        registro.estado = 'fallido'
+        return False
+
+    espera = min(maximo, base * 2 ** (registro.intentos - 1))
+    registro.estado = 'pendiente'
+    registro.proximo_intento = timezone.now() + timedelta(seconds=espera * random.uniform(0.8, 1.2))
+    return True
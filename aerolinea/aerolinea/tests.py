@@ -0,0 +1,358 @@
+"""
+Tests para la infraestructura del proyecto (logging, middleware, rendimiento, métricas).
+"""
+
+import json
+import logging
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from aerolinea.cache_aside import obtener_o_calcular
+from aerolinea.cache_referencia import CacheLocal, CacheReferencia, cache_local
+from aerolinea.logging_config import ColaHandler, FormatoJSON, ListenerRuteado
+from aerolinea import metricas, rendimiento
+from aerolinea.middleware import PerformanceMiddleware, RequestLoggingMiddleware, SecurityMiddleware
+
+
+class HandlerMemoria(logging.Handler):
+    """Handler de prueba que guarda los mensajes formateados."""
+
+    def __init__(self, level=logging.NOTSET):
+        super().__init__(level)
+        self.mensajes = []
+
+    def emit(self, record):
+        self.mensajes.append(self.format(record))
+
+
+class LoggingColaTest(SimpleTestCase):
+    """Tests para el pipeline de logging con cola."""
+
+    def test_json_evalua_campos_lazy(self):
+        """Los campos callables se evalúan recién al formatear."""
+        llamadas = []
+        record = logging.LogRecord('prueba', logging.INFO, __file__, 1, 'solicitud', None, None)
+        record.datos = {'status': 200, 'ip': lambda: llamadas.append(1) or '10.0.0.1'}
+
+        self.assertEqual(llamadas, [])
+        salida = json.loads(FormatoJSON().format(record))
+
+        self.assertEqual(llamadas, [1])
+        self.assertEqual(salida['status'], 200)
+        self.assertEqual(salida['ip'], '10.0.0.1')
+        self.assertEqual(salida['mensaje'], 'solicitud')
+
+    def test_listener_respeta_handlers_de_cada_logger(self):
+        """Cada registro llega solo a los handlers de su logger."""
+        cola = queue.SimpleQueue()
+        general = HandlerMemoria()
+        errores = HandlerMemoria(logging.ERROR)
+        logger = logging.getLogger('prueba.cola')
+        logger.propagate = False
+        logger.addHandler(ColaHandler(cola, [general, errores]))
+        listener = ListenerRuteado(cola)
+        listener.start()
+        try:
+            logger.warning('aviso %s', 1)
+            logger.error('falla')
+        finally:
+            listener.stop()
+            logger.handlers.clear()
+
+        self.assertEqual(general.mensajes, ['aviso 1', 'falla'])
+        self.assertEqual(errores.mensajes, ['falla'])
+
+
+class RequestLoggingMiddlewareTest(SimpleTestCase):
+    """Tests para el muestreo del log de solicitudes."""
+
+    @override_settings(LOG_SOLICITUDES_MUESTREO=0.0)
+    def test_muestreo_de_respuestas_exitosas(self):
+        """Las respuestas exitosas se muestrean; errores y lentas no."""
+        debe_registrar = RequestLoggingMiddleware.debe_registrar
+        self.assertFalse(debe_registrar('/es/', 200, 5))
+        self.assertTrue(debe_registrar('/es/', 404, 5))
+        self.assertTrue(debe_registrar('/es/', 200, 5000))
+
+    def test_rutas_excluidas(self):
+        """Los archivos estáticos exitosos no se registran."""
+        self.assertFalse(RequestLoggingMiddleware.debe_registrar('/static/css/app.css', 200, 5))
+        self.assertTrue(RequestLoggingMiddleware.debe_registrar('/es/', 200, 5))
+
+
+@override_settings(RENDIMIENTO_SERVER_TIMING=True, RENDIMIENTO_UMBRAL_REPETIDAS=3)
+class PerformanceMiddlewareTest(TestCase):
+    """Tests para las métricas de rendimiento por solicitud."""
+
+    def setUp(self):
+        """Configuración inicial para los tests."""
+        rendimiento.registro.reiniciar()
+        self.factory = RequestFactory()
+
+    def ejecutar(self, vista):
+        request = self.factory.get('/es/prueba/')
+        request.resolver_match = type('Match', (), {'view_name': 'prueba'})()
+        return PerformanceMiddleware(vista)(request)
+
+    def test_firma_sql_ignora_literales(self):
+        """Consultas que solo difieren en literales comparten firma."""
+        self.assertEqual(
+            rendimiento.firma_sql("SELECT * FROM t WHERE id = 1 AND n = 'a'"),
+            rendimiento.firma_sql("SELECT * FROM t WHERE id = 25 AND n = 'b'"),
+        )
+
+    def test_server_timing_y_consultas_repetidas(self):
+        """Se miden consultas y caché, y se detecta el patrón N+1."""
+        def vista(request):
+            cache.set('rendimiento-prueba', 1)
+            cache.get('rendimiento-prueba')
+            cache.get('rendimiento-inexistente')
+            with connection.cursor() as cursor:
+                for i in range(4):
+                    cursor.execute('SELECT %s', [i])
+            return HttpResponse('ok')
+
+        with self.assertLogs('aerolinea.rendimiento', 'WARNING'):
+            response = self.ejecutar(vista)
+
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('4 consultas', response['Server-Timing'])
+        self.assertIn('aciertos=1 fallos=1', response['Server-Timing'])
+        self.assertEqual(response['X-Consultas-Repetidas'], '4')
+
+        resumen = rendimiento.registro.resumen()['prueba']
+        self.assertEqual(resumen['solicitudes'], 1)
+        self.assertEqual(resumen['consultas_promedio'], 4)
+        self.assertEqual(resumen['solicitudes_con_consultas_repetidas'], 1)
+
+    def test_endpoint_solo_staff(self):
+        """El resumen de rendimiento requiere un usuario staff."""
+        self.assertEqual(self.client.get('/admin/rendimiento/').status_code, 302)
+
+        staff = get_user_model().objects.create_user('staff', password='clave', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get('/admin/rendimiento/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('vistas', response.json())
+
+
+class MetricasTest(SimpleTestCase):
+    """Tests para las métricas de Prometheus."""
+
+    def test_medir_cuenta_resultados(self):
+        """medir registra la duración y el resultado de cada operación."""
+        @metricas.medir(metricas.RESERVAS_DURACION, metricas.RESERVAS_OPERACIONES,
+                        operacion='prueba', origen='test')
+        def operacion(falla=None):
+            if falla:
+                raise falla
+
+        operacion()
+        with self.assertRaises(ValidationError):
+            operacion(ValidationError('no'))
+
+        contenido = metricas.generar_metricas()[0].decode()
+        for resultado in ('ok', 'rechazada'):
+            self.assertIn(
+                'aerolinea_reservas_operaciones_total{operacion="prueba",origen="test",'
+                f'resultado="{resultado}"}} 1.0',
+                contenido
+            )
+        self.assertRegex(
+            contenido,
+            r'aerolinea_reservas_duracion_segundos_count\{operacion="prueba",origen="test"\} 2(\.0)?\n'
+        )
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_endpoint_requiere_token(self):
+        """El endpoint de scraping exige el token configurado."""
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(
+            self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer otro').status_code, 403
+        )
+
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'aerolinea_busqueda_vuelos_duracion_segundos', response.content)
+
+    @unittest.skipUnless(metricas.prometheus_client, 'prometheus-client no está instalado')
+    def test_agrega_los_valores_de_varios_procesos(self):
+        """Con PROMETHEUS_MULTIPROC_DIR, /metrics suma lo que registró cada worker."""
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        entorno = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directorio.name)
+        codigo = (
+            'from aerolinea import metricas; '
+            "metricas.RESERVAS_EXPIRADAS.labels(origen='worker').inc(3)"
+        )
+        # Cada worker es un proceso aparte que escribe sus valores en el directorio
+        for _ in range(2):
+            subprocess.run([sys.executable, '-c', codigo], check=True, env=entorno,
+                           cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+        with mock.patch.dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directorio.name):
+            contenido, content_type = metricas.generar_metricas()
+
+        self.assertEqual(content_type, metricas.prometheus_client.CONTENT_TYPE_LATEST)
+        self.assertIn(
+            'aerolinea_reservas_expiradas_total{origen="worker"} 6.0', contenido.decode()
+        )
+
+
+class SecurityMiddlewareTest(SimpleTestCase):
+    """Tests para el escaneo de requests sospechosos."""
+
+    def setUp(self):
+        """Configuración inicial para los tests."""
+        self.factory = RequestFactory()
+        self.middleware = SecurityMiddleware(lambda request: HttpResponse())
+
+    def test_detecta_patrones_en_ruta_query_y_formulario(self):
+        """Los patrones se detectan sin importar mayúsculas ni codificación."""
+        sospechoso = self.middleware.is_suspicious_request
+        self.assertTrue(sospechoso(self.factory.get('/es/<SCRIPT>/')))
+        self.assertTrue(sospechoso(self.factory.get('/es/', {'q': 'JavaScript:alert(1)'})))
+        self.assertTrue(sospechoso(self.factory.post('/es/', 'nombre=%3Cimg+onError%3Dx%3E',
+                                                     content_type='application/x-www-form-urlencoded')))
+        self.assertFalse(sospechoso(self.factory.get('/es/vuelos/', {'origen': 'Salta'})))
+
+    def test_formularios_multipart_grandes_y_json(self):
+        """Multipart solo en rutas habilitadas; los cuerpos enormes y el JSON no se leen."""
+        sospechoso = self.middleware.is_suspicious_request
+        subida = self.factory.post('/es/', {'nombre': 'onload=1'})
+        self.assertFalse(sospechoso(subida))
+        self.assertFalse(hasattr(subida, '_post'))
+
+        with self.settings(SEGURIDAD_RUTAS_MULTIPART=['/es/equipaje/']):
+            middleware = SecurityMiddleware(lambda request: HttpResponse())
+        self.assertTrue(middleware.is_suspicious_request(self.factory.post('/es/equipaje/', {'nombre': 'onload=1'})))
+        self.assertFalse(middleware.is_suspicious_request(self.factory.post('/es/equipaje/', {'nombre': 'Ana'})))
+
+        json_request = self.factory.post('/api/', '{"x": "<script>"}', content_type='application/json')
+        self.assertFalse(sospechoso(json_request))
+        self.assertFalse(hasattr(json_request, '_body'))
+
+        with self.settings(SEGURIDAD_MAX_CUERPO_ESCANEO=10):
+            middleware = SecurityMiddleware(lambda request: HttpResponse())
+        grande = self.factory.post('/es/', 'campo=<script>' + 'a' * 20,
+                                   content_type='application/x-www-form-urlencoded')
+        with self.assertLogs('django.security', 'DEBUG'):
+            self.assertFalse(middleware.is_suspicious_request(grande))
+        self.assertFalse(hasattr(grande, '_body'))
+
+    def test_query_string_solo_valores(self):
+        """Los nombres de los parámetros no se escanean, como antes."""
+        sospechoso = self.middleware.is_suspicious_request
+        self.assertFalse(sospechoso(self.factory.get('/es/', {'descripcion': 'x', 'subscript': '1'})))
+        self.assertTrue(sospechoso(self.factory.get('/es/?a=1&a=%3Cscript%3E')))
+
+    @override_settings(SEGURIDAD_RUTAS_EXCLUIDAS=['/api/webhooks/'])
+    def test_rutas_excluidas(self):
+        """Las rutas excluidas no se escanean."""
+        middleware = SecurityMiddleware(lambda request: HttpResponse())
+        self.assertFalse(middleware.is_suspicious_request(self.factory.get('/api/webhooks/script')))
+
+
+class CacheReferenciaTest(SimpleTestCase):
+    """Tests para la caché de datos de referencia en dos niveles."""
+
+    def setUp(self):
+        cache.clear()
+        cache_local().clear()
+
+    def test_lru_acotado(self):
+        """El nivel local descarta la entrada usada hace más tiempo."""
+        local = CacheLocal(maximo=2)
+        local.set('a', 1, 60)
+        local.set('b', 2, 60)
+        local.get('a')
+        local.set('c', 3, 60)
+        self.assertIsNone(local.get('b', None))
+        self.assertEqual((local.get('a'), local.get('c')), (1, 3))
+
+    def test_niveles_copias_e_invalidacion(self):
+        """Se carga una vez, se devuelven copias y se recarga al invalidar."""
+        referencia = CacheReferencia('prueba')
+        cargas = []
+
+        def cargar():
+            cargas.append(1)
+            return {'modelo': 'A320'}
+
+        referencia.obtener(1, cargar)['modelo'] = 'modificado'
+        self.assertEqual(referencia.obtener(1, cargar), {'modelo': 'A320'})
+
+        # Otro proceso (sin nivel local) lo lee del nivel compartido
+        cache_local().clear()
+        referencia.obtener(1, cargar)
+        self.assertEqual(len(cargas), 1)
+
+        referencia.invalidar(1)
+        referencia.obtener(1, cargar)
+        referencia.invalidar_todo()
+        referencia.obtener(1, cargar)
+        self.assertEqual(len(cargas), 3)
+
+
+class CacheAsideTest(SimpleTestCase):
+    """Tests para la caché de agregados con recálculo anticipado y único."""
+
+    def setUp(self):
+        cache.clear()
+        cache_local().clear()
+        self.addCleanup(cache_local().clear)
+        self.addCleanup(cache.clear)
+        self.calculos = []
+
+    def calcular(self):
+        self.calculos.append(1)
+        return len(self.calculos)
+
+    def test_recalculo_anticipado_probabilistico(self):
+        """Cerca del vencimiento, y si cuesta calcularlo, se renueva antes de tiempo."""
+        self.assertEqual(obtener_o_calcular('prueba:total', self.calcular, 60), 1)
+
+        # El valor queda tal cual en su clave: se puede ajustar con incr
+        cache.incr('prueba:total', 5)
+        self.assertEqual(obtener_o_calcular('prueba:total', self.calcular, 60), 6)
+
+        # Tardó 10 segundos y vence en 1: el sorteo casi siempre lo renueva...
+        cache.set('prueba:total:recalculo', (10.0, time.time() + 1))
+        with mock.patch('aerolinea.cache_aside.random.random', return_value=0.99):
+            self.assertEqual(obtener_o_calcular('prueba:total', self.calcular, 60), 2)
+
+        # ...salvo que salga el extremo más favorable
+        cache.set('prueba:total:recalculo', (10.0, time.time() + 1))
+        with mock.patch('aerolinea.cache_aside.random.random', return_value=0.0):
+            self.assertEqual(obtener_o_calcular('prueba:total', self.calcular, 60), 2)
+
+    @override_settings(CACHE_RECALCULO_ESPERA=0.5)
+    def test_recalculo_unico(self):
+        """Mientras otro lo calcula se espera su resultado; si no lo guarda, se calcula."""
+        cache.add('prueba:total:bloqueo', 1)
+        otro_worker = threading.Timer(0.05, cache.set, ('prueba:total', 40))
+        otro_worker.start()
+        self.addCleanup(otro_worker.cancel)
+        self.assertEqual(obtener_o_calcular('prueba:total', self.calcular, 60), 40)
+        self.assertEqual(self.calculos, [])
+
+        cache.delete_many(['prueba:total', 'prueba:total:bloqueo'])
+        cache.add('prueba:total:bloqueo', 1, 0.1)
+        self.assertEqual(obtener_o_calcular('prueba:total', self.calcular, 60), 1)
+        self.assertIsNone(cache.get('prueba:total:bloqueo'))
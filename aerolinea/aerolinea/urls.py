@@ -21,6 +21,9 @@ from django.conf.urls.static import static
 from django.conf.urls.i18n import i18n_patterns
 from django.views.i18n import set_language
 
+from aerolinea.metricas import vista_metricas
+from aerolinea.rendimiento import estadisticas_rendimiento
+
 # Swagger
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
@@ -42,6 +45,10 @@ schema_view = get_schema_view(
 
 # URLs principales del proyecto
 urlpatterns = [
+    # Métricas de rendimiento por vista (solo staff); antes del admin,
+    # que captura todas las rutas bajo admin/
+    path('admin/rendimiento/', estadisticas_rendimiento, name='rendimiento'),
+    
     # Panel de administración de Django
     path('admin/', admin.site.urls),
     
@@ -52,6 +59,9 @@ urlpatterns = [
     
     # API REST
     path('api/', include('api.urls')),
+    
+    # Métricas para Prometheus
+    path('metrics', vista_metricas, name='metricas'),
 ]
 
 # URL para cambiar idioma (fuera de i18n_patterns para que funcione)
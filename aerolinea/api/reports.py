@@ -10,19 +10,42 @@ from rest_framework.response import Response
 from django.db.models import Count, Sum, Avg, Q
 from django.utils import timezone
 from datetime import datetime, timedelta
+from functools import wraps
 
 from vuelos.models import Vuelo, Avion
+from vuelos.repositories.vuelos import AvionRepository
+from vuelos.services.estadisticas import EstadisticasService
 from reservas.models import Reserva, Boleto
 from pasajeros.models import Pasajero
 
 from .permissions import IsAdminOrEmployee
 
 
+def reporte_en_cache(accion):
+    """
+    Decorador para las acciones de reportes: sirve el resultado desde la
+    caché según la acción y sus parámetros (ver EstadisticasService.reporte),
+    así al vencer lo recalcula una sola solicitud.
+    
+    Los permisos del ViewSet se verifican antes de llegar a la acción.
+    """
+    @wraps(accion)
+    def envoltorio(self, request, *args, **kwargs):
+        datos = EstadisticasService.reporte(
+            accion.__name__,
+            request.query_params,
+            lambda: accion(self, request, *args, **kwargs).data
+        )
+        return Response(datos)
+    return envoltorio
+
+
 class ReportesViewSet(viewsets.ViewSet):
     """
     ViewSet para generar reportes estadísticos.
     
-    Requiere permisos de administrador o empleado.
+    Requiere permisos de administrador o empleado. Los resultados se
+    sirven desde la caché por ESTADISTICAS_TTL segundos.
     """
     permission_classes = [IsAdminOrEmployee]
     
@@ -31,29 +54,22 @@ class ReportesViewSet(viewsets.ViewSet):
         """
         Retorna estadísticas generales del sistema.
         """
-        total_vuelos = Vuelo.objects.count()
-        total_pasajeros = Pasajero.objects.count()
-        total_reservas = Reserva.objects.count()
-        total_aviones = Avion.objects.count()
-        
-        reservas_confirmadas = Reserva.objects.filter(estado='confirmada').count()
-        reservas_pendientes = Reserva.objects.filter(estado='pendiente').count()
-        
-        vuelos_programados = Vuelo.objects.filter(estado='programado').count()
-        vuelos_en_vuelo = Vuelo.objects.filter(estado='en_vuelo').count()
+        # Agregados en caché, compartidos con el dashboard del admin
+        resumen = EstadisticasService.resumen()
         
         return Response({
-            'total_vuelos': total_vuelos,
-            'total_pasajeros': total_pasajeros,
-            'total_reservas': total_reservas,
-            'total_aviones': total_aviones,
-            'reservas_confirmadas': reservas_confirmadas,
-            'reservas_pendientes': reservas_pendientes,
-            'vuelos_programados': vuelos_programados,
-            'vuelos_en_vuelo': vuelos_en_vuelo,
+            'total_vuelos': resumen['total_vuelos'],
+            'total_pasajeros': resumen['total_pasajeros'],
+            'total_reservas': resumen['total_reservas'],
+            'total_aviones': resumen['total_aviones'],
+            'reservas_confirmadas': resumen['reservas_confirmadas'],
+            'reservas_pendientes': resumen['reservas_pendientes'],
+            'vuelos_programados': resumen['vuelos_activos'],
+            'vuelos_en_vuelo': resumen['vuelos_en_vuelo'],
         })
     
     @action(detail=False, methods=['get'])
+    @reporte_en_cache
     def reporte_vuelos(self, request):
         """
         Retorna reporte detallado de vuelos.
@@ -79,7 +95,10 @@ class ReportesViewSet(viewsets.ViewSet):
         por_estado = queryset.values('estado').annotate(total=Count('id'))
         
         # Ventas totales estimadas
-        ventas_estimadas = sum([v.precio_base * v.avion.capacidad * 0.7 for v in queryset])
+        # La capacidad de cada avión sale de la caché de datos de referencia
+        ventas_estimadas = sum([
+            v.precio_base * AvionRepository.obtener_por_id(v.avion_id).capacidad * 0.7 for v in queryset
+        ])
         
         return Response({
             'total_vuelos': total,
@@ -88,6 +107,7 @@ class ReportesViewSet(viewsets.ViewSet):
         })
     
     @action(detail=False, methods=['get'])
+    @reporte_en_cache
     def reporte_reservas(self, request):
         """
         Retorna reporte detallado de reservas.
@@ -127,6 +147,7 @@ class ReportesViewSet(viewsets.ViewSet):
         })
     
     @action(detail=False, methods=['get'])
+    @reporte_en_cache
     def reporte_pasajeros(self, request):
         """
         Retorna reporte de pasajeros más frecuentes.
@@ -151,6 +172,7 @@ class ReportesViewSet(viewsets.ViewSet):
         })
     
     @action(detail=False, methods=['get'])
+    @reporte_en_cache
     def reporte_ocupacion(self, request):
         """
         Retorna reporte de ocupación de vuelos.
@@ -164,7 +186,7 @@ class ReportesViewSet(viewsets.ViewSet):
         
         resultados = []
         for vuelo in vuelos:
-            asientos_total = vuelo.avion.capacidad
+            asientos_total = AvionRepository.obtener_por_id(vuelo.avion_id).capacidad
             reservas_count = vuelo.reservas.filter(estado='confirmada').count()
             ocupacion = (reservas_count / asientos_total * 100) if asientos_total > 0 else 0
             
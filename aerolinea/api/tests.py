@@ -4,13 +4,20 @@ Tests para la API REST.
 Este módulo contiene tests para los endpoints de la API.
 """
 
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.urls import reverse
 
-from vuelos.models import Avion, Vuelo
+from aerolinea.cache_referencia import cache_local
+from aerolinea.idempotencia import AlmacenIdempotencia, RespuestaGuardada, almacen
+from vuelos.models import Avion, Vuelo, Asiento
 from pasajeros.models import Pasajero
 from reservas.models import Reserva
 
@@ -112,6 +119,81 @@ class VuelosAPITests(TestCase):
             self.assertEqual(response.data['results'][0]['origen'], 'Buenos Aires')
 
 
+class CotizacionAPITests(TestCase):
+    """Tests para la cotización en bloque."""
+    
+    def setUp(self):
+        """Vuelo con 3 asientos de económica."""
+        # El límite de frecuencia se cuenta en la caché
+        cache.clear()
+        cache_local().clear()
+        self.addCleanup(cache_local().clear)
+        self.addCleanup(cache.clear)
+        self.client = APIClient()
+        avion = Avion.objects.bulk_create([
+            Avion(modelo='Cotizador', capacidad=3, filas=1, columnas=3)
+        ])[0]
+        Asiento.objects.bulk_create([
+            Asiento(avion=avion, numero=f'CZ{i}', fila=1, columna='ABC'[i], tipo='economica')
+            for i in range(3)
+        ])
+        salida = timezone.now() + timedelta(days=60)
+        self.vuelo = Vuelo.objects.create(
+            avion=avion, origen='Mendoza', destino='Neuquén', fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=2), duracion='2:00', precio_base=1000
+        )
+        self.url = reverse('vuelo-cotizar')
+    
+    def test_cotizar_sin_autenticacion(self):
+        """Los buscadores cotizan varias solicitudes en una llamada."""
+        response = self.client.post(self.url, {'solicitudes': [
+            {'vuelo_id': self.vuelo.id, 'tipo': 'economica', 'pasajeros': 1},
+            {'vuelo_id': self.vuelo.id, 'tipo': 'primera', 'pasajeros': 1},
+        ]}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        economica, primera = response.data['cotizaciones']
+        self.assertTrue(economica['disponible'])
+        self.assertEqual(economica['total'], '1000.00')
+        self.assertEqual(economica['asientos_disponibles'], 3)
+        self.assertFalse(primera['disponible'])
+    
+    def test_solicitudes_no_validas(self):
+        """Se rechazan las cabinas desconocidas y los grupos demasiado grandes."""
+        response = self.client.post(self.url, {'solicitudes': [
+            {'vuelo_id': self.vuelo.id, 'tipo': 'ejecutiva', 'pasajeros': 1},
+            {'vuelo_id': self.vuelo.id, 'tipo': 'economica', 'pasajeros': 50},
+        ]}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_cotiza_lo_que_cobra_la_reserva_sin_escribir(self):
+        """El total es el precio de la reserva por pasajero y la cotización no guarda tarifas."""
+        from reservas.services.reservas import ReservaService
+        from vuelos.models import TarifaVuelo
+        
+        TarifaVuelo.objects.all().delete()
+        response = self.client.post(self.url, {'solicitudes': [
+            {'vuelo_id': self.vuelo.id, 'tipo': 'economica', 'pasajeros': 3},
+        ]}, format='json')
+        
+        cotizacion = response.data['cotizaciones'][0]
+        precio = ReservaService._calcular_precio_final(self.vuelo.id, Asiento.objects.first().id)
+        self.assertEqual(cotizacion['precio_unitario'], f'{precio:.2f}')
+        self.assertEqual(cotizacion['total'], f'{precio * 3:.2f}')
+        self.assertFalse(TarifaVuelo.objects.exists())
+    
+    def test_limite_de_frecuencia(self):
+        """La cotización pública tiene su propio límite por cliente."""
+        from api.throttles import CotizacionRateThrottle
+        
+        cuerpo = {'solicitudes': [{'vuelo_id': self.vuelo.id, 'tipo': 'economica', 'pasajeros': 1}]}
+        with mock.patch.object(CotizacionRateThrottle, 'THROTTLE_RATES', {'cotizacion': '2/min'}):
+            codigos = [self.client.post(self.url, cuerpo, format='json').status_code for _ in range(3)]
+        
+        self.assertEqual(codigos, [200, 200, 429])
+
+
 class ReportesAPITests(TestCase):
     """Tests para los endpoints de reportes."""
     
@@ -154,6 +236,31 @@ class ReportesAPITests(TestCase):
         self.assertIn('total_vuelos', response.data)
         self.assertIn('total_pasajeros', response.data)
         self.assertIn('total_reservas', response.data)
+    
+    def test_reportes_se_sirven_desde_la_cache(self):
+        """Un reporte con los mismos parámetros se calcula una sola vez."""
+        cache.clear()
+        cache_local().clear()
+        self.addCleanup(cache_local().clear)
+        self.addCleanup(cache.clear)
+        self.client.force_authenticate(self.usuario)
+        url = '/api/reportes/reporte_pasajeros/'
+        Pasajero.objects.create(
+            nombre='Ana', apellido='Gómez', documento='30111222',
+            email='ana@example.com', telefono='1144445555',
+            fecha_nacimiento='1990-01-01'
+        )
+        
+        primera = self.client.get(url, {'top': 5})
+        self.assertEqual(primera.data['total_pasajeros'], 1)
+        
+        Pasajero.objects.all().delete()
+        with self.assertNumQueries(0):
+            segunda = self.client.get(url, {'top': 5})
+        self.assertEqual(segunda.data, primera.data)
+        
+        # Otros parámetros son otro reporte
+        self.assertEqual(self.client.get(url, {'top': 3}).data['total_pasajeros'], 0)
 
 
 class PermisosAPITests(TestCase):
@@ -198,3 +305,124 @@ class PermisosAPITests(TestCase):
         
         # Debería fallar porque el cliente no tiene permisos de admin
         self.assertIn(response.status_code, [status.HTTP_403_FORBIDDEN, status.HTTP_401_UNAUTHORIZED])
+
+
+class AlmacenIdempotenciaTests(SimpleTestCase):
+    """Tests para el almacén de claves de idempotencia."""
+    
+    def test_expira_por_ttl(self):
+        """Las respuestas vencidas se descartan."""
+        almacen_local = AlmacenIdempotencia(ttl=0, max_claves=10, usar_cache=False)
+        clave = almacen_local.generar_clave('u1', 'POST', '/api/reservas/', 'abc')
+        self.assertTrue(almacen_local.iniciar(clave))
+        almacen_local.guardar(clave, RespuestaGuardada('h', 201, {}, {}))
+        self.assertIsNone(almacen_local.obtener(clave))
+    
+    def test_respeta_maximo_de_claves(self):
+        """Al superar el máximo se descartan las claves más antiguas."""
+        almacen_local = AlmacenIdempotencia(ttl=60, max_claves=2, usar_cache=False)
+        claves = [almacen_local.generar_clave('u1', i) for i in range(3)]
+        for clave in claves:
+            almacen_local.iniciar(clave)
+            almacen_local.guardar(clave, RespuestaGuardada('h', 200, {}, {}))
+        self.assertIsNone(almacen_local.obtener(claves[0]))
+        self.assertIsNotNone(almacen_local.obtener(claves[2]))
+    
+    def test_clave_en_curso(self):
+        """Una clave en curso no puede iniciarse dos veces."""
+        almacen_local = AlmacenIdempotencia(ttl=60, max_claves=10, usar_cache=False)
+        clave = almacen_local.generar_clave('u1', 'x')
+        self.assertTrue(almacen_local.iniciar(clave))
+        self.assertFalse(almacen_local.iniciar(clave))
+        almacen_local.liberar(clave)
+        self.assertTrue(almacen_local.iniciar(clave))
+    
+    def test_reproduce_si_otra_solicitud_termina_antes_de_iniciar(self):
+        """Si la original termina entre la lectura y la marca, se reproduce sin ejecutar de nuevo."""
+        from aerolinea import idempotencia
+        
+        almacen_local = AlmacenIdempotencia(ttl=60, max_claves=10, usar_cache=False)
+        clave = almacen_local.generar_clave('u1', 'POST', '/api/reservas/', 'carrera')
+        obtener_original = almacen_local.obtener
+        lecturas = []
+        
+        def obtener(clave_leida):
+            lecturas.append(clave_leida)
+            if len(lecturas) == 1:
+                # La solicitud original guarda su respuesta justo después de esta lectura
+                almacen_local.guardar(clave_leida, RespuestaGuardada('h', 201, 'original', {}))
+                return None
+            return obtener_original(clave_leida)
+        
+        with mock.patch.object(idempotencia, 'almacen', almacen_local), \
+                mock.patch.object(almacen_local, 'obtener', side_effect=obtener):
+            resultado = idempotencia._procesar(
+                clave, 'h',
+                ejecutar=lambda: self.fail('La operación se ejecutó dos veces'),
+                reproducir=lambda guardada: guardada.datos,
+                rechazar=lambda status, mensaje: status
+            )
+        
+        self.assertEqual(resultado, 'original')
+        self.assertTrue(almacen_local.iniciar(clave))
+
+
+class IdempotenciaReservasAPITests(TestCase):
+    """Tests para las claves de idempotencia en los endpoints de reservas."""
+    
+    def setUp(self):
+        """Configuración inicial para cada test."""
+        almacen.limpiar()
+        self.client = APIClient()
+        self.usuario = User.objects.create_user(
+            username='cliente', password='cliente123', rol='cliente'
+        )
+        self.client.force_authenticate(self.usuario)
+        
+        avion = Avion.objects.bulk_create([
+            Avion(modelo='Embraer 190', capacidad=4, filas=1, columnas=4)
+        ])[0]
+        asiento = Asiento.objects.create(avion=avion, numero='1A', fila=1, columna='A')
+        vuelo = Vuelo.objects.create(
+            avion=avion,
+            origen='Buenos Aires',
+            destino='Córdoba',
+            fecha_salida=timezone.now() + timedelta(days=2),
+            fecha_llegada=timezone.now() + timedelta(days=2, hours=1),
+            duracion='1:00',
+            precio_base=30000
+        )
+        pasajero = Pasajero.objects.create(
+            nombre='Ana', apellido='Pérez', documento='40000001',
+            email='ana@example.com', fecha_nacimiento='1990-01-01'
+        )
+        self.reserva = Reserva.objects.create(
+            vuelo=vuelo, pasajero=pasajero, asiento=asiento,
+            codigo_reserva='IDEM0001', estado='pendiente', precio=30000
+        )
+        self.url = reverse('reserva-confirmar', args=[self.reserva.id])
+    
+    def test_reintento_reproduce_respuesta_original(self):
+        """El reintento con la misma clave no vuelve a ejecutar la acción."""
+        primera = self.client.post(self.url, {}, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+        self.assertEqual(primera.status_code, status.HTTP_200_OK)
+        
+        # Sin idempotencia el segundo intento fallaría: ya no está pendiente
+        segunda = self.client.post(self.url, {}, format='json', HTTP_IDEMPOTENCY_KEY='k1')
+        self.assertEqual(segunda.status_code, status.HTTP_200_OK)
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(segunda.data, primera.data)
+    
+    def test_misma_clave_con_otros_datos(self):
+        """Reutilizar una clave con otro cuerpo se rechaza."""
+        self.client.post(self.url, {}, format='json', HTTP_IDEMPOTENCY_KEY='k2')
+        respuesta = self.client.post(
+            self.url, {'motivo': 'otro'}, format='json', HTTP_IDEMPOTENCY_KEY='k2'
+        )
+        self.assertEqual(respuesta.status_code, 422)
+    
+    def test_sin_clave_no_cambia_el_comportamiento(self):
+        """Sin cabecera la acción se ejecuta normalmente."""
+        self.client.post(self.url, {}, format='json')
+        respuesta = self.client.post(self.url, {}, format='json')
+        self.assertEqual(respuesta.status_code, status.HTTP_400_BAD_REQUEST)
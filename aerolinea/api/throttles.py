@@ -0,0 +1,15 @@
+"""
+Límites de frecuencia para la API REST.
+"""
+
+from rest_framework.throttling import UserRateThrottle
+
+
+class CotizacionRateThrottle(UserRateThrottle):
+    """
+    Limita la cotización en bloque por usuario o, si es anónimo, por IP.
+
+    Cada pedido puede traer cientos de solicitudes, así que el límite es
+    propio (tasa 'cotizacion' en DEFAULT_THROTTLE_RATES).
+    """
+    scope = 'cotizacion'
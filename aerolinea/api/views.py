@@ -14,9 +14,14 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.decorators import method_decorator
 
 from vuelos.models import Vuelo, Avion, Asiento
-from vuelos.serializers import VueloSerializer, VueloListSerializer, AvionSerializer, AsientoSerializer
+from vuelos.serializers import (
+    VueloSerializer, VueloListSerializer, AvionSerializer, AsientoSerializer,
+    CotizacionSerializer, ResultadoCotizacionSerializer
+)
+from vuelos.services.tarifas import TarifaService
 
 from pasajeros.models import Pasajero
 from pasajeros.serializers import PasajeroSerializer, PasajeroListSerializer
@@ -27,7 +32,11 @@ from reservas.serializers import ReservaSerializer, ReservaListSerializer, Bolet
 from usuarios.models import Usuario
 from usuarios.serializers import UsuarioSerializer, UsuarioListSerializer, UsuarioCreateSerializer, UsuarioUpdateSerializer
 
+from aerolinea.cache_vistas import cachear_respuesta
+from aerolinea.idempotencia import idempotente
+
 from .permissions import IsAdminOrReadOnly, IsAdminOrEmployee, IsAdmin
+from .throttles import CotizacionRateThrottle
 
 
 class AvionViewSet(viewsets.ModelViewSet):
@@ -71,11 +80,17 @@ class AsientoViewSet(viewsets.ModelViewSet):
         return queryset
 
 
+@method_decorator(cachear_respuesta('vuelos'), name='list')
+@method_decorator(cachear_respuesta('vuelos'), name='retrieve')
 class VueloViewSet(viewsets.ModelViewSet):
     """
     ViewSet para el modelo Vuelo.
     
     Permite listar, crear, recuperar, actualizar y eliminar vuelos.
+    El listado y el detalle son públicos y se sirven desde la caché de
+    respuestas (solo dependen de vuelos y aviones, que invalidan el grupo
+    'vuelos'). asientos_disponibles no se cachea: el estado de los asientos
+    cambia con actualizaciones masivas que no disparan signals.
     """
     queryset = Vuelo.objects.all()
     serializer_class = VueloSerializer
@@ -138,6 +153,29 @@ class VueloViewSet(viewsets.ModelViewSet):
         )
         serializer = AsientoSerializer(asientos_disponibles, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['post'], permission_classes=[permissions.AllowAny],
+            throttle_classes=[CotizacionRateThrottle])
+    def cotizar(self, request):
+        """
+        Cotiza muchas combinaciones de vuelo, cabina y pasajeros en una llamada.
+        
+        Pensado para los buscadores asociados, que antes consultaban la
+        disponibilidad asiento por asiento. Los vuelos y sus tarifas se leen
+        con una sola consulta y sin escribir (ver TarifaService.cotizar). Es
+        pública, así que tiene su propio límite de frecuencia
+        (CotizacionRateThrottle).
+        
+        Body:
+            {"solicitudes": [{"vuelo_id": 1, "tipo": "economica", "pasajeros": 2}, ...]}
+        
+        Returns:
+            Una cotización por solicitud, en el mismo orden
+        """
+        serializer = CotizacionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cotizaciones = TarifaService.cotizar(serializer.validated_data['solicitudes'])
+        return Response({'cotizaciones': ResultadoCotizacionSerializer(cotizaciones, many=True).data})
 
 
 class PasajeroViewSet(viewsets.ModelViewSet):
@@ -223,7 +261,18 @@ class ReservaViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    @idempotente
+    def create(self, request, *args, **kwargs):
+        """
+        Crea una reserva.
+        
+        Acepta la cabecera Idempotency-Key: los reintentos con la misma
+        clave reciben la respuesta original sin crear otra reserva.
+        """
+        return super().create(request, *args, **kwargs)
+    
     @action(detail=True, methods=['post'])
+    @idempotente
     def confirmar(self, request, pk=None):
         """
         Confirma una reserva pendiente.
@@ -243,6 +292,7 @@ class ReservaViewSet(viewsets.ModelViewSet):
         )
     
     @action(detail=True, methods=['post'])
+    @idempotente
     def cancelar(self, request, pk=None):
         """
         Cancela una reserva.
@@ -0,0 +1,39 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import EventoDominio
+
+# Register your models here.
+
+@admin.register(EventoDominio)
+class EventoDominioAdmin(admin.ModelAdmin):
+    """
+    Configuración del admin para el outbox de eventos.
+
+    Permite revisar entregas pendientes o fallidas y reintentarlas.
+    """
+
+    list_display = [
+        'id',
+        'tipo',
+        'estado',
+        'intentos',
+        'proximo_intento',
+        'fecha_creacion',
+        'fecha_proceso'
+    ]
+
+    list_filter = ['estado', 'tipo']
+
+    readonly_fields = ['tipo', 'datos', 'fecha_creacion', 'fecha_proceso', 'intentos', 'ultimo_error']
+
+    ordering = ['-id']
+
+    actions = ['reintentar']
+
+    def reintentar(self, request, queryset):
+        """Vuelve a poner en cola los eventos seleccionados."""
+        actualizados = queryset.exclude(estado='procesado').update(
+            estado='pendiente', intentos=0, proximo_intento=timezone.now()
+        )
+        self.message_user(request, f'{actualizados} eventos reencolados.')
+    reintentar.short_description = 'Reintentar eventos seleccionados'
@@ -0,0 +1,195 @@
+"""
+Bus de eventos de dominio en proceso.
+
+Los servicios publican eventos (ver eventos.dominio) y los suscriptores
+reaccionan a ellos. Los eventos se entregan recién cuando la transacción
+que los publicó confirma; si hace rollback, se descartan.
+
+Hay dos tipos de suscriptores:
+- Síncronos: corren en el mismo proceso, justo después del commit. Son
+  para trabajo barato (logs, contadores, invalidar caché).
+- En cola: corren en segundo plano (aerolinea.tareas). Sus eventos se
+  guardan en el outbox (EventoDominio) dentro de la transacción, así que
+  se entregan aunque el proceso muera antes de despacharlos. La entrega
+  es "al menos una vez": los suscriptores deben ser idempotentes.
+
+Los suscriptores reciben siempre una lista de eventos del mismo tipo: una
+operación masiva (publicar_varios) produce una sola llamada por suscriptor.
+
+Uso:
+
+    @suscribir(ReservaConfirmada, cola=True)
+    def enviar_confirmaciones(eventos):
+        ...
+
+    publicar(ReservaConfirmada(reserva_id=1, vuelo_id=2))
+"""
+
+import logging
+import threading
+import weakref
+from collections import defaultdict
+from typing import Callable, Iterable
+
+from django.db import transaction
+
+from eventos.dominio import Evento
+
+
+logger = logging.getLogger(__name__)
+
+_sincronos = defaultdict(list)
+_en_cola = defaultdict(list)
+_pendientes = threading.local()
+
+
+def suscribir(*tipos: type, cola: bool = False):
+    """
+    Decorador que registra una función como suscriptor de eventos.
+
+    Args:
+        *tipos: Clases de evento a las que se suscribe
+        cola (bool): True para entregar en segundo plano vía outbox
+    """
+    def decorador(funcion: Callable):
+        registro = _en_cola if cola else _sincronos
+        for tipo in tipos:
+            if funcion not in registro[tipo.nombre()]:
+                registro[tipo.nombre()].append(funcion)
+        return funcion
+    return decorador
+
+
+def desuscribir(funcion: Callable):
+    """Quita una función de todos los eventos a los que estaba suscripta."""
+    for registro in (_sincronos, _en_cola):
+        for suscriptores in registro.values():
+            if funcion in suscriptores:
+                suscriptores.remove(funcion)
+
+
+def suscriptores_en_cola(tipo: str) -> list[Callable]:
+    """Suscriptores en cola de un tipo de evento."""
+    return list(_en_cola.get(tipo, ()))
+
+
+def publicar(evento: Evento, using: str = None):
+    """Publica un evento (se entrega cuando la transacción confirma)."""
+    publicar_varios([evento], using=using)
+
+
+def publicar_varios(eventos: Iterable[Evento], using: str = None):
+    """
+    Publica varios eventos juntos.
+
+    Los eventos con suscriptores en cola se insertan en el outbox con una
+    sola consulta. Todos se entregan agrupados por tipo al confirmar.
+
+    Args:
+        eventos: Eventos a publicar
+        using (str): Alias de la base de datos (default 'default')
+    """
+    eventos = list(eventos)
+    if not eventos:
+        return
+
+    from eventos.repositories.eventos import EventoDominioRepository
+    ids_outbox = EventoDominioRepository.guardar_varios([
+        (evento.nombre(), evento.datos())
+        for evento in eventos
+        if _en_cola.get(evento.nombre())
+    ])
+
+    conexion = transaction.get_connection(using)
+    if not conexion.in_atomic_block:
+        _entregar(eventos, ids_outbox)
+        return
+
+    tramo = _Tramo(_lote_actual(conexion.alias), eventos, ids_outbox)
+    # Django descarta el callback si el savepoint en que se publicó hace rollback
+    transaction.on_commit(tramo, using=using)
+
+
+class _Lote:
+    """
+    Eventos pendientes de la transacción en curso de una conexión.
+
+    Cada publicación es un tramo registrado con on_commit; el lote solo
+    guarda referencias débiles a sus tramos. Si un savepoint hace rollback,
+    Django suelta los callbacks registrados dentro y esos tramos dejan de
+    existir, así que el lote entrega únicamente los que siguen vivos.
+    """
+
+    def __init__(self):
+        self.tramos = []
+        self.entregado = False
+
+    def vigente(self) -> bool:
+        """False si ya se entregó o si todos sus tramos se descartaron."""
+        return not self.entregado and any(ref() is not None for ref in self.tramos)
+
+    def entregar(self):
+        """Entrega de una vez los tramos confirmados (solo la primera llamada)."""
+        if self.entregado:
+            return
+        self.entregado = True
+        eventos, ids_outbox = [], []
+        for tramo in (ref() for ref in self.tramos):
+            if tramo is not None:
+                eventos.extend(tramo.eventos)
+                ids_outbox.extend(tramo.ids_outbox)
+        self.tramos = []
+        _entregar(eventos, ids_outbox)
+
+
+class _Tramo:
+    """Eventos de una llamada a publicar_varios dentro de una transacción."""
+
+    def __init__(self, lote: _Lote, eventos: list[Evento], ids_outbox: list[int]):
+        self.lote = lote
+        self.eventos = eventos
+        self.ids_outbox = ids_outbox
+        lote.tramos.append(weakref.ref(self))
+
+    def __call__(self):
+        # El primer tramo que corre después del commit entrega todo el lote;
+        # los siguientes ya lo encuentran entregado
+        self.lote.entregar()
+
+
+def _lote_actual(alias: str) -> _Lote:
+    """Lote de la transacción en curso de la conexión (por hilo)."""
+    lotes = getattr(_pendientes, 'lotes', None)
+    if lotes is None:
+        lotes = _pendientes.lotes = {}
+    lote = lotes.get(alias)
+    if lote is None or not lote.vigente():
+        # Entregado, o de una transacción que hizo rollback completo
+        lote = lotes[alias] = _Lote()
+    return lote
+
+
+def _agrupar(eventos: list[Evento]) -> dict:
+    grupos = defaultdict(list)
+    for evento in eventos:
+        grupos[evento.nombre()].append(evento)
+    return grupos
+
+
+def _entregar(eventos: list[Evento], ids_outbox: list[int]):
+    """Entrega los eventos a los suscriptores síncronos y despacha la cola."""
+    for tipo, grupo in _agrupar(eventos).items():
+        for suscriptor in list(_sincronos.get(tipo, ())):
+            try:
+                suscriptor(grupo)
+            except Exception:
+                # Un suscriptor síncrono no puede romper la operación ya confirmada
+                logger.exception(f"Error en el suscriptor {suscriptor.__qualname__} de {tipo}")
+
+    if ids_outbox:
+        from aerolinea.tareas import encolar
+        try:
+            encolar('eventos.services.eventos:EventoService.entregar', ids_outbox)
+        except Exception:
+            # Quedan en el outbox: los toma la próxima pasada de procesar_eventos
+            logger.exception(f"No se pudo despachar la entrega de {len(ids_outbox)} eventos")
@@ -0,0 +1,69 @@
+"""
+Eventos de dominio de reservas y vuelos.
+
+Cada evento es un dataclass inmutable con datos serializables (ids y
+strings), para poder guardarlo en el outbox y enviarlo a un worker.
+usuario_id es el usuario que hizo la operación (None si la hizo el sistema).
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class Evento:
+    """Clase base de los eventos de dominio."""
+
+    @classmethod
+    def nombre(cls) -> str:
+        return cls.__name__
+
+    def datos(self) -> dict:
+        return asdict(self)
+
+
+@dataclass(frozen=True)
+class ReservaCreada(Evento):
+    reserva_id: int
+    vuelo_id: int
+    pasajero_id: int
+    usuario_id: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class ReservaConfirmada(Evento):
+    reserva_id: int
+    vuelo_id: int
+    usuario_id: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class ReservaCancelada(Evento):
+    reserva_id: int
+    vuelo_id: int
+    estado_anterior: str
+    usuario_id: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class ReservaExpirada(Evento):
+    reserva_id: int
+    vuelo_id: int
+
+
+@dataclass(frozen=True)
+class VueloEstadoCambiado(Evento):
+    vuelo_id: int
+    estado_anterior: str
+    estado_nuevo: str
+
+
+TIPOS_EVENTO = {
+    tipo.nombre(): tipo
+    for tipo in (ReservaCreada, ReservaConfirmada, ReservaCancelada, ReservaExpirada, VueloEstadoCambiado)
+}
+
+
+def reconstruir(tipo: str, datos: dict) -> Evento:
+    """Crea el evento a partir de su nombre y sus datos guardados."""
+    return TIPOS_EVENTO[tipo](**datos)
@@ -0,0 +1,66 @@
+"""
+Comando de gestión para procesar el outbox de eventos de dominio.
+
+Entrega los eventos que quedaron pendientes (proceso caído antes del
+despacho o suscriptores que fallaron). Puede ejecutarse una sola vez (por
+ejemplo desde cron) o quedar corriendo en modo continuo.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from eventos.services.eventos import EventoService
+
+
+class Command(BaseCommand):
+    help = 'Entrega los eventos de dominio pendientes del outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Seguir procesando el outbox hasta interrumpir el comando',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5,
+            help='Segundos de espera entre pasadas cuando no hay eventos',
+        )
+        parser.add_argument(
+            '--limpiar-dias',
+            type=int,
+            default=None,
+            help='Eliminar eventos entregados hace más de N días antes de procesar',
+        )
+
+    def handle(self, *args, **options):
+        if options['limpiar_dias'] is not None:
+            eliminados = EventoService.limpiar_procesados(options['limpiar_dias'])
+            self.stdout.write(f'{eliminados} eventos entregados eliminados del outbox.')
+
+        if not options['continuo']:
+            self._procesar()
+            return
+
+        self.stdout.write('Procesando el outbox de eventos (Ctrl+C para detener)...')
+        try:
+            while True:
+                totales = self._procesar()
+                if not any(totales.values()):
+                    time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write('Worker de eventos detenido.')
+
+    def _procesar(self):
+        totales = EventoService.procesar_pendientes()
+        if any(totales.values()):
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Eventos entregados: {totales['procesados']}, "
+                    f"reprogramados: {totales['reintentos']}, "
+                    f"fallidos: {totales['fallidos']}"
+                )
+            )
+        return totales
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 23:43
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoDominio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(help_text='Nombre del evento (ReservaCreada, VueloEstadoCambiado, ...)', max_length=100)),
+                ('datos', models.JSONField(help_text='Atributos del evento')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('procesado', 'Procesado'), ('fallido', 'Fallido')], default='pendiente', help_text='Estado de entrega del evento', max_length=20)),
+                ('intentos', models.PositiveIntegerField(default=0, help_text='Cantidad de entregas fallidas')),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now, help_text='Momento a partir del cual el evento puede tomarse')),
+                ('ultimo_error', models.TextField(blank=True, help_text='Último error de entrega')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, help_text='Fecha en que se publicó el evento')),
+                ('fecha_proceso', models.DateTimeField(blank=True, help_text='Fecha en que se entregó el evento', null=True)),
+            ],
+            options={
+                'verbose_name': 'Evento de dominio',
+                'verbose_name_plural': 'Eventos de dominio',
+                'db_table': 'eventos_dominio',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='eventos_dom_estado_90ed54_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+from django.db import models
+from django.utils import timezone
+
+# Create your models here.
+
+class EventoDominio(models.Model):
+    """
+    Modelo que representa un evento de dominio pendiente de entrega (outbox).
+
+    Los eventos con suscriptores en cola se guardan en la misma transacción
+    que los origina; si el proceso muere antes de entregarlos, el comando
+    ``procesar_eventos`` (o la tarea periódica) los vuelve a tomar.
+    """
+
+    ESTADOS_EVENTO = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('procesado', 'Procesado'),
+        ('fallido', 'Fallido'),
+    ]
+
+    tipo = models.CharField(
+        max_length=100,
+        help_text='Nombre del evento (ReservaCreada, VueloEstadoCambiado, ...)'
+    )
+
+    datos = models.JSONField(
+        help_text='Atributos del evento'
+    )
+
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADOS_EVENTO,
+        default='pendiente',
+        help_text='Estado de entrega del evento'
+    )
+
+    intentos = models.PositiveIntegerField(
+        default=0,
+        help_text='Cantidad de entregas fallidas'
+    )
+
+    proximo_intento = models.DateTimeField(
+        default=timezone.now,
+        help_text='Momento a partir del cual el evento puede tomarse'
+    )
+
+    ultimo_error = models.TextField(
+        blank=True,
+        help_text='Último error de entrega'
+    )
+
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        help_text='Fecha en que se publicó el evento'
+    )
+
+    fecha_proceso = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Fecha en que se entregó el evento'
+    )
+
+    class Meta:
+        verbose_name = 'Evento de dominio'
+        verbose_name_plural = 'Eventos de dominio'
+        db_table = 'eventos_dominio'
+        ordering = ['id']
+        indexes = [
+            # Consulta del worker: estado + próximo intento
+            models.Index(fields=['estado', 'proximo_intento']),
+        ]
+
+    def __str__(self):
+        """Representación en string del evento"""
+        return f"{self.tipo} #{self.id} ({self.estado})"
@@ -0,0 +1,115 @@
+"""
+Repositorio para el outbox de eventos de dominio.
+
+Este archivo implementa la capa de repositorios del patrón Vista-Servicio-Repositorio.
+Los repositorios manejan el acceso a datos y las consultas a la base de datos.
+"""
+
+from datetime import timedelta
+from typing import List
+
+from django.db import transaction
+from django.utils import timezone
+
+from eventos.models import EventoDominio
+
+
+class EventoDominioRepository:
+    """Repositorio para la gestión del outbox de eventos."""
+
+    @staticmethod
+    def guardar_varios(eventos: List[tuple]) -> List[int]:
+        """
+        Inserta eventos en el outbox con una sola consulta.
+
+        Args:
+            eventos (List[tuple]): Pares (tipo, datos)
+
+        Returns:
+            List[int]: IDs de los eventos guardados
+        """
+        if not eventos:
+            return []
+        creados = EventoDominio.objects.bulk_create([
+            EventoDominio(tipo=tipo, datos=datos) for tipo, datos in eventos
+        ])
+        return [evento.id for evento in creados]
+
+    @staticmethod
+    def tomar_lote(tamano: int, bloqueo_segundos: int, ids: List[int] = None) -> List[EventoDominio]:
+        """
+        Reserva un lote de eventos listos para entregar.
+
+        Los eventos tomados pasan a 'procesando' y su próximo intento se
+        corre ``bloqueo_segundos`` hacia adelante: si el worker muere a mitad
+        del lote, vuelven a estar disponibles cuando vence ese plazo.
+
+        Args:
+            tamano (int): Cantidad máxima de eventos
+            bloqueo_segundos (int): Duración de la reserva del lote
+            ids (List[int]): Limitar a estos eventos (opcional)
+
+        Returns:
+            List[EventoDominio]: Eventos tomados, en orden de publicación
+        """
+        ahora = timezone.now()
+        with transaction.atomic():
+            queryset = EventoDominio.objects.select_for_update(skip_locked=True).filter(
+                estado__in=['pendiente', 'procesando'], proximo_intento__lte=ahora
+            )
+            if ids is not None:
+                queryset = queryset.filter(id__in=ids)
+            lote = list(queryset.order_by('id')[:tamano])
+            if lote:
+                EventoDominio.objects.filter(id__in=[e.id for e in lote]).update(
+                    estado='procesando',
+                    proximo_intento=ahora + timedelta(seconds=bloqueo_segundos),
+                )
+        return lote
+
+    @staticmethod
+    def marcar_procesados(evento_ids: List[int]) -> int:
+        """
+        Marca eventos como entregados.
+
+        Args:
+            evento_ids (List[int]): IDs de los eventos
+
+        Returns:
+            int: Cantidad de filas actualizadas
+        """
+        if not evento_ids:
+            return 0
+        return EventoDominio.objects.filter(id__in=evento_ids).update(
+            estado='procesado', fecha_proceso=timezone.now(), ultimo_error=''
+        )
+
+    @staticmethod
+    def registrar_fallos(eventos: List[EventoDominio]) -> int:
+        """
+        Guarda estado, intentos, próximo intento y error de eventos fallidos.
+
+        Args:
+            eventos (List[EventoDominio]): Eventos con los campos ya actualizados
+
+        Returns:
+            int: Cantidad de filas actualizadas
+        """
+        if not eventos:
+            return 0
+        return EventoDominio.objects.bulk_update(
+            eventos, ['estado', 'intentos', 'proximo_intento', 'ultimo_error']
+        )
+
+    @staticmethod
+    def eliminar_procesados_antes_de(fecha) -> int:
+        """
+        Elimina los eventos entregados antes de una fecha.
+
+        Returns:
+            int: Cantidad de eventos eliminados
+        """
+        eliminados, _ = EventoDominio.objects.filter(
+            estado='procesado', fecha_proceso__lt=fecha
+        ).delete()
+        return eliminados
@@ -0,0 +1,131 @@
+"""
+Servicio para la entrega de eventos de dominio en cola.
+
+Este archivo implementa la capa de servicios del patrón Vista-Servicio-Repositorio.
+Los servicios contienen la lógica de negocio y orquestan las operaciones.
+
+Entrega los eventos del outbox (EventoDominio) a los suscriptores en cola
+registrados en eventos.bus. La entrega inmediata la despacha el bus después
+del commit; ``procesar_pendientes`` recupera los eventos que quedaron sin
+entregar (proceso caído, fallos de un suscriptor).
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import List
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from aerolinea.tareas import reprogramar
+from eventos import bus
+from eventos.dominio import reconstruir
+from eventos.models import EventoDominio
+from eventos.repositories.eventos import EventoDominioRepository
+
+
+logger = logging.getLogger(__name__)
+
+
+class EventoService:
+    """Servicio para la entrega de eventos del outbox."""
+
+    @staticmethod
+    def entregar(ids: List[int] = None, tamano: int = None) -> dict:
+        """
+        Entrega un lote de eventos pendientes a sus suscriptores en cola.
+
+        Cada suscriptor recibe en una sola llamada todos los eventos del lote
+        de un mismo tipo, dentro de su propio savepoint. Si falla, esos
+        eventos se reprograman con backoff exponencial.
+
+        Args:
+            ids (List[int]): Limitar a estos eventos (opcional)
+            tamano (int): Cantidad máxima de eventos (default EVENTOS_TAMANO_LOTE)
+
+        Returns:
+            dict: Cantidades 'procesados', 'reintentos' y 'fallidos'
+        """
+        tamano = tamano or getattr(settings, 'EVENTOS_TAMANO_LOTE', 500)
+        bloqueo = getattr(settings, 'EVENTOS_BLOQUEO_SEGUNDOS', 300)
+        resultado = {'procesados': 0, 'reintentos': 0, 'fallidos': 0}
+
+        lote = EventoDominioRepository.tomar_lote(tamano, bloqueo, ids=ids)
+        if not lote:
+            return resultado
+
+        por_tipo = defaultdict(list)
+        for fila in lote:
+            por_tipo[fila.tipo].append(fila)
+
+        procesados = []
+        con_error = []
+        for tipo, filas in por_tipo.items():
+            eventos = [reconstruir(tipo, fila.datos) for fila in filas]
+            error = None
+            for suscriptor in bus.suscriptores_en_cola(tipo):
+                try:
+                    with transaction.atomic():
+                        suscriptor(eventos)
+                except Exception as e:
+                    logger.exception(f"Error en el suscriptor {suscriptor.__qualname__} de {tipo}")
+                    error = e
+            if error is None:
+                procesados.extend(fila.id for fila in filas)
+            else:
+                con_error.extend((fila, error) for fila in filas)
+
+        EventoDominioRepository.marcar_procesados(procesados)
+        resultado['procesados'] = len(procesados)
+
+        for fila, error in con_error:
+            EventoService._reprogramar(fila, error)
+            resultado['fallidos' if fila.estado == 'fallido' else 'reintentos'] += 1
+        EventoDominioRepository.registrar_fallos([fila for fila, _ in con_error])
+
+        return resultado
+
+    @staticmethod
+    def procesar_pendientes(max_lotes: int = None, tamano: int = None) -> dict:
+        """
+        Entrega lotes hasta vaciar el outbox (o hasta max_lotes).
+
+        Returns:
+            dict: Totales acumulados de entregar
+        """
+        totales = {'procesados': 0, 'reintentos': 0, 'fallidos': 0}
+        lotes = 0
+        while max_lotes is None or lotes < max_lotes:
+            resultado = EventoService.entregar(tamano=tamano)
+            lotes += 1
+            for clave, valor in resultado.items():
+                totales[clave] += valor
+            if not any(resultado.values()):
+                break
+        return totales
+
+    @staticmethod
+    def limpiar_procesados(dias: int = 7) -> int:
+        """
+        Elimina del outbox los eventos entregados hace más de ``dias`` días.
+
+        Returns:
+            int: Cantidad de eventos eliminados
+        """
+        return EventoDominioRepository.eliminar_procesados_antes_de(
+            timezone.now() - timedelta(days=dias)
+        )
+
+    @staticmethod
+    def _reprogramar(evento: EventoDominio, error: Exception):
+        """Aplica backoff exponencial con jitter, o marca el evento como fallido."""
+        reprogramado = reprogramar(
+            evento, error,
+            max_intentos=getattr(settings, 'EVENTOS_MAX_INTENTOS', 5),
+            base=getattr(settings, 'EVENTOS_REINTENTO_BASE', 30),
+            maximo=getattr(settings, 'EVENTOS_REINTENTO_MAXIMO', 3600),
+        )
+        if not reprogramado:
+            logger.error(f"Evento {evento} descartado tras {evento.intentos} intentos: {error}")
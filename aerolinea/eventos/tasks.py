@@ -0,0 +1,16 @@
+"""
+Tareas de Celery para el outbox de eventos.
+
+Solo se importan cuando Celery está instalado. Sin Celery, el outbox lo
+procesa el comando ``procesar_eventos``.
+"""
+
+from celery import shared_task
+
+from eventos.services.eventos import EventoService
+
+
+@shared_task(ignore_result=True)
+def procesar_eventos_pendientes(max_lotes: int = 10):
+    """Entrega los eventos pendientes del outbox."""
+    return EventoService.procesar_pendientes(max_lotes=max_lotes)
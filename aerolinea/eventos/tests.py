@@ -0,0 +1,134 @@
+"""
+Tests para el bus de eventos de dominio y su outbox.
+"""
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from dataclasses import dataclass
+
+from eventos import bus
+from eventos.dominio import Evento, ReservaConfirmada, ReservaExpirada, reconstruir
+from eventos.models import EventoDominio
+from eventos.services.eventos import EventoService
+
+
+@dataclass(frozen=True)
+class EventoDePrueba(Evento):
+    """Evento sin suscriptores en cola."""
+    numero: int
+
+
+# Los suscriptores en cola de la aplicación (tarifas, mapas en vivo) corren en el hilo del test
+@override_settings(TAREAS_MODO='sincrono')
+class BusEventosTest(TestCase):
+    """Tests para la publicación y entrega de eventos."""
+
+    def suscribir(self, *tipos, cola=False, falla=False):
+        """Registra un suscriptor de prueba que guarda las llamadas."""
+        llamadas = []
+
+        def suscriptor(eventos):
+            llamadas.append(list(eventos))
+            if falla:
+                raise RuntimeError('suscriptor roto')
+
+        bus.suscribir(*tipos, cola=cola)(suscriptor)
+        self.addCleanup(bus.desuscribir, suscriptor)
+        return llamadas
+
+    def test_reconstruir_evento(self):
+        """Los eventos se reconstruyen a partir de los datos del outbox."""
+        evento = ReservaExpirada(reserva_id=1, vuelo_id=2)
+        self.assertEqual(reconstruir(evento.nombre(), evento.datos()), evento)
+
+    def test_entrega_agrupada_despues_del_commit(self):
+        """Los eventos de una transacción llegan juntos y recién al confirmar."""
+        llamadas = self.suscribir(ReservaExpirada)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                bus.publicar_varios(ReservaExpirada(reserva_id=i, vuelo_id=1) for i in range(3))
+                bus.publicar(ReservaExpirada(reserva_id=3, vuelo_id=1))
+                self.assertEqual(llamadas, [])
+
+        self.assertEqual(len(llamadas), 1)
+        self.assertEqual([e.reserva_id for e in llamadas[0]], [0, 1, 2, 3])
+
+    def test_rollback_descarta_eventos(self):
+        """Los eventos de un bloque que hace rollback no se entregan."""
+        llamadas = self.suscribir(ReservaExpirada)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bus.publicar(ReservaExpirada(reserva_id=1, vuelo_id=1))
+            try:
+                with transaction.atomic():
+                    bus.publicar(ReservaExpirada(reserva_id=2, vuelo_id=1))
+                    raise ValueError('rollback')
+            except ValueError:
+                pass
+
+        self.assertEqual([[e.reserva_id for e in grupo] for grupo in llamadas], [[1]])
+
+    def test_rollback_del_primer_bloque_no_pierde_los_siguientes(self):
+        """Si el primer savepoint con eventos hace rollback, los posteriores se entregan una vez."""
+        llamadas = self.suscribir(ReservaExpirada)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    bus.publicar(ReservaExpirada(reserva_id=1, vuelo_id=1))
+                    raise ValueError('rollback')
+            except ValueError:
+                pass
+            bus.publicar(ReservaExpirada(reserva_id=2, vuelo_id=1))
+            with transaction.atomic():
+                bus.publicar(ReservaExpirada(reserva_id=3, vuelo_id=1))
+
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual([[e.reserva_id for e in grupo] for grupo in llamadas], [[2, 3]])
+
+    def test_error_en_suscriptor_sincrono_no_afecta_a_los_demas(self):
+        """Un suscriptor que falla se registra en el log y el resto se ejecuta."""
+        self.suscribir(ReservaExpirada, falla=True)
+        llamadas = self.suscribir(ReservaExpirada)
+
+        with self.assertLogs('eventos.bus', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                bus.publicar(ReservaExpirada(reserva_id=1, vuelo_id=1))
+
+        self.assertEqual(len(llamadas), 1)
+
+    @override_settings(TAREAS_MODO='sincrono')
+    def test_outbox_solo_para_suscriptores_en_cola(self):
+        """Los eventos con suscriptores en cola pasan por el outbox y se entregan."""
+        llamadas = self.suscribir(ReservaConfirmada, cola=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bus.publicar(ReservaConfirmada(reserva_id=7, vuelo_id=1))
+            bus.publicar(EventoDePrueba(numero=8))
+            self.assertEqual(EventoDominio.objects.count(), 1)
+
+        self.assertEqual(llamadas, [[ReservaConfirmada(reserva_id=7, vuelo_id=1)]])
+        self.assertEqual(EventoDominio.objects.get().estado, 'procesado')
+
+    @override_settings(EVENTOS_MAX_INTENTOS=2)
+    def test_reintento_y_fallo_definitivo(self):
+        """Un suscriptor en cola que falla reprograma el evento hasta agotar intentos."""
+        self.suscribir(ReservaConfirmada, cola=True, falla=True)
+        bus.publicar(ReservaConfirmada(reserva_id=1, vuelo_id=1))
+        evento = EventoDominio.objects.get()
+
+        with self.assertLogs('eventos.services.eventos', 'ERROR'):
+            EventoService.entregar(ids=[evento.id])
+        evento.refresh_from_db()
+        self.assertEqual((evento.estado, evento.intentos), ('pendiente', 1))
+        self.assertGreater(evento.proximo_intento, timezone.now())
+
+        EventoDominio.objects.filter(id=evento.id).update(proximo_intento=timezone.now())
+        with self.assertLogs('eventos.services.eventos', 'ERROR'):
+            resultado = EventoService.procesar_pendientes()
+        evento.refresh_from_db()
+        self.assertEqual(resultado['fallidos'], 1)
+        self.assertEqual(evento.estado, 'fallido')
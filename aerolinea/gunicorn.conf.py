@@ -0,0 +1,11 @@
+"""
+Configuración de gunicorn.
+
+Con PROMETHEUS_MULTIPROC_DIR definido, cada worker escribe sus métricas en
+ese directorio; al terminar un worker se limpian sus valores.
+"""
+
+
+def child_exit(server, worker):
+    from aerolinea.metricas import proceso_terminado
+    proceso_terminado(worker.pid)
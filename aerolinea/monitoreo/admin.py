@@ -0,0 +1,63 @@
+from django.contrib import admin
+from django.utils.html import format_html, format_html_join
+from .models import PerfilSolicitud
+
+# Register your models here.
+
+@admin.register(PerfilSolicitud)
+class PerfilSolicitudAdmin(admin.ModelAdmin):
+    """
+    Configuración del admin para los perfiles de solicitudes.
+
+    Los perfiles los genera ProfilingMiddleware: acá solo se consultan.
+    """
+
+    list_display = [
+        'fecha',
+        'metodo',
+        'ruta',
+        'vista',
+        'status',
+        'duracion_ms',
+        'consultas',
+        'usuario',
+        'motivo'
+    ]
+
+    list_filter = ['motivo', 'vista', 'status']
+
+    search_fields = ['ruta', 'vista', 'usuario']
+
+    ordering = ['-fecha']
+
+    exclude = ['funciones']
+
+    readonly_fields = [
+        'fecha', 'metodo', 'ruta', 'vista', 'usuario', 'status',
+        'duracion_ms', 'consultas', 'motivo', 'tabla_funciones'
+    ]
+
+    def has_add_permission(self, request):
+        """Los perfiles no se crean a mano."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Los perfiles son de solo lectura."""
+        return False
+
+    def tabla_funciones(self, obj):
+        """Tabla con las funciones de más tiempo propio."""
+        filas = format_html_join(
+            '',
+            '<tr><td>{}</td><td>{}</td><td>{}</td><td><code>{}</code></td></tr>',
+            (
+                (f['tiempo_propio_ms'], f['tiempo_acumulado_ms'], f['llamadas'], f['funcion'])
+                for f in obj.funciones
+            )
+        )
+        return format_html(
+            '<table><thead><tr><th>Propio (ms)</th><th>Acumulado (ms)</th>'
+            '<th>Llamadas</th><th>Función</th></tr></thead><tbody>{}</tbody></table>',
+            filas
+        )
+    tabla_funciones.short_description = 'Funciones más costosas'
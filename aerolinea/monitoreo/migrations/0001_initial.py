@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 23:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilSolicitud',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True, help_text='Fecha de la solicitud')),
+                ('metodo', models.CharField(help_text='Método HTTP', max_length=10)),
+                ('ruta', models.CharField(help_text='Ruta solicitada', max_length=500)),
+                ('vista', models.CharField(blank=True, help_text='Nombre de la vista resuelta', max_length=200)),
+                ('usuario', models.CharField(blank=True, help_text='Usuario que hizo la solicitud', max_length=150)),
+                ('status', models.PositiveSmallIntegerField(help_text='Código de estado de la respuesta')),
+                ('duracion_ms', models.FloatField(help_text='Duración total de la solicitud perfilada (ms)')),
+                ('consultas', models.PositiveIntegerField(blank=True, help_text='Consultas SQL ejecutadas (si el middleware de rendimiento está activo)', null=True)),
+                ('motivo', models.CharField(choices=[('cabecera', 'Solicitado por cabecera'), ('muestreo', 'Muestreo automático')], help_text='Por qué se perfiló la solicitud', max_length=20)),
+                ('funciones', models.JSONField(default=list, help_text='Funciones con más tiempo propio (top N)')),
+            ],
+            options={
+                'verbose_name': 'Perfil de solicitud',
+                'verbose_name_plural': 'Perfiles de solicitudes',
+                'db_table': 'perfiles_solicitudes',
+                'ordering': ['-fecha'],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+from django.db import models
+
+# Create your models here.
+
+class PerfilSolicitud(models.Model):
+    """
+    Modelo que guarda el perfil (cProfile) de una solicitud lenta.
+
+    Se conservan solo los últimos PERFILADO_MAX_REGISTROS perfiles: al
+    guardar uno nuevo se eliminan los más viejos (buffer circular).
+    """
+
+    MOTIVOS_PERFILADO = [
+        ('cabecera', 'Solicitado por cabecera'),
+        ('muestreo', 'Muestreo automático'),
+    ]
+
+    fecha = models.DateTimeField(
+        auto_now_add=True,
+        help_text='Fecha de la solicitud'
+    )
+
+    metodo = models.CharField(
+        max_length=10,
+        help_text='Método HTTP'
+    )
+
+    ruta = models.CharField(
+        max_length=500,
+        help_text='Ruta solicitada'
+    )
+
+    vista = models.CharField(
+        max_length=200,
+        blank=True,
+        help_text='Nombre de la vista resuelta'
+    )
+
+    usuario = models.CharField(
+        max_length=150,
+        blank=True,
+        help_text='Usuario que hizo la solicitud'
+    )
+
+    status = models.PositiveSmallIntegerField(
+        help_text='Código de estado de la respuesta'
+    )
+
+    duracion_ms = models.FloatField(
+        help_text='Duración total de la solicitud perfilada (ms)'
+    )
+
+    consultas = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text='Consultas SQL ejecutadas (si el middleware de rendimiento está activo)'
+    )
+
+    motivo = models.CharField(
+        max_length=20,
+        choices=MOTIVOS_PERFILADO,
+        help_text='Por qué se perfiló la solicitud'
+    )
+
+    funciones = models.JSONField(
+        default=list,
+        help_text='Funciones con más tiempo propio (top N)'
+    )
+
+    class Meta:
+        verbose_name = 'Perfil de solicitud'
+        verbose_name_plural = 'Perfiles de solicitudes'
+        db_table = 'perfiles_solicitudes'
+        ordering = ['-fecha']
+
+    def __str__(self):
+        """Representación en string del perfil"""
+        return f"{self.metodo} {self.ruta} ({self.duracion_ms:.0f} ms)"
@@ -0,0 +1,40 @@
+"""
+Repositorio para los perfiles de solicitudes.
+
+Este archivo implementa la capa de repositorios del patrón Vista-Servicio-Repositorio.
+Los repositorios manejan el acceso a datos y las consultas a la base de datos.
+"""
+
+from monitoreo.models import PerfilSolicitud
+
+
+class PerfilSolicitudRepository:
+    """Repositorio para la gestión de perfiles de solicitudes."""
+
+    @staticmethod
+    def crear(**datos) -> PerfilSolicitud:
+        """
+        Guarda un perfil de solicitud.
+
+        Returns:
+            PerfilSolicitud: Perfil creado
+        """
+        return PerfilSolicitud.objects.create(**datos)
+
+    @staticmethod
+    def recortar(maximo: int) -> int:
+        """
+        Elimina los perfiles más viejos, conservando los últimos ``maximo``.
+
+        Args:
+            maximo (int): Cantidad de perfiles a conservar
+
+        Returns:
+            int: Cantidad de perfiles eliminados
+        """
+        limite = PerfilSolicitud.objects.order_by('-id').values_list('id', flat=True)[maximo:maximo + 1]
+        limite = list(limite)
+        if not limite:
+            return 0
+        eliminados, _ = PerfilSolicitud.objects.filter(id__lte=limite[0]).delete()
+        return eliminados
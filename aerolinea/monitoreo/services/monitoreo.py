@@ -0,0 +1,133 @@
+"""
+Servicio para el perfilado de solicitudes.
+
+Este archivo implementa la capa de servicios del patrón Vista-Servicio-Repositorio.
+Los servicios contienen la lógica de negocio y orquestan las operaciones.
+
+El perfilado lo hace aerolinea.middleware.ProfilingMiddleware con cProfile.
+Una solicitud se perfila cuando:
+- Trae la cabecera ``X-Perfilar`` y el usuario es staff (o la cabecera
+  contiene PERFILADO_TOKEN, para clientes de la API con JWT)
+- PERFILADO_ACTIVO está activo y la solicitud cae en el muestreo
+  (PERFILADO_MUESTREO)
+
+Los perfiles pedidos por cabecera se guardan siempre; los del muestreo
+solo si superan PERFILADO_UMBRAL_MS.
+"""
+
+import logging
+import os
+import pstats
+import random
+
+from django.conf import settings
+
+from monitoreo.repositories.monitoreo import PerfilSolicitudRepository
+
+
+logger = logging.getLogger(__name__)
+
+
+class PerfiladoService:
+    """Servicio para decidir, resumir y guardar perfiles de solicitudes."""
+
+    @staticmethod
+    def motivo_perfilado(request) -> str | None:
+        """
+        Decide si la solicitud se perfila.
+
+        Args:
+            request: Solicitud HTTP
+
+        Returns:
+            str | None: 'cabecera', 'muestreo' o None si no se perfila
+        """
+        cabecera = request.META.get('HTTP_X_PERFILAR')
+        if cabecera:
+            token = getattr(settings, 'PERFILADO_TOKEN', '')
+            if token and cabecera == token:
+                return 'cabecera'
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_staff:
+                return 'cabecera'
+
+        if getattr(settings, 'PERFILADO_ACTIVO', False):
+            if random.random() < getattr(settings, 'PERFILADO_MUESTREO', 0.01):
+                return 'muestreo'
+        return None
+
+    @staticmethod
+    def resumir(perfil, top: int = None) -> list[dict]:
+        """
+        Obtiene las funciones con más tiempo propio de un perfil.
+
+        Args:
+            perfil (cProfile.Profile): Perfil ya detenido
+            top (int): Cantidad de funciones (default PERFILADO_TOP_FUNCIONES)
+
+        Returns:
+            list[dict]: Funciones ordenadas por tiempo propio descendente
+        """
+        top = top or getattr(settings, 'PERFILADO_TOP_FUNCIONES', 25)
+        estadisticas = pstats.Stats(perfil).stats
+        mas_costosas = sorted(estadisticas.items(), key=lambda item: item[1][2], reverse=True)[:top]
+        return [
+            {
+                'funcion': PerfiladoService._nombre_funcion(archivo, linea, nombre),
+                'llamadas': llamadas,
+                'llamadas_primitivas': primitivas,
+                'tiempo_propio_ms': round(tiempo_propio * 1000, 3),
+                'tiempo_acumulado_ms': round(tiempo_acumulado * 1000, 3),
+            }
+            for (archivo, linea, nombre), (primitivas, llamadas, tiempo_propio, tiempo_acumulado, _)
+            in mas_costosas
+        ]
+
+    @staticmethod
+    def registrar(request, response, duracion_ms: float, motivo: str, perfil,
+                  consultas: int = None) -> bool:
+        """
+        Guarda el perfil si corresponde y recorta el buffer de perfiles.
+
+        Un error al guardar se registra en el log y no afecta la respuesta.
+
+        Returns:
+            bool: True si el perfil se guardó
+        """
+        if motivo != 'cabecera' and duracion_ms < getattr(settings, 'PERFILADO_UMBRAL_MS', 500):
+            return False
+
+        user = getattr(request, 'user', None)
+        try:
+            PerfilSolicitudRepository.crear(
+                metodo=request.method,
+                ruta=request.path[:500],
+                vista=getattr(request.resolver_match, 'view_name', '') or '',
+                usuario=user.get_username() if user is not None and user.is_authenticated else '',
+                status=response.status_code,
+                duracion_ms=round(duracion_ms, 2),
+                consultas=consultas,
+                motivo=motivo,
+                funciones=PerfiladoService.resumir(perfil),
+            )
+            PerfilSolicitudRepository.recortar(getattr(settings, 'PERFILADO_MAX_REGISTROS', 200))
+        except Exception:
+            logger.exception(f"No se pudo guardar el perfil de {request.path}")
+            return False
+        return True
+
+    @staticmethod
+    def _nombre_funcion(archivo: str, linea: int, nombre: str) -> str:
+        """Nombre legible de una función, con la ruta relativa al proyecto."""
+        if archivo == '~':
+            # Funciones built-in: pstats las registra sin archivo
+            return nombre
+        for base in (str(settings.BASE_DIR), os.path.dirname(os.__file__)):
+            if archivo.startswith(base):
+                archivo = os.path.relpath(archivo, base)
+                break
+        else:
+            indice = archivo.find('site-packages' + os.sep)
+            if indice != -1:
+                archivo = archivo[indice + len('site-packages') + 1:]
+        return f"{archivo}:{linea}({nombre})"
@@ -0,0 +1,83 @@
+"""
+Tests para el perfilado de solicitudes.
+"""
+
+import cProfile
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase, override_settings
+
+from monitoreo.models import PerfilSolicitud
+from monitoreo.repositories.monitoreo import PerfilSolicitudRepository
+from monitoreo.services.monitoreo import PerfiladoService
+
+
+def funcion_costosa():
+    return sum(i * i for i in range(20000))
+
+
+class PerfiladoServiceTest(TestCase):
+    """Tests para el servicio de perfilado."""
+
+    def setUp(self):
+        """Configuración inicial para los tests."""
+        self.factory = RequestFactory()
+        self.staff = get_user_model().objects.create_user('staff', password='clave', is_staff=True)
+        self.cliente = get_user_model().objects.create_user('cliente', password='clave')
+
+    @override_settings(PERFILADO_ACTIVO=False, PERFILADO_TOKEN='token-api')
+    def test_cabecera_solo_para_staff_o_token(self):
+        """La cabecera X-Perfilar solo la pueden usar staff o quien tenga el token."""
+        request = self.factory.get('/es/', HTTP_X_PERFILAR='1')
+        request.user = self.cliente
+        self.assertIsNone(PerfiladoService.motivo_perfilado(request))
+
+        request.user = self.staff
+        self.assertEqual(PerfiladoService.motivo_perfilado(request), 'cabecera')
+
+        request = self.factory.get('/api/', HTTP_X_PERFILAR='token-api')
+        request.user = self.cliente
+        self.assertEqual(PerfiladoService.motivo_perfilado(request), 'cabecera')
+
+    @override_settings(PERFILADO_UMBRAL_MS=500, PERFILADO_MAX_REGISTROS=2, PERFILADO_TOP_FUNCIONES=5)
+    def test_guarda_top_funciones_en_buffer_acotado(self):
+        """Se guardan las funciones más costosas y solo los últimos perfiles."""
+        perfil = cProfile.Profile()
+        perfil.runcall(funcion_costosa)
+        request = self.factory.get('/es/vuelos/1/')
+        request.user = self.staff
+        response = type('Respuesta', (), {'status_code': 200})()
+
+        self.assertFalse(PerfiladoService.registrar(request, response, 100, 'muestreo', perfil))
+        for _ in range(3):
+            self.assertTrue(PerfiladoService.registrar(request, response, 800, 'muestreo', perfil))
+
+        self.assertEqual(PerfilSolicitud.objects.count(), 2)
+        perfil_guardado = PerfilSolicitud.objects.first()
+        self.assertEqual(perfil_guardado.usuario, 'staff')
+        self.assertLessEqual(len(perfil_guardado.funciones), 5)
+        self.assertTrue(any('funcion_costosa' in f['funcion'] or 'genexpr' in f['funcion']
+                            for f in perfil_guardado.funciones))
+
+    def test_recortar_sin_excedente(self):
+        """Recortar un buffer que no está lleno no elimina nada."""
+        self.assertEqual(PerfilSolicitudRepository.recortar(10), 0)
+
+
+class ProfilingMiddlewareTest(TestCase):
+    """Tests de integración del middleware de perfilado."""
+
+    def test_staff_pide_perfil_por_cabecera(self):
+        """Una solicitud de staff con X-Perfilar queda guardada y visible en el admin."""
+        staff = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.force_login(staff)
+
+        response = self.client.get('/es/', HTTP_X_PERFILAR='1')
+
+        self.assertEqual(response['X-Perfilado'], 'guardado')
+        perfil = PerfilSolicitud.objects.get()
+        self.assertEqual(perfil.motivo, 'cabecera')
+        self.assertTrue(perfil.funciones)
+
+        response = self.client.get(f'/admin/monitoreo/perfilsolicitud/{perfil.id}/change/')
+        self.assertContains(response, 'Funciones más costosas')
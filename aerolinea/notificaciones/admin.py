@@ -0,0 +1,41 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import EmailPendiente
+
+# Register your models here.
+
+@admin.register(EmailPendiente)
+class EmailPendienteAdmin(admin.ModelAdmin):
+    """
+    Configuración del admin para la cola de emails.
+
+    Permite revisar el estado de entrega y reencolar emails fallidos.
+    """
+
+    list_display = [
+        'asunto',
+        'destinatario',
+        'estado',
+        'intentos',
+        'proximo_intento',
+        'fecha_creacion',
+        'fecha_envio'
+    ]
+
+    list_filter = ['estado', 'plantilla', 'fecha_creacion']
+
+    search_fields = ['destinatario', 'asunto']
+
+    readonly_fields = ['fecha_creacion', 'fecha_envio', 'intentos', 'ultimo_error']
+
+    ordering = ['-fecha_creacion']
+
+    actions = ['reencolar']
+
+    def reencolar(self, request, queryset):
+        """Vuelve a poner en cola los emails seleccionados."""
+        actualizados = queryset.exclude(estado='enviado').update(
+            estado='pendiente', intentos=0, proximo_intento=timezone.now()
+        )
+        self.message_user(request, f'{actualizados} emails reencolados.')
+    reencolar.short_description = 'Reencolar emails seleccionados'
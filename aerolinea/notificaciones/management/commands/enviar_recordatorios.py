@@ -0,0 +1,55 @@
+"""
+Comando de gestión para enviar recordatorios de vuelo.
+
+Pensado para ejecutarse periódicamente (cron o Celery beat): encola un
+recordatorio para cada pasajero con reserva confirmada en un vuelo que
+sale dentro de la ventana configurada. Los pasajeros que ya recibieron
+el recordatorio se omiten, así que puede ejecutarse tantas veces como
+se quiera.
+"""
+
+from django.core.management.base import BaseCommand
+
+from notificaciones.services.notificaciones import CorreoService, RecordatorioService
+
+
+class Command(BaseCommand):
+    help = 'Encola recordatorios para los vuelos que salen dentro de la ventana'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas',
+            type=int,
+            default=None,
+            help='Ventana de salida en horas (default RECORDATORIOS_VENTANA_HORAS)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=None,
+            help='Emails por bloque (default RECORDATORIOS_TAMANO_LOTE)',
+        )
+        parser.add_argument(
+            '--enviar',
+            action='store_true',
+            help='Procesar la cola de emails después de encolar',
+        )
+
+    def handle(self, *args, **options):
+        resultado = RecordatorioService.enviar_recordatorios(
+            horas=options['horas'], tamano_lote=options['lote']
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Recordatorios encolados: {resultado['encolados']} "
+                f"(omitidos: {resultado['omitidos']})"
+            )
+        )
+
+        if options['enviar']:
+            totales = CorreoService.procesar_pendientes()
+            self.stdout.write(
+                f"Emails enviados: {totales['enviados']}, "
+                f"reprogramados: {totales['reintentos']}, "
+                f"fallidos: {totales['fallidos']}"
+            )
@@ -0,0 +1,71 @@
+"""
+Comando de gestión para procesar la cola de emails.
+
+Worker local de la cola de salida: no necesita Celery. Puede ejecutarse
+una sola vez (por ejemplo desde cron) o quedar corriendo en modo continuo.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from notificaciones.services.notificaciones import CorreoService
+
+
+class Command(BaseCommand):
+    help = 'Envía los emails pendientes de la cola de salida'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--continuo',
+            action='store_true',
+            help='Seguir procesando la cola hasta interrumpir el comando',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5,
+            help='Segundos de espera entre pasadas cuando la cola está vacía',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=None,
+            help='Cantidad de emails por lote (default CORREO_TAMANO_LOTE)',
+        )
+        parser.add_argument(
+            '--limpiar-dias',
+            type=int,
+            default=None,
+            help='Eliminar emails enviados hace más de N días antes de procesar',
+        )
+
+    def handle(self, *args, **options):
+        if options['limpiar_dias'] is not None:
+            eliminados = CorreoService.limpiar_enviados(options['limpiar_dias'])
+            self.stdout.write(f'{eliminados} emails enviados eliminados de la cola.')
+
+        if not options['continuo']:
+            self._procesar(options['lote'])
+            return
+
+        self.stdout.write('Procesando la cola de emails (Ctrl+C para detener)...')
+        try:
+            while True:
+                totales = self._procesar(options['lote'])
+                if not any(totales.values()):
+                    time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write('Worker de emails detenido.')
+
+    def _procesar(self, lote):
+        totales = CorreoService.procesar_pendientes(tamano=lote)
+        if any(totales.values()):
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Emails enviados: {totales['enviados']}, "
+                    f"reprogramados: {totales['reintentos']}, "
+                    f"fallidos: {totales['fallidos']}"
+                )
+            )
+        return totales
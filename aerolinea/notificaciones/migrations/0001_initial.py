@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-18 23:16
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailPendiente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asunto', models.CharField(help_text='Asunto del email', max_length=255)),
+                ('destinatario', models.EmailField(help_text='Dirección de destino', max_length=254)),
+                ('remitente', models.CharField(blank=True, help_text='Remitente (vacío usa DEFAULT_FROM_EMAIL)', max_length=255)),
+                ('cuerpo_texto', models.TextField(help_text='Versión en texto plano')),
+                ('cuerpo_html', models.TextField(blank=True, help_text='Versión HTML (opcional)')),
+                ('plantilla', models.CharField(blank=True, help_text='Template usado para renderizar el email', max_length=100)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviando', 'Enviando'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', help_text='Estado de entrega del email', max_length=20)),
+                ('intentos', models.PositiveIntegerField(default=0, help_text='Cantidad de intentos de envío realizados')),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now, help_text='Momento a partir del cual el worker puede tomar el email')),
+                ('ultimo_error', models.TextField(blank=True, help_text='Último error de envío')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, help_text='Fecha en que se encoló el email')),
+                ('fecha_envio', models.DateTimeField(blank=True, help_text='Fecha en que se envió el email', null=True)),
+            ],
+            options={
+                'verbose_name': 'Email pendiente',
+                'verbose_name_plural': 'Emails pendientes',
+                'db_table': 'emails_pendientes',
+                'ordering': ['proximo_intento', 'id'],
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='emails_pend_estado_1de9f4_idx')],
+            },
+        ),
+    ]
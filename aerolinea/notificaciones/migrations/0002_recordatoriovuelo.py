@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 23:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificaciones', '0001_initial'),
+        ('pasajeros', '0001_initial'),
+        ('vuelos', '0002_alter_asiento_options_alter_avion_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordatorioVuelo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_envio', models.DateTimeField(auto_now_add=True, help_text='Fecha en que se encoló el recordatorio')),
+                ('pasajero', models.ForeignKey(help_text='Pasajero que recibió el recordatorio', on_delete=django.db.models.deletion.CASCADE, related_name='recordatorios', to='pasajeros.pasajero')),
+                ('vuelo', models.ForeignKey(help_text='Vuelo recordado', on_delete=django.db.models.deletion.CASCADE, related_name='recordatorios', to='vuelos.vuelo')),
+            ],
+            options={
+                'verbose_name': 'Recordatorio de vuelo',
+                'verbose_name_plural': 'Recordatorios de vuelo',
+                'db_table': 'recordatorios_vuelo',
+                'unique_together': {('vuelo', 'pasajero')},
+            },
+        ),
+    ]
@@ -0,0 +1,138 @@
+from django.db import models
+from django.utils import timezone
+
+# Create your models here.
+
+class EmailPendiente(models.Model):
+    """
+    Modelo que representa un email en la cola de salida (outbox).
+
+    Los emails se guardan como filas dentro de la misma transacción que
+    los origina y un worker los envía en lotes, fuera del ciclo de la
+    solicitud HTTP.
+    """
+
+    ESTADOS_EMAIL = [
+        ('pendiente', 'Pendiente'),
+        ('enviando', 'Enviando'),
+        ('enviado', 'Enviado'),
+        ('fallido', 'Fallido'),
+    ]
+
+    # Contenido del email (ya renderizado al encolar)
+    asunto = models.CharField(
+        max_length=255,
+        help_text='Asunto del email'
+    )
+
+    destinatario = models.EmailField(
+        help_text='Dirección de destino'
+    )
+
+    remitente = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text='Remitente (vacío usa DEFAULT_FROM_EMAIL)'
+    )
+
+    cuerpo_texto = models.TextField(
+        help_text='Versión en texto plano'
+    )
+
+    cuerpo_html = models.TextField(
+        blank=True,
+        help_text='Versión HTML (opcional)'
+    )
+
+    plantilla = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text='Template usado para renderizar el email'
+    )
+
+    # Estado de entrega
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADOS_EMAIL,
+        default='pendiente',
+        help_text='Estado de entrega del email'
+    )
+
+    intentos = models.PositiveIntegerField(
+        default=0,
+        help_text='Cantidad de intentos de envío realizados'
+    )
+
+    proximo_intento = models.DateTimeField(
+        default=timezone.now,
+        help_text='Momento a partir del cual el worker puede tomar el email'
+    )
+
+    ultimo_error = models.TextField(
+        blank=True,
+        help_text='Último error de envío'
+    )
+
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        help_text='Fecha en que se encoló el email'
+    )
+
+    fecha_envio = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Fecha en que se envió el email'
+    )
+
+    class Meta:
+        verbose_name = 'Email pendiente'
+        verbose_name_plural = 'Emails pendientes'
+        db_table = 'emails_pendientes'
+        ordering = ['proximo_intento', 'id']
+        indexes = [
+            # Consulta del worker: estado + próximo intento
+            models.Index(fields=['estado', 'proximo_intento']),
+        ]
+
+    def __str__(self):
+        """Representación en string del email"""
+        return f"{self.asunto} → {self.destinatario} ({self.estado})"
+
+
+class RecordatorioVuelo(models.Model):
+    """
+    Registro de recordatorios de vuelo ya enviados.
+
+    Hay como máximo un recordatorio por pasajero y vuelo, aunque el
+    pasajero tenga varias reservas en el mismo vuelo o el job se ejecute
+    varias veces sobre la misma ventana.
+    """
+
+    vuelo = models.ForeignKey(
+        'vuelos.Vuelo',
+        on_delete=models.CASCADE,
+        related_name='recordatorios',
+        help_text='Vuelo recordado'
+    )
+
+    pasajero = models.ForeignKey(
+        'pasajeros.Pasajero',
+        on_delete=models.CASCADE,
+        related_name='recordatorios',
+        help_text='Pasajero que recibió el recordatorio'
+    )
+
+    fecha_envio = models.DateTimeField(
+        auto_now_add=True,
+        help_text='Fecha en que se encoló el recordatorio'
+    )
+
+    class Meta:
+        verbose_name = 'Recordatorio de vuelo'
+        verbose_name_plural = 'Recordatorios de vuelo'
+        db_table = 'recordatorios_vuelo'
+        unique_together = ['vuelo', 'pasajero']
+
+    def __str__(self):
+        """Representación en string del recordatorio"""
+        return f"Recordatorio vuelo {self.vuelo_id} → pasajero {self.pasajero_id}"
@@ -0,0 +1,173 @@
+"""
+Repositorio para la cola de emails.
+
+Este archivo implementa la capa de repositorios del patrón Vista-Servicio-Repositorio.
+Los repositorios manejan el acceso a datos y las consultas a la base de datos.
+"""
+
+from datetime import timedelta
+from typing import List
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef
+from django.utils import timezone
+
+from notificaciones.models import EmailPendiente, RecordatorioVuelo
+from reservas.models import Reserva
+
+
+class EmailPendienteRepository:
+    """Repositorio para la gestión de la cola de emails."""
+
+    @staticmethod
+    def encolar(mensajes: List[EmailPendiente]) -> List[EmailPendiente]:
+        """
+        Inserta varios emails en la cola con una sola consulta.
+
+        Args:
+            mensajes (List[EmailPendiente]): Emails sin guardar
+
+        Returns:
+            List[EmailPendiente]: Emails creados
+        """
+        return EmailPendiente.objects.bulk_create(mensajes)
+
+    @staticmethod
+    def tomar_lote(tamano: int, bloqueo_segundos: int) -> List[EmailPendiente]:
+        """
+        Reserva un lote de emails listos para enviar.
+
+        Los emails tomados pasan a 'enviando' y su próximo intento se corre
+        ``bloqueo_segundos`` hacia adelante: si el worker muere a mitad del
+        lote, vuelven a estar disponibles cuando vence ese plazo.
+
+        Args:
+            tamano (int): Cantidad máxima de emails
+            bloqueo_segundos (int): Duración de la reserva del lote
+
+        Returns:
+            List[EmailPendiente]: Emails tomados
+        """
+        ahora = timezone.now()
+        with transaction.atomic():
+            lote = list(
+                EmailPendiente.objects.select_for_update(skip_locked=True)
+                .filter(estado__in=['pendiente', 'enviando'], proximo_intento__lte=ahora)
+                .order_by('proximo_intento', 'id')[:tamano]
+            )
+            if lote:
+                EmailPendiente.objects.filter(id__in=[m.id for m in lote]).update(
+                    estado='enviando',
+                    proximo_intento=ahora + timedelta(seconds=bloqueo_segundos),
+                )
+        return lote
+
+    @staticmethod
+    def marcar_enviados(email_ids: List[int]) -> int:
+        """
+        Marca emails como enviados.
+
+        Args:
+            email_ids (List[int]): IDs de los emails
+
+        Returns:
+            int: Cantidad de filas actualizadas
+        """
+        if not email_ids:
+            return 0
+        return EmailPendiente.objects.filter(id__in=email_ids).update(
+            estado='enviado',
+            intentos=F('intentos') + 1,
+            fecha_envio=timezone.now(),
+            ultimo_error='',
+        )
+
+    @staticmethod
+    def registrar_fallos(mensajes: List[EmailPendiente]) -> int:
+        """
+        Guarda el resultado de los envíos fallidos (estado, intentos, error).
+
+        Args:
+            mensajes (List[EmailPendiente]): Emails con los campos ya actualizados
+
+        Returns:
+            int: Cantidad de filas actualizadas
+        """
+        if not mensajes:
+            return 0
+        return EmailPendiente.objects.bulk_update(
+            mensajes, ['estado', 'intentos', 'proximo_intento', 'ultimo_error']
+        )
+
+    @staticmethod
+    def contar_por_estado() -> dict:
+        """Cantidad de emails por estado."""
+        return dict(
+            EmailPendiente.objects.values_list('estado').annotate(total=Count('id')).order_by()
+        )
+
+    @staticmethod
+    def eliminar_enviados_antes_de(fecha) -> int:
+        """
+        Elimina emails enviados antes de una fecha.
+
+        Returns:
+            int: Cantidad de emails eliminados
+        """
+        eliminados, _ = EmailPendiente.objects.filter(
+            estado='enviado', fecha_envio__lt=fecha
+        ).delete()
+        return eliminados
+
+
+class RecordatorioVueloRepository:
+    """Repositorio para los recordatorios de vuelo."""
+
+    @staticmethod
+    def iterar_pendientes(desde, hasta, chunk_size: int = 1000):
+        """
+        Recorre las reservas confirmadas que salen en la ventana y todavía
+        no recibieron recordatorio.
+
+        El filtro por rango sobre Vuelo.fecha_salida usa el índice
+        (estado, fecha_salida) del vuelo, y el NOT EXISTS sobre los
+        recordatorios ya enviados se resuelve en la misma consulta. Las
+        filas vienen ordenadas por (vuelo, pasajero) para poder descartar
+        duplicados sin guardar un conjunto en memoria.
+
+        Args:
+            desde (datetime): Inicio de la ventana de salida
+            hasta (datetime): Fin de la ventana de salida
+            chunk_size (int): Filas leídas por vez desde la base de datos
+
+        Returns:
+            Iterator[tuple]: (vuelo_id, pasajero_id, codigo_reserva, nombre,
+                apellido, email, asiento, origen, destino, fecha_salida,
+                fecha_llegada)
+        """
+        enviados = RecordatorioVuelo.objects.filter(
+            vuelo_id=OuterRef('vuelo_id'), pasajero_id=OuterRef('pasajero_id')
+        )
+        return Reserva.objects.filter(
+            estado='confirmada',
+            vuelo__estado='programado',
+            vuelo__fecha_salida__gte=desde,
+            vuelo__fecha_salida__lt=hasta,
+        ).filter(~Exists(enviados)).order_by('vuelo_id', 'pasajero_id', 'id').values_list(
+            'vuelo_id', 'pasajero_id', 'codigo_reserva',
+            'pasajero__nombre', 'pasajero__apellido', 'pasajero__email',
+            'asiento__numero', 'vuelo__origen', 'vuelo__destino',
+            'vuelo__fecha_salida', 'vuelo__fecha_llegada'
+        ).iterator(chunk_size=chunk_size)
+
+    @staticmethod
+    def registrar(pares: list[tuple[int, int]]) -> list[RecordatorioVuelo]:
+        """
+        Registra recordatorios enviados para pares (vuelo_id, pasajero_id).
+
+        Los pares ya registrados (por una ejecución concurrente) se ignoran.
+        """
+        return RecordatorioVuelo.objects.bulk_create(
+            [RecordatorioVuelo(vuelo_id=v, pasajero_id=p) for v, p in pares],
+            ignore_conflicts=True,
+        )
@@ -0,0 +1,546 @@
+"""
+Servicio para la cola de emails.
+
+Este archivo implementa la capa de servicios del patrón Vista-Servicio-Repositorio.
+Los servicios contienen la lógica de negocio y orquestan las operaciones.
+
+Los emails no se envían dentro de la solicitud: se encolan como filas de
+EmailPendiente (en la misma transacción que los origina) y un worker los
+envía en lotes reutilizando una sola conexión SMTP. El worker puede ser
+Celery (si CORREO_USAR_CELERY está activo) o el comando local
+``procesar_correos``.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Iterable, List
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.html import strip_tags
+from django.utils.translation import gettext as _
+
+from aerolinea.metricas import EMAILS_PROCESADOS, ENVIO_EMAILS_DURACION
+from aerolinea.tareas import reprogramar
+from notificaciones.models import EmailPendiente
+from notificaciones.repositories.notificaciones import EmailPendienteRepository, RecordatorioVueloRepository
+from reservas.repositories.reservas import ReservaRepository
+from vuelos.repositories.vuelos import VueloRepository
+
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=128)
+def _plantilla_compilada(nombre: str):
+    """Template compilado, cacheado por nombre."""
+    return get_template(nombre)
+
+
+def obtener_plantilla(nombre: str):
+    """
+    Template compilado una sola vez por proceso.
+
+    En DEBUG se recarga en cada llamada para reflejar cambios en el archivo.
+    """
+    return get_template(nombre) if settings.DEBUG else _plantilla_compilada(nombre)
+
+
+class CorreoService:
+    """Servicio para encolar y enviar emails."""
+
+    @staticmethod
+    def renderizar(plantilla: str, contexto: dict) -> tuple[str, str]:
+        """
+        Renderiza un template de email (compilado una sola vez por proceso).
+
+        Args:
+            plantilla (str): Nombre del template
+            contexto (dict): Contexto de renderizado
+
+        Returns:
+            tuple: (html, texto_plano)
+        """
+        html = obtener_plantilla(plantilla).render(contexto)
+        return html, strip_tags(html)
+
+    @staticmethod
+    def encolar(asunto: str, destinatarios: Iterable[str], cuerpo_texto: str,
+                cuerpo_html: str = '', plantilla: str = '', remitente: str = '') -> int:
+        """
+        Encola un email para cada destinatario.
+
+        Args:
+            asunto (str): Asunto del email
+            destinatarios (Iterable[str]): Direcciones de destino
+            cuerpo_texto (str): Versión en texto plano
+            cuerpo_html (str): Versión HTML (opcional)
+            plantilla (str): Template de origen (informativo)
+            remitente (str): Remitente (vacío usa DEFAULT_FROM_EMAIL)
+
+        Returns:
+            int: Cantidad de emails encolados
+        """
+        mensajes = [
+            EmailPendiente(
+                asunto=asunto[:255],
+                destinatario=destinatario,
+                remitente=remitente,
+                cuerpo_texto=cuerpo_texto,
+                cuerpo_html=cuerpo_html,
+                plantilla=plantilla,
+            )
+            for destinatario in dict.fromkeys(destinatarios) if destinatario
+        ]
+        if not mensajes:
+            return 0
+
+        EmailPendienteRepository.encolar(mensajes)
+        transaction.on_commit(CorreoService._notificar_worker)
+        return len(mensajes)
+
+    @staticmethod
+    def encolar_plantilla(asunto: str, plantilla: str, contexto: dict,
+                          destinatarios: Iterable[str]) -> int:
+        """
+        Renderiza un template una sola vez y lo encola para varios destinatarios.
+
+        Args:
+            asunto (str): Asunto del email
+            plantilla (str): Nombre del template
+            contexto (dict): Contexto compartido por todos los destinatarios
+            destinatarios (Iterable[str]): Direcciones de destino
+
+        Returns:
+            int: Cantidad de emails encolados
+        """
+        html, texto = CorreoService.renderizar(plantilla, contexto)
+        return CorreoService.encolar(asunto, destinatarios, texto, html, plantilla)
+
+    @staticmethod
+    def encolar_varios(mensajes: List[dict]) -> int:
+        """
+        Encola emails con contenido distinto en una sola inserción.
+
+        Args:
+            mensajes (List[dict]): Diccionarios con asunto, destinatario,
+                cuerpo_texto y opcionalmente cuerpo_html y plantilla
+
+        Returns:
+            int: Cantidad de emails encolados
+        """
+        filas = [EmailPendiente(**mensaje) for mensaje in mensajes]
+        if not filas:
+            return 0
+        EmailPendienteRepository.encolar(filas)
+        transaction.on_commit(CorreoService._notificar_worker)
+        return len(filas)
+
+    @staticmethod
+    def procesar_lote(tamano: int = None) -> dict:
+        """
+        Toma un lote de la cola y lo envía por una sola conexión SMTP.
+
+        Cada mensaje se envía con send_messages sobre la conexión ya
+        abierta, para que un destinatario rechazado no descarte el resto
+        del lote. Los fallos se reprograman con backoff exponencial. Si
+        CORREO_MAX_POR_SEGUNDO está definido, los envíos se espacian para
+        respetar ese ritmo.
+
+        Args:
+            tamano (int): Cantidad máxima de emails (default CORREO_TAMANO_LOTE)
+
+        Returns:
+            dict: Cantidades 'enviados', 'reintentos' y 'fallidos'
+        """
+        tamano = tamano or getattr(settings, 'CORREO_TAMANO_LOTE', 50)
+        bloqueo = getattr(settings, 'CORREO_BLOQUEO_SEGUNDOS', 300)
+        resultado = {'enviados': 0, 'reintentos': 0, 'fallidos': 0}
+
+        lote = EmailPendienteRepository.tomar_lote(tamano, bloqueo)
+        if not lote:
+            return resultado
+
+        inicio = time.perf_counter()
+        enviados = []
+        errores = []
+        conexion = get_connection(fail_silently=False)
+        try:
+            conexion.open()
+        except Exception as e:
+            logger.error(f"No se pudo abrir la conexión de email: {e}")
+            errores = [(mensaje, e) for mensaje in lote]
+        else:
+            # Límite de envío opcional (emails por segundo) del proveedor SMTP
+            por_segundo = getattr(settings, 'CORREO_MAX_POR_SEGUNDO', 0)
+            intervalo = 1 / por_segundo if por_segundo else 0
+            siguiente = time.monotonic()
+            try:
+                for mensaje in lote:
+                    if intervalo:
+                        espera = siguiente - time.monotonic()
+                        if espera > 0:
+                            time.sleep(espera)
+                        siguiente = max(siguiente, time.monotonic()) + intervalo
+                    try:
+                        conexion.send_messages([CorreoService._construir(mensaje, conexion)])
+                        enviados.append(mensaje.id)
+                    except Exception as e:
+                        errores.append((mensaje, e))
+            finally:
+                conexion.close()
+
+        EmailPendienteRepository.marcar_enviados(enviados)
+        resultado['enviados'] = len(enviados)
+
+        fallidos = []
+        for mensaje, error in errores:
+            CorreoService._reprogramar(mensaje, error)
+            resultado['fallidos' if mensaje.estado == 'fallido' else 'reintentos'] += 1
+            fallidos.append(mensaje)
+        EmailPendienteRepository.registrar_fallos(fallidos)
+
+        ENVIO_EMAILS_DURACION.observe(time.perf_counter() - inicio)
+        EMAILS_PROCESADOS.labels(resultado='enviado').inc(resultado['enviados'])
+        EMAILS_PROCESADOS.labels(resultado='reintento').inc(resultado['reintentos'])
+        EMAILS_PROCESADOS.labels(resultado='fallido').inc(resultado['fallidos'])
+
+        logger.info(
+            f"Lote de emails procesado: {resultado['enviados']} enviados, "
+            f"{resultado['reintentos']} reprogramados, {resultado['fallidos']} fallidos"
+        )
+        return resultado
+
+    @staticmethod
+    def procesar_pendientes(max_lotes: int = None, tamano: int = None) -> dict:
+        """
+        Procesa lotes hasta vaciar la cola (o hasta max_lotes).
+
+        Returns:
+            dict: Totales acumulados de procesar_lote
+        """
+        totales = {'enviados': 0, 'reintentos': 0, 'fallidos': 0}
+        lotes = 0
+        while max_lotes is None or lotes < max_lotes:
+            resultado = CorreoService.procesar_lote(tamano)
+            lotes += 1
+            for clave, valor in resultado.items():
+                totales[clave] += valor
+            if not any(resultado.values()):
+                break
+        return totales
+
+    @staticmethod
+    def estado_cola() -> dict:
+        """Cantidad de emails por estado."""
+        return EmailPendienteRepository.contar_por_estado()
+
+    @staticmethod
+    def limpiar_enviados(dias: int = 30) -> int:
+        """
+        Elimina de la cola los emails enviados hace más de ``dias`` días.
+
+        Returns:
+            int: Cantidad de emails eliminados
+        """
+        return EmailPendienteRepository.eliminar_enviados_antes_de(
+            timezone.now() - timedelta(days=dias)
+        )
+
+    @staticmethod
+    def _construir(mensaje: EmailPendiente, conexion) -> EmailMultiAlternatives:
+        """Construye el EmailMultiAlternatives de una fila de la cola."""
+        email = EmailMultiAlternatives(
+            subject=mensaje.asunto,
+            body=mensaje.cuerpo_texto,
+            from_email=mensaje.remitente or settings.DEFAULT_FROM_EMAIL,
+            to=[mensaje.destinatario],
+            connection=conexion,
+        )
+        if mensaje.cuerpo_html:
+            email.attach_alternative(mensaje.cuerpo_html, "text/html")
+        return email
+
+    @staticmethod
+    def _reprogramar(mensaje: EmailPendiente, error: Exception):
+        """Aplica backoff exponencial con jitter, o marca el email como fallido."""
+        reprogramado = reprogramar(
+            mensaje, error,
+            max_intentos=getattr(settings, 'CORREO_MAX_INTENTOS', 5),
+            base=getattr(settings, 'CORREO_REINTENTO_BASE', 60),
+            maximo=getattr(settings, 'CORREO_REINTENTO_MAXIMO', 3600),
+        )
+        if not reprogramado:
+            logger.error(
+                f"Email a {mensaje.destinatario} descartado tras {mensaje.intentos} intentos: {error}"
+            )
+
+    @staticmethod
+    def _notificar_worker():
+        """Despierta al worker de Celery, si está configurado."""
+        if not getattr(settings, 'CORREO_USAR_CELERY', False):
+            return
+        try:
+            from notificaciones.tasks import enviar_correos_pendientes
+            enviar_correos_pendientes.delay()
+        except Exception as e:
+            # El email ya está en la cola: el worker periódico lo tomará
+            logger.warning(f"No se pudo notificar al worker de emails: {e}")
+
+
+
+class NotificacionVueloService:
+    """Servicio para notificar a los pasajeros los cambios de un vuelo."""
+
+    # Estados de reserva cuyos pasajeros reciben las notificaciones
+    ESTADOS_RESERVA_NOTIFICABLES = ['confirmada', 'pendiente']
+
+    PLANTILLA_CAMBIO = 'emails/flight_status_change.html'
+
+    @staticmethod
+    def debe_notificar(estado_anterior: str, estado_nuevo: str,
+                       salida_anterior=None, salida_nueva=None) -> bool:
+        """
+        Indica si un cambio de vuelo requiere avisar a los pasajeros.
+
+        Solo se avisan los retrasos (cambia la hora de salida de un vuelo
+        todavía activo). Las cancelaciones las avisa el trabajo de
+        cancelación en cascada junto con el reembolso, ver
+        reservas.services.cancelaciones.
+        """
+        return (
+            salida_anterior is not None and salida_nueva is not None
+            and salida_anterior != salida_nueva and estado_nuevo != 'cancelado'
+        )
+
+    @staticmethod
+    def programar_cambio(vuelo_id: int, estado_anterior: str, salida_anterior=None):
+        """
+        Programa el fan-out en segundo plano, después del commit.
+
+        La acción que cambió el vuelo (admin, API) retorna de inmediato;
+        la lectura de reservas y el encolado corren fuera de la solicitud.
+
+        Args:
+            vuelo_id (int): ID del vuelo
+            estado_anterior (str): Estado antes del cambio
+            salida_anterior (datetime): Salida antes del cambio, si cambió
+        """
+        from aerolinea.tareas import encolar
+
+        salida = salida_anterior.isoformat() if salida_anterior else None
+        transaction.on_commit(lambda: encolar(
+            'notificaciones.services.notificaciones:NotificacionVueloService.notificar_cambio',
+            vuelo_id, estado_anterior, salida
+        ))
+
+    @staticmethod
+    def encolar_avisos_cancelacion(vuelo, estado_anterior: str, reservas: List[dict]) -> int:
+        """
+        Encola el aviso de cancelación de un lote de reservas de un vuelo.
+
+        Args:
+            vuelo: Vuelo cancelado
+            estado_anterior (str): Estado del vuelo antes de cancelarse
+            reservas (List[dict]): Reservas con codigo_reserva, datos del
+                pasajero (pasajero__nombre, pasajero__apellido,
+                pasajero__email), asiento__numero y reembolso
+
+        Returns:
+            int: Cantidad de emails encolados
+        """
+        template = obtener_plantilla(NotificacionVueloService.PLANTILLA_CAMBIO)
+        asunto = _('Cambio de Estado - Vuelo {}').format(vuelo.id)
+        contexto = {'vuelo': vuelo, 'old_status': estado_anterior, 'new_status': 'cancelado'}
+        mensajes = []
+        for reserva in reservas:
+            if not reserva['pasajero__email']:
+                continue
+            contexto.update(
+                pasajero_nombre=f"{reserva['pasajero__nombre']} {reserva['pasajero__apellido']}",
+                codigo_reserva=reserva['codigo_reserva'],
+                asiento=reserva['asiento__numero'],
+                reembolso=reserva['reembolso'],
+            )
+            html = template.render(contexto)
+            mensajes.append({
+                'asunto': asunto,
+                'destinatario': reserva['pasajero__email'],
+                'cuerpo_texto': strip_tags(html),
+                'cuerpo_html': html,
+                'plantilla': NotificacionVueloService.PLANTILLA_CAMBIO,
+            })
+        return CorreoService.encolar_varios(mensajes)
+
+    @staticmethod
+    def notificar_cambio(vuelo_id: int, estado_anterior: str, salida_anterior: str = None) -> int:
+        """
+        Encola un email personalizado para cada pasajero afectado.
+
+        Las reservas se leen con una sola consulta en streaming y los
+        emails se insertan en bloques de NOTIFICACIONES_TAMANO_BLOQUE, con
+        una pausa entre bloques para no saturar la base de datos. Cada
+        pasajero (email) recibe un solo aviso aunque tenga varias reservas.
+
+        Args:
+            vuelo_id (int): ID del vuelo
+            estado_anterior (str): Estado antes del cambio
+            salida_anterior (str): Salida anterior en ISO 8601, si cambió
+
+        Returns:
+            int: Cantidad de emails encolados
+        """
+
+        vuelo = VueloRepository.obtener_por_id(vuelo_id)
+        if not vuelo:
+            logger.warning(f"Vuelo {vuelo_id} no encontrado para notificar cambios")
+            return 0
+
+        if salida_anterior:
+            salida_anterior = datetime.fromisoformat(salida_anterior)
+        asunto = (
+            _('Cambio de Estado - Vuelo {}') if vuelo.estado != estado_anterior
+            else _('Cambio de Horario - Vuelo {}')
+        ).format(vuelo.id)
+
+        tamano = getattr(settings, 'NOTIFICACIONES_TAMANO_BLOQUE', 500)
+        pausa = getattr(settings, 'NOTIFICACIONES_PAUSA_BLOQUE', 0)
+        template = obtener_plantilla(NotificacionVueloService.PLANTILLA_CAMBIO)
+        contexto = {
+            'vuelo': vuelo,
+            'old_status': estado_anterior,
+            'new_status': vuelo.estado,
+            'salida_anterior': salida_anterior,
+        }
+
+        vistos = set()
+        bloque = []
+        total = 0
+        contactos = ReservaRepository.iterar_contactos_por_vuelo(
+            vuelo_id, NotificacionVueloService.ESTADOS_RESERVA_NOTIFICABLES, chunk_size=tamano
+        )
+        for codigo, nombre, apellido, email, asiento in contactos:
+            if not email or email in vistos:
+                continue
+            vistos.add(email)
+            contexto.update(
+                pasajero_nombre=f"{nombre} {apellido}",
+                codigo_reserva=codigo,
+                asiento=asiento,
+            )
+            html = template.render(contexto)
+            bloque.append({
+                'asunto': asunto,
+                'destinatario': email,
+                'cuerpo_texto': strip_tags(html),
+                'cuerpo_html': html,
+                'plantilla': NotificacionVueloService.PLANTILLA_CAMBIO,
+            })
+            if len(bloque) >= tamano:
+                total += CorreoService.encolar_varios(bloque)
+                bloque = []
+                if pausa:
+                    time.sleep(pausa)
+        total += CorreoService.encolar_varios(bloque)
+
+        logger.info(f"{total} avisos encolados por cambio en el vuelo {vuelo_id}")
+        return total
+
+
+class RecordatorioService:
+    """Servicio para los recordatorios de vuelo programados."""
+
+    PLANTILLA = 'emails/flight_reminder.html'
+
+    CLAVE_BLOQUEO = 'notificaciones:recordatorios:en_curso'
+
+    @staticmethod
+    def enviar_recordatorios(horas: int = None, tamano_lote: int = None, ahora=None) -> dict:
+        """
+        Encola recordatorios para las reservas confirmadas que salen pronto.
+
+        Recorre las reservas de los vuelos que salen dentro de las próximas
+        ``horas`` con una consulta en streaming, arma un email por pasajero
+        y vuelo, y por cada bloque registra los recordatorios y encola los
+        emails en la misma transacción. La memoria usada depende del tamaño
+        del bloque, no de la cantidad total de reservas.
+
+        Args:
+            horas (int): Ventana de salida (default RECORDATORIOS_VENTANA_HORAS)
+            tamano_lote (int): Emails por bloque (default RECORDATORIOS_TAMANO_LOTE)
+            ahora (datetime): Momento de referencia (default timezone.now())
+
+        Returns:
+            dict: 'encolados' y 'omitidos' (duplicados del mismo pasajero)
+        """
+        horas = horas or getattr(settings, 'RECORDATORIOS_VENTANA_HORAS', 24)
+        tamano_lote = tamano_lote or getattr(settings, 'RECORDATORIOS_TAMANO_LOTE', 1000)
+        ahora = ahora or timezone.now()
+        resultado = {'encolados': 0, 'omitidos': 0}
+
+        # Evitar dos ejecuciones simultáneas sobre la misma ventana
+        if not cache.add(RecordatorioService.CLAVE_BLOQUEO, 1, 3600):
+            logger.warning("Ya hay un envío de recordatorios en curso")
+            return resultado
+
+        try:
+            template = obtener_plantilla(RecordatorioService.PLANTILLA)
+            asunto_base = _('Recordatorio de Vuelo - {} → {}')
+            filas = RecordatorioVueloRepository.iterar_pendientes(
+                ahora, ahora + timedelta(hours=horas), chunk_size=tamano_lote
+            )
+
+            anterior = None
+            pares = []
+            mensajes = []
+            for (vuelo_id, pasajero_id, codigo, nombre, apellido, email, asiento,
+                 origen, destino, salida, llegada) in filas:
+                # Las filas vienen ordenadas por (vuelo, pasajero)
+                if (vuelo_id, pasajero_id) == anterior or not email:
+                    resultado['omitidos'] += 1
+                    continue
+                anterior = (vuelo_id, pasajero_id)
+
+                html = template.render({
+                    'vuelo': {'id': vuelo_id, 'origen': origen, 'destino': destino,
+                              'fecha_salida': salida, 'fecha_llegada': llegada},
+                    'pasajero': {'nombre': nombre, 'apellido': apellido},
+                    'asiento': {'numero': asiento},
+                    'reservation': {'codigo_reserva': codigo},
+                })
+                pares.append(anterior)
+                mensajes.append({
+                    'asunto': asunto_base.format(origen, destino),
+                    'destinatario': email,
+                    'cuerpo_texto': strip_tags(html),
+                    'cuerpo_html': html,
+                    'plantilla': RecordatorioService.PLANTILLA,
+                })
+                if len(mensajes) >= tamano_lote:
+                    resultado['encolados'] += RecordatorioService._guardar_bloque(pares, mensajes)
+                    pares, mensajes = [], []
+
+            resultado['encolados'] += RecordatorioService._guardar_bloque(pares, mensajes)
+        finally:
+            cache.delete(RecordatorioService.CLAVE_BLOQUEO)
+
+        logger.info(
+            f"Recordatorios de vuelo: {resultado['encolados']} encolados, "
+            f"{resultado['omitidos']} omitidos"
+        )
+        return resultado
+
+    @staticmethod
+    def _guardar_bloque(pares, mensajes) -> int:
+        """Registra los recordatorios y encola sus emails de forma atómica."""
+        if not mensajes:
+            return 0
+        with transaction.atomic():
+            RecordatorioVueloRepository.registrar(pares)
+            return CorreoService.encolar_varios(mensajes)
@@ -0,0 +1,29 @@
+"""
+Tareas de Celery para la cola de emails.
+
+Solo se importan cuando Celery está instalado y configurado
+(CORREO_USAR_CELERY). Sin Celery, la cola la procesa el comando
+``procesar_correos``.
+"""
+
+from celery import shared_task
+
+from notificaciones.services.notificaciones import CorreoService, RecordatorioService
+
+
+@shared_task(ignore_result=True)
+def enviar_correos_pendientes(max_lotes: int = 10):
+    """Envía los emails pendientes de la cola."""
+    return CorreoService.procesar_pendientes(max_lotes=max_lotes)
+
+
+@shared_task(ignore_result=True)
+def limpiar_correos_enviados(dias: int = 30):
+    """Elimina de la cola los emails enviados hace más de ``dias`` días."""
+    return CorreoService.limpiar_enviados(dias)
+
+
+@shared_task(ignore_result=True)
+def enviar_recordatorios_vuelo(horas: int = None):
+    """Encola los recordatorios de los vuelos que salen dentro de la ventana."""
+    return RecordatorioService.enviar_recordatorios(horas=horas)
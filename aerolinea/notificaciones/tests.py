@@ -0,0 +1,217 @@
+"""
+Tests para la cola de emails.
+"""
+
+from datetime import timedelta
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from notificaciones.models import EmailPendiente, RecordatorioVuelo
+from notificaciones.services.notificaciones import CorreoService, RecordatorioService
+from pasajeros.models import Pasajero
+from reservas.models import Reserva
+from vuelos.models import Asiento, Avion, Vuelo
+
+
+class BackendConRechazos(EmailBackend):
+    """Backend de prueba que rechaza direcciones de rechazado.com."""
+
+    conexiones = 0
+
+    def open(self):
+        BackendConRechazos.conexiones += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if message.to[0].endswith('@rechazado.com'):
+                raise ConnectionError('Destinatario rechazado')
+        return super().send_messages(messages)
+
+
+class CorreoServiceTest(TestCase):
+    """Tests para el encolado y envío de emails."""
+
+    def test_encolar_no_envia(self):
+        """Encolar solo inserta filas: no hay envío en la solicitud."""
+        encolados = CorreoService.encolar(
+            'Aviso', ['a@example.com', 'b@example.com', 'a@example.com'], 'Hola'
+        )
+
+        self.assertEqual(encolados, 2)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(EmailPendiente.objects.filter(estado='pendiente').count(), 2)
+
+    @override_settings(EMAIL_BACKEND='notificaciones.tests.BackendConRechazos')
+    def test_lote_usa_una_conexion(self):
+        """Un lote completo se envía abriendo una sola conexión."""
+        BackendConRechazos.conexiones = 0
+        CorreoService.encolar('Aviso', [f'p{i}@example.com' for i in range(10)], 'Hola', '<p>Hola</p>')
+
+        resultado = CorreoService.procesar_lote()
+
+        self.assertEqual(resultado['enviados'], 10)
+        self.assertEqual(BackendConRechazos.conexiones, 1)
+        self.assertEqual(len(mail.outbox), 10)
+        self.assertEqual(EmailPendiente.objects.filter(estado='enviado').count(), 10)
+
+    @override_settings(
+        EMAIL_BACKEND='notificaciones.tests.BackendConRechazos',
+        CORREO_MAX_INTENTOS=2,
+    )
+    def test_reintento_con_backoff(self):
+        """Un envío fallido se reprograma y, al agotar intentos, queda fallido."""
+        CorreoService.encolar('Aviso', ['ok@example.com', 'x@rechazado.com'], 'Hola')
+
+        resultado = CorreoService.procesar_lote()
+        self.assertEqual(resultado, {'enviados': 1, 'reintentos': 1, 'fallidos': 0})
+
+        fallido = EmailPendiente.objects.get(destinatario='x@rechazado.com')
+        self.assertEqual(fallido.estado, 'pendiente')
+        self.assertEqual(fallido.intentos, 1)
+        self.assertGreater(fallido.proximo_intento, timezone.now())
+
+        # Todavía no vence el backoff: no se vuelve a tomar
+        self.assertEqual(CorreoService.procesar_lote()['reintentos'], 0)
+
+        EmailPendiente.objects.filter(id=fallido.id).update(proximo_intento=timezone.now())
+        resultado = CorreoService.procesar_lote()
+        self.assertEqual(resultado['fallidos'], 1)
+        fallido.refresh_from_db()
+        self.assertEqual(fallido.estado, 'fallido')
+
+
+@override_settings(TAREAS_MODO='sincrono', NOTIFICACIONES_TAMANO_BLOQUE=2, NOTIFICACIONES_PAUSA_BLOQUE=0)
+class NotificacionVueloServiceTest(TestCase):
+    """Tests para el aviso masivo de cambios de vuelo."""
+
+    def setUp(self):
+        """Configuración inicial para los tests."""
+        avion = Avion.objects.bulk_create([
+            Avion(modelo='Boeing 737', capacidad=6, filas=1, columnas=6)
+        ])[0]
+        asientos = Asiento.objects.bulk_create([
+            Asiento(avion=avion, numero=f'1{c}', fila=1, columna=c) for c in 'ABCDEF'
+        ])
+        self.vuelo = Vuelo.objects.create(
+            avion=avion,
+            origen='Buenos Aires',
+            destino='Salta',
+            fecha_salida=timezone.now() + timedelta(days=5),
+            fecha_llegada=timezone.now() + timedelta(days=5, hours=2),
+            duracion='2:00',
+            precio_base=50000
+        )
+        estados = ['confirmada', 'pendiente', 'cancelada', 'confirmada']
+        for i, estado in enumerate(estados):
+            pasajero = Pasajero.objects.create(
+                nombre=f'Pasajero{i}', apellido='Prueba', documento=f'5000000{i}',
+                email=f'p{i}@example.com', fecha_nacimiento='1985-05-05'
+            )
+            Reserva.objects.create(
+                vuelo=self.vuelo, pasajero=pasajero, asiento=asientos[i],
+                codigo_reserva=f'NOTIF{i}', estado=estado, precio=50000
+            )
+
+    def test_cancelacion_encola_un_aviso_por_pasajero_activo(self):
+        """Solo las reservas activas reciben el aviso, personalizado."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vuelo.estado = 'cancelado'
+            self.vuelo.save()
+
+        avisos = EmailPendiente.objects.order_by('destinatario')
+        self.assertEqual(
+            [a.destinatario for a in avisos],
+            ['p0@example.com', 'p1@example.com', 'p3@example.com']
+        )
+        self.assertIn('NOTIF0', avisos[0].cuerpo_html)
+        self.assertIn('cancelado', avisos[0].cuerpo_html)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_retraso_se_notifica(self):
+        """Un cambio en la hora de salida se notifica como cambio de horario."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vuelo.fecha_salida += timedelta(hours=3)
+            self.vuelo.fecha_llegada += timedelta(hours=3)
+            self.vuelo.save()
+
+        self.assertEqual(EmailPendiente.objects.count(), 3)
+        self.assertTrue(
+            EmailPendiente.objects.filter(asunto__startswith='Cambio de Horario').exists()
+        )
+
+    def test_otros_cambios_no_notifican(self):
+        """Cambios que no son cancelación ni retraso no generan avisos."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vuelo.precio_base = 60000
+            self.vuelo.save()
+
+        self.assertFalse(EmailPendiente.objects.exists())
+
+
+class RecordatorioServiceTest(TestCase):
+    """Tests para el job de recordatorios de vuelo."""
+
+    def setUp(self):
+        """Configuración inicial para los tests."""
+        avion = Avion.objects.bulk_create([
+            Avion(modelo='Airbus A320', capacidad=6, filas=1, columnas=6)
+        ])[0]
+        self.asientos = Asiento.objects.bulk_create([
+            Asiento(avion=avion, numero=f'1{c}', fila=1, columna=c) for c in 'ABCDEF'
+        ])
+        ahora = timezone.now()
+        self.vuelo_proximo = Vuelo.objects.create(
+            avion=avion, origen='Rosario', destino='Bariloche',
+            fecha_salida=ahora + timedelta(hours=10),
+            fecha_llegada=ahora + timedelta(hours=12),
+            duracion='2:00', precio_base=70000
+        )
+        self.vuelo_lejano = Vuelo.objects.create(
+            avion=avion, origen='Rosario', destino='Ushuaia',
+            fecha_salida=ahora + timedelta(hours=60),
+            fecha_llegada=ahora + timedelta(hours=64),
+            duracion='4:00', precio_base=90000
+        )
+        self.pasajeros = [
+            Pasajero.objects.create(
+                nombre=f'Viajero{i}', apellido='Prueba', documento=f'6000000{i}',
+                email=f'v{i}@example.com', fecha_nacimiento='1992-02-02'
+            )
+            for i in range(3)
+        ]
+        reservas = [
+            # El pasajero 0 tiene dos asientos en el mismo vuelo
+            (self.vuelo_proximo, 0, 0, 'confirmada'),
+            (self.vuelo_proximo, 0, 1, 'confirmada'),
+            (self.vuelo_proximo, 1, 2, 'confirmada'),
+            (self.vuelo_proximo, 2, 3, 'pendiente'),
+            (self.vuelo_lejano, 1, 4, 'confirmada'),
+        ]
+        for i, (vuelo, pasajero, asiento, estado) in enumerate(reservas):
+            Reserva.objects.create(
+                vuelo=vuelo, pasajero=self.pasajeros[pasajero], asiento=self.asientos[asiento],
+                codigo_reserva=f'REC{i}', estado=estado, precio=vuelo.precio_base
+            )
+
+    def test_un_recordatorio_por_pasajero_en_la_ventana(self):
+        """Solo reservas confirmadas en la ventana, una por pasajero y vuelo."""
+        resultado = RecordatorioService.enviar_recordatorios(horas=24, tamano_lote=1)
+
+        self.assertEqual(resultado, {'encolados': 2, 'omitidos': 1})
+        self.assertEqual(
+            sorted(EmailPendiente.objects.values_list('destinatario', flat=True)),
+            ['v0@example.com', 'v1@example.com']
+        )
+        self.assertEqual(RecordatorioVuelo.objects.filter(vuelo=self.vuelo_proximo).count(), 2)
+
+    def test_no_repite_recordatorios(self):
+        """Una segunda ejecución no vuelve a encolar los mismos recordatorios."""
+        RecordatorioService.enviar_recordatorios(horas=24)
+        resultado = RecordatorioService.enviar_recordatorios(horas=24)
+
+        self.assertEqual(resultado['encolados'], 0)
+        self.assertEqual(EmailPendiente.objects.count(), 2)
@@ -1,8 +1,23 @@
-from django.contrib import admin
-from .models import Reserva, Boleto
+from django.contrib import admin, messages
+from .models import Reserva, Boleto, CancelacionVuelo
+from .services.masivas import OperacionMasivaService
 
 # Register your models here.
 
+def _ids(queryset):
+    """IDs de la selección del admin (una consulta, sin instanciar modelos)."""
+    return list(queryset.values_list('id', flat=True))
+
+
+def _informar_omitidas(model_admin, request, resultado, motivo):
+    """Avisa cuántas filas de la selección no admitían la acción."""
+    if resultado['omitidas']:
+        model_admin.message_user(
+            request,
+            f'{resultado["omitidas"]} omitida(s): {motivo}',
+            level=messages.WARNING
+        )
+
 class BoletoInline(admin.StackedInline):
     """
     Inline para mostrar el boleto asociado a una reserva.
@@ -83,29 +98,32 @@ class ReservaAdmin(admin.ModelAdmin):
     
     def confirmar_reservas(self, request, queryset):
         """Acción para confirmar reservas seleccionadas"""
-        updated = queryset.update(estado='confirmada')
+        resultado = OperacionMasivaService.confirmar_reservas(_ids(queryset), request.user.id)
         self.message_user(
             request, 
-            f'{updated} reserva(s) confirmada(s) exitosamente'
+            f'{resultado["procesadas"]} reserva(s) confirmada(s) exitosamente'
         )
+        _informar_omitidas(self, request, resultado, 'no estaban pendientes o su vuelo no está programado')
     confirmar_reservas.short_description = "Confirmar reservas seleccionadas"
     
     def cancelar_reservas(self, request, queryset):
         """Acción para cancelar reservas seleccionadas"""
-        updated = queryset.update(estado='cancelada')
+        resultado = OperacionMasivaService.cancelar_reservas(_ids(queryset), request.user.id)
         self.message_user(
             request, 
-            f'{updated} reserva(s) cancelada(s) exitosamente'
+            f'{resultado["procesadas"]} reserva(s) cancelada(s) exitosamente'
         )
+        _informar_omitidas(self, request, resultado, 'ya estaban canceladas, expiradas o completadas')
     cancelar_reservas.short_description = "Cancelar reservas seleccionadas"
     
     def marcar_completadas(self, request, queryset):
         """Acción para marcar reservas como completadas"""
-        updated = queryset.update(estado='completada')
+        resultado = OperacionMasivaService.completar_reservas(_ids(queryset))
         self.message_user(
             request, 
-            f'{updated} reserva(s) marcada(s) como completada(s)'
+            f'{resultado["procesadas"]} reserva(s) marcada(s) como completada(s)'
         )
+        _informar_omitidas(self, request, resultado, 'no estaban confirmadas')
     marcar_completadas.short_description = "Marcar como completadas"
 
 
@@ -173,11 +191,12 @@ class BoletoAdmin(admin.ModelAdmin):
     
     def marcar_usado(self, request, queryset):
         """Acción para marcar boletos como usados"""
-        updated = queryset.update(estado='usado')
+        resultado = OperacionMasivaService.marcar_boletos_usados(_ids(queryset))
         self.message_user(
             request, 
-            f'{updated} boleto(s) marcado(s) como usado(s)'
+            f'{resultado["procesadas"]} boleto(s) marcado(s) como usado(s)'
         )
+        _informar_omitidas(self, request, resultado, 'no estaban emitidos o su reserva no está confirmada')
     marcar_usado.short_description = "Marcar como usado"
     
     def marcar_perdido(self, request, queryset):
@@ -188,3 +207,64 @@ class BoletoAdmin(admin.ModelAdmin):
             f'{updated} boleto(s) marcado(s) como perdido(s)'
         )
     marcar_perdido.short_description = "Marcar como perdido"
+
+
+@admin.register(CancelacionVuelo)
+class CancelacionVueloAdmin(admin.ModelAdmin):
+    """
+    Configuración del admin para las cancelaciones en cascada de vuelos.
+    
+    Muestra el avance de cada trabajo y permite reanudar los que fallaron
+    o quedaron sin avance (CANCELACION_MINUTOS_INACTIVA).
+    """
+    
+    list_display = [
+        'vuelo',
+        'estado',
+        'get_progreso',
+        'reservas_procesadas',
+        'total_reservas',
+        'avisos_encolados',
+        'reembolso_total',
+        'fecha_creacion',
+        'fecha_fin'
+    ]
+    
+    list_filter = ['estado', 'fecha_creacion']
+    
+    list_select_related = ['vuelo']
+    
+    readonly_fields = [
+        'vuelo', 'estado', 'total_reservas', 'reservas_procesadas', 'avisos_encolados',
+        'reembolso_total', 'ultimo_error', 'fecha_creacion', 'fecha_actualizacion', 'fecha_fin'
+    ]
+    
+    actions = ['reanudar']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def get_progreso(self, obj):
+        """Mostrar el porcentaje de avance"""
+        return f'{obj.progreso}%'
+    get_progreso.short_description = 'Progreso'
+    
+    def reanudar(self, request, queryset):
+        """Acción para reanudar cancelaciones fallidas o sin avance"""
+        from django.conf import settings
+        from django.db.models import Q
+        from django.utils import timezone
+        from .services.cancelaciones import CancelacionVueloService
+        minutos = getattr(settings, 'CANCELACION_MINUTOS_INACTIVA', 10)
+        limite = timezone.now() - timezone.timedelta(minutes=minutos)
+        reanudadas = 0
+        for cancelacion in queryset.filter(
+            Q(estado='fallida') | Q(estado__in=['pendiente', 'en_proceso'], fecha_actualizacion__lt=limite)
+        ):
+            # Renovar la fecha de avance evita que el barrido periódico la encole otra vez
+            cancelacion.estado = 'pendiente'
+            cancelacion.save(update_fields=['estado', 'fecha_actualizacion'])
+            CancelacionVueloService.iniciar(cancelacion.vuelo_id, cancelacion.estado_vuelo_anterior)
+            reanudadas += 1
+        self.message_user(request, f'{reanudadas} cancelación(es) reanudada(s)')
+    reanudar.short_description = "Reanudar cancelaciones fallidas o detenidas"
@@ -8,6 +8,7 @@ de reservas que han expirado sin confirmación.
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.db import transaction
+from aerolinea.metricas import BARRIDO_EXPIRADAS_DURACION, RESERVAS_EXPIRADAS, medir
 from reservas.models import Reserva
 from vuelos.models import Asiento
 
@@ -27,6 +28,7 @@ class Command(BaseCommand):
             help='Forzar limpieza incluso de reservas recientes',
         )
 
+    @medir(BARRIDO_EXPIRADAS_DURACION, origen='comando')
     def handle(self, *args, **options):
         dry_run = options['dry_run']
         force = options['force']
@@ -87,6 +89,7 @@ class Command(BaseCommand):
                         f'  - Reserva {reserva.codigo_reserva} cancelada, asiento {reserva.asiento.numero} liberado'
                     )
             
+            RESERVAS_EXPIRADAS.labels(origen='comando').inc(reservas_limpiadas)
             self.stdout.write(
                 self.style.SUCCESS(
                     f'Limpieza completada: {reservas_limpiadas} reservas canceladas, '
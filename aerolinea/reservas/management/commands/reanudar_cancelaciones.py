@@ -0,0 +1,27 @@
+"""
+Comando de gestión para reanudar cancelaciones de vuelos interrumpidas.
+
+Vuelve a encolar las cancelaciones en cascada pendientes o en proceso que
+no avanzan hace CANCELACION_MINUTOS_INACTIVA minutos (por ejemplo, porque
+se reinició el proceso que las corría). Puede ejecutarse desde cron.
+"""
+
+from django.core.management.base import BaseCommand
+
+from reservas.services.cancelaciones import CancelacionVueloService
+
+
+class Command(BaseCommand):
+    help = 'Reanuda las cancelaciones de vuelos que dejaron de avanzar'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minutos',
+            type=int,
+            default=None,
+            help='Minutos sin avance para considerarla interrumpida (default CANCELACION_MINUTOS_INACTIVA)',
+        )
+
+    def handle(self, *args, **options):
+        reanudadas = CancelacionVueloService.reanudar_inactivas(options['minutos'])
+        self.stdout.write(self.style.SUCCESS(f'{reanudadas} cancelación(es) reanudada(s).'))
@@ -0,0 +1,48 @@
+"""
+Comando de gestión para reubicar los pasajeros de un vuelo.
+
+Reubica en vuelos alternativos de la misma ruta a los pasajeros de un
+vuelo cancelado o sobrevendido (ver reservas.services.reubicacion).
+"""
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from reservas.services.reubicacion import ReubicacionService
+
+
+class Command(BaseCommand):
+    help = 'Reubica en vuelos alternativos a los pasajeros de un vuelo cancelado o sobrevendido'
+
+    def add_arguments(self, parser):
+        parser.add_argument('vuelo_id', type=int, help='ID del vuelo')
+        parser.add_argument(
+            '--ventana-horas',
+            type=int,
+            default=None,
+            help='Horas antes y después de la salida original para buscar alternativas',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=None,
+            help='Reservas creadas por transacción',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            resultado = ReubicacionService.reubicar_vuelo(
+                options['vuelo_id'],
+                ventana_horas=options['ventana_horas'],
+                tamano_lote=options['lote'],
+            )
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Pasajeros desplazados: {resultado['desplazados']}, "
+                f"reubicados: {resultado['reubicados']}, "
+                f"sin lugar: {resultado['sin_lugar']}"
+            )
+        )
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-18 23:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0001_initial'),
+        ('vuelos', '0002_alter_asiento_options_alter_avion_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='monto_reembolso',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Monto a reembolsar por la cancelación del vuelo', max_digits=10, null=True),
+        ),
+        migrations.CreateModel(
+            name='CancelacionVuelo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En Proceso'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', help_text='Estado del trabajo de cancelación', max_length=20)),
+                ('total_reservas', models.PositiveIntegerField(default=0, help_text='Reservas activas al iniciar la cancelación')),
+                ('reservas_procesadas', models.PositiveIntegerField(default=0, help_text='Reservas canceladas hasta el momento')),
+                ('avisos_encolados', models.PositiveIntegerField(default=0, help_text='Emails de aviso encolados')),
+                ('reembolso_total', models.DecimalField(decimal_places=2, default=0, help_text='Suma de los reembolsos calculados', max_digits=12)),
+                ('ultimo_error', models.TextField(blank=True, help_text='Error que detuvo el trabajo, si lo hubo')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, help_text='Fecha en que se inició la cancelación')),
+                ('fecha_fin', models.DateTimeField(blank=True, help_text='Fecha en que terminó el trabajo', null=True)),
+                ('vuelo', models.ForeignKey(help_text='Vuelo cancelado', on_delete=django.db.models.deletion.CASCADE, related_name='cancelaciones', to='vuelos.vuelo')),
+            ],
+            options={
+                'verbose_name': 'Cancelación de vuelo',
+                'verbose_name_plural': 'Cancelaciones de vuelos',
+                'db_table': 'cancelaciones_vuelo',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
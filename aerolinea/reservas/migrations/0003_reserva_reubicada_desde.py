@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 23:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0002_reserva_monto_reembolso_cancelacionvuelo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='reubicada_desde',
+            field=models.ForeignKey(blank=True, help_text='Reserva original de un vuelo cancelado o sobrevendido', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reubicaciones', to='reservas.reserva'),
+        ),
+    ]
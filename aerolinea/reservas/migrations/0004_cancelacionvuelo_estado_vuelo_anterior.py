@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0003_reserva_reubicada_desde'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cancelacionvuelo',
+            name='estado_vuelo_anterior',
+            field=models.CharField(default='programado', help_text='Estado del vuelo antes de cancelarse (para los avisos y al reanudar)', max_length=20),
+        ),
+    ]
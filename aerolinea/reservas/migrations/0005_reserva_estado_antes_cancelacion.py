@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0004_cancelacionvuelo_estado_vuelo_anterior'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='estado_antes_cancelacion',
+            field=models.CharField(blank=True, help_text='Estado de la reserva antes de la cancelación del vuelo (para reubicarla)', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservas', '0005_reserva_estado_antes_cancelacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cancelacionvuelo',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, help_text='Último avance del trabajo (para detectar trabajos interrumpidos)'),
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 import uuid
-from datetime import datetime
+from django.utils import timezone
 
 # Create your models here.
 
@@ -75,6 +75,29 @@ class Reserva(models.Model):
         help_text='Precio final de la reserva'
     )
     
+    monto_reembolso = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text='Monto a reembolsar por la cancelación del vuelo'
+    )
+    
+    estado_antes_cancelacion = models.CharField(
+        max_length=20,
+        blank=True,
+        help_text='Estado de la reserva antes de la cancelación del vuelo (para reubicarla)'
+    )
+    
+    reubicada_desde = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reubicaciones',  # Permite acceder desde reserva.reubicaciones.all()
+        help_text='Reserva original de un vuelo cancelado o sobrevendido'
+    )
+    
     # Información adicional
     observaciones = models.TextField(
         blank=True,
@@ -105,7 +128,7 @@ class Reserva(models.Model):
         if not self.fecha_vencimiento:
             # Establecer vencimiento en 24 horas por defecto
             from datetime import timedelta
-            self.fecha_vencimiento = datetime.now() + timedelta(hours=24)
+            self.fecha_vencimiento = timezone.now() + timedelta(hours=24)
         
         super().save(*args, **kwargs)
     
@@ -115,7 +138,7 @@ class Reserva(models.Model):
     
     def esta_vencida(self):
         """Verifica si la reserva está vencida"""
-        return datetime.now() > self.fecha_vencimiento
+        return timezone.now() > self.fecha_vencimiento
     
     def puede_cancelar(self):
         """Verifica si la reserva puede ser cancelada"""
@@ -234,3 +257,100 @@ class Boleto(models.Model):
             'puerta': self.puerta_embarque,
             'hora_embarque': self.hora_embarque
         }
+
+
+class CancelacionVuelo(models.Model):
+    """
+    Modelo que registra el progreso de la cancelación en cascada de un vuelo.
+    
+    Cuando un vuelo pasa a 'cancelado' se crea un registro y un trabajo en
+    segundo plano cancela sus reservas activas por lotes, actualizando
+    los contadores de avance en cada lote.
+    """
+    
+    ESTADOS_CANCELACION = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En Proceso'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    ]
+    
+    vuelo = models.ForeignKey(
+        'vuelos.Vuelo',
+        on_delete=models.CASCADE,
+        related_name='cancelaciones',  # Permite acceder desde vuelo.cancelaciones.all()
+        help_text='Vuelo cancelado'
+    )
+    
+    estado = models.CharField(
+        max_length=20,
+        choices=ESTADOS_CANCELACION,
+        default='pendiente',
+        help_text='Estado del trabajo de cancelación'
+    )
+    
+    estado_vuelo_anterior = models.CharField(
+        max_length=20,
+        default='programado',
+        help_text='Estado del vuelo antes de cancelarse (para los avisos y al reanudar)'
+    )
+    
+    total_reservas = models.PositiveIntegerField(
+        default=0,
+        help_text='Reservas activas al iniciar la cancelación'
+    )
+    
+    reservas_procesadas = models.PositiveIntegerField(
+        default=0,
+        help_text='Reservas canceladas hasta el momento'
+    )
+    
+    avisos_encolados = models.PositiveIntegerField(
+        default=0,
+        help_text='Emails de aviso encolados'
+    )
+    
+    reembolso_total = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        help_text='Suma de los reembolsos calculados'
+    )
+    
+    ultimo_error = models.TextField(
+        blank=True,
+        help_text='Error que detuvo el trabajo, si lo hubo'
+    )
+    
+    fecha_creacion = models.DateTimeField(
+        auto_now_add=True,
+        help_text='Fecha en que se inició la cancelación'
+    )
+    
+    fecha_fin = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Fecha en que terminó el trabajo'
+    )
+    
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        help_text='Último avance del trabajo (para detectar trabajos interrumpidos)'
+    )
+    
+    class Meta:
+        verbose_name = 'Cancelación de vuelo'
+        verbose_name_plural = 'Cancelaciones de vuelos'
+        db_table = 'cancelaciones_vuelo'
+        ordering = ['-fecha_creacion']
+    
+    def __str__(self):
+        """Representación en string de la cancelación"""
+        return f"Cancelación del vuelo {self.vuelo_id} ({self.get_estado_display()})"
+    
+    @property
+    def progreso(self):
+        """Porcentaje de reservas procesadas"""
+        if not self.total_reservas:
+            return 100 if self.estado == 'completada' else 0
+        return min(100, round(self.reservas_procesadas * 100 / self.total_reservas))
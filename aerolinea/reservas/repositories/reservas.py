@@ -9,7 +9,9 @@ from django.db import models
 from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import Q
 from django.utils import timezone
-from reservas.models import Reserva
+from datetime import timedelta
+import uuid
+from reservas.models import Reserva, Boleto, CancelacionVuelo
 
 
 class ReservaRepository:
@@ -32,13 +34,15 @@ class ReservaRepository:
         Returns:
             Reserva: Reserva creada
         """
+        # El modelo Reserva no guarda el usuario: la reserva se vincula
+        # al pasajero, y el usuario queda registrado en los logs de acción.
         return Reserva.objects.create(
-            usuario_id=usuario_id,
             pasajero_id=pasajero_id,
             vuelo_id=vuelo_id,
             asiento_id=asiento_id,
             estado=estado,
-            precio_final=precio_final
+            precio=precio_final,
+            fecha_vencimiento=timezone.now() + timedelta(hours=24)
         )
     
     @staticmethod
@@ -119,7 +123,30 @@ class ReservaRepository:
         return list(Reserva.objects.filter(vuelo_id=vuelo_id).select_related(
             'pasajero', 'asiento', 'usuario'
         ).order_by('fecha_creacion'))
-    
+
+    @staticmethod
+    def iterar_contactos_por_vuelo(vuelo_id: int, estados: list[str], chunk_size: int = 1000):
+        """
+        Recorre los datos de contacto de las reservas de un vuelo.
+
+        Usa una sola consulta con cursor (iterator) y trae solo las columnas
+        necesarias, para no cargar en memoria todas las reservas del vuelo.
+
+        Args:
+            vuelo_id (int): ID del vuelo
+            estados (list[str]): Estados de reserva a incluir
+            chunk_size (int): Filas leídas por vez desde la base de datos
+
+        Returns:
+            Iterator[tuple]: (codigo_reserva, nombre, apellido, email, asiento)
+        """
+        return Reserva.objects.filter(
+            vuelo_id=vuelo_id, estado__in=estados
+        ).order_by('id').values_list(
+            'codigo_reserva', 'pasajero__nombre', 'pasajero__apellido',
+            'pasajero__email', 'asiento__numero'
+        ).iterator(chunk_size=chunk_size)
+
     @staticmethod
     def buscar_por_criterios(criterios: dict) -> list[Reserva]:
         """
@@ -224,6 +251,240 @@ class ReservaRepository:
         except ObjectDoesNotExist:
             return False
     
+    @staticmethod
+    def bloquear_varias(reserva_ids: list[int], estados: list[str], **filtros) -> list[dict]:
+        """
+        Bloquea (SELECT ... FOR UPDATE) las reservas indicadas en ciertos estados.
+        
+        Solo se bloquean las filas de reservas, no las de los vuelos unidos.
+        
+        Args:
+            reserva_ids (list[int]): IDs de las reservas
+            estados (list[str]): Estados de origen admitidos
+            **filtros: Filtros adicionales (por ejemplo vuelo__estado)
+            
+        Returns:
+            list[dict]: id, vuelo_id, asiento_id, estado, salida del vuelo,
+                estado antes de la cancelación y reembolso
+        """
+        return list(Reserva.objects.select_for_update(of=('self',)).filter(
+            id__in=reserva_ids, estado__in=estados, **filtros
+        ).order_by('id').values(
+            'id', 'vuelo_id', 'asiento_id', 'estado', 'vuelo__fecha_salida',
+            'estado_antes_cancelacion', 'monto_reembolso'
+        ))
+    
+    @staticmethod
+    def tomar_activas_de_vuelo(vuelo_id: int, tamano: int) -> list[dict]:
+        """
+        Bloquea un lote de reservas activas de un vuelo con sus datos de contacto.
+        
+        Usa SKIP LOCKED: las reservas que otra transacción tiene bloqueadas
+        quedan para el próximo lote.
+        
+        Args:
+            vuelo_id (int): ID del vuelo
+            tamano (int): Cantidad máxima de reservas
+            
+        Returns:
+            list[dict]: Reservas con id, asiento, estado, precio, código y contacto
+        """
+        return list(Reserva.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+            vuelo_id=vuelo_id, estado__in=['pendiente', 'confirmada']
+        ).order_by('id').values(
+            'id', 'asiento_id', 'estado', 'precio', 'codigo_reserva',
+            'pasajero__nombre', 'pasajero__apellido', 'pasajero__email', 'asiento__numero'
+        )[:tamano])
+    
+    @staticmethod
+    def contar_activas_de_vuelo(vuelo_id: int) -> int:
+        """
+        Cuenta las reservas pendientes o confirmadas de un vuelo.
+        
+        Returns:
+            int: Cantidad de reservas activas
+        """
+        return Reserva.objects.filter(
+            vuelo_id=vuelo_id, estado__in=['pendiente', 'confirmada']
+        ).count()
+    
+    @staticmethod
+    def contar_activas_por_tipo(vuelo_ids) -> dict:
+        """
+        Cuenta las reservas pendientes o confirmadas de varios vuelos por cabina.
+        
+        Args:
+            vuelo_ids: IDs de los vuelos
+            
+        Returns:
+            dict: {(vuelo_id, tipo de asiento): cantidad}
+        """
+        filas = Reserva.objects.filter(
+            vuelo_id__in=vuelo_ids, estado__in=['pendiente', 'confirmada']
+        ).values('vuelo_id', 'asiento__tipo').annotate(cantidad=models.Count('id')).order_by()
+        return {(fila['vuelo_id'], fila['asiento__tipo']): fila['cantidad'] for fila in filas}
+    
+    @staticmethod
+    def obtener_desplazadas(vuelo_id: int, cancelado: bool, capacidad: int) -> list[dict]:
+        """
+        Obtiene las reservas a reubicar de un vuelo, sin reubicación previa.
+        
+        En un vuelo cancelado son todas las activas y las canceladas por la
+        cancelación del vuelo (con reembolso calculado). En un vuelo
+        sobrevendido son las activas que exceden la capacidad del avión.
+        Las confirmadas (o confirmadas antes de la cancelación) tienen
+        prioridad y, entre ellas, las más antiguas.
+        
+        Args:
+            vuelo_id (int): ID del vuelo
+            cancelado (bool): True si el vuelo está cancelado
+            capacidad (int): Capacidad del avión
+            
+        Returns:
+            list[dict]: Reservas con pasajero, cabina, estado, precio y fecha
+        """
+        queryset = Reserva.objects.filter(vuelo_id=vuelo_id, reubicaciones__isnull=True)
+        activas = Q(estado__in=['pendiente', 'confirmada'])
+        if cancelado:
+            queryset = queryset.filter(activas | Q(estado='cancelada', monto_reembolso__isnull=False))
+        else:
+            queryset = queryset.filter(activas)
+        reservas = list(queryset.annotate(
+            # Las canceladas por la cascada conservan la prioridad que tenían
+            prioridad=models.Case(
+                models.When(estado='confirmada', then=0),
+                models.When(estado='cancelada', estado_antes_cancelacion='confirmada', then=0),
+                default=1,
+                output_field=models.IntegerField()
+            )
+        ).order_by('prioridad', 'fecha_reserva', 'id').values(
+            'id', 'pasajero_id', 'asiento_id', 'asiento__tipo', 'estado', 'estado_antes_cancelacion',
+            'precio', 'fecha_reserva'
+        ))
+        return reservas if cancelado else reservas[capacidad:]
+    
+    @staticmethod
+    def pasajeros_con_reserva_activa(vuelo_ids: list[int]) -> set:
+        """
+        Pares (vuelo_id, pasajero_id) con reserva activa en los vuelos.
+        
+        Returns:
+            set: Pares (vuelo_id, pasajero_id)
+        """
+        return set(Reserva.objects.filter(
+            vuelo_id__in=vuelo_ids, estado__in=['pendiente', 'confirmada']
+        ).values_list('vuelo_id', 'pasajero_id'))
+    
+    @staticmethod
+    def asientos_ocupados(vuelo_ids: list[int], asiento_ids: list[int]) -> set:
+        """
+        Pares (vuelo_id, asiento_id) ya tomados por reservas activas.
+        
+        Returns:
+            set: Pares (vuelo_id, asiento_id)
+        """
+        return set(Reserva.objects.filter(
+            vuelo_id__in=vuelo_ids, asiento_id__in=asiento_ids,
+            estado__in=['pendiente', 'confirmada']
+        ).values_list('vuelo_id', 'asiento_id'))
+    
+    @staticmethod
+    def combinaciones_existentes(vuelo_ids: list[int], pasajero_ids: list[int]) -> set:
+        """
+        Ternas (vuelo_id, pasajero_id, asiento_id) ya usadas, en cualquier estado.
+        
+        Una reserva cancelada sigue ocupando la combinación única
+        (vuelo, pasajero, asiento).
+        
+        Returns:
+            set: Ternas (vuelo_id, pasajero_id, asiento_id)
+        """
+        return set(Reserva.objects.filter(
+            vuelo_id__in=vuelo_ids, pasajero_id__in=pasajero_ids
+        ).values_list('vuelo_id', 'pasajero_id', 'asiento_id'))
+    
+    @staticmethod
+    def codigos_existentes(codigos: list[str]) -> set:
+        """
+        Códigos de reserva que ya están en uso.
+        
+        Returns:
+            set: Códigos existentes
+        """
+        return set(Reserva.objects.filter(codigo_reserva__in=codigos).values_list('codigo_reserva', flat=True))
+    
+    @staticmethod
+    def asientos_de_reservas(reserva_ids: list[int]) -> list[tuple]:
+        """
+        Vuelo y asiento de varias reservas.
+        
+        Returns:
+            list[tuple]: Tuplas (vuelo_id, asiento_id)
+        """
+        return list(Reserva.objects.filter(
+            id__in=reserva_ids, asiento__isnull=False
+        ).values_list('vuelo_id', 'asiento_id'))
+    
+    @staticmethod
+    def crear_varias(reservas: list[Reserva]) -> list[Reserva]:
+        """
+        Inserta varias reservas con una sola consulta.
+        
+        No llama a save(): el código y el vencimiento deben venir cargados.
+        
+        Returns:
+            list[Reserva]: Reservas creadas (con ID)
+        """
+        return Reserva.objects.bulk_create(reservas)
+    
+    @staticmethod
+    def cancelar_con_reembolso(reserva_ids: list[int], porcentaje) -> int:
+        """
+        Cancela reservas y registra el reembolso como porcentaje de su precio.
+        
+        Es una sola consulta: el monto se calcula en la base de datos. El
+        estado previo queda en estado_antes_cancelacion para la reubicación.
+        
+        Args:
+            reserva_ids (list[int]): IDs de las reservas
+            porcentaje (Decimal): Porcentaje del precio a reembolsar
+            
+        Returns:
+            int: Cantidad de reservas canceladas
+        """
+        if not reserva_ids:
+            return 0
+        return Reserva.objects.filter(id__in=reserva_ids).update(
+            # Antes que estado: MySQL evalúa las asignaciones en orden
+            estado_antes_cancelacion=models.F('estado'),
+            estado='cancelada',
+            monto_reembolso=models.F('precio') * porcentaje / 100
+        )
+    
+    @staticmethod
+    def anular_reembolsos(reserva_ids: list[int]) -> int:
+        """
+        Deja en cero el reembolso de reservas canceladas que fueron reubicadas.
+        
+        Returns:
+            int: Cantidad de reservas actualizadas
+        """
+        if not reserva_ids:
+            return 0
+        return Reserva.objects.filter(id__in=reserva_ids).update(monto_reembolso=0)
+    
+    @staticmethod
+    def cambiar_estado_varias(reserva_ids: list[int], estado: str) -> int:
+        """
+        Cambia el estado de varias reservas con una sola consulta.
+        
+        Returns:
+            int: Cantidad de reservas actualizadas
+        """
+        if not reserva_ids:
+            return 0
+        return Reserva.objects.filter(id__in=reserva_ids).update(estado=estado)
+    
     @staticmethod
     def contar_por_estado() -> dict:
         """
@@ -251,4 +512,200 @@ class ReservaRepository:
             'pendientes': Reserva.objects.filter(estado='pendiente').count(),
             'canceladas': Reserva.objects.filter(estado='cancelada').count(),
             'expiradas': ReservaRepository.obtener_reservas_expiradas().__len__(),
-        } 
\ No newline at end of file
+        }
+
+
+class BoletoRepository:
+    """Repositorio para la gestión de boletos."""
+    
+    @staticmethod
+    def emitir_varios(reservas: list[dict]) -> int:
+        """
+        Emite los boletos de varias reservas con una sola inserción.
+        
+        Las reservas que ya tienen boleto se ignoran (la relación es uno a
+        uno). La hora de embarque es una hora antes de la salida.
+        
+        Args:
+            reservas (list[dict]): Reservas con 'id' y 'vuelo__fecha_salida'
+            
+        Returns:
+            int: Cantidad de boletos nuevos
+        """
+        if not reservas:
+            return 0
+        ids = [reserva['id'] for reserva in reservas]
+        existentes = Boleto.objects.filter(reserva_id__in=ids).count()
+        Boleto.objects.bulk_create([
+            Boleto(
+                reserva_id=reserva['id'],
+                codigo_barra=f"BOL{str(uuid.uuid4())[:12].upper()}",
+                estado='emitido',
+                puerta_embarque='Por asignar',
+                hora_embarque=timezone.localtime(reserva['vuelo__fecha_salida'] - timedelta(hours=1)).time(),
+            )
+            for reserva in reservas
+        ], ignore_conflicts=True)
+        return Boleto.objects.filter(reserva_id__in=ids).count() - existentes
+    
+    @staticmethod
+    def cambiar_estado_por_reservas(reserva_ids: list[int], estado: str,
+                                    estados_origen: list[str]) -> int:
+        """
+        Cambia el estado de los boletos de varias reservas.
+        
+        Args:
+            reserva_ids (list[int]): IDs de las reservas
+            estado (str): Nuevo estado
+            estados_origen (list[str]): Estados de boleto a modificar
+            
+        Returns:
+            int: Cantidad de boletos actualizados
+        """
+        if not reserva_ids:
+            return 0
+        return Boleto.objects.filter(
+            reserva_id__in=reserva_ids, estado__in=estados_origen
+        ).update(estado=estado)
+    
+    @staticmethod
+    def marcar_usados(boleto_ids: list[int]) -> int:
+        """
+        Marca como usados los boletos emitidos de reservas confirmadas.
+        
+        Returns:
+            int: Cantidad de boletos actualizados
+        """
+        if not boleto_ids:
+            return 0
+        return Boleto.objects.filter(
+            id__in=boleto_ids, estado='emitido', reserva__estado='confirmada'
+        ).update(estado='usado')
+
+
+class CancelacionVueloRepository:
+    """Repositorio para los trabajos de cancelación de vuelos."""
+    
+    @staticmethod
+    def crear(vuelo_id: int, total_reservas: int, estado_vuelo_anterior: str) -> CancelacionVuelo:
+        """
+        Crea el registro de una cancelación.
+        
+        Args:
+            vuelo_id (int): ID del vuelo
+            total_reservas (int): Reservas activas a cancelar
+            estado_vuelo_anterior (str): Estado del vuelo antes de cancelarse
+            
+        Returns:
+            CancelacionVuelo: Cancelación creada
+        """
+        return CancelacionVuelo.objects.create(
+            vuelo_id=vuelo_id, total_reservas=total_reservas,
+            estado_vuelo_anterior=estado_vuelo_anterior
+        )
+    
+    @staticmethod
+    def obtener_por_id(cancelacion_id: int) -> CancelacionVuelo | None:
+        """
+        Obtiene una cancelación por su ID.
+        
+        Returns:
+            CancelacionVuelo: Cancelación encontrada o None
+        """
+        return CancelacionVuelo.objects.filter(id=cancelacion_id).first()
+    
+    @staticmethod
+    def obtener_activa(vuelo_id: int) -> CancelacionVuelo | None:
+        """
+        Obtiene la cancelación pendiente o en proceso de un vuelo.
+        
+        Returns:
+            CancelacionVuelo: Cancelación activa o None
+        """
+        return CancelacionVuelo.objects.filter(
+            vuelo_id=vuelo_id, estado__in=['pendiente', 'en_proceso']
+        ).first()
+    
+    @staticmethod
+    def ids_inactivas(desde) -> list[int]:
+        """
+        IDs de las cancelaciones pendientes o en proceso sin avance desde una fecha.
+        
+        Args:
+            desde (datetime): Fecha límite del último avance
+            
+        Returns:
+            list[int]: IDs de las cancelaciones
+        """
+        return list(CancelacionVuelo.objects.filter(
+            estado__in=['pendiente', 'en_proceso'], fecha_actualizacion__lt=desde
+        ).values_list('id', flat=True))
+    
+    @staticmethod
+    def marcar_en_proceso(cancelacion_id: int) -> int:
+        """
+        Marca que un worker tomó la cancelación (renueva la fecha de avance).
+        
+        Returns:
+            int: Cantidad de filas actualizadas
+        """
+        return CancelacionVuelo.objects.filter(id=cancelacion_id).update(
+            estado='en_proceso', fecha_actualizacion=timezone.now()
+        )
+    
+    @staticmethod
+    def registrar_lote(cancelacion_id: int, procesadas: int, avisos: int, reembolso) -> int:
+        """
+        Suma el avance de un lote a los contadores de la cancelación.
+        
+        Usa expresiones F para no pisar avances de otro worker.
+        
+        Returns:
+            int: Cantidad de filas actualizadas
+        """
+        return CancelacionVuelo.objects.filter(id=cancelacion_id).update(
+            estado='en_proceso',
+            fecha_actualizacion=timezone.now(),
+            reservas_procesadas=models.F('reservas_procesadas') + procesadas,
+            avisos_encolados=models.F('avisos_encolados') + avisos,
+            reembolso_total=models.F('reembolso_total') + reembolso,
+        )
+    
+    @staticmethod
+    def descontar_reembolso(vuelo_id: int, monto) -> int:
+        """
+        Resta del total de la última cancelación del vuelo los reembolsos anulados.
+        
+        Args:
+            vuelo_id (int): ID del vuelo cancelado
+            monto (Decimal): Reembolsos que ya no se pagan
+            
+        Returns:
+            int: Cantidad de filas actualizadas
+        """
+        cancelacion_id = CancelacionVuelo.objects.filter(vuelo_id=vuelo_id).order_by(
+            '-fecha_creacion'
+        ).values_list('id', flat=True).first()
+        if cancelacion_id is None:
+            return 0
+        return CancelacionVuelo.objects.filter(id=cancelacion_id).update(
+            reembolso_total=models.F('reembolso_total') - monto
+        )
+    
+    @staticmethod
+    def finalizar(cancelacion_id: int, estado: str, error: str = '') -> int:
+        """
+        Marca el fin de una cancelación.
+        
+        Args:
+            cancelacion_id (int): ID de la cancelación
+            estado (str): 'completada' o 'fallida'
+            error (str): Error que detuvo el trabajo
+            
+        Returns:
+            int: Cantidad de filas actualizadas
+        """
+        ahora = timezone.now()
+        return CancelacionVuelo.objects.filter(id=cancelacion_id).update(
+            estado=estado, ultimo_error=error, fecha_fin=ahora, fecha_actualizacion=ahora
+        )
@@ -0,0 +1,225 @@
+"""
+Servicio para la cancelación en cascada de vuelos.
+
+Este archivo implementa la capa de servicios del patrón Vista-Servicio-Repositorio.
+Los servicios contienen la lógica de negocio y orquestan las operaciones.
+
+Cuando un vuelo pasa a 'cancelado' (servicio, API o admin) se publica
+VueloEstadoCambiado; un suscriptor en cola inicia aquí un trabajo en
+segundo plano que, por lotes y en transacciones cortas:
+- cancela las reservas activas y calcula su reembolso
+- anula los boletos emitidos
+- libera los asientos
+- encola el aviso a cada pasajero
+El avance queda registrado en CancelacionVuelo (visible en el admin).
+Si el trabajo se interrumpe (por ejemplo, se reinicia el proceso que lo
+corría en un hilo), reanudar_inactivas lo vuelve a encolar cuando pasan
+CANCELACION_MINUTOS_INACTIVA sin avance (tarea periódica de Celery o
+comando reanudar_cancelaciones) y continúa desde donde quedó. Si el vuelo
+deja de estar cancelado, el trabajo se detiene.
+"""
+
+import logging
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from eventos.bus import publicar_varios
+from eventos.dominio import ReservaCancelada
+from notificaciones.services.notificaciones import NotificacionVueloService
+from reservas.models import CancelacionVuelo
+from reservas.repositories.reservas import (
+    BoletoRepository, CancelacionVueloRepository, ReservaRepository,
+)
+from vuelos.repositories.vuelos import AsientoRepository, VueloRepository
+
+
+logger = logging.getLogger(__name__)
+
+CENTAVOS = Decimal('0.01')
+
+
+class CancelacionVueloService:
+    """Servicio para la cancelación en cascada de vuelos."""
+    
+    @staticmethod
+    def iniciar(vuelo_id: int, estado_anterior: str = 'programado') -> CancelacionVuelo:
+        """
+        Registra la cancelación de un vuelo y programa el trabajo.
+        
+        Si el vuelo ya tiene una cancelación pendiente o en proceso se
+        reutiliza. El trabajo se encola cuando la transacción confirma.
+        
+        Args:
+            vuelo_id (int): ID del vuelo cancelado
+            estado_anterior (str): Estado del vuelo antes de cancelarse
+            
+        Returns:
+            CancelacionVuelo: Registro de la cancelación
+        """
+        cancelacion = CancelacionVueloRepository.obtener_activa(vuelo_id)
+        if cancelacion is None:
+            cancelacion = CancelacionVueloRepository.crear(
+                vuelo_id, ReservaRepository.contar_activas_de_vuelo(vuelo_id), estado_anterior
+            )
+        
+        from aerolinea.tareas import encolar
+        cancelacion_id = cancelacion.id
+        transaction.on_commit(lambda: encolar(
+            'reservas.services.cancelaciones:CancelacionVueloService.procesar', cancelacion_id
+        ))
+        return cancelacion
+    
+    @staticmethod
+    def procesar(cancelacion_id: int) -> dict:
+        """
+        Cancela por lotes las reservas activas del vuelo.
+        
+        Cada lote es una transacción: si el proceso muere, los lotes ya
+        confirmados no se repiten y el resto queda para la próxima ejecución.
+        Un lote vacío no alcanza para terminar: las reservas que otra
+        transacción tiene bloqueadas se saltean (SKIP LOCKED), así que antes
+        de marcar la cancelación como completada se verifica que no quede
+        ninguna activa y, si quedan, se reintenta.
+        
+        Args:
+            cancelacion_id (int): ID de la cancelación
+            
+        Returns:
+            dict: Cantidades 'procesadas', 'avisos' y 'reembolso' de esta ejecución
+        """
+        resultado = {'procesadas': 0, 'avisos': 0, 'reembolso': Decimal('0')}
+        cancelacion = CancelacionVueloRepository.obtener_por_id(cancelacion_id)
+        if cancelacion is None or cancelacion.estado in ('completada', 'fallida'):
+            return resultado
+        
+        CancelacionVueloRepository.marcar_en_proceso(cancelacion_id)
+        vuelo = VueloRepository.obtener_por_id(cancelacion.vuelo_id)
+        estado_anterior = cancelacion.estado_vuelo_anterior
+        tamano = getattr(settings, 'CANCELACION_TAMANO_LOTE', 200)
+        pausa = getattr(settings, 'CANCELACION_PAUSA_LOTE', 0)
+        max_reintentos = getattr(settings, 'CANCELACION_REINTENTOS_BLOQUEO', 5)
+        espera = getattr(settings, 'CANCELACION_ESPERA_BLOQUEO', 1)
+        reintentos = 0
+        try:
+            while True:
+                if VueloRepository.obtener_estado(cancelacion.vuelo_id) != 'cancelado':
+                    logger.warning(
+                        f"El vuelo {cancelacion.vuelo_id} ya no está cancelado: se detiene la cancelación"
+                    )
+                    CancelacionVueloRepository.finalizar(
+                        cancelacion_id, 'fallida', 'El vuelo ya no está cancelado'
+                    )
+                    return resultado
+                
+                lote = CancelacionVueloService._procesar_lote(
+                    cancelacion_id, vuelo, estado_anterior, tamano
+                )
+                if lote['procesadas']:
+                    for clave, valor in lote.items():
+                        resultado[clave] += valor
+                    if pausa:
+                        time.sleep(pausa)
+                    continue
+                
+                restantes = ReservaRepository.contar_activas_de_vuelo(vuelo.id)
+                if not restantes:
+                    break
+                if reintentos >= max_reintentos:
+                    raise RuntimeError(
+                        f"Quedan {restantes} reservas activas bloqueadas por otras transacciones"
+                    )
+                reintentos += 1
+                time.sleep(espera)
+        except Exception as e:
+            logger.exception(f"Error cancelando las reservas del vuelo {cancelacion.vuelo_id}")
+            CancelacionVueloRepository.finalizar(cancelacion_id, 'fallida', str(e)[:1000])
+            raise
+        
+        CancelacionVueloRepository.finalizar(cancelacion_id, 'completada')
+        logger.info(
+            f"Vuelo {cancelacion.vuelo_id} cancelado: {resultado['procesadas']} reservas, "
+            f"{resultado['avisos']} avisos, reembolsos por ${resultado['reembolso']}"
+        )
+        return resultado
+    
+    @staticmethod
+    def reanudar_inactivas(minutos: int = None) -> int:
+        """
+        Vuelve a encolar las cancelaciones activas que dejaron de avanzar.
+        
+        Args:
+            minutos (int): Minutos sin avance (default CANCELACION_MINUTOS_INACTIVA)
+            
+        Returns:
+            int: Cantidad de cancelaciones encoladas
+        """
+        from aerolinea.tareas import encolar
+        if minutos is None:
+            minutos = getattr(settings, 'CANCELACION_MINUTOS_INACTIVA', 10)
+        ids = CancelacionVueloRepository.ids_inactivas(timezone.now() - timezone.timedelta(minutes=minutos))
+        for cancelacion_id in ids:
+            logger.warning(f"Reanudando la cancelación {cancelacion_id}, sin avance hace {minutos} minutos")
+            encolar('reservas.services.cancelaciones:CancelacionVueloService.procesar', cancelacion_id)
+        return len(ids)
+    
+    @staticmethod
+    def obtener_progreso(cancelacion_id: int) -> dict | None:
+        """
+        Obtiene el avance de una cancelación.
+        
+        Args:
+            cancelacion_id (int): ID de la cancelación
+            
+        Returns:
+            dict: Estado, contadores y porcentaje, o None si no existe
+        """
+        cancelacion = CancelacionVueloRepository.obtener_por_id(cancelacion_id)
+        if cancelacion is None:
+            return None
+        return {
+            'id': cancelacion.id,
+            'vuelo_id': cancelacion.vuelo_id,
+            'estado': cancelacion.estado,
+            'total_reservas': cancelacion.total_reservas,
+            'reservas_procesadas': cancelacion.reservas_procesadas,
+            'avisos_encolados': cancelacion.avisos_encolados,
+            'reembolso_total': str(cancelacion.reembolso_total),
+            'progreso': cancelacion.progreso,
+        }
+    
+    @staticmethod
+    def _procesar_lote(cancelacion_id: int, vuelo, estado_anterior: str, tamano: int) -> dict:
+        """Cancela un lote de reservas con sus dependencias en una transacción."""
+        porcentaje = Decimal(str(getattr(settings, 'CANCELACION_PORCENTAJE_REEMBOLSO', 100)))
+        with transaction.atomic():
+            reservas = ReservaRepository.tomar_activas_de_vuelo(vuelo.id, tamano)
+            if not reservas:
+                return {'procesadas': 0, 'avisos': 0, 'reembolso': Decimal('0')}
+            
+            ids = [reserva['id'] for reserva in reservas]
+            ReservaRepository.cancelar_con_reembolso(ids, porcentaje)
+            BoletoRepository.cambiar_estado_por_reservas(ids, 'cancelado', ['emitido'])
+            AsientoRepository.liberar_varios(
+                [reserva['asiento_id'] for reserva in reservas if reserva['asiento_id']]
+            )
+            
+            for reserva in reservas:
+                reserva['reembolso'] = (reserva['precio'] * porcentaje / 100).quantize(CENTAVOS)
+            avisos = NotificacionVueloService.encolar_avisos_cancelacion(
+                vuelo, estado_anterior, reservas
+            )
+            reembolso = sum((reserva['reembolso'] for reserva in reservas), Decimal('0'))
+            
+            publicar_varios(
+                ReservaCancelada(
+                    reserva_id=reserva['id'], vuelo_id=vuelo.id, estado_anterior=reserva['estado']
+                )
+                for reserva in reservas
+            )
+            CancelacionVueloRepository.registrar_lote(cancelacion_id, len(ids), avisos, reembolso)
+        
+        return {'procesadas': len(ids), 'avisos': avisos, 'reembolso': reembolso}
@@ -0,0 +1,175 @@
+"""
+Servicio para operaciones masivas sobre reservas, boletos, asientos y vuelos.
+
+Este archivo implementa la capa de servicios del patrón Vista-Servicio-Repositorio.
+Los servicios contienen la lógica de negocio y orquestan las operaciones.
+
+Cada operación aplica la transición de estado y todas sus dependencias
+(asientos, boletos, contadores, eventos) en una sola transacción y con una
+cantidad constante de consultas, sin importar cuántas filas se procesen.
+Las filas que no admiten la transición se omiten y se informan.
+"""
+
+from django.db import transaction
+from typing import List
+from reservas.repositories.reservas import ReservaRepository, BoletoRepository
+from vuelos.repositories.vuelos import VueloRepository, AsientoRepository
+from vuelos.services.vuelos import VueloService
+from eventos.bus import publicar_varios
+from eventos.dominio import ReservaCancelada, ReservaConfirmada, VueloEstadoCambiado
+
+
+class OperacionMasivaService:
+    """Servicio para operaciones masivas (acciones del admin)."""
+    
+    @staticmethod
+    def confirmar_reservas(reserva_ids: List[int], usuario_id: int = None) -> dict:
+        """
+        Confirma reservas pendientes de vuelos programados.
+        
+        Ocupa sus asientos y emite los boletos que falten.
+        
+        Args:
+            reserva_ids (List[int]): IDs de las reservas
+            usuario_id (int): Usuario que ejecuta la acción (para la auditoría)
+            
+        Returns:
+            dict: Cantidades 'procesadas' y 'omitidas'
+        """
+        with transaction.atomic():
+            reservas = ReservaRepository.bloquear_varias(
+                reserva_ids, ['pendiente'], vuelo__estado='programado'
+            )
+            ids = [reserva['id'] for reserva in reservas]
+            ReservaRepository.cambiar_estado_varias(ids, 'confirmada')
+            AsientoRepository.cambiar_estado_varios(
+                [reserva['asiento_id'] for reserva in reservas if reserva['asiento_id']], 'ocupado'
+            )
+            BoletoRepository.emitir_varios(reservas)
+            publicar_varios(
+                ReservaConfirmada(
+                    reserva_id=reserva['id'], vuelo_id=reserva['vuelo_id'], usuario_id=usuario_id
+                )
+                for reserva in reservas
+            )
+        return OperacionMasivaService._resultado(reserva_ids, ids)
+    
+    @staticmethod
+    def cancelar_reservas(reserva_ids: List[int], usuario_id: int = None) -> dict:
+        """
+        Cancela reservas pendientes o confirmadas.
+        
+        Anula sus boletos emitidos y libera los asientos que no tengan
+        otra reserva activa.
+        
+        Args:
+            reserva_ids (List[int]): IDs de las reservas
+            usuario_id (int): Usuario que ejecuta la acción (para la auditoría)
+            
+        Returns:
+            dict: Cantidades 'procesadas' y 'omitidas'
+        """
+        with transaction.atomic():
+            reservas = ReservaRepository.bloquear_varias(reserva_ids, ['pendiente', 'confirmada'])
+            ids = [reserva['id'] for reserva in reservas]
+            ReservaRepository.cambiar_estado_varias(ids, 'cancelada')
+            BoletoRepository.cambiar_estado_por_reservas(ids, 'cancelado', ['emitido'])
+            AsientoRepository.liberar_varios(
+                [reserva['asiento_id'] for reserva in reservas if reserva['asiento_id']]
+            )
+            publicar_varios(
+                ReservaCancelada(
+                    reserva_id=reserva['id'],
+                    vuelo_id=reserva['vuelo_id'],
+                    estado_anterior=reserva['estado'],
+                    usuario_id=usuario_id
+                )
+                for reserva in reservas
+            )
+        return OperacionMasivaService._resultado(reserva_ids, ids)
+    
+    @staticmethod
+    def completar_reservas(reserva_ids: List[int]) -> dict:
+        """
+        Marca como completadas reservas confirmadas y libera sus asientos.
+        
+        Args:
+            reserva_ids (List[int]): IDs de las reservas
+            
+        Returns:
+            dict: Cantidades 'procesadas' y 'omitidas'
+        """
+        with transaction.atomic():
+            reservas = ReservaRepository.bloquear_varias(reserva_ids, ['confirmada'])
+            ids = [reserva['id'] for reserva in reservas]
+            ReservaRepository.cambiar_estado_varias(ids, 'completada')
+            AsientoRepository.liberar_varios(
+                [reserva['asiento_id'] for reserva in reservas if reserva['asiento_id']]
+            )
+        return OperacionMasivaService._resultado(reserva_ids, ids)
+    
+    @staticmethod
+    def marcar_boletos_usados(boleto_ids: List[int]) -> dict:
+        """
+        Marca como usados boletos emitidos de reservas confirmadas.
+        
+        Args:
+            boleto_ids (List[int]): IDs de los boletos
+            
+        Returns:
+            dict: Cantidades 'procesadas' y 'omitidas'
+        """
+        procesados = BoletoRepository.marcar_usados(boleto_ids)
+        return {'procesadas': procesados, 'omitidas': len(set(boleto_ids)) - procesados}
+    
+    @staticmethod
+    def liberar_asientos(asiento_ids: List[int]) -> dict:
+        """
+        Marca como disponibles asientos sin reservas activas.
+        
+        Args:
+            asiento_ids (List[int]): IDs de los asientos
+            
+        Returns:
+            dict: Cantidades 'procesadas' y 'omitidas' (en uso o ya disponibles)
+        """
+        liberados = AsientoRepository.liberar_varios(asiento_ids)
+        return {'procesadas': liberados, 'omitidas': len(set(asiento_ids)) - liberados}
+    
+    @staticmethod
+    def cancelar_vuelos(vuelo_ids: List[int]) -> dict:
+        """
+        Cancela vuelos programados o en vuelo.
+        
+        Ajusta los contadores en caché y publica VueloEstadoCambiado, igual
+        que el guardado individual de un vuelo. Las reservas, boletos,
+        asientos y avisos los procesa en segundo plano la cancelación en
+        cascada (reservas.services.cancelaciones).
+        
+        Args:
+            vuelo_ids (List[int]): IDs de los vuelos
+            
+        Returns:
+            dict: Cantidades 'procesadas' y 'omitidas'
+        """
+        with transaction.atomic():
+            vuelos = VueloRepository.bloquear_varios(vuelo_ids, ['programado', 'en_vuelo'])
+            ids = [vuelo_id for vuelo_id, _ in vuelos]
+            VueloRepository.cambiar_estado_varios(ids, 'cancelado')
+            
+            if any(estado == 'programado' for _, estado in vuelos):
+                transaction.on_commit(VueloService.invalidar_contadores)
+            
+            publicar_varios(
+                VueloEstadoCambiado(vuelo_id=vuelo_id, estado_anterior=estado, estado_nuevo='cancelado')
+                for vuelo_id, estado in vuelos
+            )
+        return OperacionMasivaService._resultado(vuelo_ids, ids)
+    
+    @staticmethod
+    def _resultado(solicitados: List[int], procesados: List[int]) -> dict:
+        """Arma el resumen de una operación masiva."""
+        return {
+            'procesadas': len(procesados),
+            'omitidas': len(set(solicitados)) - len(procesados),
+        }
@@ -5,12 +5,22 @@ Este archivo implementa la capa de servicios del patrón Vista-Servicio-Reposito
 Los servicios contienen la lógica de negocio y orquestan las operaciones.
 """
 
+from decimal import Decimal
+
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.utils import timezone
 from typing import List
 from reservas.models import Reserva
 from reservas.repositories.reservas import ReservaRepository
 from vuelos.repositories.vuelos import VueloRepository, AsientoRepository
+from vuelos.services.tarifas import TarifaService
+from vuelos.services.vuelos import AsientoService
+from eventos.bus import publicar, publicar_varios
+from eventos.dominio import ReservaCancelada, ReservaConfirmada, ReservaCreada, ReservaExpirada
+from aerolinea.metricas import (
+    BARRIDO_EXPIRADAS_DURACION, RESERVAS_DURACION, RESERVAS_EXPIRADAS, RESERVAS_OPERACIONES, medir,
+)
 
 
 class ReservaService:
@@ -18,16 +28,22 @@ class ReservaService:
     
     @staticmethod
     def crear_reserva(usuario_id: int, pasajero_id: int, vuelo_id: int, 
-                      asiento_id: int = None, precio_final: float = None) -> Reserva:
+                      asiento_id: int = None, precio_final: float = None,
+                      tipo_asiento: str = None, preferencia: str = None) -> Reserva:
         """
         Crea una nueva reserva con validaciones de negocio.
         
+        Si no se indica un asiento, se asigna automáticamente el mejor
+        asiento libre del vuelo según cabina y preferencia.
+        
         Args:
             usuario_id (int): ID del usuario que hace la reserva
             pasajero_id (int): ID del pasajero
             vuelo_id (int): ID del vuelo
             asiento_id (int): ID del asiento (opcional)
             precio_final (float): Precio final de la reserva
+            tipo_asiento (str): Cabina para la asignación automática (opcional)
+            preferencia (str): 'ventanilla' o 'pasillo' para la asignación automática
             
         Returns:
             Reserva: La reserva creada
@@ -35,29 +51,97 @@ class ReservaService:
         Raises:
             ValidationError: Si los datos no son válidos
         """
-        # Validaciones de negocio
-        ReservaService._validar_vuelo_disponible(vuelo_id)
-        ReservaService._validar_asiento_disponible(asiento_id, vuelo_id)
-        ReservaService._validar_pasajero_valido(pasajero_id)
-        
-        # Calcular precio final si no se proporciona
-        if precio_final is None:
-            precio_final = ReservaService._calcular_precio_final(vuelo_id, asiento_id)
-        
-        # Crear reserva
-        reserva = ReservaRepository.crear(
+        reservas = ReservaService.crear_reservas_grupo(
             usuario_id=usuario_id,
-            pasajero_id=pasajero_id,
+            pasajero_ids=[pasajero_id],
             vuelo_id=vuelo_id,
-            asiento_id=asiento_id,
-            estado='pendiente',
-            precio_final=precio_final
+            asiento_ids=[asiento_id] if asiento_id else None,
+            precio_final=precio_final,
+            tipo_asiento=tipo_asiento,
+            preferencia=preferencia
         )
+        return reservas[0]
+    
+    @staticmethod
+    @medir(RESERVAS_DURACION, RESERVAS_OPERACIONES, operacion='crear', origen='servicio')
+    def crear_reservas_grupo(usuario_id: int, pasajero_ids: List[int], vuelo_id: int,
+                             asiento_ids: List[int] = None, precio_final: float = None,
+                             tipo_asiento: str = None, preferencia: str = None) -> List[Reserva]:
+        """
+        Crea las reservas de un grupo de pasajeros en un mismo vuelo.
         
-        # Lógica adicional post-creación
-        ReservaService._procesar_reserva_creada(reserva)
+        Cuando no se indican asientos, el grupo se ubica junto (misma fila
+        o filas consecutivas) usando el motor de asignación en memoria.
+        La asignación y la creación ocurren en una sola transacción con el
+        vuelo bloqueado, para que dos grupos no reciban los mismos asientos.
         
-        return reserva
+        Args:
+            usuario_id (int): ID del usuario que hace la reserva
+            pasajero_ids (List[int]): IDs de los pasajeros
+            vuelo_id (int): ID del vuelo
+            asiento_ids (List[int]): IDs de asientos, uno por pasajero (opcional)
+            precio_final (float): Precio final por reserva (opcional)
+            tipo_asiento (str): Cabina para la asignación automática (opcional)
+            preferencia (str): 'ventanilla' o 'pasillo' para la asignación automática
+            
+        Returns:
+            List[Reserva]: Reservas creadas, en el orden de los pasajeros
+            
+        Raises:
+            ValidationError: Si los datos no son válidos
+        """
+        if not pasajero_ids:
+            raise ValidationError("Debe indicar al menos un pasajero")
+        if asiento_ids and len(asiento_ids) != len(pasajero_ids):
+            raise ValidationError("Debe indicar un asiento por pasajero")
+        if asiento_ids and len(set(asiento_ids)) != len(asiento_ids):
+            raise ValidationError("No puede repetir asientos dentro del grupo")
+        
+        # Validaciones de negocio
+        ReservaService._validar_vuelo_disponible(vuelo_id)
+        for pasajero_id in pasajero_ids:
+            ReservaService._validar_pasajero_valido(pasajero_id)
+        
+        with transaction.atomic():
+            # Bloquear el vuelo serializa las asignaciones concurrentes
+            VueloRepository.obtener_para_actualizar(vuelo_id)
+            
+            if asiento_ids:
+                for asiento_id in asiento_ids:
+                    ReservaService._validar_asiento_disponible(asiento_id, vuelo_id)
+            else:
+                asiento_ids = AsientoService.asignar_automaticamente(
+                    vuelo_id,
+                    cantidad=len(pasajero_ids),
+                    tipo=tipo_asiento,
+                    preferencia=preferencia
+                )
+            
+            reservas = []
+            for pasajero_id, asiento_id in zip(pasajero_ids, asiento_ids):
+                # Calcular precio final si no se proporciona
+                precio = precio_final
+                if precio is None:
+                    precio = ReservaService._calcular_precio_final(vuelo_id, asiento_id)
+                
+                reservas.append(ReservaRepository.crear(
+                    usuario_id=usuario_id,
+                    pasajero_id=pasajero_id,
+                    vuelo_id=vuelo_id,
+                    asiento_id=asiento_id,
+                    estado='pendiente',
+                    precio_final=precio
+                ))
+            
+            # Los suscriptores reciben el grupo entero después del commit
+            publicar_varios(
+                ReservaCreada(
+                    reserva_id=r.id, vuelo_id=vuelo_id, pasajero_id=r.pasajero_id, usuario_id=usuario_id
+                )
+                for r in reservas
+            )
+        
+        return reservas
     
     @staticmethod
     def obtener_reserva(reserva_id: int) -> Reserva | None:
@@ -115,12 +199,14 @@ class ReservaService:
             return ReservaRepository.obtener_reservas_activas()
     
     @staticmethod
-    def confirmar_reserva(reserva_id: int) -> Reserva | None:
+    @medir(RESERVAS_DURACION, RESERVAS_OPERACIONES, operacion='confirmar', origen='servicio')
+    def confirmar_reserva(reserva_id: int, usuario_id: int = None) -> Reserva | None:
         """
         Confirma una reserva.
         
         Args:
             reserva_id (int): ID de la reserva
+            usuario_id (int): Usuario que confirma (para la auditoría)
             
         Returns:
             Reserva: Reserva confirmada
@@ -137,15 +223,24 @@ class ReservaService:
         ReservaService._validar_puede_confirmar(reserva)
         
         # Confirmar reserva
-        return ReservaRepository.actualizar(reserva, estado='confirmada')
+        with transaction.atomic():
+            reserva = ReservaRepository.actualizar(reserva, estado='confirmada')
+            # El email de confirmación lo encola un suscriptor en cola
+            # (reservas.suscriptores), fuera de la solicitud
+            publicar(ReservaConfirmada(
+                reserva_id=reserva.id, vuelo_id=reserva.vuelo_id, usuario_id=usuario_id
+            ))
+        return reserva
     
     @staticmethod
-    def cancelar_reserva(reserva_id: int) -> Reserva | None:
+    @medir(RESERVAS_DURACION, RESERVAS_OPERACIONES, operacion='cancelar', origen='servicio')
+    def cancelar_reserva(reserva_id: int, usuario_id: int = None) -> Reserva | None:
         """
         Cancela una reserva.
         
         Args:
             reserva_id (int): ID de la reserva
+            usuario_id (int): Usuario que cancela (para la auditoría)
             
         Returns:
             Reserva: Reserva cancelada
@@ -162,7 +257,14 @@ class ReservaService:
         ReservaService._validar_puede_cancelar(reserva)
         
         # Cancelar reserva
-        return ReservaRepository.actualizar(reserva, estado='cancelada')
+        estado_anterior = reserva.estado
+        with transaction.atomic():
+            reserva = ReservaRepository.actualizar(reserva, estado='cancelada')
+            publicar(ReservaCancelada(
+                reserva_id=reserva.id, vuelo_id=reserva.vuelo_id,
+                estado_anterior=estado_anterior, usuario_id=usuario_id
+            ))
+        return reserva
     
     @staticmethod
     def actualizar_reserva(reserva_id: int, **datos_actualizacion) -> Reserva | None:
@@ -226,6 +328,7 @@ class ReservaService:
         return ReservaRepository.obtener_estadisticas()
     
     @staticmethod
+    @medir(BARRIDO_EXPIRADAS_DURACION, origen='servicio')
     def limpiar_reservas_expiradas() -> int:
         """
         Limpia las reservas expiradas.
@@ -236,9 +339,14 @@ class ReservaService:
         reservas_expiradas = ReservaRepository.obtener_reservas_expiradas()
         count = len(reservas_expiradas)
         
-        for reserva in reservas_expiradas:
-            ReservaRepository.actualizar(reserva, estado='expirada')
+        with transaction.atomic():
+            for reserva in reservas_expiradas:
+                ReservaRepository.actualizar(reserva, estado='expirada')
+            publicar_varios(
+                ReservaExpirada(reserva_id=r.id, vuelo_id=r.vuelo_id) for r in reservas_expiradas
+            )
         
+        RESERVAS_EXPIRADAS.labels(origen='servicio').inc(count)
         return count
     
     @staticmethod
@@ -270,27 +378,14 @@ class ReservaService:
             raise ValidationError("Pasajero no encontrado")
     
     @staticmethod
-    def _calcular_precio_final(vuelo_id: int, asiento_id: int = None) -> float:
-        """Calcula el precio final de la reserva."""
-        vuelo = VueloRepository.obtener_por_id(vuelo_id)
-        if not vuelo:
-            raise ValidationError("Vuelo no encontrado")
-        
-        precio_final = vuelo.precio_base
-        
-        # Aplicar recargos por clase de asiento si se especifica
+    def _calcular_precio_final(vuelo_id: int, asiento_id: int = None) -> Decimal:
+        """Precio vigente de la cabina del asiento (ver vuelos.services.tarifas)."""
+        tipo = 'economica'
         if asiento_id:
             asiento = AsientoRepository.obtener_por_id(asiento_id)
             if asiento:
-                from decimal import Decimal
-                if asiento.clase == 'primera':
-                    precio_final *= Decimal('2.5')
-                elif asiento.clase == 'business':
-                    precio_final *= Decimal('1.8')
-                elif asiento.clase == 'economica':
-                    precio_final *= Decimal('1.0')
-        
-        return precio_final
+                tipo = asiento.tipo
+        return TarifaService.precio(vuelo_id, tipo)
     
     @staticmethod
     def _validar_puede_confirmar(reserva: Reserva):
@@ -325,12 +420,3 @@ class ReservaService:
             estados_validos = ['pendiente', 'confirmada', 'cancelada', 'expirada']
             if datos['estado'] not in estados_validos:
                 raise ValidationError("Estado de reserva no válido")
-    
-    @staticmethod
-    def _procesar_reserva_creada(reserva: Reserva):
-        """Procesa acciones adicionales después de crear una reserva."""
-        # Aquí se pueden agregar acciones como:
-        # - Enviar email de confirmación
-        # - Actualizar estadísticas
-        # - Notificar al sistema de pagos
-        pass 
\ No newline at end of file
@@ -0,0 +1,297 @@
+"""
+Servicio para la reubicación masiva de pasajeros.
+
+Este archivo implementa la capa de servicios del patrón Vista-Servicio-Repositorio.
+Los servicios contienen la lógica de negocio y orquestan las operaciones.
+
+Toma los pasajeros desplazados de un vuelo cancelado o sobrevendido y los
+reubica en vuelos alternativos de la misma ruta:
+1. Busca alternativas con la capa de búsqueda de vuelos, dentro de una
+   ventana alrededor de la salida original.
+2. Carga los mapas de asientos de todas las alternativas con dos consultas
+   y arma el plan en memoria: primero se respeta la cabina original y,
+   entre los vuelos que la tienen, se elige el de llegada más temprana.
+   Si ninguna alternativa tiene lugar en esa cabina, se usa cualquier
+   cabina del vuelo que llegue antes.
+3. Confirma el plan por lotes, cada uno en su propia transacción con los
+   vuelos bloqueados, volviendo a verificar que los asientos sigan libres.
+
+Cada reserva nueva apunta a la original (reubicada_desde), así que volver
+a ejecutar la reubicación solo procesa a los que quedaron sin lugar.
+"""
+
+import logging
+import uuid
+from collections import Counter
+from datetime import timedelta
+from typing import List
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from eventos.bus import publicar_varios
+from eventos.dominio import ReservaCancelada, ReservaConfirmada, ReservaCreada
+from reservas.models import Reserva
+from reservas.repositories.reservas import (
+    BoletoRepository, CancelacionVueloRepository, ReservaRepository,
+)
+from vuelos.repositories.vuelos import AsientoRepository, VueloRepository
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReubicacionService:
+    """Servicio para la reubicación masiva de pasajeros desplazados."""
+    
+    @staticmethod
+    def programar(vuelo_id: int):
+        """
+        Programa la reubicación de un vuelo en segundo plano.
+        
+        Args:
+            vuelo_id (int): ID del vuelo
+        """
+        from aerolinea.tareas import encolar
+        transaction.on_commit(lambda: encolar(
+            'reservas.services.reubicacion:ReubicacionService.reubicar_vuelo', vuelo_id
+        ))
+    
+    @staticmethod
+    def reubicar_vuelo(vuelo_id: int, ventana_horas: int = None, tamano_lote: int = None) -> dict:
+        """
+        Reubica los pasajeros desplazados de un vuelo.
+        
+        Args:
+            vuelo_id (int): ID del vuelo cancelado o sobrevendido
+            ventana_horas (int): Horas alrededor de la salida original en que
+                se buscan alternativas (default REUBICACION_VENTANA_HORAS)
+            tamano_lote (int): Reservas por transacción (default REUBICACION_TAMANO_LOTE)
+            
+        Returns:
+            dict: Cantidades 'desplazados', 'reubicados' y 'sin_lugar'
+            
+        Raises:
+            ValidationError: Si el vuelo no existe
+        """
+        vuelo = VueloRepository.obtener_por_id(vuelo_id)
+        if not vuelo:
+            raise ValidationError("Vuelo no encontrado")
+        
+        ventana_horas = ventana_horas or getattr(settings, 'REUBICACION_VENTANA_HORAS', 48)
+        tamano_lote = tamano_lote or getattr(settings, 'REUBICACION_TAMANO_LOTE', 100)
+        
+        desplazadas = ReservaRepository.obtener_desplazadas(
+            vuelo.id, vuelo.estado == 'cancelado', vuelo.avion.capacidad
+        )
+        resultado = {'desplazados': len(desplazadas), 'reubicados': 0, 'sin_lugar': 0}
+        if not desplazadas:
+            return resultado
+        
+        alternativas = ReubicacionService.buscar_alternativas(vuelo, ventana_horas)
+        plan = ReubicacionService.planificar(
+            desplazadas,
+            alternativas,
+            AsientoRepository.obtener_mapas_vuelos(alternativas),
+            ReservaRepository.pasajeros_con_reserva_activa([v.id for v in alternativas])
+        )
+        
+        salidas = {alternativa.id: alternativa.fecha_salida for alternativa in alternativas}
+        for inicio in range(0, len(plan), tamano_lote):
+            resultado['reubicados'] += ReubicacionService._confirmar_lote(
+                vuelo, plan[inicio:inicio + tamano_lote], salidas
+            )
+        resultado['sin_lugar'] = resultado['desplazados'] - resultado['reubicados']
+        
+        logger.info(
+            f"Reubicación del vuelo {vuelo.id}: {resultado['reubicados']} de "
+            f"{resultado['desplazados']} pasajeros reubicados"
+        )
+        return resultado
+    
+    @staticmethod
+    def buscar_alternativas(vuelo, ventana_horas: int) -> list:
+        """
+        Busca vuelos programados de la misma ruta dentro de la ventana.
+        
+        Args:
+            vuelo: Vuelo original
+            ventana_horas (int): Horas antes y después de la salida original
+            
+        Returns:
+            list[Vuelo]: Alternativas ordenadas por llegada
+        """
+        ventana = timedelta(hours=ventana_horas)
+        desde = max(timezone.now(), vuelo.fecha_salida - ventana)
+        hasta = vuelo.fecha_salida + ventana
+        candidatos = VueloRepository.buscar_disponibles({
+            'origen': vuelo.origen,
+            'destino': vuelo.destino,
+            'fecha_desde': timezone.localdate(desde),
+            'fecha_hasta': timezone.localdate(hasta),
+        })
+        # La búsqueda filtra por día y por coincidencia parcial de ciudades
+        alternativas = [
+            candidato for candidato in candidatos
+            if candidato.id != vuelo.id
+            and candidato.origen == vuelo.origen and candidato.destino == vuelo.destino
+            and desde <= candidato.fecha_salida <= hasta
+        ]
+        return sorted(alternativas, key=lambda v: (v.fecha_llegada, v.id))
+    
+    @staticmethod
+    def planificar(desplazadas: List[dict], alternativas: list, mapas: dict,
+                   pasajeros_en_vuelo: set) -> List[tuple]:
+        """
+        Asigna en memoria un vuelo y un asiento a cada reserva desplazada.
+        
+        Las reservas se recorren en el orden recibido (prioridad). Los mapas
+        y el conjunto de pasajeros se actualizan a medida que se asigna.
+        
+        Args:
+            desplazadas (List[dict]): Reservas a reubicar (ver obtener_desplazadas)
+            alternativas (list): Vuelos alternativos ordenados por llegada
+            mapas (dict): vuelo_id -> MapaAsientos
+            pasajeros_en_vuelo (set): Pares (vuelo_id, pasajero_id) ya reservados
+            
+        Returns:
+            List[tuple]: (reserva, vuelo_id, asiento_id) por reserva reubicada
+        """
+        plan = []
+        for reserva in desplazadas:
+            candidatos = [
+                alternativa.id for alternativa in alternativas
+                if (alternativa.id, reserva['pasajero_id']) not in pasajeros_en_vuelo
+            ]
+            cabina = reserva['asiento__tipo']
+            asignacion = None
+            # Paridad de cabina primero; si no hay lugar, cualquier cabina
+            for tipo in ([cabina] if cabina else []) + [None]:
+                for vuelo_id in candidatos:
+                    mapa = mapas[vuelo_id]
+                    if mapa.disponibles(tipo):
+                        asignacion = (vuelo_id, mapa.asignar(1, tipo=tipo)[0])
+                        break
+                if asignacion:
+                    break
+            if asignacion:
+                plan.append((reserva,) + asignacion)
+                pasajeros_en_vuelo.add((asignacion[0], reserva['pasajero_id']))
+        return plan
+    
+    @staticmethod
+    def _confirmar_lote(vuelo_original, lote: List[tuple], salidas: dict) -> int:
+        """Crea las reservas de un lote del plan en una transacción."""
+        with transaction.atomic():
+            # Bloquear los vuelos serializa con las reservas de la web
+            vuelo_ids = sorted({vuelo_id for _, vuelo_id, _ in lote})
+            abiertos = {vuelo_id for vuelo_id, _ in VueloRepository.bloquear_varios(vuelo_ids, ['programado'])}
+            tomados = ReservaRepository.asientos_ocupados(
+                vuelo_ids, [asiento_id for _, _, asiento_id in lote]
+            )
+            # Las reservas canceladas también ocupan (vuelo, pasajero, asiento)
+            usadas = ReservaRepository.combinaciones_existentes(
+                vuelo_ids, [reserva['pasajero_id'] for reserva, _, _ in lote]
+            )
+            originales = {
+                reserva['id']: reserva
+                for reserva in ReservaRepository.bloquear_varias(
+                    [reserva['id'] for reserva, _, _ in lote], ['pendiente', 'confirmada', 'cancelada']
+                )
+            }
+            validos = [
+                (reserva, vuelo_id, asiento_id) for reserva, vuelo_id, asiento_id in lote
+                if vuelo_id in abiertos and (vuelo_id, asiento_id) not in tomados
+                and (vuelo_id, reserva['pasajero_id'], asiento_id) not in usadas
+                and reserva['id'] in originales
+            ]
+            if not validos:
+                return 0
+            
+            ahora = timezone.now()
+            nuevas = ReubicacionService._asignar_codigos([
+                Reserva(
+                    vuelo_id=vuelo_id,
+                    pasajero_id=reserva['pasajero_id'],
+                    asiento_id=asiento_id,
+                    estado=ReubicacionService._estado_a_conservar(originales[reserva['id']]),
+                    precio=reserva['precio'],
+                    fecha_vencimiento=ahora + timedelta(hours=24),
+                    reubicada_desde_id=reserva['id'],
+                    observaciones=f"Reubicada desde el vuelo {vuelo_original.id}",
+                )
+                for reserva, vuelo_id, asiento_id in validos
+            ])
+            nuevas = ReservaRepository.crear_varias(nuevas)
+            confirmadas = [nueva for nueva in nuevas if nueva.estado == 'confirmada']
+            AsientoRepository.cambiar_estado_varios([n.asiento_id for n in confirmadas], 'ocupado')
+            AsientoRepository.cambiar_estado_varios(
+                [n.asiento_id for n in nuevas if n.estado == 'pendiente'], 'reservado'
+            )
+            BoletoRepository.emitir_varios([
+                {'id': nueva.id, 'vuelo__fecha_salida': salidas[nueva.vuelo_id]} for nueva in confirmadas
+            ])
+            
+            # Las originales quedan canceladas y sin reembolso: el valor pasa a la nueva
+            ids_originales = [reserva['id'] for reserva, _, _ in validos]
+            activas = [originales[i] for i in ids_originales if originales[i]['estado'] != 'cancelada']
+            reembolsadas = [
+                originales[i] for i in ids_originales
+                if originales[i]['estado'] == 'cancelada' and originales[i]['monto_reembolso']
+            ]
+            ReservaRepository.cancelar_con_reembolso([r['id'] for r in activas], 0)
+            ReservaRepository.anular_reembolsos([r['id'] for r in reembolsadas])
+            if reembolsadas:
+                # La cascada ya sumó (y avisó) estos reembolsos
+                CancelacionVueloRepository.descontar_reembolso(
+                    vuelo_original.id, sum(r['monto_reembolso'] for r in reembolsadas)
+                )
+            BoletoRepository.cambiar_estado_por_reservas(ids_originales, 'cancelado', ['emitido'])
+            AsientoRepository.liberar_varios([r['asiento_id'] for r in activas if r['asiento_id']])
+            
+            publicar_varios(
+                ReservaCancelada(reserva_id=r['id'], vuelo_id=r['vuelo_id'], estado_anterior=r['estado'])
+                for r in activas
+            )
+            publicar_varios(
+                ReservaCreada(reserva_id=n.id, vuelo_id=n.vuelo_id, pasajero_id=n.pasajero_id)
+                for n in nuevas
+            )
+            publicar_varios(
+                ReservaConfirmada(reserva_id=n.id, vuelo_id=n.vuelo_id) for n in confirmadas
+            )
+        return len(nuevas)
+    
+    @staticmethod
+    def _estado_a_conservar(original: dict) -> str:
+        """
+        Estado de la reserva nueva: el que tenía la original antes de cancelarse.
+        
+        La cascada de cancelación deja todas las reservas en 'cancelada' y
+        guarda el estado previo; sin ese dato se usa 'pendiente' para no
+        emitir boletos de reservas que nunca se confirmaron.
+        """
+        if original['estado'] != 'cancelada':
+            return original['estado']
+        return original['estado_antes_cancelacion'] or 'pendiente'
+    
+    @staticmethod
+    def _asignar_codigos(reservas: List[Reserva]) -> List[Reserva]:
+        """
+        Genera códigos de reserva que no choquen entre sí ni con los existentes.
+        
+        bulk_create no llama a save() y el código es único: un choque
+        abortaría el lote entero, así que se regeneran los repetidos.
+        """
+        pendientes = reservas
+        while pendientes:
+            for reserva in pendientes:
+                reserva.codigo_reserva = str(uuid.uuid4())[:8].upper()
+            usos = Counter(reserva.codigo_reserva for reserva in reservas)
+            repetidos = ReservaRepository.codigos_existentes(list(usos)) | {
+                codigo for codigo, cantidad in usos.items() if cantidad > 1
+            }
+            pendientes = [reserva for reserva in pendientes if reserva.codigo_reserva in repetidos]
+        return reservas
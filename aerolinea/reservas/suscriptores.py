@@ -0,0 +1,84 @@
+"""
+Suscriptores de eventos de reservas.
+
+Centraliza los efectos secundarios de los cambios de estado de una reserva
+(auditoría, emails) para que servicios, vistas y admin solo publiquen el
+evento. Se registran al iniciar la aplicación (ReservasConfig.ready).
+"""
+
+from eventos.bus import suscribir
+from eventos.dominio import (
+    ReservaCancelada, ReservaConfirmada, ReservaCreada, ReservaExpirada, VueloEstadoCambiado,
+)
+from aerolinea.email_config import EmailService
+from aerolinea.logging_config import log_reservation_action
+from usuarios.models import Usuario
+from .models import Reserva
+
+
+ACCIONES = {
+    'ReservaCreada': 'Reserva creada',
+    'ReservaConfirmada': 'Reserva confirmada',
+    'ReservaCancelada': 'Reserva cancelada',
+    'ReservaExpirada': 'Reserva expirada',
+}
+
+
+@suscribir(ReservaCreada, ReservaConfirmada, ReservaCancelada, ReservaExpirada)
+def auditar_reservas(eventos):
+    """
+    Registra en el log de reservas cada cambio de estado.
+
+    Se consultan de una vez las reservas y los usuarios del lote, y se
+    registran los mismos detalles que antes escribían las vistas.
+    """
+    accion = ACCIONES[eventos[0].nombre()]
+    reservas = Reserva.objects.filter(
+        id__in=[evento.reserva_id for evento in eventos]
+    ).select_related('vuelo', 'asiento', 'boleto')
+    reservas = {reserva.id: reserva for reserva in reservas}
+    usuarios = Usuario.objects.in_bulk(
+        {evento.usuario_id for evento in eventos if getattr(evento, 'usuario_id', None)}
+    )
+
+    for evento in eventos:
+        reserva = reservas.get(evento.reserva_id)
+        if reserva is None:
+            continue
+        log_reservation_action(
+            reservation=reserva,
+            action=accion,
+            user=usuarios.get(getattr(evento, 'usuario_id', None)),
+            details=_detalles(evento, reserva)
+        )
+
+
+def _detalles(evento, reserva) -> str:
+    """Detalles de auditoría según el tipo de evento."""
+    if isinstance(evento, ReservaCreada):
+        return f'Vuelo: {reserva.vuelo.origen}→{reserva.vuelo.destino}, Asiento: {reserva.asiento.numero}'
+    if isinstance(evento, ReservaConfirmada):
+        boleto = getattr(reserva, 'boleto', None)
+        return f'Boleto generado: {boleto.codigo_barra}' if boleto else None
+    if isinstance(evento, ReservaCancelada):
+        return f'Estado anterior: {evento.estado_anterior}'
+    return None
+
+
+@suscribir(ReservaConfirmada, cola=True)
+def enviar_confirmaciones(eventos):
+    """Encola el email de confirmación de las reservas confirmadas."""
+    reservas = Reserva.objects.filter(
+        id__in=[evento.reserva_id for evento in eventos], estado='confirmada'
+    ).select_related('vuelo', 'pasajero', 'asiento')
+    for reserva in reservas:
+        EmailService.send_reservation_confirmation(reserva, reserva.pasajero)
+
+
+@suscribir(VueloEstadoCambiado, cola=True)
+def cancelar_reservas_de_vuelos(eventos):
+    """Inicia la cancelación en cascada de los vuelos cancelados."""
+    from .services.cancelaciones import CancelacionVueloService
+    for evento in eventos:
+        if evento.estado_nuevo == 'cancelado':
+            CancelacionVueloService.iniciar(evento.vuelo_id, evento.estado_anterior)
@@ -0,0 +1,17 @@
+"""
+Tareas de Celery para reservas.
+
+Solo se importan cuando Celery está instalado. Sin Celery, las
+cancelaciones interrumpidas se reanudan con el comando
+``reanudar_cancelaciones``.
+"""
+
+from celery import shared_task
+
+from reservas.services.cancelaciones import CancelacionVueloService
+
+
+@shared_task(ignore_result=True)
+def reanudar_cancelaciones_inactivas():
+    """Vuelve a encolar las cancelaciones en cascada que dejaron de avanzar."""
+    return CancelacionVueloService.reanudar_inactivas()
@@ -8,7 +8,7 @@ Este módulo contiene tests para:
 - Validaciones de reservas
 """
 
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth import get_user_model
@@ -590,3 +590,549 @@ class ReservaIntegrationTest(TestCase):
         # Verificar que el asiento fue liberado
         self.asiento.refresh_from_db()
         self.assertEqual(self.asiento.estado, 'disponible')
+
+
+class AsignacionAutomaticaTest(TestCase):
+    """Tests para la asignación automática de asientos al reservar."""
+    
+    def setUp(self):
+        """Configuración inicial para los tests."""
+        # bulk_create evita la generación automática de asientos del signal,
+        # para trabajar con un mapa de asientos controlado
+        self.avion = Avion.objects.bulk_create([
+            Avion(modelo='Embraer 190', capacidad=24, filas=6, columnas=4)
+        ])[0]
+        Asiento.objects.bulk_create([
+            Asiento(
+                avion=self.avion,
+                numero=f'{columna}{fila}',
+                fila=fila,
+                columna=columna,
+                tipo='premium' if fila == 1 else 'economica'
+            )
+            for fila in range(1, 7) for columna in 'ABCD'
+        ])
+        
+        self.vuelo = Vuelo.objects.create(
+            avion=self.avion,
+            origen='Buenos Aires',
+            destino='Mendoza',
+            fecha_salida=timezone.now() + timedelta(days=3),
+            fecha_llegada=timezone.now() + timedelta(days=3, hours=2),
+            duracion='2:00',
+            estado='programado',
+            precio_base=40000
+        )
+        
+        self.pasajeros = [
+            Pasajero.objects.create(
+                nombre=f'Pasajero{i}',
+                apellido='Grupo',
+                documento=f'3000000{i}',
+                email=f'p{i}@example.com',
+                fecha_nacimiento='1990-01-01'
+            )
+            for i in range(3)
+        ]
+    
+    def test_crear_reserva_sin_asiento_asigna_uno(self):
+        """Sin asiento_id, la reserva recibe un asiento libre de la cabina pedida."""
+        from reservas.services.reservas import ReservaService
+        
+        reserva = ReservaService.crear_reserva(
+            usuario_id=None,
+            pasajero_id=self.pasajeros[0].id,
+            vuelo_id=self.vuelo.id,
+            tipo_asiento='premium',
+            preferencia='ventanilla'
+        )
+        
+        self.assertEqual(reserva.asiento.tipo, 'premium')
+        self.assertIn(reserva.asiento.columna, 'AD')
+        self.assertEqual(reserva.estado, 'pendiente')
+    
+    def test_grupo_sentado_junto_sin_repetir_asientos(self):
+        """Un grupo queda en la misma fila y no reutiliza asientos ocupados."""
+        from reservas.services.reservas import ReservaService
+        
+        primera = ReservaService.crear_reserva(
+            usuario_id=None,
+            pasajero_id=self.pasajeros[0].id,
+            vuelo_id=self.vuelo.id,
+            tipo_asiento='economica'
+        )
+        grupo = ReservaService.crear_reservas_grupo(
+            usuario_id=None,
+            pasajero_ids=[p.id for p in self.pasajeros[1:]],
+            vuelo_id=self.vuelo.id,
+            tipo_asiento='economica'
+        )
+        
+        asientos = [r.asiento for r in grupo]
+        self.assertEqual(len({a.fila for a in asientos}), 1)
+        self.assertNotIn(primera.asiento_id, [a.id for a in asientos])
+    
+    def test_sin_asientos_suficientes(self):
+        """Si la cabina no tiene lugar suficiente se rechaza la reserva."""
+        from django.core.exceptions import ValidationError
+        from reservas.services.reservas import ReservaService
+        
+        with self.assertRaises(ValidationError):
+            ReservaService.crear_reservas_grupo(
+                usuario_id=None,
+                pasajero_ids=[p.id for p in self.pasajeros] * 2,
+                vuelo_id=self.vuelo.id,
+                tipo_asiento='premium'
+            )
+        self.assertFalse(Reserva.objects.exists())
+    
+    def test_grupo_con_asientos_repetidos(self):
+        """Un mismo asiento no puede indicarse dos veces dentro del grupo."""
+        from django.core.exceptions import ValidationError
+        from reservas.services.reservas import ReservaService
+        
+        asiento = Asiento.objects.filter(avion=self.avion, tipo='economica').first()
+        
+        with self.assertRaises(ValidationError):
+            ReservaService.crear_reservas_grupo(
+                usuario_id=None,
+                pasajero_ids=[p.id for p in self.pasajeros[:2]],
+                vuelo_id=self.vuelo.id,
+                asiento_ids=[asiento.id, asiento.id]
+            )
+        self.assertFalse(Reserva.objects.exists())
+
+
+class OperacionMasivaTest(TestCase):
+    """Tests para las operaciones masivas del admin."""
+    
+    def setUp(self):
+        """Configuración inicial para los tests."""
+        self.avion = Avion.objects.bulk_create([
+            Avion(modelo='Embraer 190', capacidad=8, filas=2, columnas=4)
+        ])[0]
+        self.asientos = Asiento.objects.bulk_create([
+            Asiento(avion=self.avion, numero=f'M{i}', fila=1 + i // 4, columna='ABCD'[i % 4])
+            for i in range(8)
+        ])
+        self.vuelo = Vuelo.objects.create(
+            avion=self.avion,
+            origen='Buenos Aires',
+            destino='Salta',
+            fecha_salida=timezone.now() + timedelta(days=2),
+            fecha_llegada=timezone.now() + timedelta(days=2, hours=2),
+            duracion='2:00',
+            estado='programado',
+            precio_base=40000
+        )
+        self.reservas = [
+            Reserva.objects.create(
+                vuelo=self.vuelo,
+                pasajero=Pasajero.objects.create(
+                    nombre=f'Masivo{i}', apellido='Test', documento=f'4000000{i}',
+                    email=f'm{i}@example.com', fecha_nacimiento='1990-01-01'
+                ),
+                asiento=self.asientos[i],
+                estado='pendiente',
+                precio=40000,
+                fecha_vencimiento=timezone.now() + timedelta(hours=24)
+            )
+            for i in range(4)
+        ]
+    
+    def ids(self, reservas):
+        return [reserva.id for reserva in reservas]
+    
+    def test_confirmar_con_consultas_constantes(self):
+        """Confirmar ocupa asientos y emite boletos sin depender de la cantidad."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from reservas.services.masivas import OperacionMasivaService
+        
+        with CaptureQueriesContext(connection) as una:
+            OperacionMasivaService.confirmar_reservas(self.ids(self.reservas[:1]))
+        with CaptureQueriesContext(connection) as tres:
+            resultado = OperacionMasivaService.confirmar_reservas(self.ids(self.reservas))
+        
+        self.assertEqual(resultado, {'procesadas': 3, 'omitidas': 1})
+        self.assertEqual(len(una), len(tres))
+        self.assertEqual(Boleto.objects.filter(reserva__in=self.reservas).count(), 4)
+        self.assertEqual(Asiento.objects.filter(id__in=self.ids(self.asientos[:4]), estado='ocupado').count(), 4)
+    
+    def test_cancelar_libera_asientos_y_anula_boletos(self):
+        """Cancelar anula boletos y libera solo los asientos sin otra reserva activa."""
+        from reservas.services.masivas import OperacionMasivaService
+        
+        OperacionMasivaService.confirmar_reservas(self.ids(self.reservas[:2]))
+        # Otra reserva activa usa el asiento de la primera
+        Reserva.objects.filter(id=self.reservas[2].id).update(asiento=self.asientos[0])
+        
+        resultado = OperacionMasivaService.cancelar_reservas(self.ids(self.reservas[:2]))
+        
+        self.assertEqual(resultado['procesadas'], 2)
+        self.assertEqual(Reserva.objects.filter(id__in=self.ids(self.reservas[:2]), estado='cancelada').count(), 2)
+        self.assertFalse(Boleto.objects.filter(reserva__in=self.reservas[:2]).exclude(estado='cancelado').exists())
+        self.asientos[0].refresh_from_db()
+        self.asientos[1].refresh_from_db()
+        self.assertEqual(self.asientos[0].estado, 'ocupado')
+        self.assertEqual(self.asientos[1].estado, 'disponible')
+
+    def test_auditoria_registra_usuario_y_detalles(self):
+        """El log de auditoría conserva el usuario y los detalles de la operación."""
+        from reservas.services.masivas import OperacionMasivaService
+
+        admin = Usuario.objects.create_user(username='auditor', password='x', rol='admin')
+        with self.assertLogs('reservas', 'INFO') as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                OperacionMasivaService.confirmar_reservas(self.ids(self.reservas[:2]), admin.id)
+            with self.captureOnCommitCallbacks(execute=True):
+                OperacionMasivaService.cancelar_reservas(self.ids(self.reservas[:1]))
+
+        confirmadas = [linea for linea in logs.output if 'Reserva confirmada' in linea]
+        self.assertEqual(len(confirmadas), 2)
+        self.assertTrue(all('Usuario: auditor' in linea and 'Boleto generado:' in linea for linea in confirmadas))
+        cancelada = [linea for linea in logs.output if 'Reserva cancelada' in linea]
+        self.assertEqual(len(cancelada), 1)
+        self.assertIn('Sistema', cancelada[0])
+        self.assertIn('Estado anterior: confirmada', cancelada[0])
+
+    def test_cancelar_vuelos_publica_eventos(self):
+        """Cancelar vuelos publica un lote de VueloEstadoCambiado y omite los ya cancelados."""
+        from eventos import bus
+        from eventos.dominio import VueloEstadoCambiado
+        from reservas.services.masivas import OperacionMasivaService
+        
+        recibidos = []
+        bus.suscribir(VueloEstadoCambiado)(recibidos.append)
+        self.addCleanup(bus.desuscribir, recibidos.append)
+        
+        with self.settings(TAREAS_MODO='sincrono'), self.captureOnCommitCallbacks(execute=True):
+            primero = OperacionMasivaService.cancelar_vuelos([self.vuelo.id])
+        segundo = OperacionMasivaService.cancelar_vuelos([self.vuelo.id])
+        
+        self.assertEqual(primero, {'procesadas': 1, 'omitidas': 0})
+        self.assertEqual(segundo, {'procesadas': 0, 'omitidas': 1})
+        self.assertEqual(recibidos, [[VueloEstadoCambiado(self.vuelo.id, 'programado', 'cancelado')]])
+        self.vuelo.refresh_from_db()
+        self.assertEqual(self.vuelo.estado, 'cancelado')
+
+
+@override_settings(TAREAS_MODO='sincrono', CANCELACION_TAMANO_LOTE=2, CANCELACION_PORCENTAJE_REEMBOLSO=80)
+class CancelacionVueloTest(TestCase):
+    """Tests para la cancelación en cascada de vuelos."""
+    
+    def setUp(self):
+        """Configuración inicial para los tests."""
+        avion = Avion.objects.bulk_create([
+            Avion(modelo='Embraer 190', capacidad=6, filas=1, columnas=6)
+        ])[0]
+        self.asientos = Asiento.objects.bulk_create([
+            Asiento(avion=avion, numero=f'C{c}', fila=1, columna=c, estado='ocupado') for c in 'ABCDEF'
+        ])
+        self.vuelo = Vuelo.objects.create(
+            avion=avion,
+            origen='Buenos Aires',
+            destino='Ushuaia',
+            fecha_salida=timezone.now() + timedelta(days=4),
+            fecha_llegada=timezone.now() + timedelta(days=4, hours=3),
+            duracion='3:00',
+            estado='programado',
+            precio_base=100000
+        )
+        estados = ['confirmada', 'pendiente', 'confirmada', 'confirmada', 'cancelada']
+        self.reservas = [
+            Reserva.objects.create(
+                vuelo=self.vuelo,
+                pasajero=Pasajero.objects.create(
+                    nombre=f'Cascada{i}', apellido='Test', documento=f'6000000{i}',
+                    email=f'c{i}@example.com', fecha_nacimiento='1990-01-01'
+                ),
+                asiento=self.asientos[i],
+                estado=estado,
+                precio=100000,
+                fecha_vencimiento=timezone.now() + timedelta(hours=24)
+            )
+            for i, estado in enumerate(estados)
+        ]
+        Boleto.objects.create(reserva=self.reservas[0], hora_embarque='09:00')
+    
+    def marcar_cancelado(self):
+        """Cancela el vuelo sin signals (sin iniciar la cascada)."""
+        Vuelo.objects.filter(id=self.vuelo.id).update(estado='cancelado')
+    
+    def test_cancelar_vuelo_cancela_reservas_por_lotes(self):
+        """Cancelar el vuelo cancela reservas, boletos y asientos y avisa con el reembolso."""
+        from notificaciones.models import EmailPendiente
+        from reservas.models import CancelacionVuelo
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vuelo.estado = 'cancelado'
+            self.vuelo.save()
+        
+        cancelacion = CancelacionVuelo.objects.get(vuelo=self.vuelo)
+        self.assertEqual(cancelacion.estado, 'completada')
+        self.assertEqual((cancelacion.total_reservas, cancelacion.reservas_procesadas), (4, 4))
+        self.assertEqual(cancelacion.progreso, 100)
+        self.assertEqual(cancelacion.reembolso_total, 320000)
+        
+        activas = Reserva.objects.filter(id__in=[r.id for r in self.reservas[:4]])
+        self.assertFalse(activas.exclude(estado='cancelada').exists())
+        self.assertEqual(activas.first().monto_reembolso, 80000)
+        self.assertIsNone(Reserva.objects.get(id=self.reservas[4].id).monto_reembolso)
+        self.assertEqual(Boleto.objects.get(reserva=self.reservas[0]).estado, 'cancelado')
+        self.assertEqual(Asiento.objects.filter(id__in=[a.id for a in self.asientos[:4]], estado='disponible').count(), 4)
+        
+        avisos = EmailPendiente.objects.order_by('destinatario')
+        self.assertEqual([a.destinatario for a in avisos], [f'c{i}@example.com' for i in range(4)])
+        self.assertIn('80000', avisos[0].cuerpo_html)
+    
+    def test_progreso_por_lote(self):
+        """Cada lote confirmado suma su avance al registro de la cancelación."""
+        from reservas.services.cancelaciones import CancelacionVueloService
+        
+        with self.captureOnCommitCallbacks():
+            cancelacion = CancelacionVueloService.iniciar(self.vuelo.id)
+        CancelacionVueloService._procesar_lote(cancelacion.id, self.vuelo, 'programado', 2)
+        
+        progreso = CancelacionVueloService.obtener_progreso(cancelacion.id)
+        self.assertEqual(progreso['estado'], 'en_proceso')
+        self.assertEqual(progreso['progreso'], 50)
+        self.assertEqual(Reserva.objects.filter(vuelo=self.vuelo, estado='cancelada').count(), 3)
+
+    @override_settings(CANCELACION_ESPERA_BLOQUEO=0, CANCELACION_REINTENTOS_BLOQUEO=2)
+    def test_lote_vacio_por_bloqueos_no_completa(self):
+        """Si las restantes están bloqueadas se reintenta; agotados los reintentos queda fallida."""
+        from unittest import mock
+        from reservas.repositories.reservas import ReservaRepository
+        from reservas.services.cancelaciones import CancelacionVueloService
+
+        self.marcar_cancelado()
+        with self.captureOnCommitCallbacks():
+            cancelacion = CancelacionVueloService.iniciar(self.vuelo.id, 'retrasado')
+        tomar = ReservaRepository.tomar_activas_de_vuelo
+        vacios = [[]]
+
+        def tomar_con_bloqueo(vuelo_id, tamano):
+            # El primer lote sale vacío porque las filas están bloqueadas
+            return vacios.pop() if vacios else tomar(vuelo_id, tamano)
+
+        with mock.patch.object(ReservaRepository, 'tomar_activas_de_vuelo', side_effect=tomar_con_bloqueo):
+            CancelacionVueloService.procesar(cancelacion.id)
+        cancelacion.refresh_from_db()
+        self.assertEqual(cancelacion.estado, 'completada')
+        self.assertEqual(cancelacion.estado_vuelo_anterior, 'retrasado')
+        self.assertFalse(Reserva.objects.filter(vuelo=self.vuelo, estado__in=['pendiente', 'confirmada']).exists())
+
+    @override_settings(CANCELACION_ESPERA_BLOQUEO=0, CANCELACION_REINTENTOS_BLOQUEO=2)
+    def test_reservas_siempre_bloqueadas_quedan_para_reanudar(self):
+        """Si las reservas siguen bloqueadas la cancelación queda fallida y se reanuda con el estado guardado."""
+        from unittest import mock
+        from django.contrib.admin.sites import site
+        from reservas.models import CancelacionVuelo
+        from reservas.repositories.reservas import ReservaRepository
+        from reservas.services.cancelaciones import CancelacionVueloService
+
+        self.marcar_cancelado()
+        with self.captureOnCommitCallbacks():
+            cancelacion = CancelacionVueloService.iniciar(self.vuelo.id, 'retrasado')
+        with mock.patch.object(ReservaRepository, 'tomar_activas_de_vuelo', return_value=[]):
+            with self.assertLogs('reservas.services.cancelaciones', 'ERROR'), self.assertRaises(RuntimeError):
+                CancelacionVueloService.procesar(cancelacion.id)
+        cancelacion.refresh_from_db()
+        self.assertEqual(cancelacion.estado, 'fallida')
+        self.assertIn('bloqueadas', cancelacion.ultimo_error)
+
+        admin = site._registry[CancelacionVuelo]
+        with mock.patch.object(CancelacionVueloService, 'iniciar') as iniciar, \
+                mock.patch.object(admin, 'message_user'):
+            admin.reanudar(None, CancelacionVuelo.objects.filter(id=cancelacion.id))
+        iniciar.assert_called_once_with(self.vuelo.id, 'retrasado')
+
+    def test_se_detiene_si_el_vuelo_ya_no_esta_cancelado(self):
+        """Si el vuelo se reprogramó, el trabajo termina sin cancelar reservas."""
+        from reservas.services.cancelaciones import CancelacionVueloService
+
+        with self.captureOnCommitCallbacks():
+            cancelacion = CancelacionVueloService.iniciar(self.vuelo.id)
+        with self.assertLogs('reservas.services.cancelaciones', 'WARNING'):
+            CancelacionVueloService.procesar(cancelacion.id)
+
+        cancelacion.refresh_from_db()
+        self.assertEqual(cancelacion.estado, 'fallida')
+        self.assertEqual(cancelacion.reservas_procesadas, 0)
+        self.assertEqual(Reserva.objects.filter(vuelo=self.vuelo, estado='cancelada').count(), 1)
+
+    @override_settings(TAREAS_MODO='sincrono', CANCELACION_MINUTOS_INACTIVA=10)
+    def test_reanudar_cancelaciones_interrumpidas(self):
+        """Las cancelaciones activas sin avance se vuelven a encolar; también desde el admin."""
+        from io import StringIO
+        from unittest import mock
+        from django.contrib.admin.sites import site
+        from django.core.management import call_command
+        from reservas.models import CancelacionVuelo
+        from reservas.services.cancelaciones import CancelacionVueloService
+
+        self.marcar_cancelado()
+        with self.captureOnCommitCallbacks():
+            cancelacion = CancelacionVueloService.iniciar(self.vuelo.id)
+        # Un reinicio dejó el trabajo a medias
+        CancelacionVueloService._procesar_lote(cancelacion.id, self.vuelo, 'programado', 2)
+
+        self.assertEqual(CancelacionVueloService.reanudar_inactivas(), 0)
+        admin = site._registry[CancelacionVuelo]
+        with mock.patch.object(CancelacionVueloService, 'iniciar') as iniciar, \
+                mock.patch.object(admin, 'message_user'):
+            admin.reanudar(None, CancelacionVuelo.objects.filter(id=cancelacion.id))
+        iniciar.assert_not_called()
+
+        hace_una_hora = timezone.now() - timedelta(hours=1)
+        CancelacionVuelo.objects.filter(id=cancelacion.id).update(fecha_actualizacion=hace_una_hora)
+        with mock.patch.object(CancelacionVueloService, 'iniciar') as iniciar, \
+                mock.patch.object(admin, 'message_user'):
+            admin.reanudar(None, CancelacionVuelo.objects.filter(id=cancelacion.id))
+        iniciar.assert_called_once_with(self.vuelo.id, 'programado')
+
+        CancelacionVuelo.objects.filter(id=cancelacion.id).update(fecha_actualizacion=hace_una_hora)
+        with self.assertLogs('reservas.services.cancelaciones', 'WARNING'):
+            call_command('reanudar_cancelaciones', stdout=StringIO())
+
+        cancelacion.refresh_from_db()
+        self.assertEqual(cancelacion.estado, 'completada')
+        self.assertEqual(cancelacion.reservas_procesadas, 4)
+
+
+class ReubicacionTest(TestCase):
+    """Tests para la reubicación masiva de pasajeros."""
+    
+    def crear_vuelo(self, prefijo, tipos, salida_horas, duracion_horas):
+        avion = Avion.objects.bulk_create([
+            Avion(modelo=f'Avión {prefijo}', capacidad=len(tipos), filas=1, columnas=len(tipos))
+        ])[0]
+        asientos = Asiento.objects.bulk_create([
+            Asiento(avion=avion, numero=f'{prefijo}{i}', fila=1, columna='ABCDEF'[i], tipo=tipo)
+            for i, tipo in enumerate(tipos)
+        ])
+        salida = self.base + timedelta(hours=salida_horas)
+        vuelo = Vuelo.objects.create(
+            avion=avion,
+            origen='Buenos Aires',
+            destino='Bariloche',
+            fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=duracion_horas),
+            duracion=f'{duracion_horas}:00',
+            estado='programado',
+            precio_base=90000
+        )
+        return vuelo, asientos
+    
+    def setUp(self):
+        """Configuración inicial para los tests."""
+        self.base = timezone.now() + timedelta(days=2)
+        self.original, asientos = self.crear_vuelo('R', ['primera', 'economica', 'economica', 'economica'], 0, 2)
+        # Llega antes pero solo tiene económica
+        self.temprano, _ = self.crear_vuelo('T', ['economica', 'economica'], 1, 2)
+        # Llega después y tiene primera
+        self.tarde, _ = self.crear_vuelo('L', ['primera'], 2, 3)
+        
+        estados = ['confirmada', 'confirmada', 'pendiente', 'confirmada']
+        self.reservas = []
+        for i, estado in enumerate(estados):
+            reserva = Reserva.objects.create(
+                vuelo=self.original,
+                pasajero=Pasajero.objects.create(
+                    nombre=f'Reubicado{i}', apellido='Test', documento=f'7000000{i}',
+                    email=f'r{i}@example.com', fecha_nacimiento='1990-01-01'
+                ),
+                asiento=asientos[i],
+                estado=estado,
+                precio=90000,
+                fecha_vencimiento=timezone.now() + timedelta(hours=24)
+            )
+            self.reservas.append(reserva)
+        # Cancelado sin pasar por la cascada: las reservas siguen activas
+        Vuelo.objects.filter(id=self.original.id).update(estado='cancelado')
+    
+    def test_paridad_de_cabina_y_llegada_temprana(self):
+        """Se respeta la cabina antes que la llegada y se prioriza a los confirmados."""
+        from reservas.services.reubicacion import ReubicacionService
+        
+        resultado = ReubicacionService.reubicar_vuelo(self.original.id, tamano_lote=2)
+        
+        self.assertEqual(resultado, {'desplazados': 4, 'reubicados': 3, 'sin_lugar': 1})
+        destinos = {
+            nueva.reubicada_desde_id: nueva
+            for nueva in Reserva.objects.filter(reubicada_desde__isnull=False).select_related('asiento')
+        }
+        self.assertEqual(destinos[self.reservas[0].id].vuelo_id, self.tarde.id)
+        self.assertEqual(destinos[self.reservas[0].id].asiento.tipo, 'primera')
+        self.assertEqual(destinos[self.reservas[1].id].vuelo_id, self.temprano.id)
+        self.assertEqual(destinos[self.reservas[3].id].vuelo_id, self.temprano.id)
+        # El pendiente queda al final de la prioridad y sin lugar
+        self.assertNotIn(self.reservas[2].id, destinos)
+        
+        originales = Reserva.objects.filter(id__in=destinos)
+        self.assertFalse(originales.exclude(estado='cancelada').exists())
+        self.assertTrue(Boleto.objects.filter(reserva__in=destinos.values()).exists())
+    
+    def test_reejecutar_no_duplica(self):
+        """Una segunda ejecución solo considera a los que quedaron sin lugar."""
+        from reservas.services.reubicacion import ReubicacionService
+        
+        ReubicacionService.reubicar_vuelo(self.original.id)
+        resultado = ReubicacionService.reubicar_vuelo(self.original.id)
+        
+        self.assertEqual(resultado['desplazados'], 1)
+        self.assertEqual(resultado['reubicados'], 0)
+        self.assertEqual(Reserva.objects.filter(reubicada_desde__isnull=False).count(), 3)
+
+    @override_settings(TAREAS_MODO='sincrono', CANCELACION_PORCENTAJE_REEMBOLSO=100)
+    def test_despues_de_la_cascada_conserva_estado_prioridad_y_ajusta_reembolso(self):
+        """Tras la cascada se reubica con el estado previo y se descuentan los reembolsos."""
+        from reservas.models import CancelacionVuelo
+        from reservas.services.cancelaciones import CancelacionVueloService
+        from reservas.services.reubicacion import ReubicacionService
+        
+        extra, _ = self.crear_vuelo('X', ['economica'], 3, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            CancelacionVueloService.iniciar(self.original.id, 'programado')
+        self.assertEqual(CancelacionVuelo.objects.get(vuelo=self.original).reembolso_total, 360000)
+        
+        resultado = ReubicacionService.reubicar_vuelo(self.original.id)
+        
+        self.assertEqual(resultado['reubicados'], 4)
+        destinos = {
+            nueva.reubicada_desde_id: nueva for nueva in Reserva.objects.filter(reubicada_desde__isnull=False)
+        }
+        # El confirmado conserva la prioridad sobre el pendiente aunque ambos estén cancelados
+        self.assertEqual(destinos[self.reservas[3].id].vuelo_id, self.temprano.id)
+        pendiente = destinos[self.reservas[2].id]
+        self.assertEqual((pendiente.vuelo_id, pendiente.estado), (extra.id, 'pendiente'))
+        self.assertFalse(Boleto.objects.filter(reserva=pendiente).exists())
+        self.assertEqual(destinos[self.reservas[0].id].estado, 'confirmada')
+        
+        originales = Reserva.objects.filter(id__in=destinos)
+        self.assertEqual(set(originales.values_list('monto_reembolso', flat=True)), {0})
+        self.assertEqual(CancelacionVuelo.objects.get(vuelo=self.original).reembolso_total, 0)
+    
+    def test_conflictos_no_abortan_el_lote(self):
+        """Una reserva cancelada previa o un código repetido no abortan el resto del lote."""
+        from unittest import mock
+        from reservas.services.reubicacion import ReubicacionService
+        
+        # El pasajero ya tuvo (y canceló) los asientos del vuelo temprano
+        for asiento in self.temprano.avion.asientos.all():
+            Reserva.objects.create(
+                vuelo=self.temprano, pasajero=self.reservas[1].pasajero, asiento=asiento,
+                estado='cancelada', precio=90000, fecha_vencimiento=timezone.now()
+            )
+        
+        resultado = ReubicacionService.reubicar_vuelo(self.original.id)
+        
+        self.assertEqual(resultado['reubicados'], 2)
+        self.assertFalse(Reserva.objects.filter(reubicada_desde=self.reservas[1]).exists())
+        
+        Reserva.objects.filter(id=self.reservas[0].id).update(codigo_reserva='AAAAAAAA')
+        codigos = [uuid.UUID(f'{letra * 8}-0000-4000-8000-000000000000') for letra in 'abc']
+        with mock.patch('reservas.services.reubicacion.uuid.uuid4', side_effect=codigos):
+            nuevas = ReubicacionService._asignar_codigos([Reserva(), Reserva()])
+        self.assertEqual([n.codigo_reserva for n in nuevas], ['CCCCCCCC', 'BBBBBBBB'])
@@ -8,15 +8,25 @@ Este archivo contiene todas las vistas relacionadas con:
 - Consulta de reservas
 """
 
+import uuid
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from usuarios.decorators import reservation_owner_required, active_flight_required
-from aerolinea.logging_config import log_reservation_action, log_user_action
+from aerolinea.logging_config import log_user_action
+from aerolinea.idempotencia import idempotente_vista
+from aerolinea.metricas import RESERVAS_DURACION, RESERVAS_OPERACIONES, medir
+from eventos.bus import publicar
+from eventos.dominio import ReservaCancelada, ReservaConfirmada, ReservaCreada
 from .models import Reserva, Boleto
 from vuelos.models import Vuelo, Asiento
+from vuelos.services.disponibilidad import DisponibilidadService
+from vuelos.services.tarifas import TarifaService
 from pasajeros.models import Pasajero
 from .forms import ReservaForm
 
@@ -40,6 +50,8 @@ def lista_reservas(request):
     return render(request, 'reservas/lista_reservas.html', context)
 
 @login_required
+@idempotente_vista
+@medir(RESERVAS_DURACION, RESERVAS_OPERACIONES, operacion='crear', origen='vista')
 def crear_reserva(request):
     """
     Vista para crear una nueva reserva.
@@ -144,9 +156,9 @@ def crear_reserva(request):
                     reserva.asiento = asiento
                     reserva.pasajero = pasajero
                     
-                    # Calcular precio si no se especifica
+                    # Precio vigente de la cabina si no se especifica
                     if not reserva.precio:
-                        reserva.precio = vuelo.precio_base
+                        reserva.precio = TarifaService.precio(vuelo.id, asiento.tipo)
                     
                     # Generar código único de reserva
                     reserva.codigo_reserva = f"RES-{uuid.uuid4().hex[:8].upper()}"
@@ -161,13 +173,11 @@ def crear_reserva(request):
                     asiento.estado = 'reservado'
                     asiento.save()
                     
-                    # Loggear la acción
-                    log_reservation_action(
-                        reservation=reserva,
-                        action='Reserva creada',
-                        user=request.user,
-                        details=f'Vuelo: {vuelo.origen}→{vuelo.destino}, Asiento: {asiento.numero}'
-                    )
+                    # Auditoría y demás efectos: suscriptores de ReservaCreada
+                    publicar(ReservaCreada(
+                        reserva_id=reserva.id, vuelo_id=vuelo.id, pasajero_id=pasajero.id,
+                        usuario_id=request.user.id
+                    ))
                     
                     messages.success(request, f'Reserva {reserva.codigo_reserva} creada exitosamente.')
                     return redirect('reservas:detalle_reserva', reserva_id=reserva.id)
@@ -190,7 +200,10 @@ def crear_reserva(request):
             'vuelo': vuelo,
             'asiento': asiento_id,
             'pasajero': pasajero_id,
-            'precio': vuelo.precio_base,
+            'precio': TarifaService.precio(
+                vuelo.id,
+                Asiento.objects.filter(id=asiento_id).values_list('tipo', flat=True).first() or 'economica'
+            ),
         }
         form = ReservaForm(initial=initial_data)
     
@@ -200,6 +213,7 @@ def crear_reserva(request):
         'asiento_id': asiento_id,
         'pasajero_id': pasajero_id,
         'paso': 'confirmar_reserva',
+        'idempotency_key': uuid.uuid4().hex,
     }
     
     return render(request, 'reservas/crear_reserva.html', context)
@@ -238,6 +252,8 @@ def editar_reserva(request, reserva_id):
 
 @login_required
 @reservation_owner_required
+@idempotente_vista
+@medir(RESERVAS_DURACION, RESERVAS_OPERACIONES, operacion='cancelar', origen='vista')
 def cancelar_reserva(request, reserva_id):
     """
     Vista para cancelar una reserva.
@@ -248,18 +264,27 @@ def cancelar_reserva(request, reserva_id):
     
     if request.method == 'POST':
         if reserva.puede_cancelar():
-            # Cancelar la reserva
-            reserva.estado = 'cancelada'
-            reserva.save()
-            
-            # Liberar el asiento
-            reserva.asiento.estado = 'disponible'
-            reserva.asiento.save()
+            from django.db import transaction
             
-            # Cancelar boleto si existe
-            if hasattr(reserva, 'boleto'):
-                reserva.boleto.estado = 'cancelado'
-                reserva.boleto.save()
+            with transaction.atomic():
+                # Cancelar la reserva
+                estado_anterior = reserva.estado
+                reserva.estado = 'cancelada'
+                reserva.save()
+                
+                # Liberar el asiento
+                reserva.asiento.estado = 'disponible'
+                reserva.asiento.save()
+                
+                # Cancelar boleto si existe
+                if hasattr(reserva, 'boleto'):
+                    reserva.boleto.estado = 'cancelado'
+                    reserva.boleto.save()
+                
+                publicar(ReservaCancelada(
+                    reserva_id=reserva.id, vuelo_id=reserva.vuelo_id,
+                    estado_anterior=estado_anterior, usuario_id=request.user.id
+                ))
             
             # Calcular reembolso si aplica
             reembolso = 0
@@ -305,6 +330,8 @@ def cancelar_reserva(request, reserva_id):
 
 @login_required
 @reservation_owner_required
+@idempotente_vista
+@medir(RESERVAS_DURACION, RESERVAS_OPERACIONES, operacion='confirmar', origen='vista')
 def confirmar_reserva(request, reserva_id):
     """
     Vista para confirmar una reserva.
@@ -346,13 +373,10 @@ def confirmar_reserva(request, reserva_id):
                 reserva.asiento.estado = 'ocupado'
                 reserva.asiento.save()
                 
-                # Loggear la acción
-                log_reservation_action(
-                    reservation=reserva,
-                    action='Reserva confirmada',
-                    user=request.user,
-                    details=f'Boleto generado: {boleto.codigo_barra}'
-                )
+                # Auditoría y email: suscriptores de ReservaConfirmada
+                publicar(ReservaConfirmada(
+                    reserva_id=reserva.id, vuelo_id=reserva.vuelo_id, usuario_id=request.user.id
+                ))
                 
                 # Crear boleto automáticamente
                 boleto, created = Boleto.objects.get_or_create(
@@ -486,26 +510,31 @@ def reserva_por_codigo(request, codigo):
         messages.error(request, f'No se encontró una reserva con el código {codigo}.')
         return redirect('reservas:buscar_reservas')
 
+def _etag_disponibilidad(request):
+    """ETag de verificar_disponibilidad: la versión de la disponibilidad del vuelo."""
+    vuelo_id = request.GET.get('vuelo_id', '')
+    return DisponibilidadService.version(int(vuelo_id)) if vuelo_id.isdigit() else None
+
+@cache_control(no_cache=True)
+@condition(etag_func=_etag_disponibilidad)
 def verificar_disponibilidad(request):
-    """Vista API para verificar disponibilidad de asientos"""
-    vuelo_id = request.GET.get('vuelo_id')
-    asiento_id = request.GET.get('asiento_id')
+    """Vista API para verificar disponibilidad de asientos (desde la caché del vuelo)"""
+    vuelo_id = request.GET.get('vuelo_id', '')
+    asiento_id = request.GET.get('asiento_id', '')
     
     if vuelo_id and asiento_id:
-        try:
-            vuelo = Vuelo.objects.get(id=vuelo_id)
-            asiento = Asiento.objects.get(id=asiento_id, avion=vuelo.avion)
-            
-            # Verificar si el asiento está disponible
-            disponible = asiento.estado == 'disponible'
-            
-            return JsonResponse({
-                'disponible': disponible,
-                'asiento': asiento.numero,
-                'tipo': asiento.tipo,
-            })
-        except (Vuelo.DoesNotExist, Asiento.DoesNotExist):
+        disponibilidad = None
+        if vuelo_id.isdigit() and asiento_id.isdigit():
+            disponibilidad = DisponibilidadService.verificar(int(vuelo_id), [int(asiento_id)])
+        if not disponibilidad or not disponibilidad['asientos']:
             return JsonResponse({'error': 'Vuelo o asiento no encontrado'})
+        
+        asiento = disponibilidad['asientos'][0]
+        return JsonResponse({
+            'disponible': asiento['disponible'],
+            'asiento': asiento['numero'],
+            'tipo': asiento['tipo'],
+        })
     
     return JsonResponse({'error': 'Parámetros incompletos'})
 
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from .backends import invalidar_usuarios
 from .models import Usuario
 
 # Register your models here.
@@ -64,7 +65,10 @@ class UsuarioAdmin(UserAdmin):
     
     def activar_usuarios(self, request, queryset):
         """Acción para activar usuarios seleccionados"""
+        # update() no dispara signals: descartar a mano los usuarios cacheados
+        ids = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(is_active=True)
+        invalidar_usuarios(*ids)
         self.message_user(
             request, 
             f'{updated} usuario(s) han sido activado(s) exitosamente.'
@@ -73,7 +77,10 @@ class UsuarioAdmin(UserAdmin):
     
     def desactivar_usuarios(self, request, queryset):
         """Acción para desactivar usuarios seleccionados"""
+        # update() no dispara signals: descartar a mano los usuarios cacheados
+        ids = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(is_active=False)
+        invalidar_usuarios(*ids)
         self.message_user(
             request, 
             f'{updated} usuario(s) han sido desactivado(s) exitosamente.'
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class UsuariosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'usuarios'
+    
+    def ready(self):
+        """
+        Método que se ejecuta cuando la aplicación está lista.
+        Importa los signals para que se registren.
+        """
+        import usuarios.signals
@@ -0,0 +1,49 @@
+"""
+Backends de autenticación para la aplicación usuarios.
+
+AuthenticationMiddleware carga el usuario de la sesión en cada solicitud;
+los permisos de la API y los decoradores consultan su rol
+(request.user.rol). El backend lee ese usuario de la caché de datos de
+referencia (ver aerolinea.cache_referencia) en lugar de la base; los
+signals de usuarios lo descartan cuando el usuario se guarda y las
+actualizaciones masivas llaman a invalidar_usuarios.
+
+El usuario incluye el hash de la contraseña, así que solo se guarda en el
+nivel local de cada proceso, por CACHE_REFERENCIA_TTL_LOCAL segundos.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db import transaction
+
+from aerolinea.cache_referencia import CacheReferencia
+
+CACHE_USUARIOS = CacheReferencia('usuario', compartir=False)
+
+
+def invalidar_usuarios(*usuario_ids):
+    """
+    Descarta de la caché los usuarios indicados.
+
+    Se descartan en el momento y de nuevo después del commit, por si otra
+    solicitud volvió a cachear la versión anterior mientras tanto.
+
+    Args:
+        *usuario_ids: IDs de los usuarios modificados
+    """
+    CACHE_USUARIOS.invalidar(*usuario_ids)
+    transaction.on_commit(lambda: CACHE_USUARIOS.invalidar(*usuario_ids))
+
+
+class ModelBackendConCache(ModelBackend):
+    """ModelBackend que obtiene el usuario de la sesión desde la caché."""
+
+    def get_user(self, user_id):
+        usuario = CACHE_USUARIOS.obtener(
+            user_id, lambda: get_user_model()._default_manager.filter(pk=user_id).first()
+        )
+        return usuario if usuario is not None and self.user_can_authenticate(usuario) else None
+
+    async def aget_user(self, user_id):
+        return await sync_to_async(self.get_user)(user_id)
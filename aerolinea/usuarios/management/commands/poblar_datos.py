@@ -150,7 +150,7 @@ class Command(BaseCommand):
                             tipo = 'economica'
                         
                         # Verificar que el asiento no exista ya
-                        if not Asiento.objects.filter(numero=numero).exists():
+                        if not Asiento.objects.filter(avion=avion, numero=numero).exists():
                             Asiento.objects.create(
                                 avion=avion,
                                 numero=numero,
@@ -0,0 +1,26 @@
+"""
+Signals para la aplicación usuarios.
+
+Mantienen al día la caché del usuario de sesión: un cambio de rol, de
+contraseña o la desactivación de la cuenta se ve en la próxima solicitud.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Usuario
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def invalidar_cache_usuario(sender, instance, **kwargs):
+    """
+    Signal que descarta de la caché el usuario guardado o eliminado.
+
+    Args:
+        sender: Modelo que disparó el signal
+        instance: Instancia del modelo
+        **kwargs: Argumentos adicionales
+    """
+    from .backends import invalidar_usuarios
+    invalidar_usuarios(instance.pk)
@@ -8,12 +8,15 @@ Este módulo contiene tests para:
 - Decoradores personalizados
 """
 
+from unittest import mock
+
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
 
 from .models import Usuario
 from .forms import UsuarioRegistroForm, UsuarioPerfilForm
@@ -380,3 +383,72 @@ class UsuarioIntegrationTest(TestCase):
         # 5. Verificar que no puede acceder a página protegida
         response = self.client.get(reverse('usuarios:perfil'))
         self.assertEqual(response.status_code, 302)
+
+
+
+class UsuarioSesionCacheTest(TestCase):
+    """Tests para el usuario de sesión en caché."""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        from aerolinea.cache_referencia import cache_local
+        
+        cache.clear()
+        cache_local().clear()
+        self.addCleanup(cache_local().clear)
+        self.addCleanup(cache.clear)
+        self.usuario = Usuario.objects.create_user(
+            username='sesion', email='sesion@example.com', password='sesionpass123'
+        )
+        self.client.force_login(self.usuario)
+    
+    def test_rol_desde_cache_y_cambio_inmediato(self):
+        """El usuario de la sesión no se vuelve a consultar y un cambio de rol se ve enseguida."""
+        from django.contrib.auth import get_user
+        from django.test import RequestFactory
+        
+        request = RequestFactory().get('/')
+        request.session = self.client.session
+        self.assertEqual(get_user(request).rol, 'cliente')
+        with CaptureQueriesContext(connection) as consultas:
+            get_user(request)
+        self.assertFalse(any('usuarios_usuario' in consulta['sql'] for consulta in consultas))
+        
+        self.usuario.rol = 'admin'
+        self.usuario.save()
+        self.assertEqual(get_user(request).rol, 'admin')
+    
+    def test_desactivar_desde_admin_cierra_la_sesion(self):
+        """La acción masiva del admin descarta el usuario cacheado aunque update() no dispare signals."""
+        from django.contrib.admin.sites import site
+        from django.contrib.auth import get_user
+        from django.test import RequestFactory
+        
+        request = RequestFactory().get('/')
+        request.session = self.client.session
+        self.assertTrue(get_user(request).is_authenticated)
+        
+        admin_request = RequestFactory().post('/')
+        admin_request.user = self.usuario
+        with self.captureOnCommitCallbacks(execute=True):
+            with mock.patch.object(site._registry[Usuario], 'message_user'):
+                site._registry[Usuario].desactivar_usuarios(
+                    admin_request, Usuario.objects.filter(pk=self.usuario.pk)
+                )
+        self.assertFalse(get_user(request).is_authenticated)
+    
+    def test_usuario_no_se_guarda_en_la_cache_compartida(self):
+        """El usuario (con el hash de la contraseña) no sale de la caché local del proceso."""
+        from django.contrib.auth import get_user
+        from django.core.cache import cache
+        from django.test import RequestFactory
+        from .backends import CACHE_USUARIOS
+        
+        request = RequestFactory().get('/')
+        request.session = self.client.session
+        get_user(request)
+        
+        self.assertIsNone(cache.get(CACHE_USUARIOS._clave(self.usuario.pk)))
+        with CaptureQueriesContext(connection) as consultas:
+            get_user(request)
+        self.assertFalse(any('usuarios' in consulta['sql'] for consulta in consultas))
@@ -1,5 +1,5 @@
-from django.contrib import admin
-from .models import Avion, Asiento, Vuelo
+from django.contrib import admin, messages
+from .models import Avion, Asiento, TarifaVuelo, Vuelo
 
 # Register your models here.
 
@@ -20,6 +20,22 @@ class AsientoInline(admin.TabularInline):
         return super().get_queryset(request).select_related('avion')
 
 
+class TarifaVueloInline(admin.TabularInline):
+    """
+    Inline de solo lectura con la tabla de tarifas del vuelo.
+    
+    Las tarifas las calcula el motor de tarifas (vuelos.services.tarifas).
+    """
+    model = TarifaVuelo
+    extra = 0
+    can_delete = False
+    fields = ['tipo', 'asientos_totales', 'asientos_ocupados', 'precio', 'fecha_actualizacion']
+    readonly_fields = fields
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Avion)
 class AvionAdmin(admin.ModelAdmin):
     """
@@ -157,11 +173,18 @@ class AsientoAdmin(admin.ModelAdmin):
     
     def marcar_disponible(self, request, queryset):
         """Acción para marcar asientos como disponibles"""
-        updated = queryset.update(estado='disponible')
+        from reservas.services.masivas import OperacionMasivaService
+        resultado = OperacionMasivaService.liberar_asientos(list(queryset.values_list('id', flat=True)))
         self.message_user(
             request, 
-            f'{updated} asiento(s) marcado(s) como disponible(s)'
+            f'{resultado["procesadas"]} asiento(s) marcado(s) como disponible(s)'
         )
+        if resultado['omitidas']:
+            self.message_user(
+                request,
+                f'{resultado["omitidas"]} omitido(s): tienen reservas activas o ya estaban disponibles',
+                level=messages.WARNING
+            )
     marcar_disponible.short_description = "Marcar como disponible"
     
     def marcar_ocupado(self, request, queryset):
@@ -227,16 +250,27 @@ class VueloAdmin(admin.ModelAdmin):
     # Campos de solo lectura
     readonly_fields = ['duracion']
     
+    # Tabla de tarifas vigente (solo lectura)
+    inlines = [TarifaVueloInline]
+    
     # Acciones personalizadas
-    actions = ['cancelar_vuelos', 'activar_vuelos']
+    actions = ['cancelar_vuelos', 'activar_vuelos', 'reubicar_pasajeros']
     
     def cancelar_vuelos(self, request, queryset):
         """Acción para cancelar vuelos seleccionados"""
-        updated = queryset.update(estado='cancelado')
+        from reservas.services.masivas import OperacionMasivaService
+        resultado = OperacionMasivaService.cancelar_vuelos(list(queryset.values_list('id', flat=True)))
         self.message_user(
             request, 
-            f'{updated} vuelo(s) cancelado(s) exitosamente'
+            f'{resultado["procesadas"]} vuelo(s) cancelado(s) exitosamente. '
+            'Sus reservas se cancelan en segundo plano (ver Cancelaciones de vuelos).'
         )
+        if resultado['omitidas']:
+            self.message_user(
+                request,
+                f'{resultado["omitidas"]} omitido(s): ya estaban cancelados o aterrizados',
+                level=messages.WARNING
+            )
     cancelar_vuelos.short_description = "Cancelar vuelos seleccionados"
     
     def activar_vuelos(self, request, queryset):
@@ -247,3 +281,15 @@ class VueloAdmin(admin.ModelAdmin):
             f'{updated} vuelo(s) activado(s) exitosamente'
         )
     activar_vuelos.short_description = "Activar vuelos seleccionados"
+    
+    def reubicar_pasajeros(self, request, queryset):
+        """Acción para reubicar en segundo plano los pasajeros de los vuelos seleccionados"""
+        from reservas.services.reubicacion import ReubicacionService
+        vuelo_ids = list(queryset.values_list('id', flat=True))
+        for vuelo_id in vuelo_ids:
+            ReubicacionService.programar(vuelo_id)
+        self.message_user(
+            request, 
+            f'Reubicación programada para {len(vuelo_ids)} vuelo(s)'
+        )
+    reubicar_pasajeros.short_description = "Reubicar pasajeros en vuelos alternativos"
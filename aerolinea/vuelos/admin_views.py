@@ -6,11 +6,13 @@ para proporcionar funcionalidades adicionales como dashboards,
 estadísticas y reportes.
 """
 
+from asgiref.sync import sync_to_async
 from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render, get_object_or_404, redirect
 from django.db.models import Count, Q, Sum
 from django.utils import timezone
-from datetime import datetime, timedelta
+from django.utils.dateparse import parse_date
+from datetime import datetime, time, timedelta
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
@@ -18,9 +20,9 @@ from django.views.decorators.csrf import csrf_exempt
 import json
 
 from .models import Vuelo, Avion, Asiento
+from .services.estadisticas import EstadisticasService
 from reservas.models import Reserva, Boleto
 from pasajeros.models import Pasajero
-from usuarios.models import Usuario
 
 
 @staff_member_required
@@ -34,23 +36,10 @@ def dashboard_admin(request):
     - Alertas y notificaciones
     """
     
-    # Obtener estadísticas generales
-    total_vuelos = Vuelo.objects.count()
-    vuelos_activos = Vuelo.objects.filter(estado='programado').count()
-    vuelos_en_vuelo = Vuelo.objects.filter(estado='en_vuelo').count()
-    vuelos_completados = Vuelo.objects.filter(estado='aterrizado').count()
-    
-    total_reservas = Reserva.objects.count()
-    reservas_pendientes = Reserva.objects.filter(estado='pendiente').count()
-    reservas_confirmadas = Reserva.objects.filter(estado='confirmada').count()
-    
-    total_pasajeros = Pasajero.objects.count()
-    total_usuarios = Usuario.objects.count()
-    
-    # Estadísticas de aviones
-    total_aviones = Avion.objects.count()
-    aviones_activos = Avion.objects.filter(estado='activo').count()
-    aviones_mantenimiento = Avion.objects.filter(estado='mantenimiento').count()
+    # Estadísticas generales (en caché, ver EstadisticasService)
+    resumen = EstadisticasService.resumen()
+    aviones_mantenimiento = resumen['aviones_mantenimiento']
+    reservas_pendientes = resumen['reservas_pendientes']
     
     # Ocupación de vuelos próximos
     vuelos_proximos = Vuelo.objects.filter(
@@ -101,18 +90,7 @@ def dashboard_admin(request):
         })
     
     context = {
-        'total_vuelos': total_vuelos,
-        'vuelos_activos': vuelos_activos,
-        'vuelos_en_vuelo': vuelos_en_vuelo,
-        'vuelos_completados': vuelos_completados,
-        'total_reservas': total_reservas,
-        'reservas_pendientes': reservas_pendientes,
-        'reservas_confirmadas': reservas_confirmadas,
-        'total_pasajeros': total_pasajeros,
-        'total_usuarios': total_usuarios,
-        'total_aviones': total_aviones,
-        'aviones_activos': aviones_activos,
-        'aviones_mantenimiento': aviones_mantenimiento,
+        **resumen,
         'vuelos_proximos': vuelos_proximos,
         'alertas': alertas,
     }
@@ -214,6 +192,55 @@ def estadisticas_ocupacion(request):
     return render(request, 'admin/estadisticas_ocupacion.html', context)
 
 
+@staff_member_required
+def gantt_flota(request):
+    """
+    Diagrama de Gantt de la flota.
+    
+    Muestra, por avión, los vuelos del rango y el tiempo de rotación en
+    tierra después de cada uno; los tramos que se superponen se resaltan.
+    
+    Parámetros GET:
+    - desde: Fecha inicial (YYYY-MM-DD, por defecto hoy)
+    - dias: Cantidad de días a mostrar (1 a 14, por defecto 1)
+    """
+    from .services.rotacion import RotacionService, tiempo_rotacion
+    
+    fecha = parse_date(request.GET.get('desde') or '') or timezone.localdate()
+    try:
+        dias = min(max(int(request.GET.get('dias', 1)), 1), 14)
+    except ValueError:
+        dias = 1
+    
+    desde = timezone.make_aware(datetime.combine(fecha, time.min))
+    hasta = desde + timedelta(days=dias)
+    filas = RotacionService.gantt_flota(desde, hasta)
+    
+    # Marcas del eje de tiempo: cada hora para un día, cada 6 horas para más
+    paso = timedelta(hours=1 if dias == 1 else 6)
+    total = (hasta - desde).total_seconds()
+    marcas = []
+    momento = desde
+    while momento < hasta:
+        marcas.append({
+            'momento': momento,
+            'izquierda': round((momento - desde).total_seconds() * 100 / total, 3),
+        })
+        momento += paso
+    
+    context = {
+        'filas': filas,
+        'marcas': marcas,
+        'desde': fecha,
+        'dias': dias,
+        'anterior': fecha - timedelta(days=dias),
+        'siguiente': fecha + timedelta(days=dias),
+        'rotacion_minutos': int(tiempo_rotacion().total_seconds() // 60),
+        'conflictos': sum(1 for fila in filas for tramo in fila['tramos'] if tramo['conflicto']),
+    }
+    return render(request, 'admin/gantt_flota.html', context)
+
+
 @staff_member_required
 def reporte_pasajeros(request):
     """
@@ -323,28 +350,30 @@ def detalle_pasajeros_vuelo(request, vuelo_id):
 # API endpoints para AJAX
 @staff_member_required
 @require_http_methods(["GET"])
-def api_estadisticas_vuelos(request):
+async def api_estadisticas_vuelos(request):
     """
     API endpoint para obtener estadísticas de vuelos en tiempo real.
+    
+    Es async: el panel la consulta periódicamente y bajo ASGI las
+    consultas no ocupan un worker mientras esperan a la base.
     """
     
-    # Estadísticas básicas
-    total_vuelos = Vuelo.objects.count()
-    vuelos_activos = Vuelo.objects.filter(estado='programado').count()
-    vuelos_en_vuelo = Vuelo.objects.filter(estado='en_vuelo').count()
+    # Estadísticas básicas (en caché, ver EstadisticasService)
+    resumen = await sync_to_async(EstadisticasService.resumen)()
     
-    # Ocupación actual
+    # Ocupación actual (asientos ocupados contados en la misma consulta)
     vuelos_proximos = Vuelo.objects.filter(
         fecha_salida__gte=timezone.now(),
         estado='programado'
+    ).select_related('avion').annotate(
+        asientos_ocupados=Count(
+            'reservas', filter=Q(reservas__estado__in=['confirmada', 'completada'])
+        )
     )[:5]
     
     ocupacion_vuelos = []
-    for vuelo in vuelos_proximos:
-        asientos_ocupados = Reserva.objects.filter(
-            vuelo=vuelo,
-            estado__in=['confirmada', 'completada']
-        ).count()
+    async for vuelo in vuelos_proximos:
+        asientos_ocupados = vuelo.asientos_ocupados
         
         ocupacion_vuelos.append({
             'id': vuelo.id,
@@ -357,9 +386,9 @@ def api_estadisticas_vuelos(request):
         })
     
     data = {
-        'total_vuelos': total_vuelos,
-        'vuelos_activos': vuelos_activos,
-        'vuelos_en_vuelo': vuelos_en_vuelo,
+        'total_vuelos': resumen['total_vuelos'],
+        'vuelos_activos': resumen['vuelos_activos'],
+        'vuelos_en_vuelo': resumen['vuelos_en_vuelo'],
         'ocupacion_vuelos': ocupacion_vuelos,
         'timestamp': timezone.now().isoformat()
     }
@@ -8,6 +8,7 @@ class VuelosConfig(AppConfig):
     def ready(self):
         """
         Método que se ejecuta cuando la aplicación está lista.
-        Importa los signals para que se registren.
+        Importa los signals y los suscriptores de eventos para que se registren.
         """
         import vuelos.signals
+        import vuelos.suscriptores
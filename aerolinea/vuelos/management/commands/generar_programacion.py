@@ -0,0 +1,81 @@
+"""
+Comando de gestión para generar los vuelos de una temporada.
+
+Lee patrones de vuelos recurrentes desde un CSV y los expande en vuelos
+concretos (ver vuelos.services.programacion).
+
+Columnas del CSV:
+    origen,destino,dias,hora_salida,duracion,avion_id,desde,hasta,precio_base
+    Buenos Aires,Córdoba,"1,3,5",07:30,1:20,4,2026-01-01,2026-03-31,85000
+
+Uso: python manage.py generar_programacion temporada.csv [--omitir-conflictos] [--dry-run]
+"""
+
+import csv
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from vuelos.services.programacion import PatronVuelo, ProgramacionService
+
+
+class Command(BaseCommand):
+    help = 'Genera los vuelos de una temporada a partir de patrones recurrentes en un CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', type=str, help='Ruta al CSV con los patrones')
+        parser.add_argument(
+            '--omitir-conflictos',
+            action='store_true',
+            help='Crear los vuelos válidos y omitir los que chocan con otros del mismo avión',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validar la programación sin guardar',
+        )
+        parser.add_argument(
+            '--delimiter',
+            type=str,
+            default=',',
+            help='Delimitador del CSV (por defecto: coma)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=None,
+            help='Vuelos insertados por consulta',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['archivo'], newline='', encoding='utf-8') as archivo:
+                filas = list(csv.DictReader(archivo, delimiter=options['delimiter']))
+        except OSError as e:
+            raise CommandError(f"No se pudo leer el archivo: {e}")
+
+        patrones = []
+        for numero, fila in enumerate(filas, start=2):
+            try:
+                patrones.append(PatronVuelo.desde_fila(fila))
+            except ValidationError as e:
+                raise CommandError(f"Línea {numero}: {e.messages[0]}")
+
+        try:
+            resultado = ProgramacionService.generar(
+                patrones,
+                omitir_conflictos=options['omitir_conflictos'],
+                simular=options['dry_run'],
+                tamano_lote=options['lote'],
+            )
+        except ValidationError as e:
+            raise CommandError('\n'.join(e.messages))
+
+        self.stdout.write(
+            f"Patrones: {len(patrones)}, vuelos generados: {resultado['generados']}, "
+            f"pasados: {resultado['pasados']}, en conflicto: {resultado['conflictos']}"
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Simulación: no se guardaron vuelos'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Vuelos creados: {resultado['creados']}"))
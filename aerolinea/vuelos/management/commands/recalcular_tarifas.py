@@ -0,0 +1,37 @@
+"""
+Comando de gestión para recalcular la tabla de tarifas.
+
+El factor de anticipación de las tarifas cambia con el paso del tiempo;
+este comando (o la tarea de Celery equivalente) debe correr periódicamente,
+por ejemplo cada hora.
+"""
+
+from django.core.management.base import BaseCommand
+
+from vuelos.services.tarifas import TarifaService
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las tarifas de los vuelos programados de los próximos días'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=30,
+            help='Días hacia adelante a recalcular (por defecto: 30)',
+        )
+        parser.add_argument(
+            '--vuelo',
+            type=int,
+            action='append',
+            default=[],
+            help='Recalcular solo este vuelo (se puede repetir)',
+        )
+
+    def handle(self, *args, **options):
+        if options['vuelo']:
+            guardadas = TarifaService.recalcular(options['vuelo'])
+        else:
+            guardadas = TarifaService.recalcular_proximos(options['dias'])
+        self.stdout.write(self.style.SUCCESS(f"Tarifas recalculadas: {guardadas}"))
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vuelos', '0002_alter_asiento_options_alter_avion_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vuelo',
+            index=models.Index(fields=['avion', 'fecha_salida'], name='vuelos_vuel_avion_i_b500af_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vuelos', '0003_vuelo_avion_fecha_salida_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TarifaVuelo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('economica', 'Económica'), ('premium', 'Premium'), ('primera', 'Primera Clase')], help_text='Cabina (tipo de asiento)', max_length=20)),
+                ('asientos_totales', models.PositiveIntegerField(default=0, help_text='Asientos de la cabina en el avión del vuelo')),
+                ('asientos_ocupados', models.PositiveIntegerField(default=0, help_text='Asientos de la cabina con reservas activas en el vuelo')),
+                ('precio', models.DecimalField(decimal_places=2, help_text='Precio vigente por pasajero', max_digits=10)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True, help_text='Último recálculo de la tarifa')),
+                ('vuelo', models.ForeignKey(help_text='Vuelo de la tarifa', on_delete=django.db.models.deletion.CASCADE, related_name='tarifas', to='vuelos.vuelo')),
+            ],
+            options={
+                'verbose_name': 'Tarifa de vuelo',
+                'verbose_name_plural': 'Tarifas de vuelos',
+                'db_table': 'tarifas_vuelo',
+                'constraints': [models.UniqueConstraint(fields=('vuelo', 'tipo'), name='tarifa_unica_por_cabina')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vuelos', '0004_tarifavuelo'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='asiento',
+            unique_together={('avion', 'fila', 'columna')},
+        ),
+        migrations.AlterField(
+            model_name='asiento',
+            name='numero',
+            field=models.CharField(help_text='Número del asiento, único dentro del avión', max_length=10),
+        ),
+        migrations.AlterUniqueTogether(
+            name='asiento',
+            unique_together={('avion', 'fila', 'columna'), ('avion', 'numero')},
+        ),
+    ]
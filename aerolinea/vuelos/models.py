@@ -82,8 +82,8 @@ class Asiento(models.Model):
         help_text="Avión al que pertenece el asiento"
     )
     numero = models.CharField(
-        max_length=10, unique=True,
-        help_text="Número único del asiento"
+        max_length=10,
+        help_text="Número del asiento, único dentro del avión"
     )
     fila = models.PositiveIntegerField(
         validators=[MinValueValidator(1)],
@@ -118,7 +118,7 @@ class Asiento(models.Model):
     class Meta:
         verbose_name = "Asiento"
         verbose_name_plural = "Asientos"
-        unique_together = ['avion', 'fila', 'columna']
+        unique_together = [['avion', 'fila', 'columna'], ['avion', 'numero']]
         # Índices para optimizar consultas frecuentes
         indexes = [
             models.Index(fields=['avion', 'estado']),
@@ -198,11 +198,33 @@ class Vuelo(models.Model):
             models.Index(fields=['fecha_salida']),
             models.Index(fields=['origen', 'destino']),
             models.Index(fields=['estado', 'fecha_salida']),
+            models.Index(fields=['avion', 'fecha_salida']),
         ]
     
     def __str__(self):
         return f"Vuelo {self.id}: {self.origen} → {self.destino}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Guarda el estado y la salida con que se cargó el vuelo.
+        
+        Los signals de vuelos los usan para detectar cambios al guardar
+        sin volver a consultar la base de datos.
+        """
+        instance = super().from_db(db, field_names, values)
+        if 'estado' in instance.__dict__ and 'fecha_salida' in instance.__dict__:
+            instance._estado_cargado = (instance.estado, instance.fecha_salida)
+        return instance
+    
+    def clean(self):
+        """Verifica que el avión esté libre en el horario del vuelo (con rotación)."""
+        if self.avion_id and self.fecha_salida and self.fecha_llegada and self.estado != 'cancelado':
+            from vuelos.services.rotacion import RotacionService
+            RotacionService.validar_vuelo(
+                self.avion_id, self.fecha_salida, self.fecha_llegada, excluir_id=self.pk
+            )
+    
     def get_estado_display(self):
         """Retorna el nombre legible del estado del vuelo."""
         estados = dict(self._meta.get_field('estado').choices)
@@ -215,7 +237,10 @@ class Vuelo(models.Model):
     
     def calcular_precio_asiento(self, tipo_asiento):
         """
-        Calcula el precio según el tipo de asiento.
+        Calcula el precio de lista según el tipo de asiento.
+        
+        Es el precio sin ajustes por ocupación ni anticipación; el precio
+        vigente está en la tabla de tarifas (ver vuelos.services.tarifas).
         
         Args:
             tipo_asiento: 'economica', 'premium', 'primera'
@@ -223,12 +248,56 @@ class Vuelo(models.Model):
         Returns:
             Precio calculado para el tipo de asiento
         """
-        from decimal import Decimal
-        multiplicadores = {
-            'economica': Decimal('1.0'),
-            'premium': Decimal('1.5'),
-            'primera': Decimal('2.0'),
-        }
-        
-        multiplicador = multiplicadores.get(tipo_asiento, Decimal('1.0'))
-        return self.precio_base * multiplicador
+        from .services.tarifas import precio_de_lista
+        return precio_de_lista(self.precio_base, tipo_asiento)
+
+
+class TarifaVuelo(models.Model):
+    """
+    Tarifa vigente de una cabina de un vuelo.
+    
+    Es una tabla precalculada: guarda los contadores de disponibilidad de
+    la cabina y el precio que resulta de ellos, así las búsquedas y los
+    mapas de asientos leen el precio sin recalcularlo. Se actualiza cuando
+    cambian las reservas del vuelo (ver vuelos.services.tarifas).
+    """
+    vuelo = models.ForeignKey(
+        Vuelo, on_delete=models.CASCADE, related_name='tarifas',
+        help_text="Vuelo de la tarifa"
+    )
+    tipo = models.CharField(
+        max_length=20,
+        choices=Asiento._meta.get_field('tipo').choices,
+        help_text="Cabina (tipo de asiento)"
+    )
+    asientos_totales = models.PositiveIntegerField(
+        default=0,
+        help_text="Asientos de la cabina en el avión del vuelo"
+    )
+    asientos_ocupados = models.PositiveIntegerField(
+        default=0,
+        help_text="Asientos de la cabina con reservas activas en el vuelo"
+    )
+    precio = models.DecimalField(
+        max_digits=10, decimal_places=2,
+        help_text="Precio vigente por pasajero"
+    )
+    fecha_actualizacion = models.DateTimeField(
+        auto_now=True,
+        help_text="Último recálculo de la tarifa"
+    )
+    
+    class Meta:
+        verbose_name = "Tarifa de vuelo"
+        verbose_name_plural = "Tarifas de vuelos"
+        db_table = 'tarifas_vuelo'
+        constraints = [
+            models.UniqueConstraint(fields=['vuelo', 'tipo'], name='tarifa_unica_por_cabina'),
+        ]
+    
+    def __str__(self):
+        return f"Vuelo {self.vuelo_id} - {self.tipo}: {self.precio}"
+    
+    @property
+    def asientos_disponibles(self) -> int:
+        return max(self.asientos_totales - self.asientos_ocupados, 0)
@@ -8,7 +8,13 @@ Los repositorios manejan el acceso a datos y las consultas a la base de datos.
 from django.db import models
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils import timezone
-from vuelos.models import Vuelo, Avion, Asiento
+from vuelos.models import Vuelo, Avion, Asiento, TarifaVuelo
+from aerolinea.cache_referencia import CacheReferencia
+from aerolinea.metricas import BUSQUEDA_VUELOS_DURACION, BUSQUEDA_VUELOS_RESULTADOS, MAPA_ASIENTOS_DURACION, medir
+
+# Datos de referencia en caché (se invalidan en vuelos.signals al guardar)
+CACHE_AVIONES = CacheReferencia('avion')
+CACHE_ASIENTOS_AVION = CacheReferencia('asientos_avion')
 
 
 class VueloRepository:
@@ -58,6 +64,37 @@ class VueloRepository:
         except ObjectDoesNotExist:
             return None
     
+    @staticmethod
+    def obtener_estado(vuelo_id: int) -> str | None:
+        """
+        Obtiene solo el estado de un vuelo.
+        
+        Args:
+            vuelo_id (int): ID del vuelo
+            
+        Returns:
+            str: Estado del vuelo o None si no existe
+        """
+        return Vuelo.objects.filter(id=vuelo_id).values_list('estado', flat=True).first()
+    
+    @staticmethod
+    def obtener_para_actualizar(vuelo_id: int) -> Vuelo | None:
+        """
+        Obtiene un vuelo bloqueando su fila hasta el fin de la transacción.
+        
+        Debe llamarse dentro de transaction.atomic().
+        
+        Args:
+            vuelo_id (int): ID del vuelo
+            
+        Returns:
+            Vuelo: Vuelo encontrado o None
+        """
+        try:
+            return Vuelo.objects.select_for_update().get(id=vuelo_id)
+        except ObjectDoesNotExist:
+            return None
+    
     @staticmethod
     def obtener_con_detalles(vuelo_id: int) -> Vuelo | None:
         """
@@ -75,6 +112,7 @@ class VueloRepository:
             return None
     
     @staticmethod
+    @medir(BUSQUEDA_VUELOS_DURACION)
     def buscar_disponibles(filtros: dict = None) -> list[Vuelo]:
         """
         Busca vuelos disponibles con filtros.
@@ -106,24 +144,135 @@ class VueloRepository:
             if filtros.get('precio_max'):
                 queryset = queryset.filter(precio_base__lte=filtros['precio_max'])
         
-        return list(queryset.order_by('fecha_salida'))
+        vuelos = list(queryset.order_by('fecha_salida'))
+        BUSQUEDA_VUELOS_RESULTADOS.observe(len(vuelos))
+        return vuelos
     
     @staticmethod
-    def buscar_por_avion_y_fecha(avion_id: int, fecha_salida) -> list[Vuelo]:
+    def contar_total_y_programados() -> dict:
         """
-        Busca vuelos por avión y fecha.
+        Cuenta el total de vuelos y los programados en una sola consulta.
+        
+        Returns:
+            dict: Cantidades 'total' y 'programados'
+        """
+        return Vuelo.objects.aggregate(
+            total=models.Count('id'),
+            programados=models.Count('id', filter=models.Q(estado='programado'))
+        )
+    
+    @staticmethod
+    def crear_varios(vuelos: list[Vuelo], tamano_lote: int = 1000) -> list[Vuelo]:
+        """
+        Inserta varios vuelos con bulk_create.
+        
+        No dispara los signals post_save de cada vuelo.
         
         Args:
-            avion_id (int): ID del avión
-            fecha_salida: Fecha de salida
+            vuelos (list[Vuelo]): Vuelos sin guardar
+            tamano_lote (int): Vuelos por INSERT
+            
+        Returns:
+            list[Vuelo]: Vuelos creados
+        """
+        return Vuelo.objects.bulk_create(vuelos, batch_size=tamano_lote)
+    
+    @staticmethod
+    def obtener_datos_tarifa(vuelo_ids) -> list[dict]:
+        """
+        Obtiene los datos que usa el motor de tarifas de varios vuelos.
+        
+        Args:
+            vuelo_ids: IDs de los vuelos
+            
+        Returns:
+            list[dict]: Vuelos con id, avion_id, precio_base y fecha_salida
+        """
+        return list(Vuelo.objects.filter(id__in=vuelo_ids).values(
+            'id', 'avion_id', 'precio_base', 'fecha_salida'
+        ))
+    
+    @staticmethod
+    def obtener_con_tarifas(vuelo_ids) -> list[dict]:
+        """
+        Obtiene varios vuelos junto con su tabla de tarifas en una sola consulta.
+        
+        Hay una fila por cabina de la tabla; los vuelos sin tabla traen una
+        sola fila con las columnas de la tarifa en None.
+        
+        Args:
+            vuelo_ids: IDs de los vuelos
+        
+        Returns:
+            list[dict]: Filas con id, estado, precio_base, fecha_salida y
+            tarifas__tipo, tarifas__asientos_totales, tarifas__asientos_ocupados
+            y tarifas__precio
+        """
+        return list(Vuelo.objects.filter(id__in=vuelo_ids).values(
+            'id', 'estado', 'precio_base', 'fecha_salida',
+            'tarifas__tipo', 'tarifas__asientos_totales', 'tarifas__asientos_ocupados',
+            'tarifas__precio'
+        ))
+    
+    @staticmethod
+    def ids_programados_entre(desde, hasta) -> list[int]:
+        """
+        IDs de los vuelos programados que salen dentro de un rango.
+        
+        Args:
+            desde: Inicio del rango
+            hasta: Fin del rango
             
         Returns:
-            list[Vuelo]: Vuelos encontrados
+            list[int]: IDs de los vuelos
         """
         return list(Vuelo.objects.filter(
-            avion_id=avion_id,
-            fecha_salida__date=fecha_salida.date()
-        ).order_by('fecha_salida'))
+            estado='programado', fecha_salida__gte=desde, fecha_salida__lt=hasta
+        ).values_list('id', flat=True))
+    
+    @staticmethod
+    def ids_por_avion_desde(avion_id: int, desde) -> list[int]:
+        """
+        IDs de los vuelos de un avión que salen a partir de un momento.
+        
+        Args:
+            avion_id (int): ID del avión
+            desde: Fecha y hora desde la que se buscan
+        
+        Returns:
+            list[int]: IDs de los vuelos
+        """
+        return list(Vuelo.objects.filter(
+            avion_id=avion_id, fecha_salida__gte=desde
+        ).values_list('id', flat=True))
+    
+    @staticmethod
+    def buscar_tramos(avion_ids, desde, hasta) -> list[dict]:
+        """
+        Busca los vuelos no cancelados que ocupan aviones dentro de un rango.
+        
+        Un vuelo entra si está en el aire en algún momento del rango
+        (sale antes de 'hasta' y llega después de 'desde'). La condición es
+        sobre las columnas sin transformar, así usa el índice (avion, fecha_salida).
+        
+        Args:
+            avion_ids: IDs de los aviones (None = toda la flota)
+            desde: Inicio del rango
+            hasta: Fin del rango
+            
+        Returns:
+            list[dict]: Vuelos con id, avion_id, origen, destino, fechas y estado,
+            ordenados por salida
+        """
+        queryset = Vuelo.objects.filter(
+            fecha_salida__lt=hasta,
+            fecha_llegada__gt=desde
+        ).exclude(estado='cancelado')
+        if avion_ids is not None:
+            queryset = queryset.filter(avion_id__in=avion_ids)
+        return list(queryset.order_by('fecha_salida').values(
+            'id', 'avion_id', 'origen', 'destino', 'fecha_salida', 'fecha_llegada', 'estado'
+        ))
     
     @staticmethod
     def obtener_proximos_vuelos(limite: int = 5) -> list[Vuelo]:
@@ -175,6 +324,37 @@ class VueloRepository:
             return True
         except ObjectDoesNotExist:
             return False
+    
+    @staticmethod
+    def bloquear_varios(vuelo_ids: list[int], estados: list[str]) -> list[tuple]:
+        """
+        Bloquea (SELECT ... FOR UPDATE) los vuelos indicados en ciertos estados.
+        
+        Args:
+            vuelo_ids (list[int]): IDs de los vuelos
+            estados (list[str]): Estados de origen admitidos
+            
+        Returns:
+            list[tuple]: (id, estado) de los vuelos bloqueados
+        """
+        return list(Vuelo.objects.select_for_update().filter(
+            id__in=vuelo_ids, estado__in=estados
+        ).order_by('id').values_list('id', 'estado'))
+    
+    @staticmethod
+    def cambiar_estado_varios(vuelo_ids: list[int], estado: str) -> int:
+        """
+        Cambia el estado de varios vuelos con una sola consulta.
+        
+        No dispara los signals de Vuelo: quien llama se encarga de los
+        contadores, eventos y avisos.
+        
+        Returns:
+            int: Cantidad de vuelos actualizados
+        """
+        if not vuelo_ids:
+            return 0
+        return Vuelo.objects.filter(id__in=vuelo_ids).update(estado=estado)
 
 
 class AvionRepository:
@@ -204,16 +384,33 @@ class AvionRepository:
         """
         Obtiene un avión por su ID.
         
+        Se lee de la caché de datos de referencia: cada llamada devuelve
+        una copia, que se puede modificar y guardar.
+        
         Args:
             avion_id (int): ID del avión
             
         Returns:
             Avion: Avión encontrado o None
         """
-        try:
-            return Avion.objects.get(id=avion_id)
-        except ObjectDoesNotExist:
-            return None
+        avion_id = int(avion_id)
+        return CACHE_AVIONES.obtener(avion_id, lambda: Avion.objects.filter(id=avion_id).first())
+    
+    @staticmethod
+    def invalidar_cache(avion_id: int):
+        """Descarta de la caché el avión y la distribución de sus asientos."""
+        CACHE_AVIONES.invalidar(avion_id)
+        AsientoRepository.invalidar_cache_avion(avion_id)
+    
+    @staticmethod
+    def contar_total() -> int:
+        """
+        Cuenta todos los aviones.
+        
+        Returns:
+            int: Cantidad de aviones
+        """
+        return Avion.objects.count()
     
     @staticmethod
     def buscar_activos() -> list[Avion]:
@@ -225,6 +422,19 @@ class AvionRepository:
         """
         return list(Avion.objects.filter(estado='activo').order_by('modelo'))
     
+    @staticmethod
+    def obtener_varios(avion_ids) -> list[Avion]:
+        """
+        Obtiene varios aviones por ID con una sola consulta.
+        
+        Args:
+            avion_ids: IDs de los aviones
+            
+        Returns:
+            list[Avion]: Aviones encontrados
+        """
+        return list(Avion.objects.filter(id__in=avion_ids))
+    
     @staticmethod
     def buscar_por_modelo(modelo: str) -> list[Avion]:
         """
@@ -277,7 +487,7 @@ class AsientoRepository:
     
     @staticmethod
     def crear(avion_id: int, numero: str, fila: int, columna: str, 
-              clase: str = 'economica', estado: str = 'disponible') -> Asiento:
+              tipo: str = 'economica', estado: str = 'disponible') -> Asiento:
         """
         Crea un nuevo asiento.
         
@@ -286,7 +496,7 @@ class AsientoRepository:
             numero (str): Número del asiento
             fila (int): Fila del asiento
             columna (str): Columna del asiento
-            clase (str): Clase del asiento
+            tipo (str): Tipo (cabina) del asiento
             estado (str): Estado del asiento
             
         Returns:
@@ -297,10 +507,33 @@ class AsientoRepository:
             numero=numero,
             fila=fila,
             columna=columna,
-            clase=clase,
+            tipo=tipo,
             estado=estado
         )
     
+    @staticmethod
+    def crear_varios(asientos: list[Asiento]) -> list[Asiento]:
+        """
+        Inserta varios asientos con una sola consulta.
+        
+        No dispara los signals post_save de cada asiento: la distribución
+        en caché de los aviones afectados se descarta acá.
+        
+        Args:
+            asientos (list[Asiento]): Asientos sin guardar
+            
+        Returns:
+            list[Asiento]: Asientos creados
+        """
+        creados = Asiento.objects.bulk_create(asientos)
+        AsientoRepository.invalidar_cache_avion(*{asiento.avion_id for asiento in creados})
+        return creados
+    
+    @staticmethod
+    def invalidar_cache_avion(*avion_ids):
+        """Descarta de la caché la distribución de asientos de uno o varios aviones."""
+        CACHE_ASIENTOS_AVION.invalidar(*avion_ids)
+    
     @staticmethod
     def obtener_por_id(asiento_id: int) -> Asiento | None:
         """
@@ -317,10 +550,41 @@ class AsientoRepository:
         except ObjectDoesNotExist:
             return None
     
+    @staticmethod
+    def contar_por_tipo(avion_ids) -> dict:
+        """
+        Cuenta los asientos de cada cabina de varios aviones.
+        
+        Args:
+            avion_ids: IDs de los aviones
+            
+        Returns:
+            dict: {(avion_id, tipo): cantidad}
+        """
+        filas = Asiento.objects.filter(avion_id__in=avion_ids).values(
+            'avion_id', 'tipo'
+        ).annotate(cantidad=models.Count('id')).order_by()
+        return {(fila['avion_id'], fila['tipo']): fila['cantidad'] for fila in filas}
+    
+    @staticmethod
+    def aviones_con_asientos(avion_ids) -> set[int]:
+        """
+        IDs de los aviones que ya tienen asientos.
+        
+        Args:
+            avion_ids: IDs de los aviones a consultar
+            
+        Returns:
+            set[int]: Aviones con al menos un asiento
+        """
+        return set(
+            Asiento.objects.filter(avion_id__in=avion_ids).values_list('avion_id', flat=True).distinct()
+        )
+    
     @staticmethod
     def obtener_por_avion(avion_id: int) -> list[Asiento]:
         """
-        Obtiene los asientos de un avión.
+        Obtiene los asientos de un avión (desde la caché de datos de referencia).
         
         Args:
             avion_id (int): ID del avión
@@ -328,7 +592,10 @@ class AsientoRepository:
         Returns:
             list[Asiento]: Asientos del avión
         """
-        return list(Asiento.objects.filter(avion_id=avion_id).order_by('fila', 'columna'))
+        avion_id = int(avion_id)
+        return CACHE_ASIENTOS_AVION.obtener(
+            avion_id, lambda: list(Asiento.objects.filter(avion_id=avion_id).order_by('fila', 'columna'))
+        )
     
     @staticmethod
     def buscar_disponibles_por_vuelo(vuelo_id: int) -> list[Asiento]:
@@ -361,6 +628,115 @@ class AsientoRepository:
         
         return asientos_disponibles
     
+    @staticmethod
+    @medir(MAPA_ASIENTOS_DURACION, origen='asignacion')
+    def obtener_mapa_vuelo(vuelo_id: int):
+        """
+        Obtiene el mapa de asientos de un vuelo para asignación en memoria.
+        
+        Resuelve el mapa con dos consultas: los asientos del avión del vuelo
+        y los asientos con reservas activas en ese vuelo.
+        
+        Args:
+            vuelo_id (int): ID del vuelo
+            
+        Returns:
+            MapaAsientos: Mapa de asientos del vuelo
+        """
+        from reservas.models import Reserva
+        from vuelos.services.asignacion import MapaAsientos
+        
+        asientos = Asiento.objects.filter(
+            avion__vuelos=vuelo_id
+        ).exclude(
+            estado='en_mantenimiento'
+        ).values_list('id', 'fila', 'columna', 'tipo')
+        
+        ocupados = Reserva.objects.filter(
+            vuelo_id=vuelo_id,
+            estado__in=['confirmada', 'pendiente']
+        ).values_list('asiento_id', flat=True)
+        
+        return MapaAsientos(asientos, ocupados)
+    
+    @staticmethod
+    def obtener_mapas_vuelos(vuelos: list[Vuelo]) -> dict:
+        """
+        Obtiene los mapas de asientos de varios vuelos con dos consultas.
+        
+        Args:
+            vuelos (list[Vuelo]): Vuelos (se usa avion_id)
+            
+        Returns:
+            dict: vuelo_id -> MapaAsientos
+        """
+        from reservas.models import Reserva
+        from vuelos.services.asignacion import MapaAsientos
+        
+        asientos_por_avion = {}
+        asientos = Asiento.objects.filter(
+            avion_id__in={vuelo.avion_id for vuelo in vuelos}
+        ).exclude(
+            estado='en_mantenimiento'
+        ).values_list('avion_id', 'id', 'fila', 'columna', 'tipo')
+        for avion_id, *asiento in asientos:
+            asientos_por_avion.setdefault(avion_id, []).append(asiento)
+        
+        ocupados = {}
+        reservados = Reserva.objects.filter(
+            vuelo_id__in=[vuelo.id for vuelo in vuelos],
+            estado__in=['confirmada', 'pendiente']
+        ).values_list('vuelo_id', 'asiento_id')
+        for vuelo_id, asiento_id in reservados:
+            ocupados.setdefault(vuelo_id, set()).add(asiento_id)
+        
+        return {
+            vuelo.id: MapaAsientos(
+                asientos_por_avion.get(vuelo.avion_id, ()), ocupados.get(vuelo.id, ())
+            )
+            for vuelo in vuelos
+        }
+    
+    @staticmethod
+    def obtener_disponibilidad_vuelo(vuelo_id: int) -> list[dict]:
+        """
+        Obtiene los asientos de un vuelo con su ocupación y precio en una sola consulta.
+        
+        Cada asiento trae el código de la reserva activa que lo ocupa en el
+        vuelo (si hay), el precio vigente de su cabina según la tabla de
+        tarifas y el estado y precio base del vuelo.
+        
+        Args:
+            vuelo_id (int): ID del vuelo
+        
+        Returns:
+            list[dict]: Asientos ordenados por fila y columna (vacía si el
+            vuelo no existe o su avión no tiene asientos)
+        """
+        from reservas.models import Reserva
+        
+        reserva = Reserva.objects.filter(
+            vuelo_id=vuelo_id,
+            asiento_id=models.OuterRef('pk'),
+            estado__in=['confirmada', 'pendiente']
+        ).values('codigo_reserva')[:1]
+        precio = TarifaVuelo.objects.filter(
+            vuelo_id=vuelo_id,
+            tipo=models.OuterRef('tipo')
+        ).values('precio')[:1]
+        
+        return list(Asiento.objects.filter(
+            avion__vuelos=vuelo_id
+        ).annotate(
+            reserva=models.Subquery(reserva),
+            precio=models.Subquery(precio),
+            estado_vuelo=models.F('avion__vuelos__estado'),
+            precio_base=models.F('avion__vuelos__precio_base'),
+        ).order_by('fila', 'columna').values(
+            'id', 'numero', 'fila', 'columna', 'tipo', 'estado',
+            'reserva', 'precio', 'estado_vuelo', 'precio_base'
+        ))
+    
     @staticmethod
     def esta_reservado_para_vuelo(asiento_id: int, vuelo_id: int) -> bool:
         """
@@ -398,4 +774,90 @@ class AsientoRepository:
             asiento.save()
             return True
         except ObjectDoesNotExist:
-            return False 
\ No newline at end of file
+            return False
+    
+    @staticmethod
+    def cambiar_estado_varios(asiento_ids: list[int], nuevo_estado: str) -> int:
+        """
+        Cambia el estado de varios asientos con una sola consulta.
+        
+        Args:
+            asiento_ids (list[int]): IDs de los asientos
+            nuevo_estado (str): Nuevo estado
+            
+        Returns:
+            int: Cantidad de asientos actualizados
+        """
+        if not asiento_ids:
+            return 0
+        return Asiento.objects.filter(id__in=asiento_ids).exclude(
+            estado=nuevo_estado
+        ).update(estado=nuevo_estado)
+    
+    @staticmethod
+    def liberar_varios(asiento_ids: list[int]) -> int:
+        """
+        Marca como disponibles los asientos sin reservas activas.
+        
+        Los asientos que todavía tienen una reserva pendiente o confirmada
+        en un vuelo programado o en curso no se tocan. Es una sola consulta
+        (UPDATE con subconsulta).
+        
+        Args:
+            asiento_ids (list[int]): IDs de los asientos
+            
+        Returns:
+            int: Cantidad de asientos liberados
+        """
+        from reservas.models import Reserva
+        if not asiento_ids:
+            return 0
+        en_uso = Reserva.objects.filter(
+            asiento_id=models.OuterRef('pk'),
+            estado__in=['confirmada', 'pendiente'],
+            vuelo__estado__in=['programado', 'en_vuelo']
+        )
+        return Asiento.objects.filter(id__in=asiento_ids).exclude(
+            estado='disponible'
+        ).exclude(models.Exists(en_uso)).update(estado='disponible')
+
+
+class TarifaVueloRepository:
+    """Repositorio para la tabla de tarifas de los vuelos."""
+    
+    @staticmethod
+    def guardar_varias(tarifas: list[TarifaVuelo]) -> int:
+        """
+        Inserta o actualiza varias tarifas con una sola consulta.
+        
+        Args:
+            tarifas (list[TarifaVuelo]): Tarifas sin guardar
+            
+        Returns:
+            int: Cantidad de tarifas guardadas
+        """
+        if not tarifas:
+            return 0
+        TarifaVuelo.objects.bulk_create(
+            tarifas,
+            update_conflicts=True,
+            unique_fields=['vuelo', 'tipo'],
+            update_fields=['asientos_totales', 'asientos_ocupados', 'precio', 'fecha_actualizacion'],
+        )
+        return len(tarifas)
+    
+    @staticmethod
+    def obtener_por_vuelos(vuelo_ids) -> dict:
+        """
+        Obtiene las tarifas de varios vuelos.
+        
+        Args:
+            vuelo_ids: IDs de los vuelos
+            
+        Returns:
+            dict: {vuelo_id: {tipo: TarifaVuelo}}
+        """
+        tablas = {}
+        for tarifa in TarifaVuelo.objects.filter(vuelo_id__in=vuelo_ids):
+            tablas.setdefault(tarifa.vuelo_id, {})[tarifa.tipo] = tarifa
+        return tablas
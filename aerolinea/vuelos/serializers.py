@@ -5,10 +5,29 @@ Este archivo define los serializers relacionados con:
 - Aviones
 - Asientos
 - Vuelos
+- Cotizaciones en bloque
 """
 
+from django.conf import settings
 from rest_framework import serializers
 from .models import Avion, Asiento, Vuelo
+from .repositories.vuelos import AvionRepository
+
+
+class AvionCacheadoField(serializers.ReadOnlyField):
+    """
+    Atributo del avión de un objeto, leído de la caché de datos de
+    referencia: los listados no consultan el avión de cada elemento.
+    """
+    
+    def __init__(self, atributo: str, **kwargs):
+        self.atributo = atributo
+        kwargs.setdefault('source', 'avion_id')
+        super().__init__(**kwargs)
+    
+    def to_representation(self, avion_id):
+        avion = AvionRepository.obtener_por_id(avion_id)
+        return getattr(avion, self.atributo) if avion else None
 
 
 class AvionSerializer(serializers.ModelSerializer):
@@ -26,7 +45,7 @@ class AsientoSerializer(serializers.ModelSerializer):
     """
     Serializer para el modelo Asiento.
     """
-    avion_modelo = serializers.CharField(source='avion.modelo', read_only=True)
+    avion_modelo = AvionCacheadoField('modelo')
     estado_display = serializers.CharField(source='get_estado_display', read_only=True)
     tipo_display = serializers.CharField(source='get_tipo_display', read_only=True)
     
@@ -40,8 +59,8 @@ class VueloSerializer(serializers.ModelSerializer):
     """
     Serializer para el modelo Vuelo.
     """
-    avion_modelo = serializers.CharField(source='avion.modelo', read_only=True)
-    avion_capacidad = serializers.IntegerField(source='avion.capacidad', read_only=True)
+    avion_modelo = AvionCacheadoField('modelo')
+    avion_capacidad = AvionCacheadoField('capacidad')
     estado_display = serializers.CharField(source='get_estado_display', read_only=True)
     
     class Meta:
@@ -54,7 +73,7 @@ class VueloListSerializer(serializers.ModelSerializer):
     """
     Serializer simplificado para listar vuelos.
     """
-    avion_modelo = serializers.CharField(source='avion.modelo', read_only=True)
+    avion_modelo = AvionCacheadoField('modelo')
     estado_display = serializers.CharField(source='get_estado_display', read_only=True)
     ruta = serializers.SerializerMethodField()
     
@@ -68,3 +87,45 @@ class VueloListSerializer(serializers.ModelSerializer):
         """Retorna la ruta del vuelo como string."""
         return f"{obj.origen} → {obj.destino}"
 
+
+
+class SolicitudCotizacionSerializer(serializers.Serializer):
+    """
+    Serializer para una solicitud de cotización: vuelo, cabina y pasajeros.
+    """
+    vuelo_id = serializers.IntegerField(min_value=1)
+    tipo = serializers.ChoiceField(choices=Asiento._meta.get_field('tipo').choices)
+    pasajeros = serializers.IntegerField(min_value=1)
+    
+    def validate_pasajeros(self, value):
+        maximo = getattr(settings, 'COTIZACION_MAX_PASAJEROS', 9)
+        if value > maximo:
+            raise serializers.ValidationError(f"No se pueden cotizar más de {maximo} pasajeros por solicitud")
+        return value
+
+
+class CotizacionSerializer(serializers.Serializer):
+    """
+    Serializer para el pedido de cotización en bloque.
+    """
+    solicitudes = SolicitudCotizacionSerializer(many=True, allow_empty=False)
+    
+    def validate_solicitudes(self, value):
+        maximo = getattr(settings, 'COTIZACION_MAX_SOLICITUDES', 500)
+        if len(value) > maximo:
+            raise serializers.ValidationError(f"No se pueden cotizar más de {maximo} solicitudes por pedido")
+        return value
+
+
+class ResultadoCotizacionSerializer(serializers.Serializer):
+    """
+    Serializer para la cotización de una solicitud (ver TarifaService.cotizar).
+    """
+    vuelo_id = serializers.IntegerField()
+    tipo = serializers.CharField()
+    pasajeros = serializers.IntegerField()
+    disponible = serializers.BooleanField()
+    asientos_disponibles = serializers.IntegerField()
+    precio_unitario = serializers.DecimalField(max_digits=12, decimal_places=2, allow_null=True)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2, allow_null=True)
+    motivo = serializers.CharField(allow_null=True)
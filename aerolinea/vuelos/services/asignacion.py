@@ -0,0 +1,279 @@
+"""
+Motor de asignación automática de asientos.
+
+Este archivo implementa la selección de asientos en memoria sobre el mapa
+de asientos de un vuelo. El mapa se carga una sola vez desde la base de
+datos (ver AsientoRepository.obtener_mapa_vuelo) y a partir de ahí todas
+las búsquedas se resuelven con máscaras de bits por fila, sin consultas
+adicionales.
+
+Criterios de asignación, en orden de prioridad:
+- Cabina (tipo de asiento) solicitada
+- Adyacencia: misma fila y columnas contiguas sin cruzar el pasillo
+- Preferencia de ventanilla o pasillo
+- Balance de carga: se prefieren las filas más vacías de la cabina
+"""
+
+from django.core.exceptions import ValidationError
+
+
+# Orden en que se prueban las cabinas cuando no se especifica una
+ORDEN_CABINAS = ['economica', 'premium', 'primera']
+
+PREFERENCIAS_VALIDAS = ['ventanilla', 'pasillo']
+
+# Índices (base 0) de las columnas después de las cuales hay un pasillo,
+# según la cantidad de columnas del avión.
+#   6 columnas -> ABC | DEF
+#   9 columnas -> ABC | DEF | GHJ
+PASILLOS_POR_COLUMNAS = {
+    1: (),
+    2: (),
+    3: (0,),
+    4: (1,),
+    5: (1,),
+    6: (2,),
+    7: (1, 4),
+    8: (1, 5),
+    9: (2, 5),
+    10: (2, 6),
+}
+
+
+class _Cabina:
+    """Estructura interna con las filas de asientos de una misma cabina."""
+
+    __slots__ = ('filas', 'libres', 'ids', 'total')
+
+    def __init__(self):
+        # fila -> máscara de bits de columnas libres
+        self.libres = {}
+        # fila -> {indice_columna: asiento_id}
+        self.ids = {}
+        self.filas = []
+        self.total = 0
+
+
+class MapaAsientos:
+    """
+    Mapa de asientos de un vuelo en memoria.
+
+    Cada fila se representa con una máscara de bits donde el bit ``i``
+    indica si la columna ``i`` está libre. Las operaciones de búsqueda
+    son proporcionales a la cantidad de filas de la cabina.
+    """
+
+    def __init__(self, asientos, ocupados=()):
+        """
+        Construye el mapa.
+
+        Args:
+            asientos: Iterable de tuplas (id, fila, columna, tipo)
+            ocupados: Iterable de IDs de asientos ya reservados en el vuelo
+        """
+        ocupados = set(ocupados)
+        asientos = list(asientos)
+
+        columnas = sorted({columna for _, _, columna, _ in asientos})
+        self.columnas = columnas
+        self._indice_columna = {columna: i for i, columna in enumerate(columnas)}
+        self._cabinas = {}
+        # asiento_id -> (tipo, fila, indice_columna)
+        self._posiciones = {}
+
+        ancho = len(columnas)
+        self._ventanillas = self._mascara((0, ancho - 1)) if ancho else 0
+        pasillos = PASILLOS_POR_COLUMNAS.get(ancho, ())
+        self._pasillos = self._mascara(
+            [i for p in pasillos for i in (p, p + 1)]
+        )
+        # Bloques de columnas contiguas entre pasillos
+        limites = [0] + [p + 1 for p in pasillos] + [ancho]
+        self._bloques = [
+            (limites[i], limites[i + 1]) for i in range(len(limites) - 1)
+            if limites[i] < limites[i + 1]
+        ]
+
+        for asiento_id, fila, columna, tipo in asientos:
+            cabina = self._cabinas.get(tipo)
+            if cabina is None:
+                cabina = self._cabinas[tipo] = _Cabina()
+            indice = self._indice_columna[columna]
+            if fila not in cabina.ids:
+                cabina.ids[fila] = {}
+                cabina.libres[fila] = 0
+            cabina.ids[fila][indice] = asiento_id
+            cabina.total += 1
+            self._posiciones[asiento_id] = (tipo, fila, indice)
+            if asiento_id not in ocupados:
+                cabina.libres[fila] |= 1 << indice
+
+        for cabina in self._cabinas.values():
+            cabina.filas = sorted(cabina.ids)
+
+    @staticmethod
+    def _mascara(indices):
+        mascara = 0
+        for i in indices:
+            mascara |= 1 << i
+        return mascara
+
+    def disponibles(self, tipo: str = None) -> int:
+        """Cantidad de asientos libres, opcionalmente de una cabina."""
+        cabinas = [self._cabinas.get(tipo)] if tipo else self._cabinas.values()
+        return sum(
+            bin(mascara).count('1')
+            for cabina in cabinas if cabina
+            for mascara in cabina.libres.values()
+        )
+
+    def esta_libre(self, asiento_id: int) -> bool:
+        """Indica si un asiento existe en el mapa y está libre."""
+        posicion = self._posiciones.get(asiento_id)
+        if posicion is None:
+            return False
+        tipo, fila, indice = posicion
+        return bool(self._cabinas[tipo].libres[fila] >> indice & 1)
+
+    def ocupar(self, asiento_ids):
+        """Marca asientos como ocupados en el mapa."""
+        for asiento_id in asiento_ids:
+            tipo, fila, indice = self._posiciones[asiento_id]
+            self._cabinas[tipo].libres[fila] &= ~(1 << indice)
+
+    def liberar(self, asiento_ids):
+        """Marca asientos como libres en el mapa."""
+        for asiento_id in asiento_ids:
+            tipo, fila, indice = self._posiciones[asiento_id]
+            self._cabinas[tipo].libres[fila] |= 1 << indice
+
+    def asignar(self, cantidad: int = 1, tipo: str = None,
+                preferencia: str = None) -> list[int]:
+        """
+        Selecciona y ocupa los mejores asientos para un grupo.
+
+        Args:
+            cantidad (int): Cantidad de pasajeros del grupo
+            tipo (str): Cabina solicitada ('economica', 'premium', 'primera')
+            preferencia (str): 'ventanilla', 'pasillo' o None
+
+        Returns:
+            list[int]: IDs de los asientos asignados, ordenados por posición
+
+        Raises:
+            ValidationError: Si no hay asientos suficientes
+        """
+        if cantidad < 1:
+            raise ValidationError("La cantidad de pasajeros debe ser mayor a 0")
+        if preferencia and preferencia not in PREFERENCIAS_VALIDAS:
+            raise ValidationError("Preferencia de asiento no válida")
+
+        tipos = [tipo] if tipo else [t for t in ORDEN_CABINAS if t in self._cabinas]
+        for tipo_cabina in tipos:
+            cabina = self._cabinas.get(tipo_cabina)
+            if cabina is None:
+                continue
+            seleccion = self._asignar_en_cabina(cabina, cantidad, preferencia)
+            if seleccion:
+                ids = [cabina.ids[fila][indice] for fila, indice in seleccion]
+                self.ocupar(ids)
+                return ids
+
+        raise ValidationError("No hay asientos disponibles suficientes en el vuelo")
+
+    def _asignar_en_cabina(self, cabina, cantidad, preferencia):
+        """Retorna una lista de (fila, indice_columna) o None."""
+        if self._libres_cabina(cabina) < cantidad:
+            return None
+
+        return (
+            self._misma_fila(cabina, cantidad, preferencia)
+            or self._filas_consecutivas(cabina, cantidad)
+            or self._cualquiera(cabina, cantidad)
+        )
+
+    @staticmethod
+    def _libres_cabina(cabina):
+        return sum(bin(m).count('1') for m in cabina.libres.values())
+
+    def _misma_fila(self, cabina, cantidad, preferencia):
+        """Busca un bloque contiguo en una sola fila."""
+        ancho = len(self.columnas)
+        if cantidad > ancho:
+            return None
+
+        bloque = (1 << cantidad) - 1
+        mascara_preferencia = {
+            'ventanilla': self._ventanillas,
+            'pasillo': self._pasillos,
+        }.get(preferencia, 0)
+
+        # Puntaje de un bloque ideal: no cruza pasillo, cumple la preferencia
+        # y está en una fila completamente libre
+        ideal = (False, False, -ancho)
+
+        mejor = None
+        mejor_puntaje = None
+        for fila in cabina.filas:
+            libres = cabina.libres[fila]
+            vacios = bin(libres).count('1')
+            if vacios < cantidad:
+                continue
+            for inicio in range(ancho - cantidad + 1):
+                candidato = bloque << inicio
+                if libres & candidato != candidato:
+                    continue
+                # Penalizar bloques que cruzan el pasillo
+                cruza = not any(
+                    a <= inicio and inicio + cantidad <= b for a, b in self._bloques
+                )
+                cumple = bool(candidato & mascara_preferencia) if preferencia else True
+                puntaje = (cruza, not cumple, -vacios, fila, inicio)
+                if mejor_puntaje is None or puntaje < mejor_puntaje:
+                    mejor_puntaje = puntaje
+                    mejor = (fila, inicio)
+            if mejor_puntaje is not None and mejor_puntaje[:3] == ideal:
+                # Las filas siguientes no pueden mejorar este puntaje
+                break
+
+        if mejor is None:
+            return None
+        fila, inicio = mejor
+        return [(fila, i) for i in range(inicio, inicio + cantidad)]
+
+    def _filas_consecutivas(self, cabina, cantidad):
+        """Reparte el grupo en la menor cantidad de filas consecutivas."""
+        filas = cabina.filas
+        mejor = None
+        for i in range(len(filas)):
+            seleccion = []
+            for j in range(i, len(filas)):
+                fila = filas[j]
+                if j > i and fila != filas[j - 1] + 1:
+                    break
+                libres = cabina.libres[fila]
+                for indice in range(len(self.columnas)):
+                    if libres >> indice & 1:
+                        seleccion.append((fila, indice))
+                        if len(seleccion) == cantidad:
+                            break
+                if len(seleccion) == cantidad:
+                    span = j - i
+                    if mejor is None or span < mejor[0]:
+                        mejor = (span, seleccion)
+                    break
+            if mejor is not None and mejor[0] == 0:
+                break
+        return mejor[1] if mejor else None
+
+    def _cualquiera(self, cabina, cantidad):
+        """Toma los primeros asientos libres de la cabina."""
+        seleccion = []
+        for fila in cabina.filas:
+            libres = cabina.libres[fila]
+            for indice in range(len(self.columnas)):
+                if libres >> indice & 1:
+                    seleccion.append((fila, indice))
+                    if len(seleccion) == cantidad:
+                        return seleccion
+        return None
@@ -0,0 +1,159 @@
+"""
+Disponibilidad de asientos por vuelo.
+
+El selector de asientos consulta la disponibilidad en cada clic. En lugar
+de buscar el asiento, el vuelo y la reserva por separado, la disponibilidad
+de todos los asientos de un vuelo se arma con una sola consulta (ver
+AsientoRepository.obtener_disponibilidad_vuelo) y se guarda en caché; las
+consultas de uno o varios asientos se responden desde esa estructura, sin
+tocar la base mientras la caché esté cargada.
+
+Cada estructura lleva una versión (hash de su contenido) que las vistas
+usan como ETag: el selector puede repetir la consulta con If-None-Match y
+recibe 304 mientras nada cambie.
+
+La caché de un vuelo se descarta cuando cambian sus reservas (suscriptores
+de vuelos), cuando se modifica el vuelo o el estado de un asiento de su
+avión (signals), y en el peor caso vence a los DISPONIBILIDAD_TTL segundos.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+
+class DisponibilidadService:
+    """Servicio para consultar la disponibilidad de los asientos de un vuelo."""
+
+    PREFIJO_CLAVE = 'disponibilidad:vuelo:'
+
+    @staticmethod
+    def _clave(vuelo_id: int) -> str:
+        return f'{DisponibilidadService.PREFIJO_CLAVE}{vuelo_id}'
+
+    @staticmethod
+    def obtener(vuelo_id: int) -> dict | None:
+        """
+        Obtiene la disponibilidad de todos los asientos de un vuelo.
+
+        Args:
+            vuelo_id (int): ID del vuelo
+
+        Returns:
+            dict: 'vuelo_id', 'estado_vuelo', 'version' y 'asientos'
+            ({asiento_id: datos del asiento}), o None si el vuelo no existe
+        """
+        clave = DisponibilidadService._clave(vuelo_id)
+        disponibilidad = cache.get(clave)
+        if disponibilidad is None:
+            disponibilidad = DisponibilidadService._construir(vuelo_id)
+            if disponibilidad is None:
+                return None
+            cache.set(clave, disponibilidad, getattr(settings, 'DISPONIBILIDAD_TTL', 300))
+        return disponibilidad
+
+    @staticmethod
+    def _construir(vuelo_id: int) -> dict | None:
+        """Arma la disponibilidad de un vuelo desde la base."""
+        from vuelos.repositories.vuelos import AsientoRepository, VueloRepository
+        from vuelos.services.tarifas import CENTAVOS, TarifaService
+
+        filas = AsientoRepository.obtener_disponibilidad_vuelo(vuelo_id)
+        if filas:
+            estado_vuelo = filas[0]['estado_vuelo']
+        else:
+            # Vuelo inexistente o avión sin asientos
+            vuelo = VueloRepository.obtener_por_id(vuelo_id)
+            if vuelo is None:
+                return None
+            estado_vuelo = vuelo.estado
+
+        # Las cabinas sin tabla de tarifas (vuelo recién creado) se calculan una vez
+        precios = {
+            fila['tipo']: fila['precio'].quantize(CENTAVOS)
+            for fila in filas if fila['precio'] is not None
+        }
+        for tipo in {fila['tipo'] for fila in filas} - precios.keys():
+            precios[tipo] = TarifaService.precio(vuelo_id, tipo)
+
+        acepta_reservas = estado_vuelo == 'programado'
+        asientos = {}
+        for fila in filas:
+            disponible_basico = fila['estado'] == 'disponible'
+            disponible_vuelo = acepta_reservas and fila['reserva'] is None
+            asientos[fila['id']] = {
+                'asiento_id': fila['id'],
+                'numero': fila['numero'],
+                'fila': fila['fila'],
+                'columna': fila['columna'],
+                'estado': fila['estado'],
+                'tipo': fila['tipo'],
+                'disponible_basico': disponible_basico,
+                'disponible_vuelo': disponible_vuelo,
+                'disponible': disponible_basico and disponible_vuelo,
+                'en_mantenimiento': fila['estado'] == 'en_mantenimiento',
+                'precio': precios[fila['tipo']],
+                'reserva_existente': fila['reserva'],
+            }
+
+        contenido = repr((estado_vuelo, sorted(
+            (asiento_id, tuple(datos.values())) for asiento_id, datos in asientos.items()
+        )))
+        return {
+            'vuelo_id': vuelo_id,
+            'estado_vuelo': estado_vuelo,
+            'version': hashlib.sha1(contenido.encode()).hexdigest(),
+            'asientos': asientos,
+        }
+
+    @staticmethod
+    def version(vuelo_id: int) -> str | None:
+        """Versión actual de la disponibilidad de un vuelo (para el ETag)."""
+        disponibilidad = DisponibilidadService.obtener(vuelo_id)
+        return disponibilidad['version'] if disponibilidad else None
+
+    @staticmethod
+    def verificar(vuelo_id: int, asiento_ids=None) -> dict | None:
+        """
+        Disponibilidad de uno, varios o todos los asientos de un vuelo.
+
+        Args:
+            vuelo_id (int): ID del vuelo
+            asiento_ids: IDs de los asientos (None = todos). Los que no son
+                del avión del vuelo se informan en 'no_encontrados'
+
+        Returns:
+            dict: 'vuelo_id', 'estado_vuelo', 'version', 'asientos' (lista)
+            y 'no_encontrados', o None si el vuelo no existe
+        """
+        disponibilidad = DisponibilidadService.obtener(vuelo_id)
+        if disponibilidad is None:
+            return None
+
+        asientos = disponibilidad['asientos']
+        if asiento_ids is None:
+            encontrados, no_encontrados = list(asientos.values()), []
+        else:
+            encontrados = [asientos[a] for a in asiento_ids if a in asientos]
+            no_encontrados = [a for a in asiento_ids if a not in asientos]
+        return {
+            'vuelo_id': vuelo_id,
+            'estado_vuelo': disponibilidad['estado_vuelo'],
+            'version': disponibilidad['version'],
+            'asientos': encontrados,
+            'no_encontrados': no_encontrados,
+        }
+
+    @staticmethod
+    def invalidar(vuelo_ids):
+        """Descarta la disponibilidad en caché de varios vuelos."""
+        cache.delete_many([DisponibilidadService._clave(vuelo_id) for vuelo_id in set(vuelo_ids)])
+
+    @staticmethod
+    def invalidar_avion(avion_id: int):
+        """Descarta la disponibilidad en caché de los próximos vuelos de un avión."""
+        from vuelos.repositories.vuelos import VueloRepository
+
+        DisponibilidadService.invalidar(VueloRepository.ids_por_avion_desde(avion_id, timezone.now()))
@@ -0,0 +1,98 @@
+"""
+Estadísticas del sistema para el panel de administración y los reportes.
+
+Son agregados sobre tablas completas (vuelos, reservas, pasajeros) que se
+consultan seguido y toleran algunos minutos de atraso, así que se guardan
+en caché por ESTADISTICAS_TTL segundos con aerolinea.cache_aside: al
+vencer los recalcula una sola solicitud, no todas las que llegan juntas.
+"""
+
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from aerolinea.cache_aside import obtener_o_calcular
+
+
+class EstadisticasService:
+    """Servicio para las estadísticas generales y los reportes en caché."""
+
+    CLAVE_RESUMEN = 'estadisticas:resumen'
+    PREFIJO_REPORTE = 'estadisticas:reporte:'
+
+    @staticmethod
+    def _ttl() -> int:
+        return getattr(settings, 'ESTADISTICAS_TTL', 300)
+
+    @staticmethod
+    def resumen() -> dict:
+        """
+        Cantidades de vuelos, reservas, pasajeros, usuarios y aviones por estado.
+
+        Returns:
+            dict: 'total_vuelos', 'vuelos_activos', 'vuelos_en_vuelo',
+            'vuelos_completados', 'total_reservas', 'reservas_pendientes',
+            'reservas_confirmadas', 'total_pasajeros', 'total_usuarios',
+            'total_aviones', 'aviones_activos' y 'aviones_mantenimiento'
+        """
+        return obtener_o_calcular(
+            EstadisticasService.CLAVE_RESUMEN,
+            EstadisticasService._calcular_resumen,
+            EstadisticasService._ttl()
+        )
+
+    @staticmethod
+    def _calcular_resumen() -> dict:
+        """Cuenta todo con una consulta por tabla."""
+        from pasajeros.models import Pasajero
+        from reservas.models import Reserva
+        from usuarios.models import Usuario
+        from vuelos.models import Avion, Vuelo
+
+        resumen = {}
+        resumen.update(Vuelo.objects.aggregate(
+            total_vuelos=Count('id'),
+            vuelos_activos=Count('id', filter=Q(estado='programado')),
+            vuelos_en_vuelo=Count('id', filter=Q(estado='en_vuelo')),
+            vuelos_completados=Count('id', filter=Q(estado='aterrizado')),
+        ))
+        resumen.update(Reserva.objects.aggregate(
+            total_reservas=Count('id'),
+            reservas_pendientes=Count('id', filter=Q(estado='pendiente')),
+            reservas_confirmadas=Count('id', filter=Q(estado='confirmada')),
+        ))
+        resumen.update(Avion.objects.aggregate(
+            total_aviones=Count('id'),
+            aviones_activos=Count('id', filter=Q(estado='activo')),
+            aviones_mantenimiento=Count('id', filter=Q(estado='mantenimiento')),
+        ))
+        resumen['total_pasajeros'] = Pasajero.objects.count()
+        resumen['total_usuarios'] = Usuario.objects.count()
+        return resumen
+
+    @staticmethod
+    def reporte(nombre: str, parametros, calcular):
+        """
+        Resultado de un reporte, en caché según su nombre y sus parámetros.
+
+        Args:
+            nombre (str): Nombre del reporte
+            parametros: QueryDict (o dict) con los filtros del reporte;
+                el orden de los parámetros no cambia la clave
+            calcular: Función sin argumentos que arma el resultado
+
+        Returns:
+            El resultado del reporte
+        """
+        if hasattr(parametros, 'lists'):
+            pares = [(clave, valor) for clave, valores in parametros.lists() for valor in valores]
+        else:
+            pares = list(parametros.items())
+        huella = hashlib.sha1(urlencode(sorted(pares)).encode()).hexdigest()
+        return obtener_o_calcular(
+            f'{EstadisticasService.PREFIJO_REPORTE}{nombre}:{huella}',
+            calcular,
+            EstadisticasService._ttl()
+        )
@@ -0,0 +1,112 @@
+"""
+Mapa de asientos en vivo (server-sent events).
+
+Los selectores de asientos abren una conexión por vuelo (vista
+stream_asientos, solo bajo ASGI) y reciben:
+
+- 'mapa': la disponibilidad completa al conectarse (y de nuevo si la
+  conexión se atrasa y pierde mensajes)
+- 'asientos': los cambios, con los asientos 'ocupados' y 'liberados'
+- 'vuelo': el nuevo estado del vuelo cuando cambia
+
+Los cambios salen de los eventos de reservas (suscriptores de vuelos) y
+viajan por el broker de aerolinea.pubsub hasta las conexiones abiertas.
+Así el navegador no consulta la disponibilidad de cada asiento y se
+entera de las reservas ajenas antes de intentar reservar.
+"""
+
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from aerolinea.pubsub import obtener_broker
+
+
+def formatear_evento(nombre: str, datos) -> str:
+    """Formatea un mensaje en el formato de server-sent events."""
+    return f"event: {nombre}\ndata: {json.dumps(datos, cls=DjangoJSONEncoder)}\n\n"
+
+
+class MapaEnVivoService:
+    """Servicio para transmitir los cambios del mapa de asientos de un vuelo."""
+
+    @staticmethod
+    def canal(vuelo_id: int) -> str:
+        return f'asientos:vuelo:{vuelo_id}'
+
+    @staticmethod
+    def publicar_cambios(cambios: dict):
+        """
+        Publica los cambios de ocupación de varios vuelos.
+
+        Args:
+            cambios (dict): {vuelo_id: {'ocupados': [...], 'liberados': [...]}}
+        """
+        broker = obtener_broker()
+        for vuelo_id, cambio in cambios.items():
+            broker.publicar(MapaEnVivoService.canal(vuelo_id), ('asientos', cambio))
+
+    @staticmethod
+    def publicar_estado(vuelo_id: int, estado: str):
+        """Publica el cambio de estado de un vuelo."""
+        obtener_broker().publicar(MapaEnVivoService.canal(vuelo_id), ('vuelo', {'estado_vuelo': estado}))
+
+    @staticmethod
+    def mapa(vuelo_id: int) -> dict | None:
+        """Disponibilidad completa del vuelo en el formato del evento 'mapa'."""
+        from vuelos.services.disponibilidad import DisponibilidadService
+
+        disponibilidad = DisponibilidadService.verificar(vuelo_id)
+        if disponibilidad is None:
+            return None
+        return {
+            'vuelo_id': vuelo_id,
+            'estado_vuelo': disponibilidad['estado_vuelo'],
+            'version': disponibilidad['version'],
+            'asientos': {
+                asiento['asiento_id']: asiento['disponible'] for asiento in disponibilidad['asientos']
+            },
+        }
+
+    @staticmethod
+    async def transmitir(vuelo_id: int, duracion: float = None):
+        """
+        Genera el stream de eventos del mapa de asientos de un vuelo.
+
+        Se suscribe al canal antes de leer el mapa, así no se pierden los
+        cambios que ocurran entre la lectura y la suscripción. Cuando no hay
+        cambios envía un comentario cada SSE_LATIDO_SEGUNDOS para mantener
+        viva la conexión, y la cierra a los SSE_DURACION_MAXIMA segundos (el
+        navegador reconecta solo).
+
+        Args:
+            vuelo_id (int): ID del vuelo
+            duracion (float): Segundos máximos de la conexión
+
+        Yields:
+            str: Mensajes en formato server-sent events
+        """
+        latido = getattr(settings, 'SSE_LATIDO_SEGUNDOS', 15)
+        if duracion is None:
+            duracion = getattr(settings, 'SSE_DURACION_MAXIMA', 300)
+        loop = asyncio.get_running_loop()
+        limite = loop.time() + duracion
+
+        async with obtener_broker().suscribir(MapaEnVivoService.canal(vuelo_id)) as suscripcion:
+            yield f"retry: {getattr(settings, 'SSE_REINTENTO_MS', 3000)}\n\n"
+            yield formatear_evento('mapa', await sync_to_async(MapaEnVivoService.mapa)(vuelo_id))
+
+            while (restante := limite - loop.time()) > 0:
+                mensaje = await suscripcion.recibir(timeout=min(latido, restante))
+                if suscripcion.desbordada:
+                    # Se perdieron cambios: descartar los viejos y reenviar el mapa completo
+                    suscripcion.vaciar()
+                    yield formatear_evento('mapa', await sync_to_async(MapaEnVivoService.mapa)(vuelo_id))
+                elif mensaje is None:
+                    yield ': latido\n\n'
+                else:
+                    nombre, datos = mensaje
+                    yield formatear_evento(nombre, datos)
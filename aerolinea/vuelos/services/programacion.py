@@ -0,0 +1,273 @@
+"""
+Generación masiva de vuelos a partir de patrones de programación.
+
+Un patrón describe un vuelo recurrente de una temporada: ruta, días de la
+semana, hora de salida, duración, avión y rango de fechas. La generación:
+
+1. Expande los patrones en vuelos concretos (en memoria)
+2. Valida todo el lote de una vez: datos, aviones (una consulta) y
+   rotación contra los vuelos existentes y entre sí (una consulta,
+   ver vuelos.services.rotacion)
+3. Inserta los vuelos con bulk_create en una sola transacción y crea los
+   asientos de los aviones que todavía no los tienen
+
+Así una temporada completa se carga con un puñado de consultas en lugar
+de varias por vuelo (ver el comando generar_programacion).
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
+
+
+logger = logging.getLogger(__name__)
+
+# Días de la semana (isoweekday: 1 = lunes ... 7 = domingo)
+DIAS_SEMANA = {
+    'lun': 1, 'mar': 2, 'mie': 3, 'mié': 3, 'jue': 4,
+    'vie': 5, 'sab': 6, 'sáb': 6, 'dom': 7,
+}
+
+# Errores de validación que se muestran antes de cortar el mensaje
+MAX_ERRORES_INFORMADOS = 10
+
+
+@dataclass(frozen=True)
+class PatronVuelo:
+    """Vuelo recurrente de una temporada."""
+
+    origen: str
+    destino: str
+    dias: frozenset
+    hora_salida: time
+    duracion: timedelta
+    avion_id: int
+    desde: date
+    hasta: date
+    precio_base: Decimal
+
+    @classmethod
+    def desde_fila(cls, fila: dict) -> 'PatronVuelo':
+        """
+        Crea un patrón a partir de una fila de texto (por ejemplo, de un CSV).
+
+        Columnas: origen, destino, dias ('1,3,5', '135', 'lun,mie,vie' o
+        'diario'), hora_salida (HH:MM), duracion (HH:MM), avion_id, desde y
+        hasta (YYYY-MM-DD) y precio_base.
+
+        Raises:
+            ValidationError: Si alguna columna falta o no es válida
+        """
+        try:
+            horas, minutos = (int(parte) for parte in fila['duracion'].split(':'))
+            patron = cls(
+                origen=fila['origen'].strip(),
+                destino=fila['destino'].strip(),
+                dias=parsear_dias(fila['dias']),
+                hora_salida=parse_time(fila['hora_salida'].strip()),
+                duracion=timedelta(hours=horas, minutes=minutos),
+                avion_id=int(fila['avion_id']),
+                desde=parse_date(fila['desde'].strip()),
+                hasta=parse_date(fila['hasta'].strip()),
+                precio_base=Decimal(fila['precio_base'].strip()),
+            )
+        except KeyError as e:
+            raise ValidationError(f"Falta la columna {e.args[0]}")
+        except (ValueError, InvalidOperation):
+            raise ValidationError(f"Fila de programación no válida: {fila}")
+
+        patron.validar()
+        return patron
+
+    def validar(self):
+        """Valida los datos del patrón."""
+        if not self.origen or not self.destino:
+            raise ValidationError("El origen y el destino son obligatorios")
+        if self.origen.lower() == self.destino.lower():
+            raise ValidationError("El origen y destino no pueden ser iguales")
+        if not self.dias:
+            raise ValidationError("El patrón debe tener al menos un día de la semana")
+        if self.hora_salida is None or self.desde is None or self.hasta is None:
+            raise ValidationError("La hora de salida y las fechas de la temporada son obligatorias")
+        if self.hasta < self.desde:
+            raise ValidationError("El fin de la temporada debe ser posterior al inicio")
+        if self.duracion <= timedelta(0):
+            raise ValidationError("La duración debe ser mayor a 0")
+        if self.precio_base <= 0:
+            raise ValidationError("El precio base debe ser mayor a 0")
+
+    def fechas(self):
+        """Fechas de la temporada en que opera el vuelo."""
+        dia = self.desde
+        while dia <= self.hasta:
+            if dia.isoweekday() in self.dias:
+                yield dia
+            dia += timedelta(days=1)
+
+
+def parsear_dias(texto: str) -> frozenset:
+    """
+    Convierte una lista de días de la semana en números ISO (1 = lunes).
+
+    Acepta 'diario', dígitos ('135' o '1,3,5') y abreviaturas ('lun,mie,vie').
+    """
+    texto = texto.strip().lower()
+    if texto == 'diario':
+        return frozenset(range(1, 8))
+
+    dias = set()
+    for parte in re.split(r'[,;\s]+', texto):
+        if not parte:
+            continue
+        if parte.isdigit():
+            dias.update(int(digito) for digito in parte)
+        elif parte[:3] in DIAS_SEMANA:
+            dias.add(DIAS_SEMANA[parte[:3]])
+        else:
+            raise ValueError(f"Día no válido: {parte}")
+    if not dias <= set(range(1, 8)):
+        raise ValueError(f"Días no válidos: {texto}")
+    return frozenset(dias)
+
+
+class ProgramacionService:
+    """Servicio para generar vuelos en bloque a partir de patrones."""
+
+    @staticmethod
+    def expandir(patrones: list[PatronVuelo]) -> list[dict]:
+        """
+        Expande los patrones en vuelos concretos, ordenados por salida.
+
+        Las horas de salida son locales (TIME_ZONE) de cada fecha.
+
+        Args:
+            patrones (list[PatronVuelo]): Patrones a expandir
+
+        Returns:
+            list[dict]: Datos de cada vuelo
+        """
+        vuelos = []
+        for patron in patrones:
+            horas, resto = divmod(int(patron.duracion.total_seconds()) // 60, 60)
+            duracion = f"{horas}:{resto:02d}"
+            for dia in patron.fechas():
+                salida = timezone.make_aware(datetime.combine(dia, patron.hora_salida))
+                vuelos.append({
+                    'origen': patron.origen,
+                    'destino': patron.destino,
+                    'fecha_salida': salida,
+                    'fecha_llegada': salida + patron.duracion,
+                    'duracion': duracion,
+                    'precio_base': patron.precio_base,
+                    'avion_id': patron.avion_id,
+                })
+        vuelos.sort(key=lambda vuelo: vuelo['fecha_salida'])
+        return vuelos
+
+    @staticmethod
+    def generar(patrones: list[PatronVuelo], omitir_conflictos: bool = False,
+                simular: bool = False, tamano_lote: int = None) -> dict:
+        """
+        Genera los vuelos de una programación.
+
+        Los vuelos que ya salieron se omiten. Si algún vuelo choca con otro
+        del mismo avión (existente o de la misma programación) no se crea
+        nada, salvo que se pida omitir los conflictos; en ese caso volver a
+        cargar la misma programación no duplica vuelos.
+
+        Args:
+            patrones (list[PatronVuelo]): Patrones de la programación
+            omitir_conflictos (bool): Crear los vuelos válidos y omitir los que chocan
+            simular (bool): Validar sin guardar
+            tamano_lote (int): Vuelos por INSERT (default PROGRAMACION_TAMANO_LOTE)
+
+        Returns:
+            dict: Cantidades 'generados', 'creados', 'pasados' y 'conflictos'
+
+        Raises:
+            ValidationError: Si un avión no está disponible o hay conflictos
+        """
+        from vuelos.models import Vuelo
+        from vuelos.repositories.vuelos import AvionRepository, VueloRepository
+        from vuelos.services.rotacion import RotacionService
+        from vuelos.services.vuelos import AsientoService, VueloService
+
+        if tamano_lote is None:
+            tamano_lote = getattr(settings, 'PROGRAMACION_TAMANO_LOTE', 1000)
+
+        for patron in patrones:
+            patron.validar()
+
+        generados = ProgramacionService.expandir(patrones)
+        ahora = timezone.now()
+        vuelos = [vuelo for vuelo in generados if vuelo['fecha_salida'] > ahora]
+        pasados = len(generados) - len(vuelos)
+
+        # Aviones: una sola consulta para todos los patrones
+        avion_ids = {patron.avion_id for patron in patrones}
+        aviones = {avion.id: avion for avion in AvionRepository.obtener_varios(avion_ids)}
+        for avion_id in sorted(avion_ids):
+            if avion_id not in aviones:
+                raise ValidationError(f"Avión {avion_id} no encontrado")
+            if aviones[avion_id].estado != 'activo':
+                raise ValidationError(f"El avión {aviones[avion_id]} no está disponible")
+
+        # Rotación: contra los vuelos existentes y entre los nuevos
+        conflictos = RotacionService.validar_programacion(vuelos)
+        if conflictos and not omitir_conflictos:
+            raise ValidationError(ProgramacionService._describir_conflictos(vuelos, conflictos))
+        en_conflicto = {conflicto['indice'] for conflicto in conflictos}
+        vuelos = [vuelo for i, vuelo in enumerate(vuelos) if i not in en_conflicto]
+
+        resultado = {
+            'generados': len(generados),
+            'creados': 0,
+            'pasados': pasados,
+            'conflictos': len(en_conflicto),
+        }
+        if simular or not vuelos:
+            return resultado
+
+        with transaction.atomic():
+            creados = VueloRepository.crear_varios(
+                [Vuelo(estado='programado', **vuelo) for vuelo in vuelos],
+                tamano_lote
+            )
+            AsientoService.crear_asientos_faltantes({vuelo['avion_id'] for vuelo in vuelos})
+            # bulk_create no dispara los signals que mantienen los contadores
+            transaction.on_commit(VueloService.invalidar_contadores)
+
+        resultado['creados'] = len(creados)
+        logger.info(
+            "Programación generada: %s vuelos creados, %s en conflicto, %s pasados",
+            resultado['creados'], resultado['conflictos'], resultado['pasados']
+        )
+        return resultado
+
+    @staticmethod
+    def _describir_conflictos(vuelos: list[dict], conflictos: list[dict]) -> list[str]:
+        """Mensajes legibles de los primeros conflictos de rotación."""
+        mensajes = []
+        for conflicto in conflictos[:MAX_ERRORES_INFORMADOS]:
+            vuelo = vuelos[conflicto['indice']]
+            if conflicto['vuelo_id'] is not None:
+                contra = f"el vuelo {conflicto['vuelo_id']}"
+            else:
+                otro = vuelos[conflicto['indice_conflicto']]
+                contra = f"{otro['origen']} → {otro['destino']} de las {timezone.localtime(otro['fecha_salida']):%H:%M}"
+            mensajes.append(
+                f"{vuelo['origen']} → {vuelo['destino']} del "
+                f"{timezone.localtime(vuelo['fecha_salida']):%d/%m/%Y %H:%M} "
+                f"(avión {vuelo['avion_id']}) se superpone con {contra}"
+            )
+        if len(conflictos) > MAX_ERRORES_INFORMADOS:
+            mensajes.append(f"... y {len(conflictos) - MAX_ERRORES_INFORMADOS} conflictos más")
+        return mensajes
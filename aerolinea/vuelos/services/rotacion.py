@@ -0,0 +1,270 @@
+"""
+Rotación de aviones: índice de ocupación por avión.
+
+Cada vuelo ocupa su avión desde la salida hasta la llegada más el tiempo
+de rotación en tierra (VUELOS_ROTACION_MINUTOS). Dos vuelos del mismo
+avión chocan si esos intervalos se superponen; así un avión puede hacer
+varios tramos en el día siempre que le alcance el tiempo entre uno y otro.
+
+Los intervalos de cada avión se guardan ordenados por inicio junto con el
+máximo fin acumulado, de modo que la búsqueda de superposiciones es una
+búsqueda binaria más los intervalos que realmente chocan (O(log n + k)),
+igual que en un árbol de intervalos aumentado.
+
+El índice se usa para:
+- Validar un vuelo nuevo o modificado (VueloService)
+- Validar en bloque una programación importada (validar_programacion)
+- Armar el diagrama de Gantt de la flota (vista gantt_flota)
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+
+class _TramosAvion:
+    """Intervalos de ocupación de un avión ordenados por inicio."""
+
+    __slots__ = ('inicios', 'fines', 'fin_max', 'claves')
+
+    def __init__(self):
+        self.inicios = []
+        self.fines = []
+        # fin_max[i] = mayor fin entre los intervalos 0..i
+        self.fin_max = []
+        self.claves = []
+
+    def agregar(self, inicio, fin, clave):
+        pos = bisect_right(self.inicios, inicio)
+        self.inicios.insert(pos, inicio)
+        self.fines.insert(pos, fin)
+        self.claves.insert(pos, clave)
+        self.fin_max.insert(pos, fin)
+
+        # Actualizar el máximo acumulado hasta que deje de cambiar
+        previo = self.fin_max[pos - 1] if pos else None
+        for i in range(pos, len(self.fin_max)):
+            nuevo = self.fines[i] if previo is None else max(previo, self.fines[i])
+            if i > pos and nuevo == self.fin_max[i]:
+                break
+            self.fin_max[i] = previo = nuevo
+
+    def superpuestos(self, inicio, fin) -> list:
+        """Claves de los intervalos que se superponen con [inicio, fin)."""
+        claves = []
+        # Candidatos: los que empiezan antes de 'fin'; se recorren hacia
+        # atrás mientras algún intervalo anterior pueda terminar después de 'inicio'
+        j = bisect_left(self.inicios, fin) - 1
+        while j >= 0 and self.fin_max[j] > inicio:
+            if self.fines[j] > inicio:
+                claves.append(self.claves[j])
+            j -= 1
+        claves.reverse()
+        return claves
+
+    def __iter__(self):
+        return iter(zip(self.inicios, self.fines, self.claves))
+
+    def __len__(self):
+        return len(self.inicios)
+
+
+class IndiceRotacion:
+    """
+    Índice en memoria de la ocupación de los aviones.
+
+    Las claves identifican a cada vuelo dentro del índice (por ejemplo el
+    ID del vuelo, o su posición en una programación todavía no guardada).
+
+    Args:
+        rotacion (timedelta): Tiempo mínimo en tierra entre dos vuelos
+    """
+
+    def __init__(self, rotacion: timedelta = None):
+        self.rotacion = rotacion if rotacion is not None else tiempo_rotacion()
+        self._aviones = {}
+
+    def agregar(self, avion_id: int, salida, llegada, clave):
+        """Registra un vuelo del avión."""
+        tramos = self._aviones.get(avion_id)
+        if tramos is None:
+            tramos = self._aviones[avion_id] = _TramosAvion()
+        tramos.agregar(salida, llegada + self.rotacion, clave)
+
+    def conflictos(self, avion_id: int, salida, llegada, excluir=None) -> list:
+        """
+        Claves de los vuelos del avión que chocan con un vuelo nuevo.
+
+        Args:
+            avion_id (int): ID del avión
+            salida: Fecha y hora de salida del vuelo nuevo
+            llegada: Fecha y hora de llegada del vuelo nuevo
+            excluir: Clave a ignorar (el mismo vuelo, al modificarlo)
+
+        Returns:
+            list: Claves de los vuelos en conflicto, ordenadas por salida
+        """
+        tramos = self._aviones.get(avion_id)
+        if tramos is None:
+            return []
+        claves = tramos.superpuestos(salida, llegada + self.rotacion)
+        if excluir is not None:
+            claves = [clave for clave in claves if clave != excluir]
+        return claves
+
+    def tramos(self, avion_id: int) -> list[tuple]:
+        """Intervalos (inicio, fin de rotación, clave) del avión, ordenados."""
+        return list(self._aviones.get(avion_id, ()))
+
+
+def tiempo_rotacion() -> timedelta:
+    """Tiempo mínimo en tierra entre dos vuelos del mismo avión."""
+    return timedelta(minutes=getattr(settings, 'VUELOS_ROTACION_MINUTOS', 45))
+
+
+class RotacionService:
+    """Servicio para validar y consultar la rotación de los aviones."""
+
+    @staticmethod
+    def cargar_indice(avion_ids, desde, hasta) -> IndiceRotacion:
+        """
+        Carga en un índice los vuelos que ocupan los aviones en un rango.
+
+        Incluye los vuelos cuya ocupación (con rotación) toca el rango, de
+        modo que sirva para validar vuelos que salgan dentro de él.
+
+        Args:
+            avion_ids: IDs de los aviones (None = toda la flota)
+            desde: Inicio del rango
+            hasta: Fin del rango
+
+        Returns:
+            IndiceRotacion: Índice con los vuelos cargados (clave = ID del vuelo)
+        """
+        from vuelos.repositories.vuelos import VueloRepository
+
+        indice = IndiceRotacion()
+        for tramo in VueloRepository.buscar_tramos(avion_ids, desde - indice.rotacion, hasta + indice.rotacion):
+            indice.agregar(tramo['avion_id'], tramo['fecha_salida'], tramo['fecha_llegada'], tramo['id'])
+        return indice
+
+    @staticmethod
+    def validar_vuelo(avion_id: int, fecha_salida, fecha_llegada, excluir_id: int = None):
+        """
+        Verifica que el avión esté libre para un vuelo.
+
+        Args:
+            avion_id (int): ID del avión
+            fecha_salida: Fecha y hora de salida
+            fecha_llegada: Fecha y hora de llegada
+            excluir_id (int): ID del vuelo que se está modificando
+
+        Raises:
+            ValidationError: Si el vuelo choca con otro del mismo avión
+        """
+        indice = RotacionService.cargar_indice([avion_id], fecha_salida, fecha_llegada)
+        conflictos = indice.conflictos(avion_id, fecha_salida, fecha_llegada, excluir=excluir_id)
+        if conflictos:
+            minutos = int(indice.rotacion.total_seconds() // 60)
+            raise ValidationError(
+                f"El avión no está disponible en ese horario: se superpone con el vuelo "
+                f"{conflictos[0]} (se requieren {minutos} minutos de rotación entre vuelos)"
+            )
+
+    @staticmethod
+    def validar_programacion(vuelos: list[dict]) -> list[dict]:
+        """
+        Valida en bloque una programación de vuelos todavía no guardada.
+
+        Los vuelos existentes de los aviones involucrados se cargan con una
+        sola consulta. Cada vuelo válido se agrega al índice, así los tramos
+        siguientes de la misma programación también se validan contra él.
+
+        Args:
+            vuelos (list[dict]): Vuelos con 'avion_id', 'fecha_salida' y 'fecha_llegada'
+
+        Returns:
+            list[dict]: Conflictos encontrados, cada uno con 'indice' (posición
+            en la lista), 'vuelo_id' (vuelo existente) o 'indice_conflicto'
+            (otro vuelo de la programación)
+        """
+        if not vuelos:
+            return []
+
+        indice = RotacionService.cargar_indice(
+            {vuelo['avion_id'] for vuelo in vuelos},
+            min(vuelo['fecha_salida'] for vuelo in vuelos),
+            max(vuelo['fecha_llegada'] for vuelo in vuelos),
+        )
+
+        conflictos = []
+        for i, vuelo in enumerate(vuelos):
+            claves = indice.conflictos(vuelo['avion_id'], vuelo['fecha_salida'], vuelo['fecha_llegada'])
+            if not claves:
+                # Las claves de la programación se distinguen de los IDs con una tupla
+                indice.agregar(vuelo['avion_id'], vuelo['fecha_salida'], vuelo['fecha_llegada'], ('nuevo', i))
+                continue
+            for clave in claves:
+                if isinstance(clave, tuple):
+                    conflictos.append({'indice': i, 'vuelo_id': None, 'indice_conflicto': clave[1]})
+                else:
+                    conflictos.append({'indice': i, 'vuelo_id': clave, 'indice_conflicto': None})
+        return conflictos
+
+    @staticmethod
+    def gantt_flota(desde, hasta) -> list[dict]:
+        """
+        Arma las filas del diagrama de Gantt de la flota para un rango.
+
+        Cada tramo trae su posición y ancho en porcentaje del rango, y se
+        marca si choca con otro tramo del mismo avión.
+
+        Args:
+            desde: Inicio del rango
+            hasta: Fin del rango
+
+        Returns:
+            list[dict]: Una fila por avión con 'avion' y 'tramos'
+        """
+        from vuelos.repositories.vuelos import AvionRepository, VueloRepository
+
+        rotacion = tiempo_rotacion()
+        tramos = VueloRepository.buscar_tramos(None, desde, hasta)
+        aviones = {avion.id: avion for avion in AvionRepository.buscar_activos()}
+        faltantes = {tramo['avion_id'] for tramo in tramos} - aviones.keys()
+        if faltantes:
+            aviones.update({avion.id: avion for avion in AvionRepository.obtener_varios(faltantes)})
+
+        total = (hasta - desde).total_seconds()
+
+        def porcentaje(momento):
+            segundos = (min(max(momento, desde), hasta) - desde).total_seconds()
+            return round(segundos * 100 / total, 3)
+
+        indice = IndiceRotacion(rotacion)
+        filas = {avion_id: [] for avion_id in aviones}
+        por_id = {}
+        for tramo in tramos:
+            conflictos = indice.conflictos(tramo['avion_id'], tramo['fecha_salida'], tramo['fecha_llegada'])
+            indice.agregar(tramo['avion_id'], tramo['fecha_salida'], tramo['fecha_llegada'], tramo['id'])
+            izquierda = porcentaje(tramo['fecha_salida'])
+            aterrizaje = porcentaje(tramo['fecha_llegada'])
+            fila = por_id[tramo['id']] = {
+                **tramo,
+                'fin_rotacion': tramo['fecha_llegada'] + rotacion,
+                'izquierda': izquierda,
+                'ancho': max(aterrizaje - izquierda, 0.5),
+                'izquierda_rotacion': aterrizaje,
+                'ancho_rotacion': porcentaje(tramo['fecha_llegada'] + rotacion) - aterrizaje,
+                'conflicto': bool(conflictos),
+            }
+            for vuelo_id in conflictos:
+                por_id[vuelo_id]['conflicto'] = True
+            filas[tramo['avion_id']].append(fila)
+
+        return [
+            {'avion': aviones[avion_id], 'tramos': filas[avion_id]}
+            for avion_id in sorted(aviones, key=lambda a: (aviones[a].modelo, a))
+        ]
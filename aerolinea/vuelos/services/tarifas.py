@@ -0,0 +1,343 @@
+"""
+Motor de tarifas dinámicas.
+
+El precio de una cabina de un vuelo es:
+
+    precio_base x multiplicador de cabina x factor de ocupación x factor de anticipación
+
+- El multiplicador de cabina es fijo (precio de lista, ver
+  Vuelo.calcular_precio_asiento).
+- El factor de ocupación sube por escalones a medida que se llena la cabina.
+- El factor de anticipación sube por escalones a medida que se acerca la salida.
+
+Los precios no se calculan por solicitud: se guardan en una tabla por
+vuelo y cabina (TarifaVuelo) junto con los contadores de ocupación que los
+producen. La tabla se recalcula en bloque cuando cambian las reservas de
+un vuelo (suscriptores de vuelos), cuando se guarda un vuelo y
+periódicamente para los vuelos próximos (el factor de anticipación cambia
+con el paso del tiempo). Las lecturas que no encuentran la tabla la
+calculan en memoria, sin guardarla.
+"""
+
+import logging
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+CABINAS = ['economica', 'premium', 'primera']
+
+MULTIPLICADORES_CABINA = {
+    'economica': Decimal('1.0'),
+    'premium': Decimal('1.5'),
+    'primera': Decimal('2.0'),
+}
+
+# Escalones de ocupación de la cabina: (ocupación menor a, factor)
+ESCALONES_OCUPACION = (
+    (Decimal('0.50'), Decimal('1.00')),
+    (Decimal('0.75'), Decimal('1.10')),
+    (Decimal('0.90'), Decimal('1.25')),
+    (None, Decimal('1.40')),
+)
+
+# Escalones de anticipación: (días hasta la salida menor a, factor)
+ESCALONES_ANTICIPACION = (
+    (3, Decimal('1.30')),
+    (7, Decimal('1.15')),
+    (21, Decimal('1.05')),
+    (None, Decimal('1.00')),
+)
+
+CENTAVOS = Decimal('0.01')
+
+
+def _escalon(escalones, valor) -> Decimal:
+    for limite, factor in escalones:
+        if limite is None or valor < limite:
+            return factor
+    return escalones[-1][1]
+
+
+def precio_de_lista(precio_base, tipo: str) -> Decimal:
+    """Precio de una cabina sin ajustes dinámicos."""
+    return precio_base * MULTIPLICADORES_CABINA.get(tipo, Decimal('1.0'))
+
+
+def calcular_precio(precio_base, tipo: str, ocupados: int, totales: int, salida, ahora=None) -> Decimal:
+    """
+    Precio dinámico de una cabina.
+
+    Args:
+        precio_base: Precio base del vuelo
+        tipo (str): Cabina
+        ocupados (int): Asientos de la cabina con reservas activas
+        totales (int): Asientos de la cabina
+        salida: Fecha y hora de salida del vuelo
+        ahora: Momento de referencia (default timezone.now())
+
+    Returns:
+        Decimal: Precio redondeado a centavos
+    """
+    ahora = ahora or timezone.now()
+    ocupacion = Decimal(ocupados) / Decimal(totales) if totales else Decimal('1')
+    dias = (salida - ahora).total_seconds() / 86400
+    precio = (
+        precio_de_lista(Decimal(precio_base), tipo)
+        * _escalon(ESCALONES_OCUPACION, ocupacion)
+        * _escalon(ESCALONES_ANTICIPACION, dias)
+    )
+    return precio.quantize(CENTAVOS, rounding=ROUND_HALF_UP)
+
+
+class TarifaService:
+    """Servicio para la tabla de tarifas precalculadas."""
+
+    TAMANO_LOTE = 500
+
+    @staticmethod
+    def recalcular(vuelo_ids) -> int:
+        """
+        Recalcula y guarda la tabla de tarifas de varios vuelos.
+
+        Usa una consulta por cada dato (vuelos, asientos por cabina y
+        reservas activas por cabina) y una para guardar por cada lote de
+        TAMANO_LOTE vuelos.
+
+        Args:
+            vuelo_ids: IDs de los vuelos
+
+        Returns:
+            int: Cantidad de tarifas guardadas
+        """
+        from vuelos.repositories.vuelos import TarifaVueloRepository
+
+        vuelo_ids = sorted(set(vuelo_ids))
+        guardadas = 0
+        for inicio in range(0, len(vuelo_ids), TarifaService.TAMANO_LOTE):
+            lote = vuelo_ids[inicio:inicio + TarifaService.TAMANO_LOTE]
+            guardadas += TarifaVueloRepository.guardar_varias(TarifaService._calcular(lote))
+        return guardadas
+
+    @staticmethod
+    def _calcular(vuelo_ids) -> list:
+        """
+        Calcula en memoria (sin guardar) las tarifas de varios vuelos.
+
+        Returns:
+            list[TarifaVuelo]: Tarifas por vuelo y cabina con asientos
+        """
+        from reservas.repositories.reservas import ReservaRepository
+        from vuelos.models import TarifaVuelo
+        from vuelos.repositories.vuelos import AsientoRepository, VueloRepository
+
+        vuelo_ids = list(vuelo_ids)
+        ahora = timezone.now()
+        vuelos = VueloRepository.obtener_datos_tarifa(vuelo_ids)
+        asientos = AsientoRepository.contar_por_tipo({vuelo['avion_id'] for vuelo in vuelos})
+        ocupados = ReservaRepository.contar_activas_por_tipo(vuelo_ids)
+
+        tarifas = []
+        for vuelo in vuelos:
+            for tipo in CABINAS:
+                totales = asientos.get((vuelo['avion_id'], tipo), 0)
+                if not totales:
+                    continue
+                en_uso = ocupados.get((vuelo['id'], tipo), 0)
+                tarifas.append(TarifaVuelo(
+                    vuelo_id=vuelo['id'],
+                    tipo=tipo,
+                    asientos_totales=totales,
+                    asientos_ocupados=en_uso,
+                    precio=calcular_precio(
+                        vuelo['precio_base'], tipo, en_uso, totales, vuelo['fecha_salida'], ahora
+                    ),
+                    fecha_actualizacion=ahora,
+                ))
+        return tarifas
+
+    @staticmethod
+    def recalcular_proximos(dias: int = 30) -> int:
+        """
+        Recalcula las tarifas de los vuelos programados de los próximos días.
+
+        Args:
+            dias (int): Días hacia adelante
+
+        Returns:
+            int: Cantidad de tarifas guardadas
+        """
+        from vuelos.repositories.vuelos import VueloRepository
+
+        ahora = timezone.now()
+        vuelo_ids = VueloRepository.ids_programados_entre(ahora, ahora + timedelta(days=dias))
+        guardadas = TarifaService.recalcular(vuelo_ids)
+        logger.info("Tarifas recalculadas: %s vuelos, %s tarifas", len(vuelo_ids), guardadas)
+        return guardadas
+
+    @staticmethod
+    def obtener_tablas(vuelo_ids) -> dict:
+        """
+        Obtiene las tablas de tarifas de varios vuelos.
+
+        Los vuelos sin tabla (cargados en bloque, sin signals) se calculan
+        en memoria sin guardarlos: las lecturas no escriben. La tabla la
+        guardan los signals y suscriptores de vuelos y la tarea periódica
+        recalcular_tarifas_proximas.
+
+        Args:
+            vuelo_ids: IDs de los vuelos
+
+        Returns:
+            dict: {vuelo_id: {tipo: TarifaVuelo}}
+        """
+        from vuelos.repositories.vuelos import TarifaVueloRepository
+
+        vuelo_ids = set(vuelo_ids)
+        tablas = TarifaVueloRepository.obtener_por_vuelos(vuelo_ids)
+        faltantes = vuelo_ids - tablas.keys()
+        if faltantes:
+            for tarifa in TarifaService._calcular(faltantes):
+                tablas.setdefault(tarifa.vuelo_id, {})[tarifa.tipo] = tarifa
+        return tablas
+
+    @staticmethod
+    def precios_por_tipo(vuelo) -> dict:
+        """
+        Precio vigente de cada cabina de un vuelo.
+
+        Las cabinas que el avión no tiene se informan con el precio de lista.
+
+        Returns:
+            dict: {tipo: Decimal}
+        """
+        tabla = TarifaService.obtener_tablas([vuelo.id]).get(vuelo.id, {})
+        return {
+            tipo: tabla[tipo].precio if tipo in tabla else precio_de_lista(vuelo.precio_base, tipo)
+            for tipo in CABINAS
+        }
+
+    @staticmethod
+    def precio(vuelo_id: int, tipo: str) -> Decimal:
+        """
+        Precio vigente de una cabina de un vuelo.
+
+        Raises:
+            ValidationError: Si el vuelo no existe
+        """
+        from django.core.exceptions import ValidationError
+        from vuelos.repositories.vuelos import VueloRepository
+
+        tabla = TarifaService.obtener_tablas([vuelo_id]).get(vuelo_id, {})
+        if tipo in tabla:
+            return tabla[tipo].precio
+        vuelo = VueloRepository.obtener_por_id(vuelo_id)
+        if not vuelo:
+            raise ValidationError("Vuelo no encontrado")
+        return precio_de_lista(vuelo.precio_base, tipo)
+
+    @staticmethod
+    def anotar_precios(vuelos) -> None:
+        """
+        Agrega a cada vuelo el atributo 'precio_desde': el menor precio
+        vigente entre sus cabinas con asientos disponibles.
+
+        Usa una sola consulta para todos los vuelos (por ejemplo, una
+        página de resultados de búsqueda).
+        """
+        vuelos = list(vuelos)
+        tablas = TarifaService.obtener_tablas(vuelo.id for vuelo in vuelos)
+        for vuelo in vuelos:
+            tarifas = tablas.get(vuelo.id, {}).values()
+            disponibles = [t.precio for t in tarifas if t.asientos_disponibles] or [t.precio for t in tarifas]
+            vuelo.precio_desde = min(disponibles) if disponibles else vuelo.precio_base
+
+    @staticmethod
+    def cotizar(solicitudes: list[dict]) -> list[dict]:
+        """
+        Cotiza varias solicitudes (vuelo, cabina y pasajeros) de una vez.
+
+        Los vuelos y sus tarifas de todas las solicitudes se leen con una
+        sola consulta (la tabla de tarifas unida a los vuelos); solo los
+        vuelos que todavía no tienen tabla se calculan aparte, en memoria.
+        La cotización no escribe.
+
+        El precio es el mismo que cobra la reserva (TarifaService.precio):
+        el de la tabla vigente, igual para todos los pasajeros del grupo.
+
+        Args:
+            solicitudes (list[dict]): Solicitudes con 'vuelo_id', 'tipo' y 'pasajeros'
+
+        Returns:
+            list[dict]: Una cotización por solicitud, en el mismo orden, con
+            'disponible', 'asientos_disponibles', 'precio_unitario', 'total'
+            y 'motivo' (por qué no está disponible)
+        """
+        from vuelos.repositories.vuelos import VueloRepository
+
+        vuelo_ids = {solicitud['vuelo_id'] for solicitud in solicitudes}
+        vuelos = TarifaService._agrupar_cabinas(VueloRepository.obtener_con_tarifas(vuelo_ids))
+        sin_tabla = [vuelo_id for vuelo_id, vuelo in vuelos.items() if not vuelo['cabinas']]
+        if sin_tabla:
+            for tarifa in TarifaService._calcular(sin_tabla):
+                vuelos[tarifa.vuelo_id]['cabinas'][tarifa.tipo] = (
+                    tarifa.asientos_totales, tarifa.asientos_ocupados, tarifa.precio
+                )
+
+        ahora = timezone.now()
+        return [TarifaService._cotizar_una(solicitud, vuelos.get(solicitud['vuelo_id']), ahora)
+                for solicitud in solicitudes]
+
+    @staticmethod
+    def _agrupar_cabinas(filas: list[dict]) -> dict:
+        """Agrupa las filas de obtener_con_tarifas por vuelo: {vuelo_id: datos}."""
+        vuelos = {}
+        for fila in filas:
+            vuelo = vuelos.setdefault(fila['id'], {
+                'estado': fila['estado'],
+                'precio_base': fila['precio_base'],
+                'fecha_salida': fila['fecha_salida'],
+                'cabinas': {},
+            })
+            if fila['tarifas__tipo'] is not None:
+                vuelo['cabinas'][fila['tarifas__tipo']] = (
+                    fila['tarifas__asientos_totales'], fila['tarifas__asientos_ocupados'],
+                    fila['tarifas__precio']
+                )
+        return vuelos
+
+    @staticmethod
+    def _cotizar_una(solicitud: dict, vuelo: dict | None, ahora) -> dict:
+        """Cotización de una solicitud con los datos ya cargados del vuelo."""
+        tipo, pasajeros = solicitud['tipo'], solicitud['pasajeros']
+        cotizacion = {
+            'vuelo_id': solicitud['vuelo_id'],
+            'tipo': tipo,
+            'pasajeros': pasajeros,
+            'disponible': False,
+            'asientos_disponibles': 0,
+            'precio_unitario': None,
+            'total': None,
+            'motivo': None,
+        }
+        if vuelo is None:
+            cotizacion['motivo'] = 'Vuelo no encontrado'
+            return cotizacion
+        if vuelo['estado'] != 'programado' or vuelo['fecha_salida'] <= ahora:
+            cotizacion['motivo'] = 'El vuelo no acepta reservas'
+            return cotizacion
+        if tipo not in vuelo['cabinas']:
+            cotizacion['motivo'] = 'El avión no tiene asientos de esa cabina'
+            return cotizacion
+
+        totales, ocupados, precio = vuelo['cabinas'][tipo]
+        cotizacion['asientos_disponibles'] = max(totales - ocupados, 0)
+        if cotizacion['asientos_disponibles'] < pasajeros:
+            cotizacion['motivo'] = 'No hay asientos suficientes'
+            return cotizacion
+
+        cotizacion.update(disponible=True, precio_unitario=precio, total=precio * pasajeros)
+        return cotizacion
@@ -5,16 +5,24 @@ Este archivo implementa la capa de servicios del patrón Vista-Servicio-Reposito
 Los servicios contienen la lógica de negocio y orquestan las operaciones.
 """
 
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from typing import List
+from aerolinea.cache_aside import obtener_o_calcular, obtener_o_calcular_varios
 from vuelos.models import Vuelo, Avion, Asiento
 from vuelos.repositories.vuelos import VueloRepository, AvionRepository, AsientoRepository
+from vuelos.services.rotacion import RotacionService
 
 
 class VueloService:
     """Servicio para la gestión de vuelos."""
     
+    # Contadores de vuelos en caché, mantenidos por los signals de vuelos
+    CLAVE_PROGRAMADOS = 'vuelos_activos_count'
+    CLAVE_TOTAL = 'total_vuelos_count'
+    TTL_CONTADORES = 300  # 5 minutos
+    
     @staticmethod
     def crear_vuelo(origen: str, destino: str, fecha_salida, fecha_llegada,
                     precio_base: float, avion_id: int, estado: str = 'programado') -> Vuelo:
@@ -38,7 +46,7 @@ class VueloService:
         """
         # Validaciones de negocio
         VueloService._validar_datos_vuelo(origen, destino, fecha_salida, fecha_llegada, precio_base)
-        VueloService._validar_disponibilidad_avion(avion_id, fecha_salida)
+        VueloService._validar_disponibilidad_avion(avion_id, fecha_salida, fecha_llegada)
         
         # Crear vuelo
         vuelo = VueloRepository.crear(
@@ -157,6 +165,15 @@ class VueloService:
         # Validar datos de actualización
         VueloService._validar_datos_actualizacion(datos_actualizacion)
         
+        # Si cambia el avión o el horario, el avión tiene que estar libre
+        if {'avion_id', 'fecha_salida', 'fecha_llegada'} & datos_actualizacion.keys():
+            VueloService._validar_disponibilidad_avion(
+                datos_actualizacion.get('avion_id', vuelo.avion_id),
+                datos_actualizacion.get('fecha_salida', vuelo.fecha_salida),
+                datos_actualizacion.get('fecha_llegada', vuelo.fecha_llegada),
+                excluir_id=vuelo.id
+            )
+        
         # Actualizar vuelo
         return VueloRepository.actualizar(vuelo, **datos_actualizacion)
     
@@ -212,7 +229,7 @@ class VueloService:
             raise ValidationError("El origen y destino no pueden ser iguales")
     
     @staticmethod
-    def _validar_disponibilidad_avion(avion_id: int, fecha_salida):
+    def _validar_disponibilidad_avion(avion_id: int, fecha_salida, fecha_llegada, excluir_id: int = None):
         """Valida la disponibilidad del avión."""
         # Verificar que el avión existe y está activo
         avion = AvionRepository.obtener_por_id(avion_id)
@@ -222,10 +239,9 @@ class VueloService:
         if avion.estado != 'activo':
             raise ValidationError("El avión no está disponible")
         
-        # Verificar que no haya otros vuelos programados para el mismo avión en la misma fecha
-        vuelos_existentes = VueloRepository.buscar_por_avion_y_fecha(avion_id, fecha_salida)
-        if vuelos_existentes:
-            raise ValidationError("El avión ya tiene vuelos programados para esa fecha")
+        # Verificar que no se superponga con otro vuelo del avión, contando
+        # el tiempo de rotación en tierra (ver vuelos.services.rotacion)
+        RotacionService.validar_vuelo(avion_id, fecha_salida, fecha_llegada, excluir_id=excluir_id)
     
     @staticmethod
     def _validar_transicion_estado(estado_actual: str, nuevo_estado: str):
@@ -262,6 +278,37 @@ class VueloService:
         if reservas_activas:
             raise ValidationError("No se puede eliminar un vuelo con reservas activas")
     
+    @staticmethod
+    def obtener_contadores() -> dict:
+        """
+        Obtiene el total de vuelos y los programados desde la caché.
+        
+        Si algún contador no está en caché se recalculan ambos con una
+        sola consulta, en una sola solicitud aunque lleguen muchas a la vez
+        (ver aerolinea.cache_aside).
+        
+        Returns:
+            dict: Cantidades 'total' y 'programados'
+        """
+        return obtener_o_calcular_varios(
+            'vuelos:contadores',
+            {'total': VueloService.CLAVE_TOTAL, 'programados': VueloService.CLAVE_PROGRAMADOS},
+            VueloRepository.contar_total_y_programados,
+            VueloService.TTL_CONTADORES
+        )
+    
+    @staticmethod
+    def invalidar_contadores():
+        """
+        Descarta los contadores de vuelos en caché.
+        
+        Se llama después de confirmar cualquier cambio que pueda alterarlos:
+        la próxima lectura (obtener_contadores) los vuelve a contar con una
+        consulta. Ajustarlos por diferencia dependía del estado previo que
+        conocía la instancia guardada, que puede estar desactualizado.
+        """
+        cache.delete_many([VueloService.CLAVE_TOTAL, VueloService.CLAVE_PROGRAMADOS])
+    
     @staticmethod
     def _procesar_vuelo_creado(vuelo: Vuelo):
         """Procesa acciones adicionales después de crear un vuelo."""
@@ -275,6 +322,30 @@ class VueloService:
 class AvionService:
     """Servicio para la gestión de aviones."""
     
+    # Total de aviones en caché, descartado por los signals de vuelos
+    CLAVE_TOTAL = 'aviones:total'
+    TTL_CONTADOR = 300  # 5 minutos
+    
+    @staticmethod
+    def contar_aviones() -> int:
+        """
+        Obtiene el total de aviones desde la caché.
+        
+        Si no está en caché se cuenta con una consulta, en una sola
+        solicitud aunque lleguen muchas a la vez (ver aerolinea.cache_aside).
+        
+        Returns:
+            int: Cantidad de aviones
+        """
+        return obtener_o_calcular(
+            AvionService.CLAVE_TOTAL, AvionRepository.contar_total, AvionService.TTL_CONTADOR
+        )
+    
+    @staticmethod
+    def invalidar_contador():
+        """Descarta el total de aviones en caché (la próxima lectura lo vuelve a contar)."""
+        cache.delete(AvionService.CLAVE_TOTAL)
+    
     @staticmethod
     def crear_avion(modelo: str, capacidad: int, estado: str = 'activo') -> Avion:
         """
@@ -400,6 +471,9 @@ class AsientoService:
         """
         Crea asientos automáticamente para un avión.
         
+        Los asientos se insertan con una sola consulta (bulk_create), sin
+        disparar un signal por asiento.
+        
         Args:
             avion_id (int): ID del avión
             
@@ -410,7 +484,7 @@ class AsientoService:
         if not avion:
             raise ValidationError("Avión no encontrado")
         
-        asientos_creados = []
+        asientos = []
         
         # Crear asientos según la capacidad del avión
         filas = (avion.capacidad // 6) + 1  # 6 asientos por fila
@@ -418,22 +492,38 @@ class AsientoService:
         
         for fila in range(1, filas + 1):
             for columna in columnas:
-                if len(asientos_creados) >= avion.capacidad:
+                if len(asientos) >= avion.capacidad:
                     break
                 
-                numero = f"{fila}{columna}"
-                clase = AsientoService._determinar_clase(fila, avion.capacidad)
-                
-                asiento = AsientoRepository.crear(
+                asientos.append(Asiento(
                     avion_id=avion_id,
-                    numero=numero,
+                    numero=f"{fila}{columna}",
                     fila=fila,
                     columna=columna,
-                    clase=clase
-                )
-                asientos_creados.append(asiento)
+                    tipo=AsientoService._determinar_clase(fila, avion.capacidad)
+                ))
+        
+        return AsientoRepository.crear_varios(asientos)
+    
+    @staticmethod
+    def crear_asientos_faltantes(avion_ids) -> int:
+        """
+        Crea los asientos de los aviones que todavía no los tienen.
+        
+        Se consulta de una vez qué aviones ya tienen asientos; los demás
+        se generan con un bulk_create por avión.
         
-        return asientos_creados
+        Args:
+            avion_ids: IDs de los aviones
+            
+        Returns:
+            int: Cantidad de asientos creados
+        """
+        faltantes = set(avion_ids) - AsientoRepository.aviones_con_asientos(avion_ids)
+        creados = 0
+        for avion_id in sorted(faltantes):
+            creados += len(AsientoService.crear_asientos_para_avion(avion_id))
+        return creados
     
     @staticmethod
     def obtener_asientos_disponibles(vuelo_id: int) -> List[Asiento]:
@@ -448,12 +538,38 @@ class AsientoService:
         """
         return AsientoRepository.buscar_disponibles_por_vuelo(vuelo_id)
     
+    @staticmethod
+    def asignar_automaticamente(vuelo_id: int, cantidad: int = 1, tipo: str = None,
+                                preferencia: str = None) -> List[int]:
+        """
+        Elige los mejores asientos libres de un vuelo para un grupo.
+        
+        La selección se hace en memoria sobre el mapa de asientos del vuelo
+        (ver vuelos.services.asignacion), priorizando cabina, asientos
+        contiguos en la misma fila, preferencia de ventanilla/pasillo y
+        filas menos ocupadas.
+        
+        Args:
+            vuelo_id (int): ID del vuelo
+            cantidad (int): Cantidad de pasajeros
+            tipo (str): Tipo de asiento ('economica', 'premium', 'primera')
+            preferencia (str): 'ventanilla', 'pasillo' o None
+            
+        Returns:
+            List[int]: IDs de los asientos elegidos
+            
+        Raises:
+            ValidationError: Si no hay asientos suficientes
+        """
+        mapa = AsientoRepository.obtener_mapa_vuelo(vuelo_id)
+        return mapa.asignar(cantidad, tipo=tipo, preferencia=preferencia)
+    
     @staticmethod
     def _determinar_clase(fila: int, capacidad_total: int) -> str:
         """Determina la clase del asiento según la fila."""
         if fila <= 2:
             return 'primera'
         elif fila <= 6:
-            return 'business'
+            return 'premium'
         else:
             return 'economica' 
\ No newline at end of file
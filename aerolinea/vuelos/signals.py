@@ -3,21 +3,31 @@ Signals para la aplicación vuelos.
 
 Este archivo define los signals que se disparan cuando ocurren eventos
 específicos en los modelos de vuelos.
+
+Los handlers evitan trabajo por guardado: los contadores de vuelos en
+caché se descartan después del commit (la próxima lectura los vuelve a
+contar una sola vez), y el seguimiento se hace con logging en nivel DEBUG.
 """
 
+import logging
+
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
-from django.core.mail import send_mail
-from django.conf import settings
-from django.utils import timezone
+from eventos.bus import publicar
+from eventos.dominio import VueloEstadoCambiado
+from notificaciones.services.notificaciones import NotificacionVueloService
 from .models import Vuelo, Avion, Asiento
 
 
+logger = logging.getLogger(__name__)
+
+
 @receiver(post_save, sender=Vuelo)
 def vuelo_creado_actualizado(sender, instance, created, **kwargs):
     """
     Signal que se dispara cuando se crea o actualiza un vuelo.
-    
+
     Args:
         sender: Modelo que disparó el signal
         instance: Instancia del modelo
@@ -26,30 +36,106 @@ def vuelo_creado_actualizado(sender, instance, created, **kwargs):
     """
     if created:
         # Lógica cuando se crea un nuevo vuelo
-        print(f"Nuevo vuelo creado: {instance}")
-        
-        # Enviar notificación por email (opcional)
-        # send_mail(
-        #     subject='Nuevo vuelo programado',
-        #     message=f'Se ha programado un nuevo vuelo: {instance}',
-        #     from_email=settings.DEFAULT_FROM_EMAIL,
-        #     recipient_list=['admin@aerolinea.com'],
-        # )
-    
+        logger.debug("Nuevo vuelo creado: %s", instance)
+
     else:
         # Lógica cuando se actualiza un vuelo
-        print(f"Vuelo actualizado: {instance}")
-        
-        # Si el estado cambió a 'en_vuelo', notificar
-        if instance.estado == 'en_vuelo':
-            print(f"Vuelo {instance} ha despegado")
+        logger.debug("Vuelo actualizado: %s", instance)
+
+        # Avisar a los pasajeros si el vuelo se retrasó
+        # (el fan-out corre en segundo plano después del commit)
+        previo = getattr(instance, '_estado_previo', None)
+        if previo is not None:
+            estado_anterior, salida_anterior = previo
+            if NotificacionVueloService.debe_notificar(
+                estado_anterior, instance.estado, salida_anterior, instance.fecha_salida
+            ):
+                NotificacionVueloService.programar_cambio(
+                    instance.id,
+                    estado_anterior,
+                    salida_anterior if salida_anterior != instance.fecha_salida else None
+                )
+
+            # Los demás efectos de un cambio de estado son suscriptores
+            # de VueloEstadoCambiado (ver vuelos.suscriptores)
+            if instance.estado != estado_anterior:
+                publicar(VueloEstadoCambiado(
+                    vuelo_id=instance.id,
+                    estado_anterior=estado_anterior,
+                    estado_nuevo=instance.estado
+                ))
+
+
+@receiver(post_save, sender=Avion)
+@receiver(post_delete, sender=Avion)
+def invalidar_cache_avion(sender, instance, **kwargs):
+    """
+    Signal que descarta de la caché de datos de referencia un avión (y la
+    distribución de sus asientos) cuando se guarda o se elimina.
+    
+    Se descarta en el momento, para lo que resta de la transacción, y de
+    nuevo después del commit, por si otra solicitud volvió a cachear la
+    versión anterior mientras tanto. Se registra antes que los demás
+    receivers de Avion y Asiento, que leen el avión desde la caché.
+    
+    Args:
+        sender: Modelo que disparó el signal
+        instance: Instancia del modelo
+        **kwargs: Argumentos adicionales
+    """
+    from .repositories.vuelos import AvionRepository
+    avion_id = instance.id
+    AvionRepository.invalidar_cache(avion_id)
+    transaction.on_commit(lambda: _invalidar_avion_confirmado(avion_id))
+
+
+@receiver(post_save, sender=Asiento)
+@receiver(post_delete, sender=Asiento)
+def invalidar_cache_asientos_avion(sender, instance, **kwargs):
+    """
+    Signal que descarta de la caché la distribución de asientos de un avión
+    cuando uno de sus asientos se guarda o se elimina.
+    
+    Args:
+        sender: Modelo que disparó el signal
+        instance: Instancia del modelo
+        **kwargs: Argumentos adicionales
+    """
+    from .repositories.vuelos import AsientoRepository
+    avion_id = instance.avion_id
+    AsientoRepository.invalidar_cache_avion(avion_id)
+    transaction.on_commit(lambda: AsientoRepository.invalidar_cache_avion(avion_id))
+
+
+@receiver(post_save, sender=Vuelo)
+@receiver(post_delete, sender=Vuelo)
+@receiver(post_save, sender=Avion)
+@receiver(post_delete, sender=Avion)
+def invalidar_vistas_vuelos(sender, instance, **kwargs):
+    """
+    Signal que descarta las respuestas cacheadas de las vistas de vuelos
+    (página principal, lista de vuelos y listado de la API) cuando se
+    guarda o se elimina un vuelo o un avión.
+    
+    Como con la caché de referencia, se descartan en el momento y de nuevo
+    después del commit; esto último lo hacen los callbacks que los demás
+    receivers ya programan (contadores, tarifas y caché del avión), para no
+    sumar uno por guardado.
+    
+    Args:
+        sender: Modelo que disparó el signal
+        instance: Instancia del modelo
+        **kwargs: Argumentos adicionales
+    """
+    from aerolinea.cache_vistas import invalidar_grupo
+    invalidar_grupo('vuelos')
 
 
 @receiver(post_save, sender=Avion)
 def avion_creado_actualizado(sender, instance, created, **kwargs):
     """
     Signal que se dispara cuando se crea o actualiza un avión.
-    
+
     Args:
         sender: Modelo que disparó el signal
         instance: Instancia del modelo
@@ -57,98 +143,193 @@ def avion_creado_actualizado(sender, instance, created, **kwargs):
         **kwargs: Argumentos adicionales
     """
     if created:
-        print(f"Nuevo avión registrado: {instance}")
-        
+        logger.debug("Nuevo avión registrado: %s", instance)
+
         # Crear asientos automáticamente para el nuevo avión
         from .services.vuelos import AsientoService
-        asiento_service = AsientoService()
-        asientos_creados = asiento_service.crear_asientos_para_avion(instance.id)
-        print(f"Se crearon {len(asientos_creados)} asientos para el avión {instance}")
-    
+        asientos_creados = AsientoService.crear_asientos_para_avion(instance.id)
+        logger.info("Se crearon %s asientos para el avión %s", len(asientos_creados), instance)
+
     else:
-        print(f"Avión actualizado: {instance}")
-        
-        # Si el estado cambió a 'mantenimiento', notificar
+        logger.debug("Avión actualizado: %s", instance)
+
+        # Si el estado cambió a 'mantenimiento', registrarlo
         if instance.estado == 'mantenimiento':
-            print(f"Avión {instance} enviado a mantenimiento")
+            logger.info("Avión %s enviado a mantenimiento", instance)
 
 
 @receiver(post_save, sender=Asiento)
 def asiento_creado_actualizado(sender, instance, created, **kwargs):
     """
     Signal que se dispara cuando se crea o actualiza un asiento.
-    
+
     Args:
         sender: Modelo que disparó el signal
         instance: Instancia del modelo
         created: True si se creó, False si se actualizó
         **kwargs: Argumentos adicionales
     """
+    # str(asiento) consulta el avión: solo se formatea si DEBUG está habilitado
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+
     if created:
-        print(f"Nuevo asiento creado: {instance}")
-    
+        logger.debug("Nuevo asiento creado: %s", instance)
+
     else:
-        print(f"Asiento actualizado: {instance}")
-        
-        # Si el estado cambió a 'reservado', registrar la acción
-        if instance.estado == 'reservado':
-            print(f"Asiento {instance} reservado")
+        logger.debug("Asiento actualizado: %s (%s)", instance, instance.estado)
 
 
 @receiver(post_delete, sender=Vuelo)
 def vuelo_eliminado(sender, instance, **kwargs):
     """
     Signal que se dispara cuando se elimina un vuelo.
-    
+
     Args:
         sender: Modelo que disparó el signal
         instance: Instancia del modelo
         **kwargs: Argumentos adicionales
     """
-    print(f"Vuelo eliminado: {instance}")
-    
-    # Notificar a los pasajeros que tenían reservas en este vuelo
-    # (implementación opcional)
+    logger.debug("Vuelo eliminado: %s", instance)
+
+    # Los contadores se vuelven a contar
+    _programar_invalidacion_contadores()
 
 
 @receiver(pre_save, sender=Vuelo)
 def validar_vuelo_antes_guardar(sender, instance, **kwargs):
     """
     Signal que se dispara antes de guardar un vuelo.
-    
+
     Args:
         sender: Modelo que disparó el signal
         instance: Instancia del modelo
         **kwargs: Argumentos adicionales
     """
     from django.core.exceptions import ValidationError
-    
+
+    # Guardar estado y salida anteriores para detectar cambios en post_save.
+    # Si el vuelo se cargó de la base se usan los valores de la carga;
+    # si no, se consultan.
+    instance._estado_previo = None
+    if instance.pk and not instance._state.adding:
+        instance._estado_previo = getattr(instance, '_estado_cargado', None)
+    if instance.pk and instance._estado_previo is None:
+        instance._estado_previo = sender.objects.filter(pk=instance.pk).values_list(
+            'estado', 'fecha_salida'
+        ).first()
+
     # Validaciones adicionales antes de guardar
     if instance.fecha_salida and instance.fecha_llegada:
         if instance.fecha_llegada <= instance.fecha_salida:
             raise ValidationError("La fecha de llegada debe ser posterior a la de salida")
-    
+
     if instance.precio_base and instance.precio_base <= 0:
         raise ValidationError("El precio debe ser mayor a 0")
 
 
 @receiver(post_save, sender=Vuelo)
-def actualizar_estadisticas_vuelos(sender, instance, **kwargs):
+def actualizar_estadisticas_vuelos(sender, instance, created, **kwargs):
     """
     Signal para actualizar estadísticas de vuelos.
+
+    Descarta los contadores en caché después del commit. No se ajustan por
+    diferencia: el estado previo que conoce la instancia puede estar
+    desactualizado (instancia vieja guardada dos veces, o cambiada por otro
+    proceso) y la diferencia haría derivar los contadores.
+
+    Args:
+        sender: Modelo que disparó el signal
+        instance: Instancia del modelo
+        created: True si se creó, False si se actualizó
+        **kwargs: Argumentos adicionales
+    """
+    _programar_invalidacion_contadores()
+
+    # Los próximos guardados de esta instancia parten del estado actual
+    instance._estado_cargado = (instance.estado, instance.fecha_salida)
+
+
+
+@receiver(post_save, sender=Vuelo)
+def recalcular_tarifas_vuelo(sender, instance, created, **kwargs):
+    """
+    Signal que recalcula la tabla de tarifas de un vuelo modificado.
+    
+    El precio depende del precio base, la salida y el avión, que pueden
+    haber cambiado. Se recalcula después del commit, junto con la
+    disponibilidad en caché (depende del estado y del avión). Los vuelos
+    nuevos no tienen tabla todavía: se calcula en la primera lectura.
+    
+    Args:
+        sender: Modelo que disparó el signal
+        instance: Instancia del modelo
+        created: True si se creó, False si se actualizó
+        **kwargs: Argumentos adicionales
+    """
+    if created:
+        return
+    
+    vuelo_id = instance.id
+    transaction.on_commit(lambda: _actualizar_vuelo_modificado(vuelo_id))
+
+
+@receiver(post_save, sender=Asiento)
+def invalidar_disponibilidad_asiento(sender, instance, created, **kwargs):
+    """
+    Signal que descarta la disponibilidad en caché de los vuelos de un avión
+    cuando cambia uno de sus asientos (por ejemplo, al pasar a mantenimiento).
+    
+    Los asientos nuevos se crean junto con el avión, antes de que tenga vuelos.
     
     Args:
         sender: Modelo que disparó el signal
         instance: Instancia del modelo
+        created: True si se creó, False si se actualizó
         **kwargs: Argumentos adicionales
     """
-    # Actualizar estadísticas en caché o base de datos
-    from django.core.cache import cache
+    if created:
+        return
     
-    # Actualizar contador de vuelos activos
-    vuelos_activos = Vuelo.objects.filter(estado='programado').count()
-    cache.set('vuelos_activos_count', vuelos_activos, 300)  # 5 minutos
+    from .services.disponibilidad import DisponibilidadService
+    avion_id = instance.avion_id
+    transaction.on_commit(lambda: DisponibilidadService.invalidar_avion(avion_id))
+
+
+def _actualizar_vuelo_modificado(vuelo_id: int):
+    """Recalcula las tarifas y descarta la disponibilidad y las vistas en caché de un vuelo."""
+    from aerolinea.cache_vistas import invalidar_grupo
+    from .services.disponibilidad import DisponibilidadService
+    from .services.tarifas import TarifaService
     
-    # Actualizar contador total de vuelos
-    total_vuelos = Vuelo.objects.count()
-    cache.set('total_vuelos_count', total_vuelos, 300)  # 5 minutos 
\ No newline at end of file
+    TarifaService.recalcular([vuelo_id])
+    DisponibilidadService.invalidar([vuelo_id])
+    invalidar_grupo('vuelos')
+
+
+def _invalidar_avion_confirmado(avion_id: int):
+    """
+    Descarta el avión de la caché de referencia, el total de aviones y las
+    vistas de vuelos, ya confirmado el cambio.
+    """
+    from aerolinea.cache_vistas import invalidar_grupo
+    from .repositories.vuelos import AvionRepository
+    from .services.vuelos import AvionService
+    
+    AvionRepository.invalidar_cache(avion_id)
+    AvionService.invalidar_contador()
+    invalidar_grupo('vuelos')
+
+
+def _invalidar_contadores_confirmado():
+    """Descarta los contadores en caché y las vistas de vuelos, ya confirmado el cambio."""
+    from aerolinea.cache_vistas import invalidar_grupo
+    from .services.vuelos import VueloService
+    
+    VueloService.invalidar_contadores()
+    invalidar_grupo('vuelos')
+
+
+def _programar_invalidacion_contadores():
+    """Descarta los contadores en caché cuando la transacción confirma."""
+    transaction.on_commit(_invalidar_contadores_confirmado)
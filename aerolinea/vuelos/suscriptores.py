@@ -0,0 +1,63 @@
+"""
+Suscriptores de eventos de vuelos.
+
+Se registran al iniciar la aplicación (VuelosConfig.ready). Después de
+cada reserva solo se descarta en la solicitud la disponibilidad en caché;
+recalcular las tarifas y avisar a los mapas de asientos se hace en segundo
+plano, vía outbox.
+"""
+
+import logging
+
+from eventos.bus import suscribir
+from eventos.dominio import ReservaCancelada, ReservaCreada, ReservaExpirada, VueloEstadoCambiado
+from vuelos.services.disponibilidad import DisponibilidadService
+from vuelos.services.mapa_en_vivo import MapaEnVivoService
+from vuelos.services.tarifas import TarifaService
+
+
+logger = logging.getLogger('vuelos')
+
+
+@suscribir(VueloEstadoCambiado)
+def registrar_cambios_estado(eventos):
+    """Registra en el log de vuelos cada cambio de estado."""
+    for evento in eventos:
+        if evento.estado_nuevo == 'en_vuelo':
+            logger.info("Vuelo %s ha despegado", evento.vuelo_id)
+        else:
+            logger.info(
+                "Vuelo %s cambió de estado: %s → %s",
+                evento.vuelo_id, evento.estado_anterior, evento.estado_nuevo
+            )
+
+
+@suscribir(ReservaCreada, ReservaCancelada, ReservaExpirada, cola=True)
+def actualizar_tarifas(eventos):
+    """Recalcula la tabla de tarifas de los vuelos cuya ocupación cambió."""
+    TarifaService.recalcular({evento.vuelo_id for evento in eventos})
+
+
+@suscribir(ReservaCreada, ReservaCancelada, ReservaExpirada)
+def actualizar_disponibilidad(eventos):
+    """Descarta la disponibilidad en caché de los vuelos cuya ocupación cambió."""
+    DisponibilidadService.invalidar({evento.vuelo_id for evento in eventos})
+
+
+@suscribir(ReservaCreada, ReservaCancelada, ReservaExpirada, cola=True)
+def transmitir_cambios_asientos(eventos):
+    """Envía a los mapas de asientos abiertos los asientos tomados o liberados."""
+    from reservas.repositories.reservas import ReservaRepository
+
+    clave = 'ocupados' if isinstance(eventos[0], ReservaCreada) else 'liberados'
+    cambios = {}
+    for vuelo_id, asiento_id in ReservaRepository.asientos_de_reservas([e.reserva_id for e in eventos]):
+        cambios.setdefault(vuelo_id, {'ocupados': [], 'liberados': []})[clave].append(asiento_id)
+    MapaEnVivoService.publicar_cambios(cambios)
+
+
+@suscribir(VueloEstadoCambiado)
+def transmitir_estado_vuelo(eventos):
+    """Avisa a los mapas de asientos abiertos que el vuelo cambió de estado."""
+    for evento in eventos:
+        MapaEnVivoService.publicar_estado(evento.vuelo_id, evento.estado_nuevo)
@@ -0,0 +1,16 @@
+"""
+Tareas de Celery para vuelos.
+
+Solo se importan cuando Celery está instalado. Sin Celery, las tarifas se
+recalculan con el comando ``recalcular_tarifas``.
+"""
+
+from celery import shared_task
+
+from vuelos.services.tarifas import TarifaService
+
+
+@shared_task(ignore_result=True)
+def recalcular_tarifas_proximas(dias: int = 30):
+    """Recalcula las tarifas de los vuelos que salen en los próximos días."""
+    return TarifaService.recalcular_proximos(dias)
@@ -8,14 +8,26 @@ Este módulo contiene tests para:
 - Funcionalidades de búsqueda
 """
 
-from django.test import TestCase, Client
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import TestCase, SimpleTestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from datetime import datetime, timedelta
 import json
+import threading
 
 from .models import Vuelo, Avion, Asiento
+from .services.asignacion import MapaAsientos
+from .services.programacion import PatronVuelo, ProgramacionService, parsear_dias
+from .services.rotacion import IndiceRotacion, RotacionService
+from .services.tarifas import TarifaService, calcular_precio
+from .services.vuelos import AsientoService, AvionService, VueloService
 from usuarios.models import Usuario
 
 
@@ -292,6 +304,25 @@ class VueloViewsTest(TestCase):
         data = json.loads(response.content)
         self.assertIn('disponible', data)
 
+    
+    @override_settings(RENDIMIENTO_SERVER_TIMING=True)
+    async def test_vistas_de_consulta_bajo_asgi(self):
+        """Las vistas de consulta son async, responden bajo ASGI y se miden sus consultas."""
+        await self.async_client.aforce_login(self.user)
+        urls = [
+            reverse('vuelos:home'),
+            reverse('vuelos:lista_vuelos'),
+            reverse('vuelos:buscar_vuelos'),
+            reverse('vuelos:detalle_vuelo', args=[self.vuelo.id]),
+        ]
+        for url in urls:
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertNotIn('desc="0 consultas"', response['Server-Timing'])
+        self.assertTrue(response.context['puede_reservar'])
+        
+        response = await self.async_client.get(reverse('vuelos:detalle_vuelo', args=[999]))
+        self.assertEqual(response.status_code, 404)
 
 class VueloAdminViewsTest(TestCase):
     """Tests para las vistas administrativas de vuelos."""
@@ -466,3 +497,776 @@ class VueloIntegrationTest(TestCase):
         # Página inexistente
         response = self.client.get(reverse('vuelos:lista_vuelos'), {'page': 999})
         self.assertEqual(response.status_code, 200)  # Debe mostrar la última página
+
+
+class MapaAsientosTest(TestCase):
+    """Tests para el motor de asignación automática de asientos."""
+    
+    def setUp(self):
+        """Avión de 50 filas x 6 columnas (300 asientos)."""
+        self.asientos = []
+        asiento_id = 0
+        for fila in range(1, 51):
+            tipo = 'primera' if fila <= 2 else 'premium' if fila <= 6 else 'economica'
+            for columna in 'ABCDEF':
+                asiento_id += 1
+                self.asientos.append((asiento_id, fila, columna, tipo))
+        self.posiciones = {a[0]: (a[1], a[2]) for a in self.asientos}
+    
+    def test_grupo_en_misma_fila_sin_cruzar_pasillo(self):
+        """Un grupo de 3 queda junto en la misma fila y del mismo lado."""
+        mapa = MapaAsientos(self.asientos)
+        ids = mapa.asignar(3, tipo='economica')
+        
+        filas = {self.posiciones[i][0] for i in ids}
+        columnas = ''.join(self.posiciones[i][1] for i in ids)
+        self.assertEqual(len(filas), 1)
+        self.assertIn(columnas, ['ABC', 'DEF'])
+    
+    def test_respeta_cabina(self):
+        """Los asientos asignados pertenecen a la cabina solicitada."""
+        mapa = MapaAsientos(self.asientos)
+        ids = mapa.asignar(2, tipo='primera')
+        self.assertTrue(all(self.posiciones[i][0] <= 2 for i in ids))
+    
+    def test_preferencia_ventanilla_y_pasillo(self):
+        """La preferencia de ventanilla o pasillo se respeta."""
+        mapa = MapaAsientos(self.asientos)
+        ventanilla = mapa.asignar(1, tipo='economica', preferencia='ventanilla')
+        pasillo = mapa.asignar(1, tipo='economica', preferencia='pasillo')
+        
+        self.assertIn(self.posiciones[ventanilla[0]][1], 'AF')
+        self.assertIn(self.posiciones[pasillo[0]][1], 'CD')
+    
+    def test_no_asigna_ocupados_y_balancea_carga(self):
+        """Se evitan asientos ocupados y se prefieren filas vacías."""
+        ocupados = [i for i, fila, _, _ in self.asientos if fila == 7 and i % 2]
+        mapa = MapaAsientos(self.asientos, ocupados)
+        ids = mapa.asignar(2, tipo='economica')
+        
+        self.assertFalse(set(ids) & set(ocupados))
+        self.assertNotEqual(self.posiciones[ids[0]][0], 7)
+    
+    def test_grupo_grande_en_filas_consecutivas(self):
+        """Un grupo de 9 se reparte en filas consecutivas."""
+        mapa = MapaAsientos(self.asientos)
+        ids = mapa.asignar(9, tipo='economica')
+        
+        filas = sorted({self.posiciones[i][0] for i in ids})
+        self.assertEqual(len(ids), 9)
+        self.assertEqual(filas, list(range(filas[0], filas[0] + 2)))
+    
+    def test_asignaciones_sucesivas_no_repiten_asientos(self):
+        """El mapa marca como ocupados los asientos ya asignados."""
+        mapa = MapaAsientos(self.asientos)
+        asignados = []
+        while mapa.disponibles('primera'):
+            asignados.extend(mapa.asignar(1, tipo='primera'))
+        
+        self.assertEqual(len(asignados), 12)
+        self.assertEqual(len(set(asignados)), 12)
+        with self.assertRaises(ValidationError):
+            mapa.asignar(1, tipo='primera')
+    
+    def test_mapa_de_vuelo_300_asientos_sin_consultas_al_asignar(self):
+        """El mapa de un vuelo de 300 asientos se carga con dos consultas y asigna sin tocar la base."""
+        from .repositories.vuelos import AsientoRepository
+        
+        avion = Avion.objects.bulk_create([
+            Avion(modelo='Mapa 300', capacidad=300, filas=50, columnas=6)
+        ])[0]
+        Asiento.objects.bulk_create([
+            Asiento(avion=avion, numero=f'M{i}', fila=fila, columna=columna, tipo=tipo)
+            for i, fila, columna, tipo in self.asientos
+        ])
+        salida = timezone.now() + timedelta(days=5)
+        vuelo = Vuelo.objects.create(
+            avion=avion, origen='Neuquén', destino='Ushuaia',
+            fecha_salida=salida, fecha_llegada=salida + timedelta(hours=3),
+            duracion='3:00', precio_base=60000
+        )
+        
+        with self.assertNumQueries(2):
+            mapa = AsientoRepository.obtener_mapa_vuelo(vuelo.id)
+        with self.assertNumQueries(0):
+            asignados = [mapa.asignar(cantidad, tipo='economica') for cantidad in range(1, 10)]
+        self.assertEqual(sum(len(ids) for ids in asignados), 45)
+
+
+@override_settings(TAREAS_MODO='sincrono')
+class VueloSignalsTest(TestCase):
+    """Tests para el costo de los signals de vuelos."""
+    
+    def setUp(self):
+        """Configuración inicial para los tests."""
+        from aerolinea.cache_referencia import cache_local
+        
+        cache.clear()
+        cache_local().clear()
+        self.addCleanup(cache_local().clear)
+        self.addCleanup(cache.clear)
+        self.avion = Avion.objects.bulk_create([
+            Avion(modelo='Embraer 190', capacidad=6, filas=1, columnas=6)
+        ])[0]
+    
+    def crear_vuelo(self, **datos):
+        salida = timezone.now() + timedelta(days=3)
+        return Vuelo.objects.create(
+            avion=self.avion, origen='Córdoba', destino='Mendoza',
+            fecha_salida=salida, fecha_llegada=salida + timedelta(hours=2),
+            duracion='2:00', precio_base=40000, **datos
+        )
+    
+    def test_contadores_se_recuentan_despues_del_commit(self):
+        """Los contadores se descartan al confirmar y se vuelven a contar una vez."""
+        self.assertEqual(VueloService.obtener_contadores(), {'total': 0, 'programados': 0})
+        
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with CaptureQueriesContext(connection) as consultas:
+                vuelo = self.crear_vuelo()
+                self.crear_vuelo(estado='cancelado')
+        self.assertFalse(any('COUNT' in q['sql'] for q in consultas.captured_queries))
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual(VueloService.obtener_contadores(), {'total': 2, 'programados': 1})
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            vuelo.estado = 'cancelado'
+            vuelo.save()
+        self.assertEqual(VueloService.obtener_contadores(), {'total': 2, 'programados': 0})
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            vuelo.delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(VueloService.obtener_contadores(), {'total': 1, 'programados': 0})
+    
+    def test_instancia_desactualizada_no_desvia_contadores(self):
+        """Guardar una instancia vieja (o dos veces) no descuenta de más."""
+        vuelo = self.crear_vuelo()
+        vieja = Vuelo.objects.get(id=vuelo.id)
+        Vuelo.objects.filter(id=vuelo.id).update(estado='cancelado')
+        self.assertEqual(VueloService.obtener_contadores(), {'total': 1, 'programados': 0})
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            vieja.estado = 'retrasado'
+            vieja.save()
+            vieja.save()
+        self.assertEqual(VueloService.obtener_contadores(), {'total': 1, 'programados': 0})
+    
+    def test_guardar_vuelo_cargado_no_consulta_estado_previo(self):
+        """Un vuelo cargado de la base se guarda con una sola consulta."""
+        vuelo = Vuelo.objects.get(id=self.crear_vuelo().id)
+        vuelo.precio_base = 45000
+        
+        with self.assertNumQueries(1):
+            vuelo.save()
+    
+    def test_asientos_del_avion_nuevo_en_una_consulta(self):
+        """Los asientos de un avión nuevo se crean con un solo INSERT y con tipo."""
+        Asiento.objects.all().delete()
+        with CaptureQueriesContext(connection) as consultas:
+            avion = Avion.objects.create(modelo='ATR 72', capacidad=12, filas=2, columnas=6)
+        
+        inserts = [q for q in consultas.captured_queries if 'INSERT INTO "vuelos_asiento"' in q['sql']]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(avion.asientos.count(), 12)
+        self.assertEqual(set(avion.asientos.values_list('tipo', flat=True)), {'primera'})
+
+    def test_cada_avion_nuevo_recibe_sus_asientos(self):
+        """La numeración es por avión: el segundo avión también recibe asientos."""
+        primero = Avion.objects.create(modelo='ATR 72', capacidad=12, filas=2, columnas=6)
+        segundo = Avion.objects.create(modelo='ATR 42', capacidad=12, filas=2, columnas=6)
+
+        self.assertEqual(primero.asientos.count(), 12)
+        self.assertEqual(segundo.asientos.count(), 12)
+        self.assertTrue(segundo.asientos.filter(numero='1A').exists())
+        self.assertEqual(AsientoService.crear_asientos_faltantes([self.avion.id, segundo.id]), 6)
+        self.assertEqual(self.avion.asientos.count(), 6)
+    
+    def test_total_de_aviones_en_cache(self):
+        """El total de aviones se cuenta una vez y se descarta al crear o eliminar un avión."""
+        self.assertEqual(AvionService.contar_aviones(), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(AvionService.contar_aviones(), 1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            avion = Avion.objects.create(modelo='ATR 72', capacidad=12, filas=2, columnas=6)
+        self.assertEqual(AvionService.contar_aviones(), 2)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            avion.delete()
+        self.assertEqual(AvionService.contar_aviones(), 1)
+
+
+class IndiceRotacionTest(SimpleTestCase):
+    """Tests para el índice de rotación de aviones."""
+    
+    def setUp(self):
+        """Un avión con tramos de 2 horas y 30 minutos de rotación."""
+        self.base = datetime(2030, 1, 1, 6, 0)
+        self.indice = IndiceRotacion(timedelta(minutes=30))
+        for i, hora in enumerate([0, 3, 6, 12]):
+            salida = self.base + timedelta(hours=hora)
+            self.indice.agregar(1, salida, salida + timedelta(hours=2), i)
+    
+    def test_rotacion_cuenta_como_ocupacion(self):
+        """Un vuelo no puede salir antes de terminar la rotación del anterior."""
+        hora = lambda h, m=0: self.base + timedelta(hours=h, minutes=m)
+        self.assertEqual(self.indice.conflictos(1, hora(8, 20), hora(9)), [2])
+        self.assertEqual(self.indice.conflictos(1, hora(8, 30), hora(11)), [])
+        self.assertEqual(self.indice.conflictos(1, hora(2), hora(7)), [0, 1, 2])
+        self.assertEqual(self.indice.conflictos(2, hora(2), hora(7)), [])
+        self.assertEqual(self.indice.conflictos(1, hora(3), hora(4), excluir=1), [])
+    
+    def test_intervalo_largo_insertado_al_final(self):
+        """Un tramo superpuesto ya cargado se encuentra aunque empiece antes."""
+        self.indice.agregar(1, self.base - timedelta(hours=1), self.base + timedelta(hours=20), 'largo')
+        conflictos = self.indice.conflictos(1, self.base + timedelta(hours=9), self.base + timedelta(hours=10))
+        self.assertEqual(conflictos, ['largo'])
+
+
+class RotacionServiceTest(TestCase):
+    """Tests para la validación de rotación contra la base de datos."""
+    
+    def setUp(self):
+        """Configuración inicial para los tests."""
+        self.avion = Avion.objects.bulk_create([
+            Avion(modelo='ATR 72', capacidad=70, filas=12, columnas=6)
+        ])[0]
+        self.salida = (timezone.now() + timedelta(days=3)).replace(hour=8, minute=0, second=0, microsecond=0)
+        self.vuelo = VueloService.crear_vuelo(
+            'Buenos Aires', 'Rosario', self.salida, self.salida + timedelta(hours=1), 40000, self.avion.id
+        )
+    
+    @override_settings(VUELOS_ROTACION_MINUTOS=45)
+    def test_varios_tramos_en_el_dia(self):
+        """Se permiten varios tramos en el día si se respeta la rotación."""
+        vuelta = self.salida + timedelta(hours=1, minutes=45)
+        VueloService.crear_vuelo('Rosario', 'Buenos Aires', vuelta, vuelta + timedelta(hours=1),
+                                 40000, self.avion.id)
+        
+        with self.assertRaises(ValidationError):
+            VueloService.crear_vuelo('Buenos Aires', 'Mendoza', vuelta + timedelta(hours=1, minutes=30),
+                                     vuelta + timedelta(hours=3), 40000, self.avion.id)
+        
+        # Mover el primer vuelo sobre sí mismo no es un conflicto
+        VueloService.actualizar_vuelo(self.vuelo.id, fecha_salida=self.salida + timedelta(minutes=5))
+    
+    @override_settings(VUELOS_ROTACION_MINUTOS=45)
+    def test_validar_programacion(self):
+        """La programación se valida contra la base y contra sí misma."""
+        def tramo(horas, duracion=1):
+            salida = self.salida + timedelta(hours=horas)
+            return {'avion_id': self.avion.id, 'fecha_salida': salida,
+                    'fecha_llegada': salida + timedelta(hours=duracion)}
+        
+        conflictos = RotacionService.validar_programacion([tramo(0.5), tramo(2), tramo(3.5), tramo(5)])
+        
+        self.assertEqual(conflictos, [
+            {'indice': 0, 'vuelo_id': self.vuelo.id, 'indice_conflicto': None},
+            {'indice': 2, 'vuelo_id': None, 'indice_conflicto': 1},
+        ])
+    
+    def test_gantt_flota(self):
+        """El Gantt de la flota muestra los tramos de cada avión."""
+        staff = Usuario.objects.create_user('gantt', password='clave123', is_staff=True)
+        self.client.force_login(staff)
+        
+        response = self.client.get(reverse('vuelos:gantt_flota'), {
+            'desde': self.salida.date().isoformat(), 'dias': 2
+        })
+        
+        self.assertEqual(response.status_code, 200)
+        fila = next(f for f in response.context['filas'] if f['avion'].id == self.avion.id)
+        self.assertEqual([t['id'] for t in fila['tramos']], [self.vuelo.id])
+        self.assertFalse(fila['tramos'][0]['conflicto'])
+
+
+@override_settings(VUELOS_ROTACION_MINUTOS=45)
+class ProgramacionTest(TestCase):
+    """Tests para la generación de vuelos por temporada."""
+    
+    def setUp(self):
+        """Avión sin asientos y una temporada de dos semanas."""
+        self.avion = Avion.objects.bulk_create([
+            Avion(modelo='Embraer 190', capacidad=12, filas=2, columnas=6)
+        ])[0]
+        self.desde = timezone.localdate() + timedelta(days=1)
+        self.hasta = self.desde + timedelta(days=13)
+    
+    def patron(self, origen, destino, dias, hora, duracion_minutos=80):
+        return PatronVuelo(
+            origen=origen, destino=destino, dias=parsear_dias(dias),
+            hora_salida=datetime.strptime(hora, '%H:%M').time(),
+            duracion=timedelta(minutes=duracion_minutos), avion_id=self.avion.id,
+            desde=self.desde, hasta=self.hasta, precio_base=85000
+        )
+    
+    def test_parsear_dias(self):
+        """Los días se aceptan como dígitos, abreviaturas o 'diario'."""
+        self.assertEqual(parsear_dias('1,3,5'), {1, 3, 5})
+        self.assertEqual(parsear_dias('135'), {1, 3, 5})
+        self.assertEqual(parsear_dias('Lun, Mié, vie'), {1, 3, 5})
+        self.assertEqual(parsear_dias('diario'), set(range(1, 8)))
+        with self.assertRaises(ValueError):
+            parsear_dias('8')
+    
+    def test_genera_rotacion_de_ida_y_vuelta(self):
+        """Ida y vuelta el mismo día se crean en bloque con pocas consultas."""
+        patrones = [
+            self.patron('Buenos Aires', 'Córdoba', 'diario', '07:00'),
+            self.patron('Córdoba', 'Buenos Aires', 'diario', '09:05'),
+        ]
+        
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = ProgramacionService.generar(patrones)
+        
+        self.assertEqual(resultado, {'generados': 28, 'creados': 28, 'pasados': 0, 'conflictos': 0})
+        self.assertEqual(Vuelo.objects.filter(avion=self.avion).count(), 28)
+        self.assertEqual(Asiento.objects.filter(avion=self.avion).count(), 12)
+        self.assertLess(len(consultas), 15)
+        vuelo = Vuelo.objects.filter(origen='Córdoba').first()
+        self.assertEqual(timezone.localtime(vuelo.fecha_salida).strftime('%H:%M'), '09:05')
+        self.assertEqual(vuelo.duracion, '1:20')
+    
+    def test_conflictos_de_rotacion(self):
+        """Sin rotación suficiente no se crea nada, salvo que se omitan los conflictos."""
+        patrones = [
+            self.patron('Buenos Aires', 'Córdoba', 'diario', '07:00'),
+            # Sale antes de terminar la rotación de la ida los lunes
+            self.patron('Córdoba', 'Buenos Aires', '1', '08:30'),
+        ]
+        
+        with self.assertRaises(ValidationError):
+            ProgramacionService.generar(patrones)
+        self.assertFalse(Vuelo.objects.exists())
+        
+        resultado = ProgramacionService.generar(patrones, omitir_conflictos=True)
+        self.assertEqual(resultado['creados'], 14)
+        self.assertEqual(resultado['conflictos'], 2)
+        
+        # Volver a cargar la misma programación no duplica vuelos
+        resultado = ProgramacionService.generar(patrones, omitir_conflictos=True)
+        self.assertEqual(resultado['creados'], 0)
+        self.assertEqual(Vuelo.objects.count(), 14)
+
+
+class TarifaTest(TestCase):
+    """Tests para el motor de tarifas y la tabla precalculada."""
+    
+    def setUp(self):
+        """Avión con 2 asientos de primera y 4 de económica."""
+        from pasajeros.models import Pasajero
+        
+        self.avion = Avion.objects.bulk_create([
+            Avion(modelo='Tarifas 100', capacidad=6, filas=1, columnas=6)
+        ])[0]
+        self.asientos = Asiento.objects.bulk_create([
+            Asiento(avion=self.avion, numero=f'TF{i}', fila=1, columna='ABCDEF'[i],
+                    tipo='primera' if i < 2 else 'economica')
+            for i in range(6)
+        ])
+        self.vuelos = []
+        for dias in (40, 41, 42):
+            salida = timezone.now() + timedelta(days=dias)
+            self.vuelos.append(Vuelo.objects.create(
+                avion=self.avion, origen='Salta', destino='Jujuy', fecha_salida=salida,
+                fecha_llegada=salida + timedelta(hours=1), duracion='1:00', precio_base=10000
+            ))
+        self.pasajero = Pasajero.objects.create(
+            nombre='Tarifa', apellido='Test', documento='81000000',
+            email='tarifa@example.com', fecha_nacimiento='1990-01-01'
+        )
+    
+    def reservar(self, vuelo, asiento):
+        from reservas.models import Reserva
+        return Reserva.objects.create(
+            vuelo=vuelo, pasajero=self.pasajero, asiento=asiento, estado='confirmada',
+            precio=10000, fecha_vencimiento=timezone.now() + timedelta(hours=24)
+        )
+    
+    def test_escalones_de_ocupacion_y_anticipacion(self):
+        """El precio sube con la ocupación de la cabina y la cercanía de la salida."""
+        ahora = timezone.now()
+        lejos = ahora + timedelta(days=60)
+        self.assertEqual(calcular_precio(10000, 'economica', 0, 100, lejos, ahora), 10000)
+        self.assertEqual(calcular_precio(10000, 'primera', 0, 100, lejos, ahora), 20000)
+        self.assertEqual(calcular_precio(10000, 'economica', 80, 100, lejos, ahora), 12500)
+        self.assertEqual(calcular_precio(10000, 'economica', 0, 100, ahora + timedelta(days=1), ahora), 13000)
+    
+    def test_tabla_se_calcula_en_bloque(self):
+        """La tabla de varios vuelos se calcula con una cantidad fija de consultas."""
+        for asiento in self.asientos[2:5]:
+            self.reservar(self.vuelos[0], asiento)
+        
+        with self.assertNumQueries(4):
+            TarifaService.recalcular([vuelo.id for vuelo in self.vuelos])
+        
+        tablas = TarifaService.obtener_tablas([vuelo.id for vuelo in self.vuelos])
+        economica = tablas[self.vuelos[0].id]['economica']
+        self.assertEqual((economica.asientos_totales, economica.asientos_ocupados), (4, 3))
+        self.assertEqual(economica.precio, 12500)
+        self.assertEqual(tablas[self.vuelos[1].id]['economica'].precio, 10000)
+        self.assertEqual(tablas[self.vuelos[1].id]['primera'].precio, 20000)
+
+    def test_lectura_sin_tabla_no_escribe(self):
+        """Un vuelo sin tabla se calcula en memoria: la lectura no guarda tarifas."""
+        from vuelos.models import TarifaVuelo
+
+        TarifaVuelo.objects.all().delete()
+        for asiento in self.asientos[2:5]:
+            self.reservar(self.vuelos[0], asiento)
+
+        with CaptureQueriesContext(connection) as consultas:
+            precios = TarifaService.precios_por_tipo(self.vuelos[0])
+
+        self.assertEqual(precios['economica'], 12500)
+        self.assertFalse(TarifaVuelo.objects.exists())
+        self.assertTrue(all(q['sql'].startswith('SELECT') for q in consultas.captured_queries))
+
+    def test_cotizacion_en_bloque(self):
+        """Las solicitudes se cotizan con una consulta, pasajero por pasajero."""
+        for asiento in self.asientos[2:4]:
+            self.reservar(self.vuelos[0], asiento)
+        TarifaService.recalcular([vuelo.id for vuelo in self.vuelos])
+        
+        with self.assertNumQueries(1):
+            cotizaciones = TarifaService.cotizar([
+                {'vuelo_id': self.vuelos[0].id, 'tipo': 'economica', 'pasajeros': 2},
+                {'vuelo_id': self.vuelos[1].id, 'tipo': 'primera', 'pasajeros': 1},
+                {'vuelo_id': self.vuelos[1].id, 'tipo': 'economica', 'pasajeros': 5},
+                {'vuelo_id': self.vuelos[2].id, 'tipo': 'premium', 'pasajeros': 1},
+                {'vuelo_id': 999999, 'tipo': 'economica', 'pasajeros': 1},
+            ])
+        
+        # 2 de 4 ocupados: todos pagan el precio vigente (escalón del 50%), como en la reserva
+        self.assertEqual((cotizaciones[0]['precio_unitario'], cotizaciones[0]['total']), (11000, 22000))
+        self.assertEqual(cotizaciones[1]['total'], 20000)
+        self.assertEqual(
+            [c['disponible'] for c in cotizaciones], [True, True, False, False, False]
+        )
+        self.assertEqual(cotizaciones[2]['motivo'], 'No hay asientos suficientes')
+        self.assertEqual(cotizaciones[4]['motivo'], 'Vuelo no encontrado')
+    
+    def test_tabla_sigue_a_las_reservas(self):
+        """Las reservas nuevas y canceladas actualizan los precios que leen las vistas."""
+        from eventos.bus import publicar
+        from eventos.dominio import ReservaCancelada, ReservaCreada
+        
+        vuelo = self.vuelos[0]
+        self.assertEqual(TarifaService.precios_por_tipo(vuelo)['economica'], 10000)
+        
+        reservas = [self.reservar(vuelo, asiento) for asiento in self.asientos[2:5]]
+        # Las tarifas se recalculan desde el outbox, fuera de la solicitud
+        with self.settings(TAREAS_MODO='sincrono'), self.captureOnCommitCallbacks(execute=True):
+            publicar(ReservaCreada(reserva_id=reservas[0].id, vuelo_id=vuelo.id, pasajero_id=self.pasajero.id))
+        
+        response = self.client.get(reverse('vuelos:detalle_vuelo', args=[vuelo.id]))
+        self.assertEqual(response.context['precios_por_tipo']['economica'], 12500)
+        
+        reservas[0].estado = 'cancelada'
+        reservas[0].save()
+        with self.settings(TAREAS_MODO='sincrono'), self.captureOnCommitCallbacks(execute=True):
+            publicar(ReservaCancelada(reserva_id=reservas[0].id, vuelo_id=vuelo.id, estado_anterior='confirmada'))
+        
+        self.assertEqual(TarifaService.precio(vuelo.id, 'economica'), 11000)
+
+
+    def test_reserva_no_recalcula_tarifas_en_la_solicitud(self):
+        """Al confirmar la transacción solo se despacha la entrega; la tabla no se toca."""
+        from unittest import mock
+        from eventos.bus import publicar
+        from eventos.dominio import ReservaCreada
+        from .models import TarifaVuelo
+        
+        vuelo = self.vuelos[0]
+        reserva = self.reservar(vuelo, self.asientos[2])
+        precios = list(TarifaVuelo.objects.filter(vuelo=vuelo).values_list('tipo', 'precio'))
+        
+        with mock.patch('aerolinea.tareas.encolar') as encolar:
+            with CaptureQueriesContext(connection) as consultas:
+                with self.captureOnCommitCallbacks(execute=True):
+                    publicar(ReservaCreada(reserva_id=reserva.id, vuelo_id=vuelo.id, pasajero_id=self.pasajero.id))
+        
+        encolar.assert_called_once()
+        self.assertEqual(encolar.call_args.args[0], 'eventos.services.eventos:EventoService.entregar')
+        self.assertFalse(any('vuelos_tarifavuelo' in q['sql'] for q in consultas.captured_queries))
+        self.assertEqual(list(TarifaVuelo.objects.filter(vuelo=vuelo).values_list('tipo', 'precio')), precios)
+
+
+@override_settings(TAREAS_MODO='sincrono')
+class DisponibilidadTest(TestCase):
+    """Tests para la disponibilidad de asientos en caché."""
+    
+    def setUp(self):
+        """Vuelo con 3 asientos de económica, uno reservado."""
+        from pasajeros.models import Pasajero
+        from reservas.models import Reserva
+        
+        cache.clear()
+        avion = Avion.objects.bulk_create([
+            Avion(modelo='Disponibilidad 10', capacidad=3, filas=1, columnas=3)
+        ])[0]
+        self.asientos = Asiento.objects.bulk_create([
+            Asiento(avion=avion, numero=f'DS{i}', fila=1, columna='ABC'[i], tipo='economica')
+            for i in range(3)
+        ])
+        salida = timezone.now() + timedelta(days=30)
+        self.vuelo = Vuelo.objects.create(
+            avion=avion, origen='Rosario', destino='Bariloche', fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=2), duracion='2:00', precio_base=10000
+        )
+        self.pasajero = Pasajero.objects.create(
+            nombre='Disponible', apellido='Test', documento='82000000',
+            email='disponible@example.com', fecha_nacimiento='1990-01-01'
+        )
+        Reserva.objects.create(
+            vuelo=self.vuelo, pasajero=self.pasajero, asiento=self.asientos[0],
+            estado='confirmada', precio=10000
+        )
+        TarifaService.recalcular([self.vuelo.id])
+        self.url = reverse('vuelos:disponibilidad_vuelo', args=[self.vuelo.id])
+    
+    def test_una_consulta_y_respuesta_condicional(self):
+        """La disponibilidad se arma con una consulta y después sale de la caché."""
+        ids = f'{self.asientos[0].id},{self.asientos[1].id}'
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'asientos': ids})
+        data = response.json()
+        self.assertEqual([a['disponible'] for a in data['asientos']], [False, True])
+        self.assertEqual(data['asientos'][1]['precio'], '10000.00')
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'asientos': ids}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                reverse('vuelos:verificar_disponibilidad', args=[self.asientos[2].id]),
+                {'vuelo_id': self.vuelo.id}
+            )
+        self.assertTrue(response.json()['disponible'])
+    
+    def test_reserva_nueva_invalida_la_cache(self):
+        """Una reserva nueva cambia la versión y la disponibilidad del asiento."""
+        from eventos.bus import publicar
+        from eventos.dominio import ReservaCreada
+        from reservas.models import Reserva
+        from .services.disponibilidad import DisponibilidadService
+        
+        version = DisponibilidadService.version(self.vuelo.id)
+        reserva = Reserva.objects.create(
+            vuelo=self.vuelo, pasajero=self.pasajero, asiento=self.asientos[1],
+            estado='pendiente', precio=10000
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            publicar(ReservaCreada(reserva_id=reserva.id, vuelo_id=self.vuelo.id, pasajero_id=self.pasajero.id))
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"{version}"')
+        self.assertEqual(response.status_code, 200)
+        disponibles = [a['asiento_id'] for a in response.json()['asientos'] if a['disponible']]
+        self.assertEqual(disponibles, [self.asientos[2].id])
+
+
+class MapaEnVivoTest(TestCase):
+    """Tests para la transmisión en vivo del mapa de asientos."""
+    
+    def setUp(self):
+        from pasajeros.models import Pasajero
+        
+        cache.clear()
+        self.avion = Avion.objects.bulk_create([
+            Avion(modelo='En Vivo 10', capacidad=2, filas=1, columnas=2)
+        ])[0]
+        self.asientos = Asiento.objects.bulk_create([
+            Asiento(avion=self.avion, numero=f'EV{i}', fila=1, columna='AB'[i], tipo='economica')
+            for i in range(2)
+        ])
+        salida = timezone.now() + timedelta(days=30)
+        self.vuelo = Vuelo.objects.create(
+            avion=self.avion, origen='Salta', destino='Ushuaia', fecha_salida=salida,
+            fecha_llegada=salida + timedelta(hours=4), duracion='4:00', precio_base=10000
+        )
+        self.pasajero = Pasajero.objects.create(
+            nombre='En', apellido='Vivo', documento='83000000',
+            email='envivo@example.com', fecha_nacimiento='1990-01-01'
+        )
+    
+    def _reservar(self):
+        from eventos.bus import publicar
+        from eventos.dominio import ReservaCreada
+        from reservas.models import Reserva
+        
+        reserva = Reserva.objects.create(
+            vuelo=self.vuelo, pasajero=self.pasajero, asiento=self.asientos[0],
+            estado='pendiente', precio=10000
+        )
+        # Los cambios de asientos se transmiten desde el outbox
+        with self.settings(TAREAS_MODO='sincrono'), self.captureOnCommitCallbacks(execute=True):
+            publicar(ReservaCreada(reserva_id=reserva.id, vuelo_id=self.vuelo.id, pasajero_id=self.pasajero.id))
+    
+    def test_transmite_mapa_y_cambios(self):
+        """El stream envía el mapa al conectarse y después los asientos que se ocupan."""
+        from asgiref.sync import async_to_sync, sync_to_async
+        from .services.mapa_en_vivo import MapaEnVivoService
+        
+        async def leer():
+            stream = MapaEnVivoService.transmitir(self.vuelo.id, duracion=5)
+            try:
+                self.assertTrue((await anext(stream)).startswith('retry:'))
+                mapa = await anext(stream)
+                await sync_to_async(self._reservar)()
+                cambio = await anext(stream)
+            finally:
+                await stream.aclose()
+            return mapa, cambio
+        
+        mapa, cambio = async_to_sync(leer)()
+        self.assertTrue(mapa.startswith('event: mapa\n'))
+        datos = json.loads(mapa.split('data: ', 1)[1])
+        self.assertEqual(datos['asientos'], {str(a.id): True for a in self.asientos})
+        self.assertTrue(cambio.startswith('event: asientos\n'))
+        self.assertEqual(json.loads(cambio.split('data: ', 1)[1]), {'ocupados': [self.asientos[0].id], 'liberados': []})
+    
+    def test_stream_requiere_asgi(self):
+        """Bajo WSGI la vista responde 501 para que el navegador consulte periódicamente."""
+        response = self.client.get(reverse('vuelos:stream_asientos', args=[self.vuelo.id]))
+        self.assertEqual(response.status_code, 501)
+
+
+
+class CacheReferenciaVuelosTest(TestCase):
+    """Tests para los aviones y asientos en la caché de datos de referencia."""
+    
+    def setUp(self):
+        from aerolinea.cache_referencia import cache_local
+        
+        cache.clear()
+        cache_local().clear()
+        # Los IDs se reutilizan entre tests: no dejar aviones en la caché
+        self.addCleanup(cache_local().clear)
+        self.addCleanup(cache.clear)
+        self.avion = Avion.objects.bulk_create([
+            Avion(modelo='Referencia 10', capacidad=2, filas=1, columnas=2)
+        ])[0]
+    
+    def test_avion_y_asientos_se_invalidan_al_guardar(self):
+        """Las lecturas repetidas no consultan la base y los cambios se ven al instante."""
+        from .repositories.vuelos import AsientoRepository, AvionRepository
+        
+        AvionRepository.obtener_por_id(self.avion.id)
+        self.assertEqual(AsientoRepository.obtener_por_avion(self.avion.id), [])
+        with self.assertNumQueries(0):
+            self.assertEqual(AvionRepository.obtener_por_id(self.avion.id).modelo, 'Referencia 10')
+            AsientoRepository.obtener_por_avion(self.avion.id)
+        
+        self.avion.estado = 'mantenimiento'
+        self.avion.save()
+        self.assertEqual(AvionRepository.obtener_por_id(self.avion.id).estado, 'mantenimiento')
+        
+        AsientoRepository.crear_varios([
+            Asiento(avion=self.avion, numero='RF1', fila=1, columna='A', tipo='economica')
+        ])
+        self.assertEqual([a.numero for a in AsientoRepository.obtener_por_avion(self.avion.id)], ['RF1'])
+
+
+class CacheVistasTest(TestCase):
+    """Tests para la caché de respuestas de las vistas de vuelos."""
+    
+    def setUp(self):
+        from aerolinea.cache_referencia import cache_local
+        
+        # Vaciar la caché compartida reinicia las generaciones de la de referencia
+        cache.clear()
+        cache_local().clear()
+        self.addCleanup(cache_local().clear)
+        self.addCleanup(cache.clear)
+        self.avion = Avion.objects.bulk_create([
+            Avion(modelo='Vistas 20', capacidad=2, filas=1, columnas=2)
+        ])[0]
+        self.vuelo = Vuelo.objects.create(
+            avion=self.avion,
+            origen='Rosario',
+            destino='Salta',
+            fecha_salida=timezone.now() + timedelta(days=3),
+            fecha_llegada=timezone.now() + timedelta(days=3, hours=2),
+            duracion=timedelta(hours=2),
+            precio_base=30000
+        )
+    
+    def test_lista_vuelos_se_sirve_desde_la_cache(self):
+        """La segunda visita no consulta la base, con token CSRF propio, y un cambio la invalida."""
+        url = reverse('vuelos:lista_vuelos')
+        primera = self.client.get(url, {'origen': 'Rosario', 'orden': 'precio'})
+        self.assertNotIn('X-Cache-Vista', primera)
+        
+        otro = Client()
+        with self.assertNumQueries(0):
+            segunda = otro.get(url, {'orden': 'precio', 'origen': 'Rosario'})
+        self.assertEqual(segunda['X-Cache-Vista'], 'HIT')
+        self.assertContains(segunda, 'Salta')
+        self.assertIn('csrftoken', segunda.cookies)
+        
+        # Otro idioma es otra entrada
+        self.assertNotIn('X-Cache-Vista', otro.get(url.replace('/es/', '/en/', 1), {'origen': 'Rosario', 'orden': 'precio'}))
+        
+        self.vuelo.destino = 'Jujuy'
+        self.vuelo.save()
+        tercera = otro.get(url, {'origen': 'Rosario', 'orden': 'precio'})
+        self.assertNotIn('X-Cache-Vista', tercera)
+        self.assertContains(tercera, 'Jujuy')
+    
+    def test_listado_api_varia_segun_autenticacion(self):
+        """El listado público de la API se cachea por separado para anónimos y autenticados."""
+        url = reverse('vuelo-list')
+        self.assertNotIn('X-Cache-Vista', self.client.get(url))
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta['X-Cache-Vista'], 'HIT')
+        self.assertEqual(respuesta.json()['results'][0]['destino'], 'Salta')
+        
+        usuario = Usuario.objects.create_user(username='cliente_vistas', password='clave12345')
+        self.client.force_login(usuario)
+        self.assertNotIn('X-Cache-Vista', self.client.get(url))
+    
+    def test_detalle_api_desde_la_cache(self):
+        """El detalle público de la API se cachea como el listado; los asientos disponibles no."""
+        url = reverse('vuelo-detail', args=[self.vuelo.id])
+        self.assertNotIn('X-Cache-Vista', self.client.get(url))
+        self.assertEqual(self.client.get(url)['X-Cache-Vista'], 'HIT')
+        
+        self.vuelo.destino = 'Jujuy'
+        self.vuelo.save()
+        respuesta = self.client.get(url)
+        self.assertNotIn('X-Cache-Vista', respuesta)
+        self.assertEqual(respuesta.json()['destino'], 'Jujuy')
+        
+        asientos = reverse('vuelo-asientos-disponibles', args=[self.vuelo.id])
+        self.client.get(asientos)
+        self.assertNotIn('X-Cache-Vista', self.client.get(asientos))
+    
+    @override_settings(CACHE_RECALCULO_ESPERA=0.2)
+    def test_espera_a_quien_esta_calculando(self):
+        """Con el bloqueo tomado por otra solicitud, no calcula la página: espera la suya."""
+        from aerolinea import cache_vistas
+        
+        llamadas = []
+        
+        @cache_vistas.cachear_respuesta('prueba')
+        def vista(request):
+            llamadas.append(request)
+            return HttpResponse('calculada')
+        
+        request = RequestFactory().get('/prueba/')
+        request.user = AnonymousUser()
+        clave = cache_vistas._preparar(request, 'prueba', f'{vista.__module__}.{vista.__qualname__}', False)
+        cache.add(f'{clave}:bloqueo', 1)
+        otro_worker = threading.Timer(0.05, cache.set, (clave, ('html', 200, b'de otro worker', 'text/html', None)))
+        otro_worker.start()
+        self.addCleanup(otro_worker.cancel)
+        self.assertEqual(vista(request).content, b'de otro worker')
+        
+        # Si quien tenía el bloqueo termina sin guardarla, la calcula
+        cache.delete(clave)
+        cache.delete(f'{clave}:bloqueo')
+        cache.add(f'{clave}:bloqueo', 1, 0.1)
+        self.assertEqual(vista(request).content, b'calculada')
+        self.assertEqual(len(llamadas), 1)
@@ -22,6 +22,8 @@ urlpatterns = [
     path('vuelos/', views.lista_vuelos, name='lista_vuelos'),
     path('vuelos/<int:vuelo_id>/', views.detalle_vuelo, name='detalle_vuelo'),
     path('vuelos/buscar/', views.buscar_vuelos, name='buscar_vuelos'),
+    path('vuelos/<int:vuelo_id>/disponibilidad/', views.disponibilidad_vuelo, name='disponibilidad_vuelo'),
+    path('vuelos/<int:vuelo_id>/asientos/stream/', views.stream_asientos, name='stream_asientos'),
     
     # Gestión de aviones (solo para administradores)
     path('aviones/', views.lista_aviones, name='lista_aviones'),
@@ -36,6 +38,7 @@ urlpatterns = [
     path('reportes/pasajeros/', admin_views.reporte_pasajeros, name='reporte_pasajeros'),
     path('reportes/pasajeros/<int:vuelo_id>/', admin_views.detalle_pasajeros_vuelo, name='detalle_pasajeros_vuelo'),
     path('estadisticas/ocupacion/', admin_views.estadisticas_ocupacion, name='estadisticas_ocupacion'),
+    path('flota/gantt/', admin_views.gantt_flota, name='gantt_flota'),
     path('api/estadisticas/', admin_views.api_estadisticas_vuelos, name='api_estadisticas'),
     path('api/actualizar-estado/', admin_views.api_actualizar_estado_vuelo, name='api_actualizar_estado'),
     
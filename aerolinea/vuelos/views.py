@@ -10,12 +10,21 @@ Este archivo contiene todas las vistas relacionadas con:
 Implementa el patrón Vista-Servicio-Repositorio.
 """
 
-from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from django.shortcuts import render, get_object_or_404, aget_object_or_404
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
 from usuarios.decorators import staff_required, active_flight_required
+from aerolinea.cache_vistas import cachear_respuesta
+from aerolinea.metricas import MAPA_ASIENTOS_DURACION, medir
 from .models import Vuelo, Avion, Asiento
+from .services.disponibilidad import DisponibilidadService
+from .services.mapa_en_vivo import MapaEnVivoService
+from .services.tarifas import TarifaService
 from .services.vuelos import VueloService, AvionService, AsientoService
 
 # Inicializar servicios
@@ -23,7 +32,19 @@ vuelo_service = VueloService()
 avion_service = AvionService()
 asiento_service = AsientoService()
 
-def home(request):
+
+async def _arender(request, template_name, context):
+    """
+    render() para vistas async.
+    
+    El template se renderiza en un hilo: los context processors (usuario,
+    mensajes) y los querysets del contexto pueden consultar la base.
+    """
+    return await sync_to_async(render)(request, template_name, context)
+
+
+@cachear_respuesta('vuelos', por_usuario=True)
+async def home(request):
     """
     Vista para la página principal del sitio.
     
@@ -31,24 +52,25 @@ def home(request):
     Implementa el patrón Vista-Servicio-Repositorio.
     """
     # Usar servicios para obtener datos
-    vuelos_proximos = vuelo_service.buscar_vuelos_disponibles()[:5]
+    vuelos_proximos = (await sync_to_async(vuelo_service.buscar_vuelos_disponibles)())[:5]
+    await sync_to_async(TarifaService.anotar_precios)(vuelos_proximos)
     
-    # Obtener estadísticas básicas
-    total_vuelos = Vuelo.objects.count()
-    vuelos_activos = Vuelo.objects.filter(estado='programado').count()
-    total_aviones = Avion.objects.count()
+    # Estadísticas básicas desde la caché (contadores de vuelos y total de aviones)
+    contadores = await sync_to_async(vuelo_service.obtener_contadores)()
+    total_aviones = await sync_to_async(avion_service.contar_aviones)()
     
     context = {
         'vuelos_proximos': vuelos_proximos,
-        'total_vuelos': total_vuelos,
-        'vuelos_activos': vuelos_activos,
+        'total_vuelos': contadores['total'],
+        'vuelos_activos': contadores['programados'],
         'total_aviones': total_aviones,
     }
     
-    return render(request, 'vuelos/home.html', context)
+    return await _arender(request, 'vuelos/home.html', context)
 
 
-def lista_vuelos(request):
+@cachear_respuesta('vuelos', por_usuario=True)
+async def lista_vuelos(request):
     """
     Vista para mostrar la lista de todos los vuelos disponibles.
     
@@ -100,11 +122,15 @@ def lista_vuelos(request):
     # Paginación
     paginator = Paginator(vuelos, 10)  # 10 vuelos por página
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = await sync_to_async(paginator.get_page)(page_number)
+    
+    # Precios vigentes de la página desde la tabla de tarifas
+    page_obj.object_list = [vuelo async for vuelo in page_obj.object_list]
+    await sync_to_async(TarifaService.anotar_precios)(page_obj.object_list)
     
-    # Estadísticas
-    total_vuelos = vuelos.count()
-    vuelos_disponibles = vuelos.filter(estado='programado').count()
+    # Estadísticas (el paginador ya contó los vuelos filtrados)
+    total_vuelos = paginator.count
+    vuelos_disponibles = await vuelos.filter(estado='programado').acount()
     
     context = {
         'page_obj': page_obj,
@@ -121,55 +147,61 @@ def lista_vuelos(request):
         'vuelos_disponibles': vuelos_disponibles,
     }
     
-    return render(request, 'vuelos/lista_vuelos.html', context)
+    return await _arender(request, 'vuelos/lista_vuelos.html', context)
 
 
-def detalle_vuelo(request, vuelo_id):
+async def detalle_vuelo(request, vuelo_id):
     """
     Vista para mostrar los detalles de un vuelo específico.
     
     Incluye información del vuelo, asientos disponibles y opciones de reserva.
     """
     # Optimización: incluir avión en una sola consulta
-    vuelo = get_object_or_404(
+    vuelo = await aget_object_or_404(
         Vuelo.objects.select_related('avion'),
         id=vuelo_id
     )
     
-    # Obtener todos los asientos del avión del vuelo
-    todos_asientos = vuelo.avion.asientos.all().order_by('fila', 'columna')
-    
-    # Obtener reservas existentes para este vuelo específico
-    reservas_vuelo = vuelo.reservas.filter(
-        estado__in=['pendiente', 'confirmada']
-    ).select_related('asiento', 'pasajero')
-    
-    # Crear un set de asientos reservados para este vuelo
-    asientos_reservados = set(reserva.asiento.id for reserva in reservas_vuelo)
-    
-    # Filtrar asientos disponibles (no reservados para este vuelo)
-    asientos_disponibles = []
-    asientos_ocupados = []
-    asientos_reservados_otros = []
-    
-    for asiento in todos_asientos:
-        if asiento.id in asientos_reservados:
-            # Asiento reservado para este vuelo
-            asientos_ocupados.append(asiento)
-        elif asiento.estado == 'disponible':
-            # Asiento disponible
-            asientos_disponibles.append(asiento)
-        else:
-            # Asiento ocupado por otros vuelos
-            asientos_reservados_otros.append(asiento)
+    # Mapa de asientos del vuelo (se mide para las métricas de latencia)
+    with medir(MAPA_ASIENTOS_DURACION, origen='detalle_vuelo'):
+        # Obtener todos los asientos del avión del vuelo
+        todos_asientos = [
+            asiento async for asiento in vuelo.avion.asientos.all().order_by('fila', 'columna')
+        ]
     
-    # Agrupar asientos disponibles por tipo
-    asientos_por_tipo = {}
-    for asiento in asientos_disponibles:
-        tipo = asiento.tipo
-        if tipo not in asientos_por_tipo:
-            asientos_por_tipo[tipo] = []
-        asientos_por_tipo[tipo].append(asiento)
+        # Obtener reservas existentes para este vuelo específico
+        reservas_vuelo = [
+            reserva async for reserva in vuelo.reservas.filter(
+                estado__in=['pendiente', 'confirmada']
+            ).select_related('asiento', 'pasajero')
+        ]
+    
+        # Crear un set de asientos reservados para este vuelo
+        asientos_reservados = set(reserva.asiento.id for reserva in reservas_vuelo)
+    
+        # Filtrar asientos disponibles (no reservados para este vuelo)
+        asientos_disponibles = []
+        asientos_ocupados = []
+        asientos_reservados_otros = []
+    
+        for asiento in todos_asientos:
+            if asiento.id in asientos_reservados:
+                # Asiento reservado para este vuelo
+                asientos_ocupados.append(asiento)
+            elif asiento.estado == 'disponible':
+                # Asiento disponible
+                asientos_disponibles.append(asiento)
+            else:
+                # Asiento ocupado por otros vuelos
+                asientos_reservados_otros.append(asiento)
+    
+        # Agrupar asientos disponibles por tipo
+        asientos_por_tipo = {}
+        for asiento in asientos_disponibles:
+            tipo = asiento.tipo
+            if tipo not in asientos_por_tipo:
+                asientos_por_tipo[tipo] = []
+            asientos_por_tipo[tipo].append(asiento)
     
     # Calcular estadísticas precisas
     total_asientos = len(todos_asientos)
@@ -178,19 +210,15 @@ def detalle_vuelo(request, vuelo_id):
     porcentaje_ocupacion = (asientos_ocupados_count / total_asientos) * 100 if total_asientos > 0 else 0
     
     # Verificar si el usuario puede hacer reservas
+    user = await request.auser()
     puede_reservar = (
-        request.user.is_authenticated and 
+        user.is_authenticated and 
         vuelo.estado == 'programado' and 
         asientos_disponibles_count > 0
     )
     
-    # Obtener información de precios por tipo de asiento
-    from decimal import Decimal
-    precios_por_tipo = {
-        'primera': vuelo.precio_base * Decimal('2.5'),  # 150% más caro
-        'premium': vuelo.precio_base * Decimal('1.8'),  # 80% más caro
-        'economica': vuelo.precio_base,      # Precio base
-    }
+    # Precios vigentes por tipo de asiento (tabla de tarifas precalculada)
+    precios_por_tipo = await sync_to_async(TarifaService.precios_por_tipo)(vuelo)
     
     context = {
         'vuelo': vuelo,
@@ -207,10 +235,10 @@ def detalle_vuelo(request, vuelo_id):
         'precios_por_tipo': precios_por_tipo,
     }
     
-    return render(request, 'vuelos/detalle_vuelo.html', context)
+    return await _arender(request, 'vuelos/detalle_vuelo.html', context)
 
 
-def buscar_vuelos(request):
+async def buscar_vuelos(request):
     """
     Vista para buscar vuelos con criterios específicos.
     
@@ -262,10 +290,10 @@ def buscar_vuelos(request):
             'fecha_hasta': fecha_hasta,
             'pasajeros': pasajeros,
             'tipo_asiento': tipo_asiento,
-            'resultados_encontrados': vuelos.count(),
+            'resultados_encontrados': await vuelos.acount(),
         }
         
-        return render(request, 'vuelos/resultados_busqueda.html', context)
+        return await _arender(request, 'vuelos/resultados_busqueda.html', context)
     
     else:
         # Búsqueda por GET (parámetros en URL)
@@ -304,7 +332,9 @@ def buscar_vuelos(request):
         # Paginación para resultados
         paginator = Paginator(vuelos, 10)
         page_number = request.GET.get('page')
-        page_obj = paginator.get_page(page_number)
+        page_obj = await sync_to_async(paginator.get_page)(page_number)
+        page_obj.object_list = [vuelo async for vuelo in page_obj.object_list]
+        await sync_to_async(TarifaService.anotar_precios)(page_obj.object_list)
         
         context = {
             'vuelos': page_obj,
@@ -315,10 +345,10 @@ def buscar_vuelos(request):
             'precio_min': precio_min,
             'precio_max': precio_max,
             'orden': orden,
-            'resultados_encontrados': vuelos.count(),
+            'resultados_encontrados': paginator.count,
         }
         
-        return render(request, 'vuelos/buscar_vuelos.html', context)
+        return await _arender(request, 'vuelos/buscar_vuelos.html', context)
 
 
 @staff_required
@@ -372,74 +402,109 @@ def asientos_avion(request, avion_id):
     return render(request, 'vuelos/asientos_avion.html', context)
 
 
+def _etag_disponibilidad(request, *args, **kwargs):
+    """ETag de las vistas de disponibilidad: la versión de la disponibilidad del vuelo."""
+    vuelo_id = kwargs.get('vuelo_id') or request.GET.get('vuelo_id')
+    if not vuelo_id or not str(vuelo_id).isdigit():
+        return None
+    return DisponibilidadService.version(int(vuelo_id))
+
+
+def _parsear_ids(texto: str) -> list[int] | None:
+    """Convierte '1,2,3' en [1, 2, 3]; None si el texto no es válido."""
+    partes = [parte.strip() for parte in texto.split(',') if parte.strip()]
+    if not all(parte.isdigit() for parte in partes):
+        return None
+    return [int(parte) for parte in partes]
+
+
+@cache_control(no_cache=True)
+@condition(etag_func=_etag_disponibilidad)
 def verificar_disponibilidad(request, asiento_id):
     """
     Vista API para verificar la disponibilidad de un asiento específico.
     
     Retorna JSON con el estado del asiento y validaciones de negocio.
+    Con vuelo_id la respuesta sale de la disponibilidad en caché del vuelo
+    (sin consultas si está cargada) y admite If-None-Match.
     """
     from django.utils import timezone
     
-    asiento = get_object_or_404(Asiento, id=asiento_id)
     vuelo_id = request.GET.get('vuelo_id')
+    disponibilidad = None
+    if vuelo_id and vuelo_id.isdigit():
+        disponibilidad = DisponibilidadService.verificar(int(vuelo_id), [asiento_id])
+    
+    if disponibilidad and disponibilidad['asientos']:
+        data = dict(disponibilidad['asientos'][0])
+    else:
+        # Sin vuelo, o el asiento no es del avión del vuelo
+        asiento = get_object_or_404(Asiento, id=asiento_id)
+        disponible_basico = asiento.estado == 'disponible'
+        disponible_vuelo = not vuelo_id
+        data = {
+            'asiento_id': asiento.id,
+            'numero': asiento.numero,
+            'fila': asiento.fila,
+            'columna': asiento.columna,
+            'estado': asiento.estado,
+            'tipo': asiento.tipo,
+            'disponible_basico': disponible_basico,
+            'disponible_vuelo': disponible_vuelo,
+            'disponible': disponible_basico and disponible_vuelo,
+            'en_mantenimiento': asiento.estado == 'en_mantenimiento',
+            'precio': None,
+            'reserva_existente': None,
+        }
     
-    # Verificar disponibilidad básica del asiento
-    disponible_basico = asiento.estado == 'disponible'
+    data['timestamp'] = timezone.now().isoformat()
+    return JsonResponse(data)
+
+
+@cache_control(no_cache=True)
+@condition(etag_func=_etag_disponibilidad)
+def disponibilidad_vuelo(request, vuelo_id):
+    """
+    Vista API con la disponibilidad de varios asientos de un vuelo.
     
-    # Verificar disponibilidad para un vuelo específico
-    disponible_vuelo = True
-    reserva_existente = None
+    El selector de asientos la consulta periódicamente con If-None-Match:
+    mientras la ocupación del vuelo no cambie recibe 304 sin cuerpo.
     
-    if vuelo_id:
-        try:
-            vuelo = Vuelo.objects.get(id=vuelo_id)
-            reserva_existente = Reserva.objects.filter(
-                vuelo=vuelo,
-                asiento=asiento,
-                estado__in=['pendiente', 'confirmada']
-            ).first()
-            
-            if reserva_existente:
-                disponible_vuelo = False
-                
-        except Vuelo.DoesNotExist:
-            disponible_vuelo = False
-    
-    # Verificar si el asiento está en mantenimiento
-    en_mantenimiento = asiento.estado == 'mantenimiento'
-    
-    # Calcular precio del asiento si hay vuelo
-    precio_asiento = None
-    if vuelo_id:
-        try:
-            vuelo = Vuelo.objects.get(id=vuelo_id)
-            from decimal import Decimal
-            precios_por_tipo = {
-                'primera': vuelo.precio_base * Decimal('2.5'),
-                'premium': vuelo.precio_base * Decimal('1.8'),
-                'economica': vuelo.precio_base,
-            }
-            precio_asiento = precios_por_tipo.get(asiento.tipo, vuelo.precio_base)
-        except Vuelo.DoesNotExist:
-            pass
-    
-    data = {
-        'asiento_id': asiento.id,
-        'numero': asiento.numero,
-        'fila': asiento.fila,
-        'columna': asiento.columna,
-        'estado': asiento.estado,
-        'tipo': asiento.tipo,
-        'disponible_basico': disponible_basico,
-        'disponible_vuelo': disponible_vuelo,
-        'disponible': disponible_basico and disponible_vuelo,
-        'en_mantenimiento': en_mantenimiento,
-        'precio': precio_asiento,
-        'reserva_existente': reserva_existente.codigo_reserva if reserva_existente else None,
-        'timestamp': timezone.now().isoformat(),
-    }
+    Parámetros GET:
+        asientos: IDs separados por coma (opcional, por defecto todos)
+    """
+    asiento_ids = None
+    if request.GET.get('asientos'):
+        asiento_ids = _parsear_ids(request.GET['asientos'])
+        if asiento_ids is None:
+            return JsonResponse({'error': 'Lista de asientos no válida'}, status=400)
+    
+    disponibilidad = DisponibilidadService.verificar(vuelo_id, asiento_ids)
+    if disponibilidad is None:
+        return JsonResponse({'error': 'Vuelo no encontrado'}, status=404)
+    return JsonResponse(disponibilidad)
+
+
+async def stream_asientos(request, vuelo_id):
+    """
+    Vista de server-sent events con los cambios del mapa de asientos de un vuelo.
     
-    return JsonResponse(data)
+    Solo funciona bajo ASGI: bajo WSGI cada conexión abierta ocuparía un
+    worker, así que responde 501 y el selector vuelve a consultar
+    periódicamente disponibilidad_vuelo.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'El mapa en vivo requiere un servidor ASGI'}, status=501)
+    if await sync_to_async(DisponibilidadService.version)(vuelo_id) is None:
+        return JsonResponse({'error': 'Vuelo no encontrado'}, status=404)
+    
+    response = StreamingHttpResponse(
+        MapaEnVivoService.transmitir(vuelo_id), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Evitar que un proxy (nginx) acumule el stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 
 def test_translation(request):